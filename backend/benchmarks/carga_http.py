@@ -0,0 +1,137 @@
+"""
+Prueba de carga HTTP simple (solo biblioteca estándar) para comparar modos de
+servicio, p. ej. gunicorn sync (WSGI) contra workers de uvicorn (ASGI).
+
+Uso:
+    python benchmarks/carga_http.py --base http://127.0.0.1:8000 --token <token> \
+        --concurrencia 16 --duracion 20 /api/cursos/ /api/notificaciones/ /api/foro/ /api/logros/
+
+Cada hilo recorre las rutas en ciclo durante ``--duracion`` segundos. Se
+reporta por ruta: peticiones, errores, peticiones/s y latencias p50/p95/p99 (ms).
+Con ``--json`` imprime el resultado en JSON.
+
+``--clientes-lentos N`` abre además N subidas que envían el cuerpo byte a byte
+(como un upload grande desde una red lenta) a ``--ruta-lenta`` durante toda la
+prueba, para medir cuánto afectan a las lecturas.
+"""
+import argparse
+import json
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+
+def _trabajador(base, rutas, cabeceras, fin, latencias, errores, candado, desfase):
+    i = desfase
+    while time.perf_counter() < fin:
+        ruta = rutas[i % len(rutas)]
+        i += 1
+        peticion = urllib.request.Request(base + ruta, headers=cabeceras)
+        inicio = time.perf_counter()
+        try:
+            with urllib.request.urlopen(peticion, timeout=60) as respuesta:
+                respuesta.read()
+            ok = True
+        except (urllib.error.URLError, OSError):
+            ok = False
+        transcurrido = (time.perf_counter() - inicio) * 1000
+        with candado:
+            if ok:
+                latencias[ruta].append(transcurrido)
+            else:
+                errores[ruta] += 1
+
+
+def _cliente_lento(base, ruta, token, fin):
+    """POST multipart cuyo cuerpo se envía a 1 byte cada 0.5 s hasta ``fin``."""
+    host, _, puerto = base.split('://', 1)[1].rstrip('/').partition(':')
+    try:
+        conexion = socket.create_connection((host, int(puerto or 80)), timeout=5)
+    except OSError:
+        return
+    with conexion:
+        cabecera = (
+            f'POST {ruta} HTTP/1.1\r\nHost: {host}\r\n'
+            f'Authorization: Token {token}\r\n'
+            'Content-Type: multipart/form-data; boundary=limite\r\nContent-Length: 10000000\r\n\r\n'
+        )
+        try:
+            conexion.sendall(cabecera.encode())
+            while time.perf_counter() < fin:
+                conexion.sendall(b'x')
+                time.sleep(0.5)
+        except OSError:
+            pass
+
+
+def ejecutar(base, rutas, token=None, concurrencia=8, duracion=10, clientes_lentos=0, ruta_lenta=None):
+    cabeceras = {'Authorization': f'Token {token}'} if token else {}
+    latencias = defaultdict(list)
+    errores = defaultdict(int)
+    candado = threading.Lock()
+    fin = time.perf_counter() + duracion
+    with ThreadPoolExecutor(max_workers=concurrencia + clientes_lentos) as pool:
+        for _ in range(clientes_lentos):
+            pool.submit(_cliente_lento, base, ruta_lenta or rutas[0], token or '', fin)
+        for desfase in range(concurrencia):
+            pool.submit(_trabajador, base.rstrip('/'), rutas, cabeceras, fin, latencias, errores, candado, desfase)
+
+    resultado = {}
+    for ruta in rutas:
+        valores = latencias[ruta]
+        resultado[ruta] = {
+            'peticiones': len(valores),
+            'errores': errores[ruta],
+            'rps': round(len(valores) / duracion, 1),
+            'p50_ms': round(percentil(valores, 50) or 0, 1),
+            'p95_ms': round(percentil(valores, 95) or 0, 1),
+            'p99_ms': round(percentil(valores, 99) or 0, 1),
+        }
+    total = sum(len(valores) for valores in latencias.values())
+    resultado['total'] = {'peticiones': total, 'rps': round(total / duracion, 1)}
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('rutas', nargs='+')
+    parser.add_argument('--base', default='http://127.0.0.1:8000')
+    parser.add_argument('--token')
+    parser.add_argument('--concurrencia', type=int, default=8)
+    parser.add_argument('--duracion', type=float, default=10)
+    parser.add_argument('--clientes-lentos', type=int, default=0)
+    parser.add_argument('--ruta-lenta', default='/api/recursos-comunidad/')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    resultado = ejecutar(
+        args.base, args.rutas, args.token, args.concurrencia, args.duracion,
+        args.clientes_lentos, args.ruta_lenta
+    )
+    if args.json:
+        print(json.dumps(resultado, indent=2))
+        return
+    print(f"{'ruta':<30} {'peticiones':>10} {'errores':>8} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for ruta in args.rutas:
+        fila = resultado[ruta]
+        print(
+            f"{ruta:<30} {fila['peticiones']:>10} {fila['errores']:>8} {fila['rps']:>8} "
+            f"{fila['p50_ms']:>8} {fila['p95_ms']:>8} {fila['p99_ms']:>8}"
+        )
+    print(f"{'total':<30} {resultado['total']['peticiones']:>10} {'':>8} {resultado['total']['rps']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""
+Concurrencia de escrituras en SQLite, antes y después del perfil de producción:
+
+- ``antes``: motor por defecto de Django (journal DELETE, ``BEGIN`` diferido)
+  y sin reintentos (``ESCRITURA_REINTENTOS=0``).
+- ``despues``: ``estudiapro.sqlite`` (WAL, PRAGMA, ``BEGIN IMMEDIATE``) con los
+  reintentos de ``estudiapro.escrituras``.
+
+Uso (desde backend/):
+    python benchmarks/escrituras_sqlite.py --workers 2 --concurrencia 16 --duracion 15
+
+Para cada perfil crea una base nueva en un directorio temporal (``migrate`` más
+un curso, un recurso, una respuesta del foro y ``--concurrencia`` estudiantes),
+levanta gunicorn con ``--workers`` workers sync y cada hilo, con su propio
+estudiante, repite ``track-time``, ``marcar_completado`` y ``votar`` durante
+``--duracion`` segundos. Se reporta por perfil: escrituras exitosas por segundo,
+errores (HTTP 500 por "database is locked"), latencias y si los contadores
+quedaron consistentes (minutos sumados y votos contra filas de voto).
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from carga_http import percentil
+
+
+BACKEND = Path(__file__).resolve().parent.parent
+PERFILES = {
+    'antes': {'DB_ENGINE': 'django.db.backends.sqlite3', 'ESCRITURA_REINTENTOS': '0'},
+    'despues': {'DB_ENGINE': 'estudiapro.sqlite'},
+}
+
+PREPARAR = """
+import json
+from rest_framework.authtoken.models import Token
+from usuarios.models import Creador, Estudiante, Usuario
+from cursos.models import Curso, Modulo, Recurso, RespuestaForo, TemaForo
+
+autor = Usuario.objects.create_user('bench_creador', 'bench_creador@example.com', 'x', rol='CREADOR')
+creador = Creador.objects.create(id_usuario=autor, especialidad='Benchmark')
+curso = Curso.objects.create(titulo='Benchmark', descripcion='Escrituras', creador=creador)
+modulo = Modulo.objects.create(curso=curso, titulo='Modulo', orden=1)
+recurso = Recurso.objects.create(modulo=modulo, titulo='Recurso', tipo='VIDEO')
+tema = TemaForo.objects.create(titulo='Benchmark', contenido='Votos', autor=autor)
+respuesta = RespuestaForo.objects.create(tema=tema, autor=autor, contenido='Respuesta')
+tokens = []
+for i in range({usuarios}):
+    usuario = Usuario.objects.create_user(f'bench_{{i}}', f'bench_{{i}}@example.com', 'x', rol='ESTUDIANTE')
+    Estudiante.objects.create(id_usuario=usuario, nivel_escolar='Universidad')
+    tokens.append(Token.objects.create(user=usuario).key)
+print(json.dumps({{'recurso': recurso.id, 'respuesta': respuesta.id, 'tokens': tokens}}))
+"""
+
+
+def _entorno(perfil, base_datos, directorio):
+    return {
+        **os.environ,
+        **PERFILES[perfil],
+        'DB_NAME': str(base_datos),
+        'CACHE_LOCATION': str(directorio / 'cache'),
+        'DJANGO_DEBUG': 'False',
+        'DJANGO_ALLOWED_HOSTS': '127.0.0.1',
+    }
+
+
+def preparar(directorio, usuarios):
+    """Base migrada con datos de prueba; regresa su ruta y los ids/tokens."""
+    base_datos = directorio / 'preparada.sqlite3'
+    entorno = _entorno('antes', base_datos, directorio)
+    subprocess.run(
+        [sys.executable, 'manage.py', 'migrate', '--noinput'],
+        cwd=BACKEND, env=entorno, check=True, stdout=subprocess.DEVNULL
+    )
+    salida = subprocess.run(
+        [sys.executable, 'manage.py', 'shell', '-c', PREPARAR.format(usuarios=usuarios)],
+        cwd=BACKEND, env=entorno, check=True, capture_output=True, text=True
+    ).stdout
+    return base_datos, json.loads(salida.strip().splitlines()[-1])
+
+
+def _esperar_puerto(puerto, limite=20):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        try:
+            socket.create_connection(('127.0.0.1', puerto), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'gunicorn no respondió en el puerto {puerto}')
+
+
+def _post(url, token, cuerpo):
+    peticion = urllib.request.Request(
+        url, data=json.dumps(cuerpo).encode(), method='POST',
+        headers={'Authorization': f'Token {token}', 'Content-Type': 'application/json'}
+    )
+    try:
+        with urllib.request.urlopen(peticion, timeout=60) as respuesta:
+            respuesta.read()
+            return respuesta.status
+    except urllib.error.HTTPError as exc:
+        return exc.code
+    except OSError:
+        return None
+
+
+def _trabajador(base, token, datos, fin, resultados, candado):
+    operaciones = [
+        ('track_time', f'{base}/api/auth/track-time/', {'minutes': 1}),
+        ('marcar_completado', f"{base}/api/recursos/{datos['recurso']}/marcar_completado/", {}),
+        ('votar', f"{base}/api/foro/respuesta/{datos['respuesta']}/votar/", {'tipo': 'UP'}),
+    ]
+    i = 0
+    while time.perf_counter() < fin:
+        nombre, url, cuerpo = operaciones[i % len(operaciones)]
+        i += 1
+        inicio = time.perf_counter()
+        codigo = _post(url, token, cuerpo)
+        transcurrido = (time.perf_counter() - inicio) * 1000
+        with candado:
+            if codigo is not None and codigo < 400:
+                resultados['latencias'].append(transcurrido)
+                resultados['exitos'][nombre] += 1
+            else:
+                resultados['errores'] += 1
+
+
+def _consistencia(base_datos, exitos):
+    with sqlite3.connect(base_datos) as conexion:
+        minutos = conexion.execute(
+            "SELECT COALESCE(SUM(tiempo_estudio_minutos), 0) FROM estudiante"
+        ).fetchone()[0]
+        votos, reales = conexion.execute(
+            "SELECT r.votos, (SELECT COUNT(*) FROM voto_respuesta v WHERE v.respuesta_id = r.id AND v.tipo = 'UP')"
+            " - (SELECT COUNT(*) FROM voto_respuesta v WHERE v.respuesta_id = r.id AND v.tipo = 'DOWN')"
+            " FROM respuesta_foro r"
+        ).fetchone()
+    return {
+        'minutos_esperados': exitos['track_time'],
+        'minutos_guardados': minutos,
+        'votos_contador': votos,
+        'votos_reales': reales,
+        'consistente': minutos == exitos['track_time'] and votos == reales,
+    }
+
+
+def medir(perfil, preparada, datos, directorio, workers, duracion, puerto):
+    base_datos = directorio / f'{perfil}.sqlite3'
+    shutil.copy(preparada, base_datos)
+    with sqlite3.connect(base_datos) as conexion:
+        # Cada corrida parte del modo de journal por defecto
+        conexion.execute('PRAGMA journal_mode = DELETE')
+
+    servidor = subprocess.Popen(
+        [
+            sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{puerto}',
+            '--timeout', '120', 'estudiapro.wsgi:application',
+        ],
+        cwd=BACKEND, env=_entorno(perfil, base_datos, directorio),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        _esperar_puerto(puerto)
+        resultados = {'latencias': [], 'errores': 0, 'exitos': dict.fromkeys(('track_time', 'marcar_completado', 'votar'), 0)}
+        candado = threading.Lock()
+        fin = time.perf_counter() + duracion
+        hilos = [
+            threading.Thread(
+                target=_trabajador,
+                args=(f'http://127.0.0.1:{puerto}', token, datos, fin, resultados, candado)
+            )
+            for token in datos['tokens']
+        ]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+    latencias = resultados['latencias']
+    exitosas = len(latencias)
+    return {
+        'perfil': perfil,
+        'motor': PERFILES[perfil]['DB_ENGINE'],
+        'escrituras': exitosas,
+        'escrituras_por_segundo': round(exitosas / duracion, 1),
+        'errores': resultados['errores'],
+        'p50_ms': round(percentil(latencias, 50) or 0, 1),
+        'p95_ms': round(percentil(latencias, 95) or 0, 1),
+        'p99_ms': round(percentil(latencias, 99) or 0, 1),
+        'por_operacion': resultados['exitos'],
+        **_consistencia(base_datos, resultados['exitos']),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrencia', type=int, default=16)
+    parser.add_argument('--duracion', type=float, default=15)
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--perfiles', nargs='+', choices=list(PERFILES), default=list(PERFILES))
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+
+    directorio = Path(tempfile.mkdtemp(prefix='escrituras_sqlite_'))
+    try:
+        preparada, datos = preparar(directorio, args.concurrencia)
+        resultados = [
+            medir(perfil, preparada, datos, directorio, args.workers, args.duracion, args.puerto)
+            for perfil in args.perfiles
+        ]
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+        return
+    print(f"{'perfil':<8} {'motor':<28} {'escrituras/s':>12} {'errores':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'consistente':>12}")
+    for fila in resultados:
+        print(
+            f"{fila['perfil']:<8} {fila['motor']:<28} {fila['escrituras_por_segundo']:>12} {fila['errores']:>8} "
+            f"{fila['p50_ms']:>8} {fila['p95_ms']:>8} {fila['p99_ms']:>8} {str(fila['consistente']):>12}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,428 @@
+"""
+Latencia, consultas y memoria de cada ruta de ``cursos/urls.py`` y
+``usuarios/urls.py`` sobre los datos de ``generar_datos_sinteticos``.
+
+Uso (desde backend/, con la base ya generada):
+    python manage.py generar_datos_sinteticos --escala 10k
+    python benchmarks/rutas.py --repeticiones 30 --salida base.json
+    ... cambios ...
+    python benchmarks/rutas.py --repeticiones 30 --comparar base.json
+
+Las rutas salen del resolver de URLs (no de una lista a mano), así que una ruta
+nueva se mide sin tocar este archivo; ``ESCENARIOS`` solo agrega el rol, el
+cuerpo o los parámetros que necesita cada (ruta, método). Una ruta de detalle
+cuyo ``pk`` no tiene muestra en ``PK_POR_PREFIJO`` se omite con un aviso en
+stderr en lugar de detener la corrida. Cada ruta corre con el cliente de
+pruebas de Django en un proceso hijo (``fork``), con una petición de
+calentamiento y luego ``--repeticiones`` medidas; cada petición va dentro de una
+transacción que se revierte, así que los POST/PUT/DELETE no cambian los datos y
+todas las repeticiones parten del mismo estado. Por ruta se reporta p50/p95/p99
+en ms, consultas SQL por petición (``estudiapro.instrumentacion.MedidorConsultas``),
+el código de estado y el RSS pico del hijo (y cuánto creció durante la ruta).
+
+``--comparar`` marca las rutas que hacen más consultas que en el JSON de
+referencia o cuyo p95 creció más de ``--tolerancia`` (y más de ``--margen-ms``),
+y termina con código 1 si hay alguna.
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from carga_http import percentil
+
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'estudiapro.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection, connections, transaction  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.urls import URLResolver, reverse  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework.authtoken.models import Token  # noqa: E402
+
+from cursos import subidas, urls as cursos_urls  # noqa: E402
+from cursos.management.commands.generar_datos_sinteticos import CONTRASENA, PREFIJO  # noqa: E402
+from cursos.models import (  # noqa: E402
+    Curso, Examen, Formulario, FormularioEstudio, Inscripcion, Modulo, Notificacion, Pregunta, ProximaActividad,
+    Recurso, RecursoComunidad, RespuestaForo, SubidaArchivo, TemaForo, TutorPerfil, Tutoria,
+)
+from estudiapro.instrumentacion import MedidorConsultas  # noqa: E402
+from usuarios import urls as usuarios_urls  # noqa: E402
+from usuarios.models import Usuario  # noqa: E402
+
+
+MODULOS_URLS = ((cursos_urls, 'api/'), (usuarios_urls, 'api/auth/'))
+METODOS = ('get', 'post', 'put', 'patch', 'delete')
+# Muestra que llena el ``pk`` de las rutas de detalle, por prefijo del nombre de la URL
+PK_POR_PREFIJO = {
+    'curso-': 'curso', 'recurso-comunidad-': 'recurso_comunidad', 'recurso-': 'recurso',
+    'pregunta-': 'pregunta', 'examen-': 'examen', 'foro-': 'tema', 'formulario-estudio-': 'formulario_estudio',
+    'formulario-': 'formulario', 'proxima-actividad-': 'proxima_actividad', 'tutor-': 'tutor',
+    'notificacion-': 'notificacion', 'manage-user-detail': 'usuario', 'subida-': 'subida',
+}
+
+
+def _preparar_entorno():
+    # Igual que el runner de pruebas: el cliente de Django usa el host "testserver"
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+    # El código de estado y las consultas ya quedan en el reporte; los logs por petición solo estorban
+    for nombre in ('django.request', 'estudiapro.instrumentacion'):
+        logging.getLogger(nombre).setLevel(logging.CRITICAL)
+
+
+def _subida(usuario, nombre):
+    """
+    Sesión de subida vigente de ``usuario`` con ``nombre``; las sesiones vencen
+    (``SUBIDAS_TTL``) y ``limpiar_subidas`` las borra, así que si no hay una con
+    su archivo temporal se abre otra.
+    """
+    subida = SubidaArchivo.objects.filter(usuario=usuario, nombre=nombre, expira__gt=timezone.now()).first()
+    if subida is None or not os.path.exists(subidas.ruta(subida)):
+        subida = subidas.crear(usuario, nombre, 1024)
+    return subida
+
+
+def muestras():
+    """Usuarios con token y objetos de ejemplo para llenar rutas y cuerpos."""
+    recurso_comunidad = RecursoComunidad.objects.filter(
+        autor__username__startswith=f'{PREFIJO}estudiante'
+    ).select_related('autor').first()
+    if recurso_comunidad is None:
+        raise SystemExit('No hay datos sintéticos: corre antes "python manage.py generar_datos_sinteticos"')
+    estudiante = recurso_comunidad.autor
+    formulario = Formulario.objects.filter(creador__username__startswith=PREFIJO).select_related('creador').first()
+    creador = formulario.creador
+    inscripcion = Inscripcion.objects.filter(estudiante__id_usuario=estudiante).first()
+    examen = Examen.objects.filter(curso_id=inscripcion.curso_id).first()
+    tema = TemaForo.objects.filter(autor=estudiante).first() or TemaForo.objects.filter(curso_id=inscripcion.curso_id).first()
+    usuarios = {
+        'estudiante': estudiante,
+        'creador': creador,
+        'administrador': Usuario.objects.get(username=f'{PREFIJO}admin_0'),
+    }
+    return {
+        'tokens': {rol: Token.objects.get_or_create(user=usuario)[0].key for rol, usuario in usuarios.items()},
+        'username': estudiante.username,
+        'curso': inscripcion.curso_id,
+        'curso_no_inscrito': Curso.objects.exclude(inscripciones__estudiante__id_usuario=estudiante).first().id,
+        'modulo': Modulo.objects.filter(curso_id=inscripcion.curso_id).first().id,
+        'recurso': Recurso.objects.filter(modulo__curso_id=inscripcion.curso_id).first().id,
+        'pregunta': Pregunta.objects.filter(modulo__curso_id=inscripcion.curso_id).first().id,
+        'examen': examen.id,
+        'respuestas_examen': {str(p.id): p.respuesta_correcta for p in examen.preguntas.all()},
+        'tema': tema.id,
+        'respuesta': RespuestaForo.objects.filter(tema=tema).first().id,
+        'recurso_comunidad': recurso_comunidad.id,
+        'formulario': formulario.id,
+        'preguntas_formulario': list(formulario.preguntas.values_list('id', flat=True)),
+        'formulario_estudio': FormularioEstudio.objects.filter(activo=True).first().id,
+        'proxima_actividad': ProximaActividad.objects.filter(estudiante__id_usuario=estudiante).first().id,
+        'tutor': TutorPerfil.objects.filter(activo=True).first().pk,
+        'tutoria': (Tutoria.objects.filter(tutor__id_usuario=creador).first() or Tutoria.objects.first()).id,
+        'notificacion': Notificacion.objects.filter(usuario=estudiante).first().id,
+        'usuario': Usuario.objects.filter(username__startswith=f'{PREFIJO}estudiante').exclude(pk=estudiante.pk).first().id,
+        'subida': _subida(estudiante, 'benchmark.pdf').pk,
+        # El DELETE borra el archivo temporal aunque la transacción se revierta: va en su propia sesión
+        'subida_borrable': _subida(estudiante, 'benchmark-borrar.pdf').pk,
+    }
+
+
+def escenarios(m):
+    """Rol, cuerpo y query string por (nombre de URL, método); lo demás es un GET del estudiante."""
+    fecha = (timezone.localdate() + timedelta(days=30)).isoformat()
+    return {
+        ('register', 'post'): {'rol': None, 'cuerpo': {
+            'username': 'bench_registro', 'email': 'bench_registro@example.com', 'password': 'bench123',
+            'password_confirm': 'bench123', 'rol': 'ESTUDIANTE', 'nivel_escolar': 'Universidad',
+        }},
+        ('login', 'post'): {'rol': None, 'cuerpo': {'username': m['username'], 'password': CONTRASENA}},
+        ('track-time', 'post'): {'cuerpo': {'minutes': 1}},
+        ('manage-users', 'get'): {'rol': 'administrador'},
+        ('manage-user-detail', 'put'): {'rol': 'administrador', 'cuerpo': {'is_premium': True}},
+        ('manage-user-detail', 'delete'): {'rol': 'administrador'},
+        ('curso-list', 'post'): {'rol': 'administrador', 'cuerpo': {
+            'titulo': 'Curso bench', 'descripcion': 'Benchmark', 'temario': [{'titulo': 'Tema 1'}],
+        }},
+        ('curso-detail', 'put'): {'rol': 'administrador', 'cuerpo': {
+            'titulo': 'Curso bench', 'descripcion': 'Benchmark',
+        }},
+        ('curso-detail', 'patch'): {'rol': 'administrador', 'cuerpo': {'titulo': 'Curso bench'}},
+        ('curso-detail', 'delete'): {'rol': 'administrador'},
+        ('curso-inscribirse', 'post'): {'pk': 'curso_no_inscrito'},
+        ('recurso-marcar-completado', 'post'): {'cuerpo': {'tiempo_dedicado': 5}},
+        ('recursos-comprar', 'post'): {'cuerpo': {'resourceId': m['recurso_comunidad']}},
+        ('recursos-descargar', 'post'): {'cuerpo': {'resourceId': m['recurso_comunidad']}},
+        ('pregunta-por-modulo', 'get'): {'query': {'modulo_id': m['modulo']}},
+        ('pregunta-por-dificultad', 'get'): {'query': {'dificultad': 'MEDIA', 'modulo_id': m['modulo']}},
+        ('examen-generar-simulador', 'post'): {'cuerpo': {
+            'courseId': m['curso'], 'questionsCount': 5, 'difficulty': 'MEDIA',
+        }},
+        ('examen-plantillas', 'get'): {'query': {'courseId': m['curso']}},
+        ('examen-enviar-respuestas', 'post'): {'cuerpo': {'answers': m['respuestas_examen']}},
+        ('foro-list', 'post'): {'cuerpo': {'titulo': 'Tema bench', 'contenido': 'Benchmark', 'curso': m['curso']}},
+        ('foro-buscar', 'get'): {'query': {'q': 'derivada'}},
+        ('foro-detail', 'put'): {'cuerpo': {'titulo': 'Tema bench', 'contenido': 'Benchmark'}},
+        ('foro-detail', 'patch'): {'cuerpo': {'titulo': 'Tema bench'}},
+        ('foro-responder', 'post'): {'cuerpo': {'contenido': 'Respuesta bench'}},
+        ('votar-respuesta', 'post'): {'kwargs': {'respuesta_id': m['respuesta']}, 'cuerpo': {'tipo': 'UP'}},
+        ('recurso-comunidad-list', 'post'): {'cuerpo': {
+            'titulo': 'Recurso bench', 'descripcion': 'Benchmark', 'tipo': 'ENLACE',
+            'archivo_url': 'https://example.com/bench', 'curso': m['curso'],
+        }},
+        ('recurso-comunidad-buscar', 'get'): {'query': {'q': 'integral'}},
+        ('recurso-comunidad-por-curso', 'get'): {'query': {'curso_id': m['curso']}},
+        ('recurso-comunidad-detail', 'put'): {'cuerpo': {
+            'titulo': 'Recurso bench', 'descripcion': 'Benchmark', 'tipo': 'ENLACE',
+        }},
+        ('recurso-comunidad-detail', 'patch'): {'cuerpo': {'titulo': 'Recurso bench'}},
+        ('recurso-comunidad-calificar', 'post'): {'cuerpo': {'calificacion': 5, 'comentario': 'Bench'}},
+        ('formulario-list', 'post'): {'rol': 'creador', 'cuerpo': {
+            'titulo': 'Encuesta bench', 'descripcion': 'Benchmark', 'tipo': 'ENCUESTA',
+        }},
+        ('formulario-detail', 'put'): {'rol': 'creador', 'cuerpo': {
+            'titulo': 'Encuesta bench', 'descripcion': 'Benchmark', 'tipo': 'ENCUESTA',
+        }},
+        ('formulario-detail', 'patch'): {'rol': 'creador', 'cuerpo': {'titulo': 'Encuesta bench'}},
+        ('formulario-detail', 'delete'): {'rol': 'creador'},
+        ('formulario-responder', 'post'): {'cuerpo': {'respuestas': [
+            {'pregunta': pregunta, 'respuesta_texto': '4'} for pregunta in m['preguntas_formulario']
+        ]}},
+        ('formulario-resultados', 'get'): {'rol': 'creador'},
+        ('formulario-mis-formularios', 'get'): {'rol': 'creador'},
+        ('formulario-estudio-list', 'post'): {'rol': 'administrador', 'cuerpo': {
+            'title': 'Formulario bench', 'subject': 'Cálculo', 'url': 'https://example.com/f.pdf',
+        }},
+        ('formulario-estudio-detail', 'put'): {'rol': 'administrador', 'cuerpo': {
+            'title': 'Formulario bench', 'url': 'https://example.com/f.pdf',
+        }},
+        ('formulario-estudio-detail', 'patch'): {'rol': 'administrador', 'cuerpo': {
+            'title': 'Formulario bench', 'url': 'https://example.com/f.pdf',
+        }},
+        ('formulario-estudio-detail', 'delete'): {'rol': 'administrador'},
+        ('proxima-actividad-list', 'post'): {'cuerpo': {'titulo': 'Repaso bench', 'tipo': 'ESTUDIO', 'fecha': fecha}},
+        ('proxima-actividad-detail', 'put'): {'cuerpo': {'titulo': 'Repaso bench', 'tipo': 'ESTUDIO', 'fecha': fecha}},
+        ('proxima-actividad-detail', 'patch'): {'cuerpo': {'titulo': 'Repaso bench'}},
+        ('proxima-actividad-calificar', 'post'): {'cuerpo': {'calificacion': 5}},
+        ('tutor-me', 'get'): {'rol': 'creador'},
+        ('tutor-me', 'put'): {'rol': 'creador', 'cuerpo': {'bio': 'Benchmark', 'active': True}},
+        ('tutor-agendar', 'post'): {'cuerpo': {
+            'tutorId': m['tutor'], 'subjectId': m['curso'], 'duration': 30, 'topic': 'Benchmark',
+        }},
+        ('tutor-actualizar-solicitud', 'put'): {
+            'rol': 'creador', 'kwargs': {'tutoria_id': m['tutoria']}, 'cuerpo': {'estado': 'ACEPTADA'},
+        },
+        ('tutor-actualizar-solicitud', 'delete'): {'rol': 'creador', 'kwargs': {'tutoria_id': m['tutoria']}},
+        ('notificacion-mark-read', 'post'): {'cuerpo': {'id': m['notificacion']}},
+        ('notificacion-delete-one', 'post'): {'cuerpo': {'id': m['notificacion']}},
+        ('actualizar-fecha-examen', 'put'): {'cuerpo': {'subjectId': m['curso'], 'examDate': fecha, 'examTime': '09:00'}},
+        ('buscar-cursos', 'get'): {'query': {'q': 'matriz'}},
+        ('subida-detail', 'delete'): {'pk': 'subida_borrable'},
+        ('subida-list', 'post'): {'cuerpo': {'nombre': 'benchmark.pdf', 'tamano': 1024}},
+        # El cuerpo JSON hace de bytes de la parte; cada repetición se revierte y la reescribe
+        ('subida-parte', 'put'): {'kwargs': {'numero': 0}},
+    }
+
+
+def _recorrer(patrones):
+    for patron in patrones:
+        if isinstance(patron, URLResolver):
+            yield from _recorrer(patron.url_patterns)
+        elif patron.name and patron.name != 'api-root' and 'format' not in patron.pattern.regex.groupindex:
+            yield patron
+
+
+def rutas():
+    """(nombre, método, kwargs esperados) de cada ruta, en el orden de los urls.py."""
+    vistas = []
+    for modulo, _ in MODULOS_URLS:
+        for patron in _recorrer(modulo.urlpatterns):
+            vista = patron.callback
+            if getattr(vista, 'actions', None):
+                metodos = list(vista.actions)
+            else:
+                metodos = [metodo for metodo in METODOS if hasattr(getattr(vista, 'cls', None), metodo)]
+            for metodo in metodos:
+                vistas.append((patron.name, metodo, list(patron.pattern.regex.groupindex)))
+    return vistas
+
+
+def preparar_peticion(nombre, metodo, parametros, m, extra):
+    """
+    ``(ruta, argumentos del cliente)``, o ``None`` si la ruta pide un ``pk`` para
+    el que no hay muestra (falta en ``PK_POR_PREFIJO`` o en ``muestras()``).
+    """
+    kwargs = dict(extra.get('kwargs', {}))
+    if 'pk' in parametros:
+        clave = extra.get('pk') or next(
+            (muestra for prefijo, muestra in PK_POR_PREFIJO.items() if nombre.startswith(prefijo)), None
+        )
+        if m.get(clave) is None:
+            return None
+        kwargs['pk'] = m[clave]
+    ruta = reverse(nombre, kwargs=kwargs)
+    rol = extra.get('rol', 'estudiante')
+    cabeceras = {'HTTP_AUTHORIZATION': f"Token {m['tokens'][rol]}"} if rol else {}
+    if metodo == 'get':
+        return ruta, {'data': extra.get('query', {}), **cabeceras}
+    return ruta, {'data': json.dumps(extra.get('cuerpo', {})), 'content_type': 'application/json', **cabeceras}
+
+
+def _medir(ruta, metodo, argumentos, repeticiones):
+    """Corre en el proceso hijo: calentamiento más ``repeticiones`` peticiones revertidas."""
+    cliente = Client(raise_request_exception=False)
+    pedir = getattr(cliente, metodo)
+    rss_inicial = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    latencias, consultas, codigo = [], [], None
+    for i in range(repeticiones + 1):
+        medidor = MedidorConsultas()
+        with transaction.atomic(), connection.execute_wrapper(medidor):
+            inicio = time.perf_counter()
+            respuesta = pedir(ruta, **argumentos)
+            transcurrido = (time.perf_counter() - inicio) * 1000
+            transaction.set_rollback(True)
+        codigo = respuesta.status_code
+        if i:
+            latencias.append(transcurrido)
+            consultas.append(medidor.consultas)
+    rss_pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        'status': codigo,
+        'p50_ms': round(percentil(latencias, 50), 2),
+        'p95_ms': round(percentil(latencias, 95), 2),
+        'p99_ms': round(percentil(latencias, 99), 2),
+        'consultas': max(consultas),
+        'rss_pico_mb': round(rss_pico / 1024, 1),
+        'rss_incremento_mb': round((rss_pico - rss_inicial) / 1024, 1),
+    }
+
+
+def medir_en_hijo(ruta, metodo, argumentos, repeticiones):
+    """Aísla cada ruta en un ``fork`` para que el RSS pico sea solo suyo."""
+    connections.close_all()
+    lectura, escritura = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(lectura)
+        try:
+            resultado = _medir(ruta, metodo, argumentos, repeticiones)
+        except Exception as exc:  # noqa: BLE001 - se reporta junto con la ruta
+            resultado = {'error': f'{type(exc).__name__}: {exc}'}
+        with os.fdopen(escritura, 'w') as salida:
+            json.dump(resultado, salida)
+        os._exit(0)
+    os.close(escritura)
+    with os.fdopen(lectura) as entrada:
+        datos = entrada.read()
+    os.waitpid(pid, 0)
+    return json.loads(datos)
+
+
+def _conteos():
+    return {
+        modelo._meta.db_table: modelo.objects.count()
+        for modelo in (Usuario, Curso, Pregunta, Inscripcion, TemaForo, RespuestaForo)
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(actual, referencia, tolerancia, margen_ms):
+    """
+    Rutas con más consultas que en la referencia o con un p95 más de ``tolerancia``
+    (fracción) y más de ``margen_ms`` por encima; el margen evita marcar el ruido
+    de las rutas de pocos milisegundos.
+    """
+    previas = {(fila['ruta'], fila['metodo']): fila for fila in referencia['rutas']}
+    regresiones = []
+    for fila in actual['rutas']:
+        previa = previas.get((fila['ruta'], fila['metodo']))
+        if not previa or 'error' in fila or 'error' in previa:
+            continue
+        motivos = []
+        aumento = fila['p95_ms'] - previa['p95_ms']
+        if fila['p95_ms'] > previa['p95_ms'] * (1 + tolerancia) and aumento > margen_ms:
+            motivos.append(f"p95 {previa['p95_ms']} -> {fila['p95_ms']} ms")
+        if fila['consultas'] > previa['consultas']:
+            motivos.append(f"consultas {previa['consultas']} -> {fila['consultas']}")
+        if motivos:
+            regresiones.append({'ruta': fila['ruta'], 'metodo': fila['metodo'], 'motivos': motivos})
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeticiones', type=int, default=20)
+    parser.add_argument('--filtro', help='Solo rutas cuyo nombre contenga este texto')
+    parser.add_argument('--salida', help='Archivo JSON de resultados (por defecto, a stdout)')
+    parser.add_argument('--comparar', help='JSON de una corrida anterior para detectar regresiones')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='Aumento de p95 tolerado (0.2 = 20%%)')
+    parser.add_argument('--margen-ms', type=float, default=5, help='Aumento absoluto de p95 que se ignora')
+    args = parser.parse_args()
+
+    _preparar_entorno()
+    m = muestras()
+    tabla = escenarios(m)
+    resultados = []
+    for nombre, metodo, parametros in rutas():
+        if args.filtro and args.filtro not in nombre:
+            continue
+        extra = tabla.get((nombre, metodo), {})
+        peticion = preparar_peticion(nombre, metodo, parametros, m, extra)
+        if peticion is None:
+            print(f'OMITIDA {metodo.upper():<6} {nombre}: no hay muestra para el pk (ver PK_POR_PREFIJO)', file=sys.stderr)
+            continue
+        ruta, argumentos = peticion
+        fila = {'ruta': nombre, 'metodo': metodo.upper(), 'url': ruta}
+        fila.update(medir_en_hijo(ruta, metodo, argumentos, args.repeticiones))
+        resultados.append(fila)
+        print(
+            f"{fila['metodo']:<6} {nombre:<32} {fila.get('status', '-'):>4} "
+            f"p50={fila.get('p50_ms', '-')} p95={fila.get('p95_ms', '-')} consultas={fila.get('consultas', '-')}",
+            file=sys.stderr,
+        )
+
+    reporte = {
+        'commit': _commit(),
+        'fecha': timezone.now().isoformat(),
+        'motor': connection.vendor,
+        'repeticiones': args.repeticiones,
+        'datos': _conteos(),
+        'rutas': resultados,
+    }
+    if args.comparar:
+        reporte['regresiones'] = comparar(
+            reporte, json.loads(Path(args.comparar).read_text()), args.tolerancia, args.margen_ms
+        )
+    texto = json.dumps(reporte, indent=2, ensure_ascii=False)
+    if args.salida:
+        Path(args.salida).write_text(texto)
+    else:
+        print(texto)
+    if reporte.get('regresiones'):
+        for regresion in reporte['regresiones']:
+            print(f"REGRESION {regresion['metodo']} {regresion['ruta']}: {', '.join(regresion['motivos'])}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     Curso, Modulo, Recurso, Pregunta, 
-    Inscripcion, ProgresoRecurso, Examen, 
+    Inscripcion, ProgresoRecurso, Examen, PreguntaExamen,
     IntentoExamen, RespuestaEstudiante,
     Logro, LogroEstudiante, ActividadEstudiante,
     TemaForo, RespuestaForo, VotoRespuesta,
@@ -55,10 +55,17 @@ class ProgresoRecursoAdmin(admin.ModelAdmin):
     list_filter = ['completado']
 
 
+class PreguntaExamenInline(admin.TabularInline):
+    model = PreguntaExamen
+    raw_id_fields = ['pregunta']
+    extra = 0
+
+
 @admin.register(Examen)
 class ExamenAdmin(admin.ModelAdmin):
     list_display = ['titulo', 'curso', 'tipo', 'duracion_minutos', 'numero_preguntas', 'activo']
     list_filter = ['tipo', 'activo', 'curso']
+    inlines = [PreguntaExamenInline]
 
 
 @admin.register(IntentoExamen)
@@ -0,0 +1,143 @@
+"""
+Almacenamiento por contenido de los archivos subidos (``RecursoComunidad`` y
+``FormularioEstudio``).
+
+Los estudiantes suben una y otra vez los mismos PDF de formularios y cada copia
+quedaba como un archivo nuevo. ``AlmacenamientoPorContenido`` guarda cada
+contenido una sola vez en ``blobs/<sha[:2]>/<sha>/<nombre>`` y lleva en
+``BlobArchivo`` cuántos ``FileField`` apuntan a él:
+
+- ``_save`` calcula el SHA-256 (o reutiliza el que ya calculó el modelo en
+  ``content.sha256``). Si el contenido ya existe solo suma una referencia y
+  regresa el nombre existente: la subida termina sin escribir nada.
+- ``delete`` resta una referencia y borra el archivo (al confirmar la
+  transacción) cuando ya nadie lo usa. Los modelos la llaman al borrar la fila
+  o al reemplazar el archivo (ver ``cursos/signals.py`` y ``models.py``).
+
+El nombre guardado conserva el nombre con el que se subió la primera copia, que
+es el que ve quien descarga. ``deduplicar_archivos`` pasa al almacén los
+archivos que ya estaban en ``MEDIA_ROOT``.
+"""
+import hashlib
+import os
+
+from django.apps import apps
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, models, transaction
+
+
+PREFIJO = 'blobs'
+
+
+def calcular_sha256(content):
+    """SHA-256 de un ``File`` abierto; lo deja al inicio."""
+    sha = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for bloque in content.chunks():
+        sha.update(bloque)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return sha.hexdigest()
+
+
+# max_length de los FileField que usan este almacenamiento
+LONGITUD_NOMBRE = 255
+
+
+def nombre_blob(sha256, nombre):
+    directorio = f'{PREFIJO}/{sha256[:2]}/{sha256}/'
+    base, extension = os.path.splitext(os.path.basename(nombre))
+    base = base[:LONGITUD_NOMBRE - len(directorio) - len(extension)] or 'archivo'
+    return f'{directorio}{base}{extension}'
+
+
+class AlmacenamientoPorContenido(FileSystemStorage):
+    """``FileSystemStorage`` que guarda cada contenido una vez y cuenta sus referencias."""
+
+    def _blobs(self):
+        return apps.get_model('cursos', 'BlobArchivo').objects
+
+    def referenciar(self, sha256, nombre, tamano):
+        """Suma una referencia al blob ``sha256`` (lo registra si es nuevo)."""
+        if not self._blobs().filter(sha256=sha256).update(referencias=models.F('referencias') + 1):
+            self._crear(sha256, nombre, tamano)
+
+    def _crear(self, sha256, nombre, tamano):
+        blobs = self._blobs()
+        try:
+            with transaction.atomic():
+                blobs.create(sha256=sha256, nombre=nombre, tamano=tamano, referencias=1)
+        except IntegrityError:
+            # Otra petición lo registró al mismo tiempo
+            blobs.filter(sha256=sha256).update(referencias=models.F('referencias') + 1)
+
+    def _vigente(self, blob, tamano):
+        """``True`` si el archivo del blob sigue en disco completo."""
+        return self.exists(blob.nombre) and self.size(blob.nombre) == tamano
+
+    def _registrar(self, blob, sha256, nombre, tamano):
+        if blob is None:
+            # Ya se consultó y no existía: se crea sin intentar antes el UPDATE
+            self._crear(sha256, nombre, tamano)
+        else:
+            # El registro apuntaba a un archivo que ya no está: se reemplaza
+            self._blobs().filter(sha256=sha256).update(nombre=nombre, tamano=tamano, referencias=1)
+
+    def _save(self, name, content):
+        sha256 = getattr(content, 'sha256', None) or calcular_sha256(content)
+        blob = self._blobs().filter(sha256=sha256).first()
+        if blob is not None and self._vigente(blob, content.size):
+            self.referenciar(sha256, blob.nombre, blob.tamano)
+            return blob.nombre
+        nombre = super()._save(nombre_blob(sha256, name), content)
+        self._registrar(blob, sha256, nombre, content.size)
+        return nombre
+
+    def delete(self, name):
+        if not name:
+            return
+        blobs = self._blobs()
+        if not name.startswith(f'{PREFIJO}/'):
+            # Archivo anterior al almacén: no tiene otras referencias
+            transaction.on_commit(lambda: super(AlmacenamientoPorContenido, self).delete(name))
+            return
+        blobs.filter(nombre=name).update(referencias=models.F('referencias') - 1)
+        if blobs.filter(nombre=name, referencias__gt=0).exists():
+            return
+        blobs.filter(nombre=name).delete()
+        transaction.on_commit(lambda: self._borrar_si_sin_referencias(name))
+
+    def _borrar_si_sin_referencias(self, name):
+        # Una subida pudo volver a usarlo entre el borrado y el commit
+        if not self._blobs().filter(nombre=name).exists():
+            super().delete(name)
+
+    def importar(self, name):
+        """
+        Pasa un archivo que ya estaba en ``MEDIA_ROOT`` al almacén y le suma una
+        referencia. Regresa ``(nombre nuevo, sha256, bytes liberados)``: si su
+        contenido ya estaba, el archivo se borra; si no, se mueve sin copiarlo.
+        """
+        tamano = self.size(name)
+        with self.open(name) as archivo:
+            sha256 = calcular_sha256(archivo)
+        blob = self._blobs().filter(sha256=sha256).first()
+        if blob is not None and self._vigente(blob, tamano):
+            self.referenciar(sha256, blob.nombre, blob.tamano)
+            os.remove(self.path(name))
+            return blob.nombre, sha256, tamano
+        nombre = nombre_blob(sha256, name)
+        os.makedirs(os.path.dirname(self.path(nombre)), exist_ok=True)
+        file_move_safe(self.path(name), self.path(nombre), allow_overwrite=True)
+        self._registrar(blob, sha256, nombre, tamano)
+        return nombre, sha256, 0
+
+
+almacenamiento = AlmacenamientoPorContenido()
+
+
+def almacenamiento_archivos():
+    """Storage de los ``FileField`` de archivos subidos (callable para no fijarlo en las migraciones)."""
+    return almacenamiento
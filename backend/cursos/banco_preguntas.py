@@ -0,0 +1,214 @@
+"""
+Banco de preguntas por curso y dificultad.
+
+- Preguntas de la base: por curso se guarda en caché la lista de ids agrupada por
+  ``Pregunta.dificultad_normalizada`` (columna indexada). Las señales de
+  ``Pregunta`` invalidan la entrada del curso; quien cree preguntas con
+  ``bulk_create`` debe llamar ``invalidar`` explícitamente.
+- Alta en bloque: ``obtener_o_crear`` reutiliza preguntas de contenido idéntico
+  (``Pregunta.hash_contenido``) y crea el resto con un solo ``bulk_create``; las
+  repetidas dentro de un mismo examen quedan como filas distintas.
+- Preguntas por defecto: se agrupan por título normalizado y dificultad una sola
+  vez, al importar el módulo.
+"""
+import unicodedata
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from estudiapro import metricas
+
+from .models import Pregunta, normalizar_dificultad
+
+
+DIFICULTADES = ('FACIL', 'MEDIA', 'DIFICIL')
+
+# Banco de preguntas por defecto por curso y dificultad (centralizado en backend)
+_BANCOS_DATOS = {
+    'calculo diferencial': [
+        {
+            'text': 'Calcula la derivada de f(x)=3x^4-5x^2+2',
+            'options': ['12x^3-10x', '12x^3-5x', '3x^3-10x', '3x^4-10x'],
+            'answer': 'A',
+            'difficulty': 'FACIL',
+            'explanation': 'Deriva cada término y agrupa.'
+        },
+        {
+            'text': 'Evalúa el límite lim_{x→0} (sin(3x))/x',
+            'options': ['1', '2', '3', '0'],
+            'answer': 'C',
+            'difficulty': 'MEDIA',
+            'explanation': 'Usa sin(kx)/(x)=k cuando x→0.'
+        },
+        {
+            'text': 'Encuentra la pendiente de la tangente a f(x)=e^{x} en x=0',
+            'options': ['0', '1', 'e', '2'],
+            'answer': 'B',
+            'difficulty': 'MEDIA',
+            'explanation': "f'(x)=e^{x}; en x=0 es 1."
+        },
+        {
+            'text': 'Aplica la regla de L’Hôpital al límite lim_{x→0} (ln(1+x))/x',
+            'options': ['0', '1', 'e', 'No existe'],
+            'answer': 'B',
+            'difficulty': 'DIFICIL',
+            'explanation': 'Deriva numerador y denominador; queda 1.'
+        },
+        {
+            'text': 'Determina la derivada de y=ln(x^2+1)',
+            'options': ['2x/(x^2+1)', '1/(x^2+1)', '2/(x^2+1)', 'x/(x^2+1)'],
+            'answer': 'A',
+            'difficulty': 'FACIL',
+            'explanation': 'Cadena: (1/(x^2+1))*2x.'
+        }
+    ],
+    'calculo integral': [
+        {
+            'text': 'Evalúa la integral definida ∫_0^1 2x dx',
+            'options': ['1', '2', '0', '3'],
+            'answer': 'A',
+            'difficulty': 'FACIL',
+            'explanation': 'x^2 de 0 a 1 es 1.'
+        },
+        {
+            'text': 'Resuelve ∫ e^{3x} dx',
+            'options': ['(1/3)e^{3x}+C', '3e^{3x}+C', 'e^{3x}+C', '(1/9)e^{3x}+C'],
+            'answer': 'A',
+            'difficulty': 'MEDIA',
+            'explanation': 'Divide por la derivada interna (3).'
+        },
+        {
+            'text': 'Calcula el área bajo y = x^2 de 0 a 2',
+            'options': ['4/3', '8/3', '2', '16/3'],
+            'answer': 'B',
+            'difficulty': 'MEDIA',
+            'explanation': '∫_0^2 x^2 dx = [x^3/3]_0^2 = 8/3.'
+        },
+        {
+            'text': 'Usa integración por partes para ∫ x·e^{x} dx',
+            'options': ['x e^{x}-e^{x}+C', 'e^{x}-x e^{x}+C', 'x e^{x}+C', 'e^{x}+C'],
+            'answer': 'A',
+            'difficulty': 'DIFICIL',
+            'explanation': 'u=x, dv=e^{x}dx → u\'=1, v=e^{x}.'
+        },
+        {
+            'text': 'Aplica sustitución a ∫ (2x)/(x^2+1) dx',
+            'options': ['ln(x^2+1)+C', '(1/2)ln(x^2+1)+C', 'arctan(x)+C', 'x/(x^2+1)+C'],
+            'answer': 'A',
+            'difficulty': 'FACIL',
+            'explanation': 'u=x^2+1, du=2x dx.'
+        }
+    ]
+}
+
+
+@lru_cache(maxsize=1024)
+def normalizar_titulo(titulo):
+    """'Cálculo Integral' -> 'calculo integral' (llave de los bancos por defecto)."""
+    return unicodedata.normalize('NFD', titulo or '').encode('ascii', 'ignore').decode('ascii').lower()
+
+
+def _agrupar(preguntas):
+    """``{dificultad: [(posición en el banco, pregunta)]}``."""
+    grupos = {}
+    for indice, pregunta in enumerate(preguntas):
+        grupos.setdefault(normalizar_dificultad(pregunta.get('difficulty')), []).append((indice, pregunta))
+    return grupos
+
+
+BANCOS_POR_DEFECTO = {titulo: tuple(preguntas) for titulo, preguntas in _BANCOS_DATOS.items()}
+_BANCOS_POR_DIFICULTAD = {titulo: _agrupar(preguntas) for titulo, preguntas in _BANCOS_DATOS.items()}
+
+
+def preguntas_por_defecto(titulo_curso, dificultad=None):
+    """Preguntas por defecto del curso; solo las de ``dificultad`` si se indica."""
+    if dificultad is None:
+        return list(BANCOS_POR_DEFECTO.get(normalizar_titulo(titulo_curso), ()))
+    return [pregunta for _, pregunta in preguntas_por_defecto_enumeradas(titulo_curso, dificultad)]
+
+
+def preguntas_por_defecto_enumeradas(titulo_curso, dificultad):
+    """Pares ``(posición en el banco completo, pregunta)`` de una dificultad."""
+    return list(_BANCOS_POR_DIFICULTAD.get(normalizar_titulo(titulo_curso), {}).get(dificultad, ()))
+
+
+def _llave(curso_id):
+    return f'banco_preguntas:{curso_id}'
+
+
+def ids_por_dificultad(curso_id):
+    """``{dificultad: [ids en orden]}`` de las preguntas del curso, desde caché."""
+    ids = cache.get(_llave(curso_id))
+    metricas.consulta_cache('banco_preguntas', ids is not None)
+    if ids is None:
+        ids = {}
+        filas = (
+            Pregunta.objects.filter(modulo__curso_id=curso_id)
+            .order_by('id')
+            .values_list('id', 'dificultad_normalizada')
+        )
+        for pregunta_id, dificultad in filas:
+            ids.setdefault(dificultad, []).append(pregunta_id)
+        cache.set(_llave(curso_id), ids, settings.BANCO_PREGUNTAS_TTL)
+    return ids
+
+
+def preguntas_por_dificultad(curso_id, limite=None, dificultades=DIFICULTADES):
+    """
+    ``{dificultad: [Pregunta]}`` con a lo sumo ``limite`` preguntas por dificultad,
+    cargadas en una sola consulta.
+    """
+    ids = ids_por_dificultad(curso_id)
+    seleccion = {codigo: ids.get(codigo, [])[:limite] for codigo in dificultades}
+    todas = [pregunta_id for grupo in seleccion.values() for pregunta_id in grupo]
+    preguntas = Pregunta.objects.in_bulk(todas) if todas else {}
+    return {
+        codigo: [preguntas[pregunta_id] for pregunta_id in grupo if pregunta_id in preguntas]
+        for codigo, grupo in seleccion.items()
+    }
+
+
+def invalidar(curso_id):
+    if curso_id:
+        cache.delete(_llave(curso_id))
+
+
+def obtener_o_crear(modulo, preguntas):
+    """
+    Recibe instancias ``Pregunta`` sin guardar y regresa, en el mismo orden, sus
+    equivalentes guardadas en ``modulo``: las de contenido idéntico a una existente
+    se reutilizan y el resto se crea en un solo ``bulk_create``.
+
+    Las repetidas dentro de la lista (p. ej. el relleno de un simulador) siguen
+    siendo filas distintas: la n-ésima copia reutiliza la n-ésima existente con
+    ese contenido, así que un examen nunca presenta dos veces la misma pregunta.
+    """
+    for pregunta in preguntas:
+        pregunta.modulo = modulo
+        pregunta.hash_contenido = pregunta.calcular_hash_contenido()
+
+    existentes = {}
+    for pregunta in Pregunta.objects.filter(
+        modulo=modulo,
+        hash_contenido__in={pregunta.hash_contenido for pregunta in preguntas}
+    ).order_by('id'):
+        existentes.setdefault(pregunta.hash_contenido, []).append(pregunta)
+
+    guardadas, nuevas, copias = [], [], {}
+    for pregunta in preguntas:
+        copia = copias.get(pregunta.hash_contenido, 0)
+        copias[pregunta.hash_contenido] = copia + 1
+        mismas = existentes.get(pregunta.hash_contenido, [])
+        if copia < len(mismas):
+            guardadas.append(mismas[copia])
+        else:
+            guardadas.append(pregunta)
+            nuevas.append(pregunta)
+    if nuevas:
+        Pregunta.objects.bulk_create(nuevas)
+        # bulk_create no dispara señales
+        curso_id = modulo.curso_id
+        transaction.on_commit(lambda: invalidar(curso_id))
+    return guardadas
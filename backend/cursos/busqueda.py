@@ -0,0 +1,257 @@
+"""
+Búsqueda full-text de cursos, recursos de comunidad y temas del foro.
+
+Cada objeto indexable tiene un ``DocumentoBusqueda`` con su texto normalizado
+(minúsculas y sin acentos), mantenido por señales en ``cursos/signals.py``. El
+backend (``settings.BUSQUEDA_BACKEND``) decide cómo consultarlo:
+
+- ``BusquedaPostgres``: ``SearchVector``/``SearchRank`` con índice GIN.
+- ``BusquedaSQLite``: tabla virtual FTS5 ``busqueda_fts`` con ``bm25``.
+- ``BusquedaSimple``: ``icontains`` sobre el texto normalizado (respaldo).
+
+Los índices específicos de cada motor se crean en la migración 0012. Los
+filtros del queryset de quien busca llegan al motor como subconsulta de ids,
+así que ``BUSQUEDA_LIMITE`` se aplica después de filtrar.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, models
+from django.utils.module_loading import import_string
+
+from .models import Curso, DocumentoBusqueda, RecursoComunidad, TemaForo
+
+
+FTS_TABLE = 'busqueda_fts'
+
+# modelo -> (tipo, campos indexados, función que arma (titulo, contenido))
+INDEXABLES = {
+    Curso: (
+        'CURSO',
+        {'titulo', 'descripcion', 'profesor'},
+        lambda obj: (obj.titulo, f"{obj.descripcion} {obj.profesor}"),
+    ),
+    RecursoComunidad: (
+        'RECURSO_COMUNIDAD',
+        {'titulo', 'descripcion'},
+        lambda obj: (obj.titulo, obj.descripcion),
+    ),
+    TemaForo: (
+        'TEMA_FORO',
+        {'titulo', 'contenido'},
+        lambda obj: (obj.titulo, obj.contenido),
+    ),
+}
+
+
+def normalizar_texto(texto):
+    """Minúsculas y sin acentos: 'Cálculo' -> 'calculo'."""
+    return unicodedata.normalize('NFD', texto or '').encode('ascii', 'ignore').decode('ascii').lower()
+
+
+def terminos(consulta):
+    """Palabras alfanuméricas de la consulta, ya normalizadas."""
+    return re.findall(r'[a-z0-9]+', normalizar_texto(consulta))
+
+
+class BusquedaSimple:
+    """
+    Respaldo sin índice full-text: icontains sobre el texto normalizado.
+
+    ``buscar`` de cada motor regresa ``[(objeto_id, rank)]`` de mayor a menor
+    relevancia; ``ids`` (opcional) es un queryset ``values('pk')`` que limita
+    los objetos candidatos.
+    """
+
+    def documentos(self, tipo, ids=None):
+        documentos = DocumentoBusqueda.objects.filter(tipo=tipo)
+        if ids is not None:
+            documentos = documentos.filter(objeto_id__in=ids)
+        return documentos
+
+    def buscar(self, tipo, consulta, limite, ids=None):
+        palabras = terminos(consulta)
+        if not palabras:
+            return []
+        documentos = self.documentos(tipo, ids)
+        for palabra in palabras:
+            documentos = documentos.filter(
+                models.Q(titulo__contains=palabra) | models.Q(contenido__contains=palabra)
+            )
+        en_titulo = models.Q()
+        for palabra in palabras:
+            en_titulo &= models.Q(titulo__contains=palabra)
+        documentos = documentos.annotate(
+            rank=models.Case(
+                models.When(en_titulo, then=models.Value(2.0)),
+                default=models.Value(1.0),
+                output_field=models.FloatField(),
+            )
+        ).order_by('-rank', '-objeto_id')
+        return list(documentos.values_list('objeto_id', 'rank')[:limite])
+
+
+class BusquedaSQLite(BusquedaSimple):
+    """FTS5 con tokenizer unicode61 (remove_diacritics) y ranking bm25."""
+
+    # Alias con la tabla FTS confirmada; un "no" (p. ej. antes de migrar) se vuelve a consultar
+    _fts_confirmado = set()
+
+    @classmethod
+    def _fts_disponible(cls, alias):
+        if alias in cls._fts_confirmado:
+            return True
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            disponible = cursor.fetchone() is not None
+        if disponible:
+            cls._fts_confirmado.add(alias)
+        return disponible
+
+    def buscar(self, tipo, consulta, limite, ids=None):
+        palabras = terminos(consulta)
+        if not palabras:
+            return []
+        if connection.vendor != 'sqlite' or not self._fts_disponible(connection.alias):
+            return super().buscar(tipo, consulta, limite, ids)
+
+        # Cada término entre comillas y como prefijo: "calc"* "integ"*
+        match = ' '.join(f'"{palabra}"*' for palabra in palabras)
+        filtro, parametros = '', []
+        if ids is not None:
+            subconsulta, parametros = ids.query.sql_with_params()
+            filtro = f'AND d.objeto_id IN ({subconsulta}) '
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT d.objeto_id, bm25({FTS_TABLE}, 10.0, 1.0) AS rank "
+                f"FROM {FTS_TABLE} JOIN busqueda_documento d ON d.id = {FTS_TABLE}.rowid "
+                f"WHERE {FTS_TABLE} MATCH %s AND d.tipo = %s {filtro}"
+                "ORDER BY rank, d.objeto_id DESC LIMIT %s",
+                [match, tipo, *parametros, limite]
+            )
+            # bm25 es menor mientras más relevante; se invierte para que mayor = mejor
+            return [(objeto_id, -rank) for objeto_id, rank in cursor.fetchall()]
+
+
+class BusquedaPostgres(BusquedaSimple):
+    """tsvector 'spanish' con pesos A (título) / B (contenido) e índice GIN."""
+
+    def buscar(self, tipo, consulta, limite, ids=None):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        palabras = terminos(consulta)
+        if not palabras:
+            return []
+        if connection.vendor != 'postgresql':
+            return super().buscar(tipo, consulta, limite, ids)
+
+        # Debe coincidir con la expresión del índice GIN creado en la migración 0012
+        vector = (
+            SearchVector('titulo', config='spanish', weight='A')
+            + SearchVector('contenido', config='spanish', weight='B')
+        )
+        query = SearchQuery(
+            ' & '.join(f'{palabra}:*' for palabra in palabras),
+            config='spanish',
+            search_type='raw'
+        )
+        documentos = (
+            self.documentos(tipo, ids)
+            .annotate(documento=vector)
+            .filter(documento=query)
+            .annotate(rank=SearchRank(vector, query))
+            .order_by('-rank', '-objeto_id')
+        )
+        return list(documentos.values_list('objeto_id', 'rank')[:limite])
+
+
+@lru_cache(maxsize=None)
+def obtener_backend():
+    return import_string(settings.BUSQUEDA_BACKEND)()
+
+
+def indexar(instancia, update_fields=None):
+    """Crea o actualiza el documento de búsqueda de ``instancia``."""
+    tipo, campos, extraer = INDEXABLES[type(instancia)]
+    if update_fields is not None and not (set(update_fields) & campos):
+        return
+    titulo, contenido = extraer(instancia)
+    DocumentoBusqueda.objects.update_or_create(
+        tipo=tipo,
+        objeto_id=instancia.pk,
+        defaults={
+            'titulo': normalizar_texto(titulo),
+            'contenido': normalizar_texto(contenido),
+        }
+    )
+
+
+def desindexar(instancia):
+    tipo = INDEXABLES[type(instancia)][0]
+    DocumentoBusqueda.objects.filter(tipo=tipo, objeto_id=instancia.pk).delete()
+
+
+def reindexar(modelo):
+    """Reconstruye los documentos de un modelo completo. Retorna cuántos indexó."""
+    tipo, _, extraer = INDEXABLES[modelo]
+    DocumentoBusqueda.objects.filter(tipo=tipo).delete()
+    documentos = []
+    for instancia in modelo.objects.all().iterator():
+        titulo, contenido = extraer(instancia)
+        documentos.append(DocumentoBusqueda(
+            tipo=tipo,
+            objeto_id=instancia.pk,
+            titulo=normalizar_texto(titulo),
+            contenido=normalizar_texto(contenido),
+        ))
+    DocumentoBusqueda.objects.bulk_create(documentos, batch_size=500)
+    return len(documentos)
+
+
+def buscar(queryset, consulta, limite=None):
+    """
+    Objetos de ``queryset`` que coinciden con ``consulta``, ordenados por
+    relevancia. Los filtros, ``select_related`` y ``prefetch_related`` del
+    queryset se respetan; los filtros se aplican antes de cortar en ``limite``.
+    """
+    tipo = INDEXABLES[queryset.model][0]
+    ids = queryset.order_by().values('pk')
+    ranking = obtener_backend().buscar(tipo, consulta, limite or settings.BUSQUEDA_LIMITE, ids)
+    if not ranking:
+        return []
+    objetos = queryset.in_bulk([objeto_id for objeto_id, _ in ranking])
+    return [objetos[objeto_id] for objeto_id, _ in ranking if objeto_id in objetos]
+
+
+def paginar(request, resultados, serializar):
+    """
+    Paginación por número de página, opcional: solo aplica cuando la petición
+    trae ``page``. Sin ``page`` se regresa la lista completa, como antes, aunque
+    venga ``page_size`` (la misma regla que ``KeysetPagination`` con ``cursor``).
+    ``resultados`` puede ser la lista de ``buscar`` o un queryset (se cuenta y
+    se corta en la base).
+    """
+    if 'page' not in request.query_params:
+        return serializar(resultados)
+    try:
+        pagina = max(int(request.query_params.get('page') or 1), 1)
+    except (TypeError, ValueError):
+        pagina = 1
+    try:
+        por_pagina = int(request.query_params.get('page_size') or settings.BUSQUEDA_PAGE_SIZE)
+    except (TypeError, ValueError):
+        por_pagina = settings.BUSQUEDA_PAGE_SIZE
+    por_pagina = min(max(por_pagina, 1), 100)
+
+    inicio = (pagina - 1) * por_pagina
+    fin = inicio + por_pagina
+    total = resultados.count() if isinstance(resultados, models.QuerySet) else len(resultados)
+    return {
+        'count': total,
+        'page': pagina,
+        'page_size': por_pagina,
+        'next': pagina + 1 if fin < total else None,
+        'results': serializar(resultados[inicio:fin]),
+    }
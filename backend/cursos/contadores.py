@@ -0,0 +1,193 @@
+"""
+Contadores con buffer: descargas de recursos de la comunidad y vistas de temas
+del foro.
+
+Antes cada clic hacía ``INSERT`` + ``UPDATE ... F() + 1`` + ``refresh_from_db``
+sobre la misma fila, y los recursos populares se formaban detrás de su bloqueo.
+Ahora ``incrementar`` (al confirmar la transacción) acumula el incremento en el
+proceso y publica el delta pendiente en la caché compartida; ``volcar`` lo
+escribe en lote: un ``bulk_create`` de ``DescargaRecurso`` y un ``UPDATE`` por
+cada valor distinto de delta. El volcado ocurre cada ``CONTADORES_INTERVALO``
+segundos (un ``Timer`` por proceso), al juntar ``CONTADORES_MAX_PENDIENTES``
+incrementos y al terminar el proceso.
+
+Las lecturas (``valor`` y ``pendientes``) suman al valor de la base lo
+pendiente. Con ``CONTADORES_COMPARTIDOS`` el delta se publica en la caché y
+todos los workers ven el mismo total; eso requiere ``incr``/``decr`` atómicos
+entre procesos (Redis o Memcached). La caché por defecto (archivos) lee, suma y
+reescribe el archivo sin bloqueo, así que dos workers pueden pisarse el delta:
+con ella cada proceso solo suma lo suyo y los demás lo ven al volcar. El
+registro de eventos vive siempre en la memoria del proceso; si un worker muere
+sin volcar se pierden a lo más ``CONTADORES_INTERVALO`` segundos de conteos.
+``DescargaRecurso.fecha`` queda con la hora del volcado. Con
+``CONTADORES_INTERVALO=0`` cada incremento se escribe de inmediato.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, models, transaction
+
+from .models import DescargaRecurso, RecursoComunidad, TemaForo
+
+
+logger = logging.getLogger(__name__)
+
+# contador -> (modelo, campo)
+CONTADORES = {
+    'descargas': (RecursoComunidad, 'descargas'),
+    'vistas': (TemaForo, 'vistas'),
+}
+
+
+class Buffer:
+    """Incrementos y descargas de este proceso que aún no están en la base."""
+
+    def __init__(self):
+        self.candado = threading.Lock()
+        self.incrementos = Counter()
+        self.descargas = []
+        self.ultimo_volcado = time.monotonic()
+        self.timer = None
+
+    def tomar(self):
+        """Vacía el buffer y regresa ``(incrementos, descargas)``."""
+        with self.candado:
+            incrementos, descargas = self.incrementos, self.descargas
+            self.incrementos, self.descargas = Counter(), []
+            self.ultimo_volcado = time.monotonic()
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        return incrementos, descargas
+
+    def devolver(self, incrementos, descargas):
+        with self.candado:
+            self.incrementos.update(incrementos)
+            self.descargas[:0] = descargas
+
+
+_buffer = Buffer()
+_atexit_registrado = False
+
+
+def _llave(contador, objeto_id):
+    return f'contador:{contador}:{objeto_id}'
+
+
+def _ttl():
+    # Acota el desfase si un proceso muere con deltas publicados
+    return max(60, int(settings.CONTADORES_INTERVALO * 10))
+
+
+def incrementar(contador, objeto_id, descarga=None):
+    """Suma 1 a ``contador`` de ``objeto_id`` cuando se confirme la transacción actual."""
+    transaction.on_commit(lambda: _registrar(contador, objeto_id, descarga))
+
+
+def registrar_descarga(recurso, usuario):
+    """Cuenta la descarga de ``recurso`` y guarda su ``DescargaRecurso`` en el siguiente volcado."""
+    incrementar('descargas', recurso.pk, DescargaRecurso(recurso_id=recurso.pk, usuario_id=usuario.pk))
+
+
+def _registrar(contador, objeto_id, descarga):
+    if settings.CONTADORES_INTERVALO <= 0:
+        _escribir(Counter({(contador, objeto_id): 1}), [descarga] if descarga else [])
+        return
+
+    if settings.CONTADORES_COMPARTIDOS:
+        llave = _llave(contador, objeto_id)
+        cache.add(llave, 0, _ttl())
+        try:
+            cache.incr(llave)
+        except ValueError:
+            # Expiró entre add e incr: la lectura solo se atrasa hasta el volcado
+            pass
+
+    global _atexit_registrado
+    with _buffer.candado:
+        _buffer.incrementos[(contador, objeto_id)] += 1
+        if descarga is not None:
+            _buffer.descargas.append(descarga)
+        total = sum(_buffer.incrementos.values())
+        vencido = time.monotonic() - _buffer.ultimo_volcado >= settings.CONTADORES_INTERVALO
+        if not (vencido or total >= settings.CONTADORES_MAX_PENDIENTES) and _buffer.timer is None:
+            _buffer.timer = threading.Timer(settings.CONTADORES_INTERVALO, _volcar_en_hilo)
+            _buffer.timer.daemon = True
+            _buffer.timer.start()
+        if not _atexit_registrado:
+            atexit.register(volcar)
+            _atexit_registrado = True
+    if vencido or total >= settings.CONTADORES_MAX_PENDIENTES:
+        volcar()
+
+
+def _escribir(incrementos, descargas):
+    por_delta = {}
+    for (contador, objeto_id), delta in incrementos.items():
+        por_delta.setdefault((contador, delta), []).append(objeto_id)
+    with transaction.atomic():
+        if descargas:
+            DescargaRecurso.objects.bulk_create(descargas, batch_size=500)
+        for (contador, delta), objeto_ids in por_delta.items():
+            modelo, campo = CONTADORES[contador]
+            modelo.objects.filter(pk__in=objeto_ids).update(**{campo: models.F(campo) + delta})
+
+
+def volcar():
+    """Escribe en la base lo acumulado por este proceso. Regresa cuántos incrementos volcó."""
+    incrementos, descargas = _buffer.tomar()
+    if not incrementos:
+        return 0
+    try:
+        _escribir(incrementos, descargas)
+    except Exception:
+        _buffer.devolver(incrementos, descargas)
+        raise
+    if not settings.CONTADORES_COMPARTIDOS:
+        return sum(incrementos.values())
+    for (contador, objeto_id), delta in incrementos.items():
+        try:
+            cache.decr(_llave(contador, objeto_id), delta)
+        except ValueError:
+            pass
+    return sum(incrementos.values())
+
+
+def _volcar_en_hilo():
+    try:
+        volcar()
+    except Exception:
+        logger.exception('No se pudieron volcar los contadores; se reintenta en el siguiente volcado')
+    finally:
+        connections.close_all()
+
+
+def pendiente(contador, objeto_id):
+    """
+    Incrementos de ``objeto_id`` que todavía no llegan a la base: de todos los
+    procesos con ``CONTADORES_COMPARTIDOS``, si no solo de este.
+    """
+    return pendientes(contador, [objeto_id]).get(objeto_id, 0)
+
+
+def pendientes(contador, objeto_ids):
+    """``{objeto_id: pendiente}`` con una sola lectura de caché."""
+    if not settings.CONTADORES_COMPARTIDOS:
+        with _buffer.candado:
+            return {
+                objeto_id: _buffer.incrementos[(contador, objeto_id)]
+                for objeto_id in objeto_ids if (contador, objeto_id) in _buffer.incrementos
+            }
+    llaves = {_llave(contador, objeto_id): objeto_id for objeto_id in objeto_ids}
+    return {llaves[llave]: max(valor or 0, 0) for llave, valor in cache.get_many(list(llaves)).items()}
+
+
+def valor(objeto, contador):
+    """Valor de ``contador`` en ``objeto`` más lo pendiente de volcar."""
+    campo = CONTADORES[contador][1]
+    return getattr(objeto, campo) + pendiente(contador, objeto.pk)
@@ -0,0 +1,82 @@
+"""
+Conjuntos fijos de preguntas de los exámenes.
+
+Cada ``Examen`` guarda en ``PreguntaExamen`` las preguntas que presenta, en
+orden. ``generar_simulador`` escribe el conjunto al crear el examen; listar,
+iniciar y calificar leen siempre ese mismo conjunto.
+
+Los exámenes creados por otras vías (admin, datos demo) se congelan la primera
+vez que se inician o califican, con las mismas preguntas que ya mostraba el
+listado: las primeras ``numero_preguntas`` del curso por ``id``.
+"""
+from collections import defaultdict
+
+from django.db.models import Prefetch
+
+from .models import Pregunta, PreguntaExamen
+
+
+def _candidatas(curso_ids):
+    return Pregunta.objects.filter(modulo__curso_id__in=curso_ids).order_by('id')
+
+
+def _limite(examen):
+    return max(examen.numero_preguntas, 1)
+
+
+def con_preguntas(examenes):
+    """Agrega al queryset de exámenes el prefetch de su conjunto de preguntas."""
+    return examenes.prefetch_related(
+        Prefetch('preguntas_examen', queryset=PreguntaExamen.objects.select_related('pregunta'))
+    )
+
+
+def _crear_miembros(examen, preguntas):
+    # ignore_conflicts: dos peticiones pueden congelar el mismo examen a la vez
+    PreguntaExamen.objects.bulk_create([
+        PreguntaExamen(examen=examen, pregunta=pregunta, orden=orden)
+        for orden, pregunta in enumerate(preguntas)
+    ], ignore_conflicts=True)
+
+
+def fijar_preguntas(examen, preguntas):
+    """Reemplaza el conjunto de preguntas de ``examen`` por ``preguntas`` (en ese orden)."""
+    PreguntaExamen.objects.filter(examen=examen).delete()
+    _crear_miembros(examen, preguntas)
+
+
+def preguntas_de(examen):
+    """Preguntas de ``examen`` en orden; congela el conjunto si aún no existe."""
+    miembros = PreguntaExamen.objects.filter(examen=examen).select_related('pregunta')
+    preguntas = [miembro.pregunta for miembro in miembros]
+    if preguntas:
+        return preguntas
+
+    preguntas = list(_candidatas([examen.curso_id])[:_limite(examen)])
+    if preguntas:
+        _crear_miembros(examen, preguntas)
+    return preguntas
+
+
+def preguntas_por_examen(examenes):
+    """
+    ``{examen.id: [preguntas]}`` para exámenes obtenidos con ``con_preguntas``.
+    Los que aún no tienen conjunto se resuelven con una sola consulta adicional,
+    sin escribir nada.
+    """
+    resultado = {}
+    pendientes = []
+    for examen in examenes:
+        preguntas = [miembro.pregunta for miembro in examen.preguntas_examen.all()]
+        if preguntas:
+            resultado[examen.id] = preguntas
+        else:
+            pendientes.append(examen)
+
+    if pendientes:
+        por_curso = defaultdict(list)
+        for pregunta in _candidatas({examen.curso_id for examen in pendientes}).select_related('modulo'):
+            por_curso[pregunta.modulo.curso_id].append(pregunta)
+        for examen in pendientes:
+            resultado[examen.id] = por_curso[examen.curso_id][:_limite(examen)]
+    return resultado
@@ -0,0 +1,114 @@
+"""
+Pasa al almacén por contenido (``cursos/almacenamiento.py``) los archivos de
+recursos de la comunidad y formularios de estudio que se subieron antes de que
+existiera, y reporta el espacio recuperado.
+
+Cada archivo se mueve a ``blobs/<sha[:2]>/<sha>/`` (sin copiarlo) o, si su
+contenido ya estaba, se borra y la fila apunta al existente. Con ``--dry-run``
+solo calcula cuánto se recuperaría. ``--borrar-huerfanos`` borra además los
+archivos de ``recursos_comunidad/`` y ``formularios_estudio/`` que ninguna fila
+usa.
+"""
+import os
+
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+
+from cursos.almacenamiento import PREFIJO, almacenamiento, calcular_sha256
+from cursos.models import BlobArchivo, FormularioEstudio, RecursoComunidad
+
+
+MODELOS = (RecursoComunidad, FormularioEstudio)
+
+
+def _mb(tamano):
+    return f'{tamano / (1024 * 1024):.2f} MB'
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve los archivos subidos de MEDIA_ROOT al almacén deduplicado por SHA-256 '
+        'y reporta el espacio recuperado.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Solo reporta lo que se recuperaría')
+        parser.add_argument(
+            '--borrar-huerfanos', action='store_true',
+            help='Borra los archivos de las carpetas de subidas que ninguna fila usa',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        # nombre anterior -> (nombre nuevo, sha256); varias filas pueden compartir archivo
+        importados = {}
+        vistos = set(BlobArchivo.objects.values_list('sha256', flat=True))
+        archivos = duplicados = faltantes = liberados = 0
+
+        for modelo in MODELOS:
+            filas = (
+                modelo.objects.exclude(archivo='').exclude(archivo__isnull=True)
+                .exclude(archivo__startswith=f'{PREFIJO}/').values_list('pk', 'archivo')
+            )
+            for pk, nombre in filas.iterator():
+                if nombre in importados:
+                    nuevo, sha256 = importados[nombre]
+                    if not dry_run:
+                        with transaction.atomic():
+                            BlobArchivo.objects.filter(sha256=sha256).update(referencias=models.F('referencias') + 1)
+                            modelo.objects.filter(pk=pk).update(archivo=nuevo, hash_archivo=sha256)
+                    continue
+                if not almacenamiento.exists(nombre):
+                    faltantes += 1
+                    self.stderr.write(f'{modelo.__name__} {pk}: no existe {nombre}')
+                    continue
+
+                archivos += 1
+                if dry_run:
+                    with almacenamiento.open(nombre) as archivo:
+                        sha256 = calcular_sha256(archivo)
+                    if sha256 in vistos:
+                        duplicados += 1
+                        liberados += almacenamiento.size(nombre)
+                    vistos.add(sha256)
+                    importados[nombre] = (nombre, sha256)
+                    continue
+
+                with transaction.atomic():
+                    nuevo, sha256, bytes_liberados = almacenamiento.importar(nombre)
+                    modelo.objects.filter(pk=pk).update(archivo=nuevo, hash_archivo=sha256)
+                importados[nombre] = (nuevo, sha256)
+                if bytes_liberados:
+                    duplicados += 1
+                    liberados += bytes_liberados
+
+        huerfanos, bytes_huerfanos = self._huerfanos(borrar=options['borrar_huerfanos'] and not dry_run)
+
+        verbo = 'se recuperarían' if dry_run else 'recuperados'
+        self.stdout.write(f'{archivos} archivo(s) revisados, {duplicados} duplicado(s), {faltantes} faltante(s)')
+        if huerfanos:
+            accion = 'borrados' if options['borrar_huerfanos'] and not dry_run else 'sin borrar (--borrar-huerfanos)'
+            self.stdout.write(f'{huerfanos} archivo(s) huérfano(s), {_mb(bytes_huerfanos)} {accion}')
+        self.stdout.write(self.style.SUCCESS(f'{_mb(liberados)} {verbo} por deduplicación'))
+
+    def _huerfanos(self, borrar):
+        """Archivos de las carpetas de subida que ninguna fila referencia."""
+        usados = set()
+        for modelo in MODELOS:
+            usados.update(modelo.objects.exclude(archivo='').values_list('archivo', flat=True))
+        cantidad = tamano = 0
+        for modelo in MODELOS:
+            carpeta = modelo._meta.get_field('archivo').upload_to.rstrip('/')
+            if not almacenamiento.exists(carpeta):
+                continue
+            for raiz, _, nombres in os.walk(almacenamiento.path(carpeta)):
+                for nombre in nombres:
+                    ruta = os.path.join(raiz, nombre)
+                    relativo = os.path.relpath(ruta, almacenamiento.location).replace(os.sep, '/')
+                    if relativo in usados:
+                        continue
+                    cantidad += 1
+                    tamano += os.path.getsize(ruta)
+                    if borrar:
+                        os.remove(ruta)
+        return cantidad, tamano
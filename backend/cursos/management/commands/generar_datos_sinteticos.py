@@ -0,0 +1,333 @@
+"""
+Genera un conjunto de datos sintético para ``benchmarks/rutas.py``.
+
+La escala es el número de estudiantes (``1k``, ``10k`` o ``100k``); el resto se
+deriva de ahí (ver ``proporciones``). Todo se inserta con ``bulk_create`` por
+lotes, así que las señales no corren: los campos desnormalizados se llenan al
+construir los objetos (hash de preguntas, respuestas y última actividad de los
+temas, votos de cada respuesta) y al final se reconstruyen el índice de
+búsqueda y el progreso de las inscripciones.
+
+Los usuarios llevan el prefijo ``sint_`` y comparten la contraseña
+``sintetico``; ``--limpiar`` borra una corrida anterior.
+"""
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from cursos.busqueda import INDEXABLES, reindexar
+from cursos.models import (
+    Curso, Examen, Formulario, FormularioEstudio, Inscripcion, IntentoExamen, Logro, LogroEstudiante,
+    Modulo, Notificacion, Pregunta, PreguntaExamen, PreguntaFormulario, ProximaActividad, Recurso,
+    RecursoComunidad, RespuestaForo, TemaForo, TutorPerfil, Tutoria, VotoRespuesta,
+)
+from cursos.progreso import recalcular_curso
+from usuarios.models import Administrador, Creador, Estudiante, Usuario
+
+
+PREFIJO = 'sint_'
+CONTRASENA = 'sintetico'
+ESCALAS = {'1k': 1_000, '10k': 10_000, '100k': 100_000}
+LOTE = 2_000
+PALABRAS = (
+    'limite derivada integral matriz vector probabilidad grafo algoritmo termodinamica circuito '
+    'ecuacion serie funcion teorema demostracion ejercicio examen repaso formula cinematica'
+).split()
+
+
+def proporciones(estudiantes):
+    """Cantidades de cada modelo para ``estudiantes`` estudiantes."""
+    return {
+        'estudiantes': estudiantes,
+        'creadores': max(5, estudiantes // 100),
+        'cursos': max(10, estudiantes // 50),
+        'modulos_por_curso': 4,
+        'recursos_por_modulo': 3,
+        'preguntas_por_modulo': 8,
+        'examenes_por_curso': 2,
+        'preguntas_por_examen': 8,
+        'inscripciones_por_estudiante': 3,
+        'intentos_por_estudiante': 2,
+        'temas': max(20, estudiantes // 5),
+        'respuestas_por_tema': 4,
+        'votos_por_estudiante': 2,
+        'notificaciones_por_estudiante': 2,
+        'recursos_comunidad': max(10, estudiantes // 20),
+        'formularios': max(5, estudiantes // 1000),
+        'formularios_estudio': 20,
+        'tutorias': max(10, estudiantes // 10),
+        'logros': 8,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Genera estudiantes, cursos, preguntas, intentos y foro sintéticos para los benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escala', choices=list(ESCALAS), default='1k')
+        parser.add_argument('--semilla', type=int, default=12)
+        parser.add_argument('--limpiar', action='store_true', help='Borra antes los datos sintéticos existentes')
+
+    def handle(self, *args, **options):
+        if options['limpiar']:
+            self._limpiar()
+        elif Usuario.objects.filter(username__startswith=PREFIJO).exists():
+            raise CommandError('Ya hay datos sintéticos; usa --limpiar para regenerarlos')
+
+        self.rng = random.Random(options['semilla'])
+        self.ahora = timezone.now()
+        self.n = proporciones(ESCALAS[options['escala']])
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            self._generar()
+        self._paso('índice de búsqueda', lambda: sum(reindexar(modelo) for modelo in INDEXABLES))
+        self._paso('progreso', self._recalcular_progreso)
+        self.stdout.write(self.style.SUCCESS(
+            f"Escala {options['escala']} generada en {time.perf_counter() - inicio:.1f} s"
+        ))
+
+    def _recalcular_progreso(self):
+        for curso_id in self.cursos:
+            recalcular_curso(curso_id)
+        return len(self.cursos)
+
+    def _limpiar(self):
+        FormularioEstudio.objects.filter(creado_por__username__startswith=PREFIJO).delete()
+        Logro.objects.filter(nombre__startswith='Logro sintético').delete()
+        borrados, _ = Usuario.objects.filter(username__startswith=PREFIJO).delete()
+        self.stdout.write(f'Datos sintéticos anteriores borrados ({borrados} filas)')
+
+    def _paso(self, nombre, funcion):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        total = len(resultado) if isinstance(resultado, list) else resultado
+        self.stdout.write(f'{nombre}: {total} ({time.perf_counter() - inicio:.1f} s)')
+        return resultado
+
+    def _insertar(self, modelo, objetos):
+        """``bulk_create`` por lotes desde un iterable; regresa las pk en orden."""
+        pks = []
+        lote = []
+        for objeto in objetos:
+            lote.append(objeto)
+            if len(lote) >= LOTE:
+                pks.extend(obj.pk for obj in modelo.objects.bulk_create(lote))
+                lote = []
+        if lote:
+            pks.extend(obj.pk for obj in modelo.objects.bulk_create(lote))
+        return pks
+
+    def _texto(self, palabras):
+        return ' '.join(self.rng.choice(PALABRAS) for _ in range(palabras))
+
+    def _usuarios(self, rol, cantidad, etiqueta):
+        contrasena = make_password(CONTRASENA)
+        return self._insertar(Usuario, (
+            Usuario(
+                username=f'{PREFIJO}{etiqueta}_{i}', email=f'{PREFIJO}{etiqueta}_{i}@example.com',
+                password=contrasena, rol=rol, first_name=etiqueta.capitalize(), last_name=str(i),
+                puntos_gamificacion=self.rng.randint(0, 5000),
+            )
+            for i in range(cantidad)
+        ))
+
+    def _generar(self):
+        n, rng = self.n, self.rng
+
+        usuarios_estudiantes = self._paso(
+            'estudiantes', lambda: self._usuarios('ESTUDIANTE', n['estudiantes'], 'estudiante')
+        )
+        usuarios_creadores = self._usuarios('CREADOR', n['creadores'], 'creador')
+        usuario_admin = self._usuarios('ADMINISTRADOR', 1, 'admin')[0]
+        Administrador.objects.create(id_usuario_id=usuario_admin, permiso='TOTAL')
+        estudiantes = self._insertar(Estudiante, (
+            Estudiante(id_usuario_id=usuario, nivel_escolar='Universidad', tiempo_estudio_minutos=rng.randint(0, 3000))
+            for usuario in usuarios_estudiantes
+        ))
+        creadores = self._insertar(Creador, (
+            Creador(id_usuario_id=usuario, especialidad=self._texto(2)) for usuario in usuarios_creadores
+        ))
+        self._insertar(TutorPerfil, (
+            TutorPerfil(creador_id=creador, materias=self._texto(3), activo=True,
+                        tarifa_30_min=Decimal('150.00'), tarifa_60_min=Decimal('250.00'))
+            for creador in creadores
+        ))
+
+        categorias = [codigo for codigo, _ in Curso.CATEGORIAS]
+        niveles = [codigo for codigo, _ in Curso.NIVELES]
+        self.cursos = self._paso('cursos', lambda: self._insertar(Curso, (
+            Curso(
+                titulo=f'Curso {i} {self._texto(3)}', descripcion=self._texto(30), profesor=f'Profesor {i % 97}',
+                categoria=rng.choice(categorias), nivel=rng.choice(niveles), creador_id=rng.choice(creadores),
+                precio=Decimal(rng.choice((0, 99, 199, 299))), es_gratuito=i % 4 == 0,
+            )
+            for i in range(n['cursos'])
+        )))
+        modulos = self._insertar(Modulo, (
+            Modulo(curso_id=curso, titulo=f'Módulo {orden}', descripcion=self._texto(10), orden=orden)
+            for curso in self.cursos for orden in range(n['modulos_por_curso'])
+        ))
+        modulos_por_curso = {
+            curso: modulos[i * n['modulos_por_curso']:(i + 1) * n['modulos_por_curso']]
+            for i, curso in enumerate(self.cursos)
+        }
+        self._paso('recursos', lambda: self._insertar(Recurso, (
+            Recurso(modulo_id=modulo, titulo=f'Recurso {orden}', tipo=rng.choice(('VIDEO', 'PDF', 'LECTURA')),
+                    contenido_url='https://example.com/recurso', orden=orden, duracion_minutos=rng.randint(5, 60))
+            for modulo in modulos for orden in range(n['recursos_por_modulo'])
+        )))
+
+        def preguntas():
+            for modulo in modulos:
+                for i in range(n['preguntas_por_modulo']):
+                    pregunta = Pregunta(
+                        modulo_id=modulo, texto_pregunta=f'{i}: {self._texto(12)}?',
+                        opcion_a=self._texto(3), opcion_b=self._texto(3), opcion_c=self._texto(3), opcion_d=self._texto(3),
+                        respuesta_correcta=rng.choice('ABCD'), explicacion=self._texto(8),
+                        dificultad=rng.choice(('FACIL', 'MEDIA', 'DIFICIL')),
+                    )
+                    pregunta.hash_contenido = pregunta.calcular_hash_contenido()
+                    yield pregunta
+        lista_preguntas = self._paso('preguntas', lambda: self._insertar(Pregunta, preguntas()))
+        por_modulo = n['preguntas_por_modulo']
+        preguntas_por_modulo = {
+            modulo: lista_preguntas[i * por_modulo:(i + 1) * por_modulo] for i, modulo in enumerate(modulos)
+        }
+
+        examenes = self._insertar(Examen, (
+            Examen(curso_id=curso, modulo_id=modulos_por_curso[curso][0], titulo=f'Examen {i}', tipo='PRACTICA',
+                   duracion_minutos=30, numero_preguntas=n['preguntas_por_examen'])
+            for curso in self.cursos for i in range(n['examenes_por_curso'])
+        ))
+        examenes_por_curso = {
+            curso: examenes[i * n['examenes_por_curso']:(i + 1) * n['examenes_por_curso']]
+            for i, curso in enumerate(self.cursos)
+        }
+
+        def preguntas_examen():
+            for curso, ids in examenes_por_curso.items():
+                banco = [p for modulo in modulos_por_curso[curso] for p in preguntas_por_modulo[modulo]]
+                for examen in ids:
+                    for orden, pregunta in enumerate(rng.sample(banco, min(len(banco), n['preguntas_por_examen']))):
+                        yield PreguntaExamen(examen_id=examen, pregunta_id=pregunta, orden=orden)
+        self._insertar(PreguntaExamen, preguntas_examen())
+
+        cursos_por_estudiante = {
+            estudiante: rng.sample(self.cursos, n['inscripciones_por_estudiante']) for estudiante in estudiantes
+        }
+        self._paso('inscripciones', lambda: self._insertar(Inscripcion, (
+            Inscripcion(estudiante_id=estudiante, curso_id=curso)
+            for estudiante, cursos in cursos_por_estudiante.items() for curso in cursos
+        )))
+
+        def intentos():
+            for estudiante, cursos in cursos_por_estudiante.items():
+                for _ in range(n['intentos_por_estudiante']):
+                    puntaje = rng.randint(20, 100)
+                    yield IntentoExamen(
+                        estudiante_id=estudiante, examen_id=rng.choice(examenes_por_curso[rng.choice(cursos)]),
+                        fecha_fin=self.ahora - timedelta(minutes=rng.randint(1, 60 * 24 * 60)),
+                        puntaje_obtenido=puntaje, tiempo_usado=rng.randint(60, 1800),
+                        completado=True, aprobado=puntaje >= 70,
+                    )
+        self._paso('intentos', lambda: self._insertar(IntentoExamen, intentos()))
+
+        self._generar_foro(usuarios_estudiantes, usuarios_creadores)
+        self._generar_resto(estudiantes, usuarios_estudiantes, usuarios_creadores, creadores, modulos_por_curso)
+
+    def _generar_foro(self, usuarios_estudiantes, usuarios_creadores):
+        n, rng = self.n, self.rng
+        autores = usuarios_estudiantes + usuarios_creadores
+        total_respuestas = n['temas'] * n['respuestas_por_tema']
+        # Los votos se eligen antes para crear cada respuesta con su contador ya calculado
+        votos = {}
+        for usuario in usuarios_estudiantes:
+            for indice in rng.sample(range(total_respuestas), n['votos_por_estudiante']):
+                votos[(indice, usuario)] = 'UP' if rng.random() < 0.8 else 'DOWN'
+        saldo = [0] * total_respuestas
+        for (indice, _), tipo in votos.items():
+            saldo[indice] += 1 if tipo == 'UP' else -1
+
+        actividad = [self.ahora - timedelta(minutes=rng.randint(1, 60 * 24 * 90)) for _ in range(n['temas'])]
+        temas = self._paso('temas', lambda: self._insertar(TemaForo, (
+            TemaForo(
+                titulo=f'Tema {i}: {self._texto(5)}', contenido=self._texto(40),
+                categoria=rng.choice(('PREGUNTA', 'DISCUSION', 'AYUDA')), autor_id=rng.choice(autores),
+                curso_id=rng.choice(self.cursos), vistas=rng.randint(0, 500),
+                total_respuestas=n['respuestas_por_tema'], ultima_actividad=actividad[i],
+            )
+            for i in range(n['temas'])
+        )))
+        respuestas = self._paso('respuestas', lambda: self._insertar(RespuestaForo, (
+            RespuestaForo(tema_id=temas[i // n['respuestas_por_tema']], autor_id=rng.choice(autores),
+                          contenido=self._texto(25), votos=saldo[i])
+            for i in range(total_respuestas)
+        )))
+        self._paso('votos', lambda: self._insertar(VotoRespuesta, (
+            VotoRespuesta(respuesta_id=respuestas[indice], usuario_id=usuario, tipo=tipo)
+            for (indice, usuario), tipo in votos.items()
+        )))
+
+    def _generar_resto(self, estudiantes, usuarios_estudiantes, usuarios_creadores, creadores, modulos_por_curso):
+        n, rng = self.n, self.rng
+        self._insertar(Notificacion, (
+            Notificacion(usuario_id=usuario, titulo=self._texto(4), mensaje=self._texto(15),
+                         tipo=rng.choice(('info', 'success', 'alert')), leida=rng.random() < 0.5)
+            for usuario in usuarios_estudiantes for _ in range(n['notificaciones_por_estudiante'])
+        ))
+        self._insertar(ProximaActividad, (
+            ProximaActividad(estudiante_id=estudiante, curso_id=rng.choice(self.cursos), titulo=self._texto(4),
+                             tipo=rng.choice(('EXAMEN', 'TAREA', 'ESTUDIO')),
+                             fecha=(self.ahora + timedelta(days=rng.randint(1, 60))).date())
+            for estudiante in estudiantes
+        ))
+        self._insertar(Tutoria, (
+            Tutoria(estudiante_id=rng.choice(estudiantes), tutor_id=rng.choice(creadores),
+                    curso_id=rng.choice(self.cursos), tema=self._texto(4))
+            for _ in range(n['tutorias'])
+        ))
+
+        def recursos_comunidad():
+            for i in range(n['recursos_comunidad']):
+                curso = rng.choice(self.cursos)
+                yield RecursoComunidad(
+                    titulo=f'Recurso comunidad {i} {self._texto(3)}', descripcion=self._texto(20),
+                    tipo=rng.choice(('DOCUMENTO', 'VIDEO', 'ENLACE')), archivo_url='https://example.com/archivo',
+                    autor_id=rng.choice(usuarios_estudiantes + usuarios_creadores), curso_id=curso,
+                    modulo_id=rng.choice(modulos_por_curso[curso]), descargas=rng.randint(0, 200),
+                    aprobado=True,
+                )
+        self._insertar(RecursoComunidad, recursos_comunidad())
+
+        formularios = self._insertar(Formulario, (
+            Formulario(titulo=f'Encuesta {i}', descripcion=self._texto(10), tipo='ENCUESTA',
+                       curso_id=rng.choice(self.cursos), creador_id=rng.choice(usuarios_creadores))
+            for i in range(n['formularios'])
+        ))
+        self._insertar(PreguntaFormulario, (
+            PreguntaFormulario(formulario_id=formulario, texto_pregunta=self._texto(8), tipo=tipo,
+                               opciones=['A', 'B', 'C'] if tipo == 'OPCION_MULTIPLE' else None, orden=orden)
+            for formulario in formularios
+            for orden, tipo in enumerate(('ESCALA', 'OPCION_MULTIPLE', 'SI_NO', 'TEXTO_CORTO'))
+        ))
+        self._insertar(FormularioEstudio, (
+            FormularioEstudio(titulo=f'Formulario de estudio {i}', materia=self._texto(1),
+                              archivo_url='https://example.com/formulario.pdf', creado_por_id=usuarios_creadores[0])
+            for i in range(n['formularios_estudio'])
+        ))
+
+        logros = self._insertar(Logro, (
+            Logro(nombre=f'Logro sintético {i}', descripcion=self._texto(8), tipo='PUNTOS',
+                  condicion_valor=(i + 1) * 500, puntos_recompensa=50)
+            for i in range(n['logros'])
+        ))
+        self._insertar(LogroEstudiante, (
+            LogroEstudiante(estudiante_id=estudiante, logro_id=logro, desbloqueado=True, progreso_actual=100)
+            for estudiante in estudiantes for logro in rng.sample(logros, 2)
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from cursos import subidas
+
+
+class Command(BaseCommand):
+    help = (
+        'Borra las sesiones de subida por partes vencidas (SUBIDAS_TTL) y sus archivos temporales. '
+        'Pensado para ejecutarse periódicamente (cron).'
+    )
+
+    def handle(self, *args, **options):
+        borradas = subidas.limpiar()
+        self.stdout.write(self.style.SUCCESS(f'{borradas} subida(s) vencida(s) borrada(s)'))
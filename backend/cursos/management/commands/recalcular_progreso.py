@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from cursos.models import Curso
+from cursos.progreso import recalcular_curso
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye totales de cursos y contadores de progreso de las inscripciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--curso', type=int, help='ID de un curso específico')
+
+    def handle(self, *args, **options):
+        cursos = Curso.objects.all()
+        if options.get('curso'):
+            cursos = cursos.filter(id=options['curso'])
+
+        total = 0
+        for curso_id in cursos.values_list('id', flat=True):
+            recalcular_curso(curso_id)
+            total += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Progreso recalculado para {total} curso(s)'))
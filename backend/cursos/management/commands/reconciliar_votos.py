@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
+from cursos.models import RespuestaForo, VotoRespuesta
+
+
+def votos_reales():
+    """
+    Votos de cada respuesta según ``VotoRespuesta`` (UP - DOWN), como subconsulta
+    correlacionada: al usarla en un ``UPDATE`` se evalúa dentro de esa misma
+    sentencia y cuenta los votos confirmados hasta ese momento.
+    """
+    return Coalesce(
+        models.Subquery(
+            VotoRespuesta.objects.filter(respuesta=models.OuterRef('pk')).order_by().values('respuesta').annotate(
+                total=models.Sum(models.Case(
+                    models.When(tipo='UP', then=1), models.When(tipo='DOWN', then=-1), default=0,
+                ))
+            ).values('total')
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula RespuestaForo.votos a partir de VotoRespuesta y corrige las diferencias. '
+        'Pensado para ejecutarse periódicamente (cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Solo reporta las diferencias')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            desfasadas = list(
+                RespuestaForo.objects.annotate(votos_reales=votos_reales())
+                .exclude(votos=models.F('votos_reales')).only('id', 'votos')
+            )
+            for respuesta in desfasadas:
+                self.stdout.write(
+                    f'Respuesta {respuesta.id}: {respuesta.votos} -> {respuesta.votos_reales}'
+                )
+
+            if desfasadas and not options['dry_run']:
+                # El valor se recalcula en el UPDATE y no se copia de la lectura de
+                # arriba: un voto de votar_respuesta confirmado entre ambas no se pierde
+                RespuestaForo.objects.filter(pk__in=[respuesta.pk for respuesta in desfasadas]).update(
+                    votos=votos_reales()
+                )
+
+        accion = 'detectadas' if options['dry_run'] else 'corregidas'
+        self.stdout.write(self.style.SUCCESS(f'{len(desfasadas)} respuesta(s) {accion}'))
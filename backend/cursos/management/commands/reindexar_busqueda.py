@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from cursos.busqueda import INDEXABLES, reindexar
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de cursos, recursos de comunidad y temas del foro'
+
+    def handle(self, *args, **kwargs):
+        for modelo in INDEXABLES:
+            total = reindexar(modelo)
+            self.stdout.write(f'{modelo._meta.verbose_name_plural}: {total} documentos')
+
+        self.stdout.write(self.style.SUCCESS('Índice de búsqueda reconstruido'))
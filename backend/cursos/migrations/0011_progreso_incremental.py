@@ -0,0 +1,76 @@
+from django.db import migrations, models
+
+
+def poblar_contadores(apps, schema_editor):
+    Curso = apps.get_model('cursos', 'Curso')
+    Recurso = apps.get_model('cursos', 'Recurso')
+    Examen = apps.get_model('cursos', 'Examen')
+    Inscripcion = apps.get_model('cursos', 'Inscripcion')
+    ProgresoRecurso = apps.get_model('cursos', 'ProgresoRecurso')
+    IntentoExamen = apps.get_model('cursos', 'IntentoExamen')
+
+    totales = {}
+    for curso in Curso.objects.all():
+        curso.total_recursos = Recurso.objects.filter(modulo__curso=curso).count()
+        curso.total_examenes = Examen.objects.filter(curso=curso, activo=True).count()
+        curso.save(update_fields=['total_recursos', 'total_examenes'])
+        totales[curso.id] = (curso.total_recursos, curso.total_examenes)
+
+    for inscripcion in Inscripcion.objects.all():
+        inscripcion.recursos_completados = ProgresoRecurso.objects.filter(
+            inscripcion=inscripcion, completado=True
+        ).values('recurso_id').distinct().count()
+        inscripcion.examenes_aprobados = IntentoExamen.objects.filter(
+            estudiante_id=inscripcion.estudiante_id,
+            examen__curso_id=inscripcion.curso_id,
+            examen__activo=True,
+            completado=True,
+            puntaje_obtenido__gte=models.F('examen__puntaje_minimo_aprobacion')
+        ).values('examen_id').distinct().count()
+        total_recursos, total_examenes = totales.get(inscripcion.curso_id, (0, 0))
+        recursos = min(inscripcion.recursos_completados, total_recursos)
+        examenes = min(inscripcion.examenes_aprobados, total_examenes)
+        if total_recursos and total_examenes:
+            porcentaje = recursos / total_recursos * 60 + examenes / total_examenes * 40
+        elif total_recursos:
+            porcentaje = recursos / total_recursos * 100
+        elif total_examenes:
+            porcentaje = examenes / total_examenes * 100
+        else:
+            porcentaje = 0
+        inscripcion.progreso_porcentaje = round(porcentaje, 2)
+        inscripcion.completado = porcentaje >= 100
+        inscripcion.save(update_fields=[
+            'recursos_completados', 'examenes_aprobados', 'progreso_porcentaje', 'completado'
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cursos', '0010_curso_profesor_escuela'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='curso',
+            name='total_examenes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='curso',
+            name='total_recursos',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='inscripcion',
+            name='examenes_aprobados',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='inscripcion',
+            name='recursos_completados',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(poblar_contadores, migrations.RunPython.noop),
+    ]
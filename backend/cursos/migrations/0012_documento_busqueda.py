@@ -0,0 +1,112 @@
+# Generated by Django 4.2.30 on 2026-10-17 22:11
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+FTS_SQLITE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS busqueda_fts USING fts5("
+    "titulo, contenido, content='busqueda_documento', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS busqueda_documento_ai AFTER INSERT ON busqueda_documento BEGIN "
+    "INSERT INTO busqueda_fts(rowid, titulo, contenido) VALUES (new.id, new.titulo, new.contenido); END",
+    "CREATE TRIGGER IF NOT EXISTS busqueda_documento_ad AFTER DELETE ON busqueda_documento BEGIN "
+    "INSERT INTO busqueda_fts(busqueda_fts, rowid, titulo, contenido) "
+    "VALUES ('delete', old.id, old.titulo, old.contenido); END",
+    "CREATE TRIGGER IF NOT EXISTS busqueda_documento_au AFTER UPDATE ON busqueda_documento BEGIN "
+    "INSERT INTO busqueda_fts(busqueda_fts, rowid, titulo, contenido) "
+    "VALUES ('delete', old.id, old.titulo, old.contenido); "
+    "INSERT INTO busqueda_fts(rowid, titulo, contenido) VALUES (new.id, new.titulo, new.contenido); END",
+]
+
+FTS_SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS busqueda_documento_au",
+    "DROP TRIGGER IF EXISTS busqueda_documento_ad",
+    "DROP TRIGGER IF EXISTS busqueda_documento_ai",
+    "DROP TABLE IF EXISTS busqueda_fts",
+]
+
+# Misma expresión que genera BusquedaPostgres con SearchVector(..., weight='A') + SearchVector(..., weight='B')
+GIN_POSTGRES = [
+    "CREATE INDEX IF NOT EXISTS busqueda_documento_fts_idx ON busqueda_documento USING GIN (("
+    "setweight(to_tsvector('spanish'::regconfig, COALESCE(titulo, '')), 'A') || "
+    "setweight(to_tsvector('spanish'::regconfig, COALESCE(contenido, '')), 'B')))",
+]
+
+GIN_POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS busqueda_documento_fts_idx",
+]
+
+
+def _ejecutar(schema_editor, sentencias):
+    for sql in sentencias:
+        schema_editor.execute(sql)
+
+
+def crear_indices(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _ejecutar(schema_editor, FTS_SQLITE)
+    elif vendor == 'postgresql':
+        _ejecutar(schema_editor, GIN_POSTGRES)
+
+
+def borrar_indices(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _ejecutar(schema_editor, FTS_SQLITE_REVERSE)
+    elif vendor == 'postgresql':
+        _ejecutar(schema_editor, GIN_POSTGRES_REVERSE)
+
+
+def _normalizar(texto):
+    return unicodedata.normalize('NFD', texto or '').encode('ascii', 'ignore').decode('ascii').lower()
+
+
+def poblar_documentos(apps, schema_editor):
+    DocumentoBusqueda = apps.get_model('cursos', 'DocumentoBusqueda')
+    fuentes = [
+        ('CURSO', apps.get_model('cursos', 'Curso'), lambda c: (c.titulo, f"{c.descripcion} {c.profesor}")),
+        ('RECURSO_COMUNIDAD', apps.get_model('cursos', 'RecursoComunidad'), lambda r: (r.titulo, r.descripcion)),
+        ('TEMA_FORO', apps.get_model('cursos', 'TemaForo'), lambda t: (t.titulo, t.contenido)),
+    ]
+    documentos = []
+    for tipo, modelo, extraer in fuentes:
+        for instancia in modelo.objects.all():
+            titulo, contenido = extraer(instancia)
+            documentos.append(DocumentoBusqueda(
+                tipo=tipo,
+                objeto_id=instancia.pk,
+                titulo=_normalizar(titulo),
+                contenido=_normalizar(contenido),
+            ))
+    DocumentoBusqueda.objects.bulk_create(documentos, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cursos', '0011_progreso_incremental'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentoBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('CURSO', 'Curso'), ('RECURSO_COMUNIDAD', 'Recurso de Comunidad'), ('TEMA_FORO', 'Tema de Foro')], max_length=20)),
+                ('objeto_id', models.BigIntegerField()),
+                ('titulo', models.TextField(blank=True)),
+                ('contenido', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Documento de Búsqueda',
+                'verbose_name_plural': 'Documentos de Búsqueda',
+                'db_table': 'busqueda_documento',
+                'unique_together': {('tipo', 'objeto_id')},
+            },
+        ),
+        migrations.RunPython(crear_indices, borrar_indices),
+        migrations.RunPython(poblar_documentos, migrations.RunPython.noop),
+    ]
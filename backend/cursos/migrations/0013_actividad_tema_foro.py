@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-17 22:14
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def poblar_actividad(apps, schema_editor):
+    TemaForo = apps.get_model('cursos', 'TemaForo')
+    temas = TemaForo.objects.annotate(
+        conteo=models.Count('respuestas'),
+        ultima_respuesta=models.Max('respuestas__fecha_creacion'),
+    )
+    for tema in temas:
+        tema.total_respuestas = tema.conteo
+        tema.ultima_actividad = max(filter(None, [tema.ultima_respuesta, tema.fecha_creacion]))
+        tema.save(update_fields=['total_respuestas', 'ultima_actividad'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cursos', '0012_documento_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='temaforo',
+            name='total_respuestas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='temaforo',
+            name='ultima_actividad',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(poblar_actividad, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-17 22:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def congelar_preguntas(apps, schema_editor):
+    """Fija para cada examen existente las preguntas que se le venían presentando."""
+    Examen = apps.get_model('cursos', 'Examen')
+    Pregunta = apps.get_model('cursos', 'Pregunta')
+    PreguntaExamen = apps.get_model('cursos', 'PreguntaExamen')
+    miembros = []
+    for examen in Examen.objects.all():
+        preguntas = Pregunta.objects.filter(modulo__curso_id=examen.curso_id).order_by('id')
+        ids = preguntas.values_list('id', flat=True)[: max(examen.numero_preguntas, 1)]
+        miembros.extend(
+            PreguntaExamen(examen_id=examen.id, pregunta_id=pregunta_id, orden=orden)
+            for orden, pregunta_id in enumerate(ids)
+        )
+    PreguntaExamen.objects.bulk_create(miembros, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cursos', '0013_actividad_tema_foro'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PreguntaExamen',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orden', models.PositiveIntegerField(default=0)),
+                ('examen', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='preguntas_examen', to='cursos.examen')),
+                ('pregunta', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='preguntas_examen', to='cursos.pregunta')),
+            ],
+            options={
+                'verbose_name': 'Pregunta de Examen',
+                'verbose_name_plural': 'Preguntas de Examen',
+                'db_table': 'examen_pregunta',
+                'ordering': ['orden', 'id'],
+                'unique_together': {('examen', 'pregunta')},
+            },
+        ),
+        migrations.AddField(
+            model_name='examen',
+            name='preguntas',
+            field=models.ManyToManyField(blank=True, related_name='examenes', through='cursos.PreguntaExamen', to='cursos.pregunta'),
+        ),
+        migrations.RunPython(congelar_preguntas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-17 22:18
+
+from django.db import migrations, models
+
+
+EQUIVALENCIAS = {
+    'INTERMEDIO': 'MEDIA',
+    'INTERMEDIA': 'MEDIA',
+    'AVANZADO': 'DIFICIL',
+    'AVANZADA': 'DIFICIL',
+    'BASICO': 'FACIL',
+    'BÁSICO': 'FACIL',
+}
+
+
+def poblar_dificultad(apps, schema_editor):
+    Pregunta = apps.get_model('cursos', 'Pregunta')
+    for dificultad in Pregunta.objects.values_list('dificultad', flat=True).distinct():
+        raw = (dificultad or '').strip().upper()
+        Pregunta.objects.filter(dificultad=dificultad).update(
+            dificultad_normalizada=EQUIVALENCIAS.get(raw, raw)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cursos', '0014_preguntas_examen'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pregunta',
+            name='dificultad_normalizada',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=10),
+        ),
+        migrations.RunPython(poblar_dificultad, migrations.RunPython.noop),
+    ]
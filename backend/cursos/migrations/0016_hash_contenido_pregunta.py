@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-17 22:19
+
+import hashlib
+import json
+
+from django.db import migrations, models
+
+
+CAMPOS_CONTENIDO = [
+    'texto_pregunta', 'opcion_a', 'opcion_b', 'opcion_c', 'opcion_d',
+    'respuesta_correcta', 'explicacion', 'dificultad_normalizada', 'puntos'
+]
+
+
+def poblar_hash(apps, schema_editor):
+    Pregunta = apps.get_model('cursos', 'Pregunta')
+    pendientes = []
+    for pregunta in Pregunta.objects.all().iterator():
+        contenido = [getattr(pregunta, campo) for campo in CAMPOS_CONTENIDO]
+        pregunta.hash_contenido = hashlib.sha256(json.dumps(contenido, ensure_ascii=False).encode()).hexdigest()
+        pendientes.append(pregunta)
+    Pregunta.objects.bulk_update(pendientes, ['hash_contenido'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cursos', '0015_dificultad_normalizada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pregunta',
+            name='hash_contenido',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AlterUniqueTogether(
+            name='preguntaexamen',
+            unique_together={('examen', 'orden')},
+        ),
+        migrations.AddIndex(
+            model_name='pregunta',
+            index=models.Index(fields=['modulo', 'hash_contenido'], name='pregunta_modulo_hash_idx'),
+        ),
+        migrations.RunPython(poblar_hash, migrations.RunPython.noop),
+    ]
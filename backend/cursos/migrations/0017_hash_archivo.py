@@ -0,0 +1,44 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:11
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def poblar_hash(apps, schema_editor):
+    for nombre in ('RecursoComunidad', 'FormularioEstudio'):
+        modelo = apps.get_model('cursos', nombre)
+        pendientes = []
+        for instancia in modelo.objects.exclude(archivo='').exclude(archivo__isnull=True).iterator():
+            sha = hashlib.sha256()
+            try:
+                with instancia.archivo.open('rb') as archivo:
+                    for bloque in archivo.chunks():
+                        sha.update(bloque)
+            except OSError:
+                # Archivo que ya no está en disco: se entrega sin ETag
+                continue
+            instancia.hash_archivo = sha.hexdigest()
+            pendientes.append(instancia)
+        modelo.objects.bulk_update(pendientes, ['hash_archivo'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cursos', '0016_hash_contenido_pregunta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='formularioestudio',
+            name='hash_archivo',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='recursocomunidad',
+            name='hash_archivo',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(poblar_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:20
+
+import cursos.almacenamiento
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cursos', '0018_subida_archivo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlobArchivo',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('nombre', models.CharField(max_length=255, unique=True)),
+                ('tamano', models.PositiveBigIntegerField()),
+                ('referencias', models.IntegerField(default=0)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archivo deduplicado',
+                'verbose_name_plural': 'Archivos deduplicados',
+                'db_table': 'blob_archivo',
+            },
+        ),
+        migrations.AlterField(
+            model_name='formularioestudio',
+            name='archivo',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=cursos.almacenamiento.almacenamiento_archivos, upload_to='formularios_estudio/'),
+        ),
+        migrations.AlterField(
+            model_name='recursocomunidad',
+            name='archivo',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=cursos.almacenamiento.almacenamiento_archivos, upload_to='recursos_comunidad/'),
+        ),
+    ]
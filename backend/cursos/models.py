@@ -1,5 +1,59 @@
+import hashlib
+import json
+import uuid
+
 from django.db import models
+from django.utils import timezone
 from usuarios.models import Creador, Estudiante, Usuario
+from .almacenamiento import almacenamiento_archivos
+
+
+def calcular_hash_archivo(archivo):
+    """SHA-256 del contenido de un ``FieldFile`` (recién subido o ya guardado)."""
+    sha = hashlib.sha256()
+    archivo.open('rb')
+    try:
+        for bloque in archivo.chunks():
+            sha.update(bloque)
+    finally:
+        if archivo._committed:
+            archivo.close()
+        else:
+            archivo.seek(0)
+    return sha.hexdigest()
+
+
+def actualizar_hash_archivo(instancia, kwargs):
+    """
+    Recalcula ``hash_archivo`` antes de guardar si ``archivo`` cambió. Si el
+    archivo se reemplaza o se quita, regresa el nombre anterior para liberarlo
+    con ``liberar_archivo_anterior`` después de guardar.
+    """
+    anterior = None
+    cambia = not instancia.archivo or not instancia.archivo._committed
+    # hash_archivo todavía es el del archivo guardado: sin él no hay nada que liberar
+    if cambia and instancia.pk and instancia.hash_archivo:
+        anterior = type(instancia).objects.filter(pk=instancia.pk).values_list('archivo', flat=True).first()
+    if not instancia.archivo:
+        instancia.hash_archivo = ''
+    elif not instancia.archivo._committed:
+        instancia.hash_archivo = calcular_hash_archivo(instancia.archivo)
+        # El almacenamiento por contenido lo reutiliza en vez de leer otra vez el archivo
+        instancia.archivo.file.sha256 = instancia.hash_archivo
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None and 'archivo' in update_fields:
+        kwargs['update_fields'] = set(update_fields) | {'hash_archivo'}
+    return anterior
+
+
+def liberar_archivo_anterior(instancia, anterior):
+    """
+    Quita la referencia al archivo que ``instancia`` dejó de usar. Se libera
+    aunque el nombre nuevo sea el mismo: al subir otra vez el mismo contenido
+    ``_save`` ya sumó una referencia al blob y esta la compensa.
+    """
+    if anterior:
+        instancia.archivo.storage.delete(anterior)
 
 
 class Curso(models.Model):
@@ -34,6 +88,9 @@ class Curso(models.Model):
     es_gratuito = models.BooleanField(default=False)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     activo = models.BooleanField(default=True)
+    # Totales cacheados para el cálculo incremental de progreso (ver cursos/progreso.py)
+    total_recursos = models.PositiveIntegerField(default=0, editable=False)
+    total_examenes = models.PositiveIntegerField(default=0, editable=False)
     
     class Meta:
         db_table = 'curso'
@@ -91,6 +148,20 @@ class Recurso(models.Model):
         return f"{self.modulo.titulo} - {self.titulo}"
 
 
+def normalizar_dificultad(value: str) -> str:
+    """Normaliza diferentes variantes de dificultad a un código único."""
+    raw = (value or '').strip().upper()
+    mapping = {
+        'INTERMEDIO': 'MEDIA',
+        'INTERMEDIA': 'MEDIA',
+        'AVANZADO': 'DIFICIL',
+        'AVANZADA': 'DIFICIL',
+        'BASICO': 'FACIL',
+        'BÁSICO': 'FACIL',
+    }
+    return mapping.get(raw, raw)
+
+
 class Pregunta(models.Model):
     """Banco de preguntas para exámenes"""
     DIFICULTADES = [
@@ -115,15 +186,39 @@ class Pregunta(models.Model):
     respuesta_correcta = models.CharField(max_length=1, choices=OPCIONES_RESPUESTA)
     explicacion = models.TextField(blank=True)
     dificultad = models.CharField(max_length=10, choices=DIFICULTADES)
+    # Código de `dificultad` ya normalizado (FACIL/MEDIA/DIFICIL) para filtrar por índice
+    dificultad_normalizada = models.CharField(max_length=10, db_index=True, editable=False, default='')
     puntos = models.IntegerField(default=1)
+    # SHA-256 del contenido; permite reutilizar preguntas idénticas del mismo módulo
+    hash_contenido = models.CharField(max_length=64, blank=True, editable=False, default='')
+    
+    CAMPOS_CONTENIDO = [
+        'texto_pregunta', 'opcion_a', 'opcion_b', 'opcion_c', 'opcion_d',
+        'respuesta_correcta', 'explicacion', 'dificultad_normalizada', 'puntos'
+    ]
     
     class Meta:
         db_table = 'pregunta'
         verbose_name = 'Pregunta'
         verbose_name_plural = 'Preguntas'
+        indexes = [
+            models.Index(fields=['modulo', 'hash_contenido'], name='pregunta_modulo_hash_idx'),
+        ]
     
     def __str__(self):
         return f"{self.modulo.titulo} - {self.texto_pregunta[:50]}"
+    
+    def calcular_hash_contenido(self):
+        self.dificultad_normalizada = normalizar_dificultad(self.dificultad)
+        contenido = [getattr(self, campo) for campo in self.CAMPOS_CONTENIDO]
+        return hashlib.sha256(json.dumps(contenido, ensure_ascii=False).encode()).hexdigest()
+    
+    def save(self, *args, **kwargs):
+        self.hash_contenido = self.calcular_hash_contenido()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(self.CAMPOS_CONTENIDO + ['dificultad']):
+            kwargs['update_fields'] = set(update_fields) | {'dificultad_normalizada', 'hash_contenido'}
+        super().save(*args, **kwargs)
 
 
 class Inscripcion(models.Model):
@@ -136,6 +231,9 @@ class Inscripcion(models.Model):
     fecha_examen = models.DateField(null=True, blank=True)
     hora_examen = models.TimeField(null=True, blank=True)
     completado = models.BooleanField(default=False)
+    # Contadores mantenidos por cursos/progreso.py al completar recursos o aprobar exámenes
+    recursos_completados = models.PositiveIntegerField(default=0, editable=False)
+    examenes_aprobados = models.PositiveIntegerField(default=0, editable=False)
     
     class Meta:
         db_table = 'inscripcion'
@@ -179,6 +277,9 @@ class Examen(models.Model):
     numero_preguntas = models.IntegerField()
     puntaje_minimo_aprobacion = models.DecimalField(max_digits=5, decimal_places=2, default=70)
     activo = models.BooleanField(default=True)
+    preguntas = models.ManyToManyField(
+        Pregunta, through='PreguntaExamen', related_name='examenes', blank=True
+    )
     
     class Meta:
         db_table = 'examen'
@@ -189,6 +290,20 @@ class Examen(models.Model):
         return f"{self.curso.titulo} - {self.titulo}"
 
 
+class PreguntaExamen(models.Model):
+    """Conjunto fijo de preguntas de un examen: lo que se presenta es lo que se califica"""
+    examen = models.ForeignKey(Examen, on_delete=models.CASCADE, related_name='preguntas_examen')
+    pregunta = models.ForeignKey(Pregunta, on_delete=models.CASCADE, related_name='preguntas_examen')
+    orden = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'examen_pregunta'
+        ordering = ['orden', 'id']
+        unique_together = ['examen', 'orden']
+        verbose_name = 'Pregunta de Examen'
+        verbose_name_plural = 'Preguntas de Examen'
+
+
 class IntentoExamen(models.Model):
     """Intentos de examen de cada estudiante"""
     estudiante = models.ForeignKey(Estudiante, on_delete=models.CASCADE, related_name='intentos_examen')
@@ -423,6 +538,9 @@ class TemaForo(models.Model):
     cerrado = models.BooleanField(default=False)
     resuelto = models.BooleanField(default=False)
     vistas = models.IntegerField(default=0)
+    # Desnormalizados: se actualizan al crear/borrar respuestas (ver cursos/signals.py)
+    total_respuestas = models.PositiveIntegerField(default=0)
+    ultima_actividad = models.DateTimeField(default=timezone.now, db_index=True)
     
     class Meta:
         db_table = 'tema_foro'
@@ -487,7 +605,9 @@ class RecursoComunidad(models.Model):
     descripcion = models.TextField()
     tipo = models.CharField(max_length=20, choices=TIPOS)
     archivo_url = models.URLField(blank=True, null=True)
-    archivo = models.FileField(upload_to='recursos_comunidad/', blank=True, null=True)
+    archivo = models.FileField(upload_to='recursos_comunidad/', storage=almacenamiento_archivos, max_length=255, blank=True, null=True)
+    # SHA-256 del archivo: ETag de la descarga (estudiapro/entrega.py)
+    hash_archivo = models.CharField(max_length=64, blank=True, editable=False, default='')
     contenido_texto = models.TextField(blank=True)
     autor = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='recursos_compartidos')
     curso = models.ForeignKey(Curso, on_delete=models.CASCADE, related_name='recursos_comunidad', null=True, blank=True)
@@ -508,6 +628,11 @@ class RecursoComunidad(models.Model):
     def __str__(self):
         return self.titulo
 
+    def save(self, *args, **kwargs):
+        anterior = actualizar_hash_archivo(self, kwargs)
+        super().save(*args, **kwargs)
+        liberar_archivo_anterior(self, anterior)
+
 
 class CalificacionRecurso(models.Model):
     """Calificaciones de recursos de comunidad"""
@@ -571,7 +696,8 @@ class FormularioEstudio(models.Model):
 
     titulo = models.CharField(max_length=200)
     materia = models.CharField(max_length=200, blank=True, default='General')
-    archivo = models.FileField(upload_to='formularios_estudio/', blank=True, null=True)
+    archivo = models.FileField(upload_to='formularios_estudio/', storage=almacenamiento_archivos, max_length=255, blank=True, null=True)
+    hash_archivo = models.CharField(max_length=64, blank=True, editable=False, default='')
     archivo_url = models.URLField(blank=True, null=True)
     creado_por = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True, related_name='formularios_estudio')
     fecha_creacion = models.DateTimeField(auto_now_add=True)
@@ -586,6 +712,54 @@ class FormularioEstudio(models.Model):
     def __str__(self):
         return self.titulo
 
+    def save(self, *args, **kwargs):
+        anterior = actualizar_hash_archivo(self, kwargs)
+        super().save(*args, **kwargs)
+        liberar_archivo_anterior(self, anterior)
+
+
+class BlobArchivo(models.Model):
+    """Contenido guardado una sola vez por el almacenamiento por contenido (cursos/almacenamiento.py)."""
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    nombre = models.CharField(max_length=255, unique=True)
+    tamano = models.PositiveBigIntegerField()
+    # FileField que apuntan a este contenido; en 0 se borra el archivo
+    referencias = models.IntegerField(default=0)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'blob_archivo'
+        verbose_name = 'Archivo deduplicado'
+        verbose_name_plural = 'Archivos deduplicados'
+
+    def __str__(self):
+        return f'{self.nombre} ({self.referencias})'
+
+
+class SubidaArchivo(models.Model):
+    """Sesión de subida por partes (cursos/subidas.py); el contenido vive en ``SUBIDAS_DIR``."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='subidas')
+    nombre = models.CharField(max_length=255)
+    tamano = models.PositiveBigIntegerField()
+    recibido = models.PositiveBigIntegerField(default=0)
+    # SHA-256 de cada parte recibida, en orden
+    partes = models.JSONField(default=list)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    expira = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = 'subida_archivo'
+        verbose_name = 'Subida de archivo'
+        verbose_name_plural = 'Subidas de archivos'
+
+    def __str__(self):
+        return f'{self.nombre} ({self.recibido}/{self.tamano})'
+
+    @property
+    def completa(self):
+        return self.recibido == self.tamano
+
 
 class PreguntaFormulario(models.Model):
     """Preguntas de un formulario"""
@@ -640,3 +814,23 @@ class DetalleRespuesta(models.Model):
         db_table = 'detalle_respuesta'
         verbose_name = 'Detalle de Respuesta'
         verbose_name_plural = 'Detalles de Respuestas'
+
+
+class DocumentoBusqueda(models.Model):
+    """Texto normalizado de cursos, recursos de comunidad y temas del foro (ver cursos/busqueda.py)"""
+    TIPOS = [
+        ('CURSO', 'Curso'),
+        ('RECURSO_COMUNIDAD', 'Recurso de Comunidad'),
+        ('TEMA_FORO', 'Tema de Foro'),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    objeto_id = models.BigIntegerField()
+    titulo = models.TextField(blank=True)
+    contenido = models.TextField(blank=True)
+
+    class Meta:
+        db_table = 'busqueda_documento'
+        unique_together = ['tipo', 'objeto_id']
+        verbose_name = 'Documento de Búsqueda'
+        verbose_name_plural = 'Documentos de Búsqueda'
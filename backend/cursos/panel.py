@@ -0,0 +1,67 @@
+"""
+Snapshots del panel (``mi_panel``) por usuario en la caché de Django.
+
+La llave incluye el rol y la fecha local, porque los exámenes y actividades
+"próximos" dependen del día. Cada escritura que cambia el panel de alguien
+(inscripciones, progreso, exámenes enviados, tutorías, actividades, recursos de
+la comunidad, datos del usuario) invalida su snapshot al confirmar la
+transacción; la siguiente lectura lo reconstruye. ``PANEL_CACHE_TTL`` acota
+cualquier desfase que se escape a las señales.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from estudiapro import metricas
+from usuarios.models import Creador, Estudiante, Usuario
+
+
+ROLES = ('ESTUDIANTE', 'CREADOR', 'ADMINISTRADOR')
+
+
+def _llave(usuario_id, rol, fecha=None):
+    fecha = fecha or timezone.localdate()
+    return f'panel:{rol}:{usuario_id}:{fecha.isoformat()}'
+
+
+def obtener(usuario, construir):
+    """Snapshot del panel de ``usuario``; si no está en caché se arma con ``construir(usuario)``."""
+    llave = _llave(usuario.pk, usuario.rol)
+    datos = cache.get(llave)
+    metricas.consulta_cache('panel', datos is not None)
+    if datos is None:
+        datos = construir(usuario)
+        cache.set(llave, datos, settings.PANEL_CACHE_TTL)
+    return datos
+
+
+def invalidar_usuarios(usuario_ids):
+    """Borra los snapshots de ``usuario_ids`` cuando se confirme la transacción actual."""
+    usuario_ids = {usuario_id for usuario_id in usuario_ids if usuario_id}
+    if not usuario_ids:
+        return
+    fecha = timezone.localdate()
+    llaves = [_llave(usuario_id, rol, fecha) for usuario_id in usuario_ids for rol in ROLES]
+    transaction.on_commit(lambda: cache.delete_many(llaves))
+
+
+def invalidar_estudiantes(estudiante_ids):
+    estudiante_ids = {estudiante_id for estudiante_id in estudiante_ids if estudiante_id}
+    if estudiante_ids:
+        invalidar_usuarios(
+            Estudiante.objects.filter(pk__in=estudiante_ids).values_list('id_usuario_id', flat=True)
+        )
+
+
+def invalidar_creadores(creador_ids):
+    creador_ids = {creador_id for creador_id in creador_ids if creador_id}
+    if creador_ids:
+        invalidar_usuarios(
+            Creador.objects.filter(pk__in=creador_ids).values_list('id_usuario_id', flat=True)
+        )
+
+
+def invalidar_administradores():
+    """El panel de administración muestra totales globales."""
+    invalidar_usuarios(Usuario.objects.filter(rol='ADMINISTRADOR').values_list('id', flat=True))
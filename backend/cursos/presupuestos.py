@@ -0,0 +1,128 @@
+"""
+Presupuesto de consultas SQL por nombre de URL de la API.
+
+``settings.PRESUPUESTOS_VISTAS`` apunta a ``PRESUPUESTOS``: el middleware de
+instrumentación registra las peticiones que lo rebasan y ``cursos/tests.py``
+falla (mostrando el SQL) si una ruta lo supera o si sus lecturas hacen más
+consultas al crecer los datos. Cada entrada tiene ``consultas`` (lecturas),
+``por_metodo`` para las escrituras que necesitan otro límite y, opcionalmente,
+``db_ms``.
+
+Los números son los medidos en frío (sin caché de auth ni del panel), incluyen
+la consulta del token y ``cursos/tests.py`` exige que coincidan con lo medido
+más la ``HOLGURA`` declarada abajo. Si un cambio los baja o los sube, la prueba
+falla hasta que se actualicen aquí.
+"""
+
+PRESUPUESTOS = {
+    # Cursos y contenido
+    'curso-list': {'consultas': 4, 'por_metodo': {'POST': 13}},
+    'curso-detail': {'consultas': 8, 'por_metodo': {'PUT': 26, 'PATCH': 26, 'DELETE': 4}},
+    'curso-inscribirse': {'consultas': 10},
+    'curso-desinscribirse': {'consultas': 10},
+    'curso-mi-progreso': {'consultas': 7},
+    'curso-modulos': {'consultas': 5},
+    'recurso-list': {'consultas': 2},
+    'recurso-detail': {'consultas': 2},
+    'recurso-mis-compras': {'consultas': 2},
+    # +2 sobre lo medido (en el fixture el porcentaje no cambia): UPDATE del porcentaje y usuario del panel
+    'recurso-marcar-completado': {'consultas': 19},
+    'pregunta-list': {'consultas': 2},
+    'pregunta-detail': {'consultas': 2},
+    'pregunta-por-dificultad': {'consultas': 2},
+    'pregunta-por-modulo': {'consultas': 2},
+    'examen-list': {'consultas': 4},
+    'examen-detail': {'consultas': 2},
+    'examen-plantillas': {'consultas': 4},
+    'examen-generar-simulador': {'consultas': 14},
+    'examen-iniciar': {'consultas': 6},
+    'examen-enviar-respuestas': {'consultas': 9},
+
+    # Foro
+    'foro-list': {'consultas': 2, 'por_metodo': {'POST': 9}},
+    'foro-detail': {'consultas': 6, 'por_metodo': {'DELETE': 11}},
+    'foro-buscar': {'consultas': 3},
+    'foro-responder': {'consultas': 4},
+    'votar-respuesta': {'consultas': 13},
+
+    # Recursos de comunidad
+    'recurso-comunidad-list': {'consultas': 2, 'por_metodo': {'POST': 10}},
+    # Escrituras con ``subida`` (el peor caso): la sesión, el blob (SELECT e INSERT con su
+    # savepoint) y el DELETE de la sesión se suman a las 8 de un PATCH sin archivo
+    'recurso-comunidad-detail': {'consultas': 4, 'por_metodo': {'PUT': 14, 'PATCH': 14}},
+    'recurso-comunidad-buscar': {'consultas': 2},
+    'recurso-comunidad-mis-recursos': {'consultas': 2},
+    'recurso-comunidad-por-curso': {'consultas': 2},
+    'recurso-comunidad-calificar': {'consultas': 7},
+    'recurso-comunidad-descargar': {'consultas': 2},
+    'recurso-comunidad-archivo': {'consultas': 2},
+
+    # Formularios
+    'formulario-list': {'consultas': 2, 'por_metodo': {'POST': 3}},
+    'formulario-detail': {'consultas': 3},
+    'formulario-disponibles': {'consultas': 2},
+    'formulario-mis-formularios': {'consultas': 2},
+    'formulario-resultados': {'consultas': 5},
+    'formulario-responder': {'consultas': 5},
+    # POST con ``subida``: la sesión, el blob (SELECT e INSERT con su savepoint), el INSERT y el DELETE de la sesión
+    'formulario-estudio-list': {'consultas': 2, 'por_metodo': {'POST': 8}},
+    'formulario-estudio-detail': {'consultas': 3},
+    'formulario-estudio-archivo': {'consultas': 2},
+
+    # Subidas por partes (solo POST, GET/DELETE y PUT)
+    'subida-list': {'consultas': 2},
+    'subida-detail': {'consultas': 2, 'por_metodo': {'DELETE': 3}},
+    # +1: la sesión se relee con el flock tomado (ver subidas.agregar_parte)
+    'subida-parte': {'consultas': 4},
+
+    # Próximas actividades (buscar, mis_recursos, por_curso y calificar vienen
+    # de RecursoComunidadViewSet y hoy fallan; no se miden)
+    'proxima-actividad-list': {'consultas': 3},
+    'proxima-actividad-detail': {'consultas': 3},
+    'proxima-actividad-buscar': {'consultas': 10},
+    'proxima-actividad-mis-recursos': {'consultas': 10},
+    'proxima-actividad-por-curso': {'consultas': 10},
+    'proxima-actividad-calificar': {'consultas': 10},
+
+    # Tutorías y notificaciones
+    'tutor-list': {'consultas': 2},
+    'tutor-detail': {'consultas': 2},
+    'tutor-me': {'consultas': 3},
+    'tutor-agendar': {'consultas': 4},
+    'tutor-actualizar-solicitud': {'consultas': 8},
+    'notificacion-list': {'consultas': 2},
+    'notificacion-detail': {'consultas': 2},
+    'notificacion-mark-read': {'consultas': 3},
+    'notificacion-delete-one': {'consultas': 3},
+    'notificacion-delete-all': {'consultas': 2},
+
+    # Panel, progreso y logros
+    'mi-panel': {'consultas': 3},
+    'mis-cursos': {'consultas': 3},
+    'actualizar-fecha-examen': {'consultas': 13},
+    'buscar-cursos': {'consultas': 5},
+    'recursos-mis-compras': {'consultas': 2},
+    'recursos-comprar': {'consultas': 1},
+    'recursos-descargar': {'consultas': 1},
+    'mi-progreso-detallado': {'consultas': 3},
+    'logros': {'consultas': 2},
+    'mis-logros': {'consultas': 3},
+
+    # Usuarios
+    'register': {'consultas': 13},
+    'login': {'consultas': 6},
+    'logout': {'consultas': 2},
+    'profile': {'consultas': 1},
+    'verificar-rol': {'consultas': 1},
+    'activate-premium': {'consultas': 3},
+    'track-time': {'consultas': 5},
+    'manage-users': {'consultas': 2},
+    'manage-user-detail': {'consultas': 7, 'por_metodo': {'DELETE': 41}},
+}
+
+
+# Consultas por encima de lo que mide cursos/tests.py, por (nombre de URL, método
+# o None para ``consultas``); el motivo va junto a la entrada en PRESUPUESTOS
+HOLGURA = {
+    ('recurso-marcar-completado', None): 2,
+}
@@ -0,0 +1,259 @@
+"""
+Motor de progreso incremental de inscripciones.
+
+El porcentaje de cada ``Inscripcion`` se materializa en ``progreso_porcentaje``
+y ``completado`` a partir de dos contadores propios (``recursos_completados`` y
+``examenes_aprobados``) y de los totales cacheados en el ``Curso``
+(``total_recursos`` y ``total_examenes``). Las vistas de lectura solo leen esos
+campos; las escrituras ocurren únicamente cuando cambia algo que afecta al
+progreso.
+"""
+import threading
+import weakref
+
+from django.db import models, transaction
+from django.utils import timezone
+
+from .models import Curso, Examen, Inscripcion, IntentoExamen, ProgresoRecurso, Recurso
+from . import panel
+
+
+def calcular_porcentaje(recursos_completados, total_recursos, examenes_aprobados, total_examenes):
+    """
+    Progreso ponderado: 60% recursos y 40% exámenes cuando el curso tiene ambos,
+    100% del que exista en otro caso.
+    """
+    recursos_completados = min(recursos_completados, total_recursos)
+    examenes_aprobados = min(examenes_aprobados, total_examenes)
+
+    if total_examenes > 0 and total_recursos > 0:
+        progreso_recursos = (recursos_completados / total_recursos) * 60
+        progreso_examenes = (examenes_aprobados / total_examenes) * 40
+        porcentaje = progreso_recursos + progreso_examenes
+    elif total_recursos > 0:
+        porcentaje = (recursos_completados / total_recursos) * 100
+    elif total_examenes > 0:
+        porcentaje = (examenes_aprobados / total_examenes) * 100
+    else:
+        porcentaje = 0
+    return round(porcentaje, 2)
+
+
+def _aplicar_porcentaje(inscripcion, curso):
+    """Actualiza porcentaje/completado en memoria. Retorna True si cambiaron."""
+    porcentaje = calcular_porcentaje(
+        inscripcion.recursos_completados,
+        curso.total_recursos,
+        inscripcion.examenes_aprobados,
+        curso.total_examenes,
+    )
+    completado = porcentaje >= 100
+    cambio = float(inscripcion.progreso_porcentaje or 0) != porcentaje or inscripcion.completado != completado
+    inscripcion.progreso_porcentaje = porcentaje
+    inscripcion.completado = completado
+    return cambio
+
+
+def _guardar_porcentaje(inscripcion):
+    Inscripcion.objects.filter(pk=inscripcion.pk).update(
+        progreso_porcentaje=inscripcion.progreso_porcentaje,
+        completado=inscripcion.completado,
+    )
+    panel.invalidar_estudiantes([inscripcion.estudiante_id])
+
+
+def _incrementar(inscripcion, campo):
+    """Incrementa un contador de la inscripción de forma atómica y recalcula el porcentaje."""
+    with transaction.atomic():
+        Inscripcion.objects.filter(pk=inscripcion.pk).update(**{campo: models.F(campo) + 1})
+        inscripcion.refresh_from_db(fields=['recursos_completados', 'examenes_aprobados'])
+        curso = Curso.objects.only('total_recursos', 'total_examenes').get(pk=inscripcion.curso_id)
+        if _aplicar_porcentaje(inscripcion, curso):
+            _guardar_porcentaje(inscripcion)
+    return float(inscripcion.progreso_porcentaje)
+
+
+def marcar_recurso_completado(progreso_recurso, **campos):
+    """
+    Marca un ``ProgresoRecurso`` como completado con un ``UPDATE`` condicional
+    (y guarda ``campos``). Regresa ``True`` solo si esta llamada lo pasó de no
+    completado a completado: de dos peticiones simultáneas solo una cuenta el
+    recurso.
+    """
+    ahora = timezone.now()
+    filas = ProgresoRecurso.objects.filter(pk=progreso_recurso.pk)
+    nuevo = bool(filas.filter(completado=False).update(completado=True, fecha_completado=ahora, **campos))
+    if not nuevo and campos:
+        filas.update(**campos)
+    progreso_recurso.completado = True
+    if nuevo:
+        progreso_recurso.fecha_completado = ahora
+    for campo, valor in campos.items():
+        setattr(progreso_recurso, campo, valor)
+    return nuevo
+
+
+def registrar_recurso_completado(inscripcion, ya_completado):
+    """
+    Llamar después de ``marcar_recurso_completado``. ``ya_completado`` es lo
+    contrario de lo que esta regresó: si el recurso ya contaba como completado.
+    """
+    if ya_completado:
+        return float(inscripcion.progreso_porcentaje)
+    return _incrementar(inscripcion, 'recursos_completados')
+
+
+def registrar_intento_examen(intento, inscripcion=None):
+    """
+    Llamar después de guardar un ``IntentoExamen`` completado. Solo el primer
+    intento aprobado de cada examen activo incrementa el contador.
+    """
+    examen = intento.examen
+    if inscripcion is None:
+        inscripcion = Inscripcion.objects.filter(
+            estudiante_id=intento.estudiante_id,
+            curso_id=examen.curso_id
+        ).first()
+    if not inscripcion:
+        return None
+
+    aprobado = intento.completado and intento.puntaje_obtenido >= examen.puntaje_minimo_aprobacion
+    if not (examen.activo and aprobado):
+        return float(inscripcion.progreso_porcentaje)
+
+    aprobado_antes = IntentoExamen.objects.filter(
+        estudiante_id=intento.estudiante_id,
+        examen=examen,
+        completado=True,
+        puntaje_obtenido__gte=examen.puntaje_minimo_aprobacion
+    ).exclude(pk=intento.pk).exists()
+    if aprobado_antes:
+        return float(inscripcion.progreso_porcentaje)
+    return _incrementar(inscripcion, 'examenes_aprobados')
+
+
+def _examenes_aprobados_por_estudiante(curso_id, estudiante_ids=None):
+    intentos = IntentoExamen.objects.filter(
+        examen__curso_id=curso_id,
+        examen__activo=True,
+        completado=True,
+        puntaje_obtenido__gte=models.F('examen__puntaje_minimo_aprobacion')
+    )
+    if estudiante_ids is not None:
+        intentos = intentos.filter(estudiante_id__in=estudiante_ids)
+    return dict(
+        intentos.values('estudiante_id')
+        .annotate(total=models.Count('examen_id', distinct=True))
+        .values_list('estudiante_id', 'total')
+    )
+
+
+def _recursos_completados_por_inscripcion(**filtros):
+    return dict(
+        ProgresoRecurso.objects.filter(completado=True, **filtros)
+        .values('inscripcion_id')
+        .annotate(total=models.Count('recurso_id', distinct=True))
+        .values_list('inscripcion_id', 'total')
+    )
+
+
+def inicializar_inscripcion(inscripcion):
+    """
+    Calcula los contadores de una inscripción recién creada (el estudiante pudo
+    presentar exámenes del curso antes de inscribirse).
+    """
+    recursos = _recursos_completados_por_inscripcion(inscripcion_id=inscripcion.pk).get(inscripcion.pk, 0)
+    examenes = _examenes_aprobados_por_estudiante(
+        inscripcion.curso_id, [inscripcion.estudiante_id]
+    ).get(inscripcion.estudiante_id, 0)
+    if not (recursos or examenes):
+        return
+    inscripcion.recursos_completados = recursos
+    inscripcion.examenes_aprobados = examenes
+    curso = Curso.objects.only('total_recursos', 'total_examenes').get(pk=inscripcion.curso_id)
+    _aplicar_porcentaje(inscripcion, curso)
+    Inscripcion.objects.filter(pk=inscripcion.pk).update(
+        recursos_completados=recursos,
+        examenes_aprobados=examenes,
+        progreso_porcentaje=inscripcion.progreso_porcentaje,
+        completado=inscripcion.completado,
+    )
+    panel.invalidar_estudiantes([inscripcion.estudiante_id])
+
+
+def recalcular_curso(curso_id):
+    """
+    Reconstruye totales del curso y contadores de todas sus inscripciones.
+    Se usa cuando cambia la estructura del curso (recursos o exámenes), no en lecturas.
+    """
+    with transaction.atomic():
+        total_recursos = Recurso.objects.filter(modulo__curso_id=curso_id).count()
+        total_examenes = Examen.objects.filter(curso_id=curso_id, activo=True).count()
+        Curso.objects.filter(pk=curso_id).update(total_recursos=total_recursos, total_examenes=total_examenes)
+        curso = Curso(pk=curso_id, total_recursos=total_recursos, total_examenes=total_examenes)
+
+        inscripciones = list(Inscripcion.objects.filter(curso_id=curso_id).only(
+            'id', 'estudiante_id', 'curso_id', 'recursos_completados',
+            'examenes_aprobados', 'progreso_porcentaje', 'completado'
+        ))
+        if not inscripciones:
+            return
+        recursos = _recursos_completados_por_inscripcion(inscripcion__curso_id=curso_id)
+        examenes = _examenes_aprobados_por_estudiante(curso_id)
+
+        modificadas = []
+        for inscripcion in inscripciones:
+            nuevos_recursos = recursos.get(inscripcion.pk, 0)
+            nuevos_examenes = examenes.get(inscripcion.estudiante_id, 0)
+            cambio = (
+                inscripcion.recursos_completados != nuevos_recursos
+                or inscripcion.examenes_aprobados != nuevos_examenes
+            )
+            inscripcion.recursos_completados = nuevos_recursos
+            inscripcion.examenes_aprobados = nuevos_examenes
+            if _aplicar_porcentaje(inscripcion, curso) or cambio:
+                modificadas.append(inscripcion)
+
+        if modificadas:
+            Inscripcion.objects.bulk_update(
+                modificadas,
+                ['recursos_completados', 'examenes_aprobados', 'progreso_porcentaje', 'completado'],
+                batch_size=500
+            )
+            panel.invalidar_estudiantes([inscripcion.estudiante_id for inscripcion in modificadas])
+
+
+# Por hilo (cada hilo tiene sus conexiones): (alias, curso_id) -> callback
+# registrado con on_commit. Las referencias son débiles: al confirmar o revertir
+# la transacción Django suelta sus callbacks y la entrada desaparece sola.
+_recalculos = threading.local()
+
+
+def _recalculos_pendientes():
+    pendientes = getattr(_recalculos, 'pendientes', None)
+    if pendientes is None:
+        pendientes = _recalculos.pendientes = weakref.WeakValueDictionary()
+    return pendientes
+
+
+def programar_recalculo_curso(curso_id):
+    """
+    Encola ``recalcular_curso`` en la cola de tareas cuando termine la
+    transacción actual. Varias llamadas para el mismo curso dentro de una
+    transacción (p. ej. el borrado en cascada de módulos y recursos) encolan una
+    sola tarea.
+    """
+    if not curso_id:
+        return
+    clave = (transaction.get_connection().alias, curso_id)
+    pendientes = _recalculos_pendientes()
+    if clave in pendientes:
+        return
+
+    def _ejecutar():
+        pendientes.pop(clave, None)
+        from .tareas import recalcular_curso as tarea_recalcular
+        tarea_recalcular.encolar(curso_id)
+
+    pendientes[clave] = _ejecutar
+    transaction.on_commit(_ejecutar)
@@ -1,3 +1,6 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
 from rest_framework import serializers
 from .models import (
     Curso, Modulo, Recurso, Pregunta, 
@@ -9,10 +12,12 @@ from .models import (
     TemaForo, RespuestaForo, VotoRespuesta,
     RecursoComunidad, CalificacionRecurso, DescargaRecurso,
     Formulario, PreguntaFormulario, RespuestaFormulario, DetalleRespuesta,
-    FormularioEstudio
+    FormularioEstudio, SubidaArchivo
 )
 from usuarios.models import Creador
 from usuarios.models import Usuario
+from estudiapro import entrega
+from . import contadores, subidas
 
 
 class CreadorSerializer(serializers.ModelSerializer):
@@ -269,6 +274,9 @@ class TutorPublicSerializer(serializers.ModelSerializer):
         return full_name or user.username
 
     def get_sessions(self, obj):
+        total = getattr(obj, 'num_tutorias', None)
+        if total is not None:
+            return total
         try:
             return obj.creador.tutorias.count()
         except Exception:
@@ -330,8 +338,6 @@ class RespuestaForoSerializer(serializers.ModelSerializer):
 class TemaForoSerializer(serializers.ModelSerializer):
     """Serializer para temas del foro"""
     autor = UsuarioBasicoSerializer(read_only=True)
-    total_respuestas = serializers.SerializerMethodField()
-    ultima_actividad = serializers.DateTimeField(source='fecha_actualizacion', read_only=True)
     
     class Meta:
         model = TemaForo
@@ -340,10 +346,7 @@ class TemaForoSerializer(serializers.ModelSerializer):
             'curso', 'fecha_creacion', 'ultima_actividad',
             'cerrado', 'resuelto', 'vistas', 'total_respuestas'
         ]
-        read_only_fields = ['fecha_creacion', 'vistas']
-    
-    def get_total_respuestas(self, obj):
-        return obj.respuestas.count()
+        read_only_fields = ['fecha_creacion', 'vistas', 'ultima_actividad', 'total_respuestas']
 
 
 class TemaForoDetalleSerializer(serializers.ModelSerializer):
@@ -360,6 +363,60 @@ class TemaForoDetalleSerializer(serializers.ModelSerializer):
         ]
 
 
+# ========== Subidas por partes ==========
+
+class SubidaArchivoSerializer(serializers.ModelSerializer):
+    """Sesión de subida por partes (ver cursos/subidas.py)"""
+    tamano_parte = serializers.SerializerMethodField()
+    completa = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = SubidaArchivo
+        fields = ['id', 'nombre', 'tamano', 'recibido', 'partes', 'tamano_parte', 'completa', 'expira']
+        read_only_fields = ['recibido', 'partes', 'expira']
+
+    def get_tamano_parte(self, obj):
+        return settings.SUBIDAS_TAMANO_PARTE
+
+    def validate_tamano(self, value):
+        if not 0 < value <= settings.SUBIDAS_TAMANO_MAXIMO:
+            raise serializers.ValidationError(f'El archivo debe pesar entre 1 y {settings.SUBIDAS_TAMANO_MAXIMO} bytes')
+        return value
+
+
+class ArchivoPorPartesMixin:
+    """
+    Acepta ``subida`` (id de una sesión completa del usuario) en lugar de
+    ``archivo``; al guardar, el archivo de la sesión se mueve al ``FileField``.
+    El serializer declara el campo ``subida``.
+    """
+
+    def validate_subida(self, value):
+        request = self.context.get('request')
+        if value is None:
+            return value
+        if request is None or value.usuario_id != request.user.pk:
+            raise serializers.ValidationError('Subida no encontrada')
+        if value.expira < timezone.now():
+            # limpiar_subidas puede borrar el temporal en cualquier momento
+            raise serializers.ValidationError('La subida expiró; crea otra')
+        if not value.completa:
+            raise serializers.ValidationError(f'Faltan {value.tamano - value.recibido} bytes por subir')
+        return value
+
+    def save(self, **kwargs):
+        subida = self.validated_data.pop('subida', None)
+        if subida is None:
+            return super().save(**kwargs)
+        archivo = subidas.archivo(subida)
+        try:
+            instancia = super().save(archivo=archivo, **kwargs)
+        finally:
+            archivo.close()
+        subidas.borrar(subida)
+        return instancia
+
+
 # ========== Recursos de Comunidad ==========
 
 class CalificacionRecursoSerializer(serializers.ModelSerializer):
@@ -372,38 +429,53 @@ class CalificacionRecursoSerializer(serializers.ModelSerializer):
         read_only_fields = ['fecha']
 
 
-class RecursoComunidadSerializer(serializers.ModelSerializer):
+def _descargas_pendientes(serializer, recurso):
+    pendientes = serializer.context.get('descargas_pendientes')
+    if pendientes is not None:
+        return pendientes.get(recurso.pk, 0)
+    return contadores.pendiente('descargas', recurso.pk)
+
+
+class RecursoComunidadListSerializer(serializers.ListSerializer):
+    """Lee las descargas pendientes de toda la lista con una sola consulta a la caché."""
+
+    def to_representation(self, data):
+        recursos = list(data.all() if isinstance(data, models.Manager) else data)
+        self.context['descargas_pendientes'] = contadores.pendientes('descargas', [recurso.pk for recurso in recursos])
+        return super().to_representation(recursos)
+
+
+class RecursoComunidadSerializer(ArchivoPorPartesMixin, serializers.ModelSerializer):
     """Serializer para recursos de comunidad"""
     autor = UsuarioBasicoSerializer(read_only=True)
     curso_titulo = serializers.CharField(source='curso.titulo', read_only=True)
     total_calificaciones = serializers.SerializerMethodField()
     archivo = serializers.FileField(required=False, allow_null=True, write_only=True)
+    subida = serializers.PrimaryKeyRelatedField(
+        queryset=SubidaArchivo.objects.all(), required=False, allow_null=True, write_only=True
+    )
     
     class Meta:
         model = RecursoComunidad
         fields = [
-            'id', 'titulo', 'descripcion', 'tipo', 'archivo_url', 'archivo',
+            'id', 'titulo', 'descripcion', 'tipo', 'archivo_url', 'archivo', 'subida',
             'contenido_texto', 'autor', 'curso', 'curso_titulo',
             'modulo', 'fecha_creacion', 'descargas',
             'calificacion_promedio', 'total_calificaciones',
             'aprobado', 'activo'
         ]
         read_only_fields = ['descargas', 'calificacion_promedio', 'aprobado']
+        list_serializer_class = RecursoComunidadListSerializer
     
     def get_total_calificaciones(self, obj):
-        return obj.calificaciones.count()
+        total = getattr(obj, 'num_calificaciones', None)
+        return total if total is not None else obj.calificaciones.count()
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        request = self.context.get('request')
+        data['descargas'] += _descargas_pendientes(self, instance)
         if getattr(instance, 'archivo', None):
-            try:
-                file_url = instance.archivo.url
-                if request:
-                    file_url = request.build_absolute_uri(file_url)
-                data['archivo_url'] = file_url
-            except Exception:
-                pass
+            data['archivo_url'] = entrega.url_archivo(self.context.get('request'), 'recurso-comunidad-archivo', instance)
         return data
 
 
@@ -424,31 +496,28 @@ class RecursoComunidadDetalleSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        request = self.context.get('request')
+        data['descargas'] += _descargas_pendientes(self, instance)
         if getattr(instance, 'archivo', None):
-            try:
-                file_url = instance.archivo.url
-                if request:
-                    file_url = request.build_absolute_uri(file_url)
-                data['archivo_url'] = file_url
-            except Exception:
-                pass
+            data['archivo_url'] = entrega.url_archivo(self.context.get('request'), 'recurso-comunidad-archivo', instance)
         return data
 
 
 # ========== Formularios de Estudio (PDF) ==========
 
-class FormularioEstudioSerializer(serializers.ModelSerializer):
+class FormularioEstudioSerializer(ArchivoPorPartesMixin, serializers.ModelSerializer):
     title = serializers.CharField(source='titulo')
     subject = serializers.CharField(source='materia', required=False, allow_blank=True)
     file = serializers.FileField(source='archivo', required=False, allow_null=True, write_only=True)
+    subida = serializers.PrimaryKeyRelatedField(
+        queryset=SubidaArchivo.objects.all(), required=False, allow_null=True, write_only=True
+    )
     url = serializers.URLField(source='archivo_url', required=False, allow_blank=True, allow_null=True)
     type = serializers.SerializerMethodField()
     fileName = serializers.SerializerMethodField()
 
     class Meta:
         model = FormularioEstudio
-        fields = ['id', 'title', 'subject', 'type', 'url', 'fileName', 'file']
+        fields = ['id', 'title', 'subject', 'type', 'url', 'fileName', 'file', 'subida']
 
     def get_type(self, obj):
         return 'PDF'
@@ -462,21 +531,14 @@ class FormularioEstudioSerializer(serializers.ModelSerializer):
         return None
 
     def validate(self, attrs):
-        if not attrs.get('archivo') and not attrs.get('archivo_url'):
-            raise serializers.ValidationError('Se requiere file o url')
+        if not attrs.get('archivo') and not attrs.get('archivo_url') and not attrs.get('subida'):
+            raise serializers.ValidationError('Se requiere file, url o subida')
         return attrs
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        request = self.context.get('request')
         if getattr(instance, 'archivo', None):
-            try:
-                file_url = instance.archivo.url
-                if request:
-                    file_url = request.build_absolute_uri(file_url)
-                data['url'] = file_url
-            except Exception:
-                pass
+            data['url'] = entrega.url_archivo(self.context.get('request'), 'formulario-estudio-archivo', instance)
         return data
 
 
@@ -520,7 +582,8 @@ class FormularioSerializer(serializers.ModelSerializer):
         read_only_fields = ['fecha_creacion']
     
     def get_total_respuestas(self, obj):
-        return obj.respuestas.count()
+        total = getattr(obj, 'num_respuestas', None)
+        return total if total is not None else obj.respuestas.count()
 
 
 class FormularioDetalleSerializer(serializers.ModelSerializer):
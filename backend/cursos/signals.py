@@ -0,0 +1,142 @@
+from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from usuarios.models import Creador, Usuario
+from .models import (
+    Curso, Examen, FormularioEstudio, Inscripcion, IntentoExamen, Modulo, Pregunta, ProximaActividad,
+    Recurso, RecursoComunidad, RespuestaForo, TemaForo, Tutoria
+)
+from . import banco_preguntas, busqueda, panel, progreso
+
+
+def _curso_de_modulo(modulo_id):
+    return Modulo.objects.filter(pk=modulo_id).values_list('curso_id', flat=True).first()
+
+
+@receiver(post_save, sender=Recurso)
+@receiver(post_delete, sender=Recurso)
+def recurso_cambiado(sender, instance, **kwargs):
+    """Agregar o quitar recursos cambia el total del curso."""
+    progreso.programar_recalculo_curso(_curso_de_modulo(instance.modulo_id))
+
+
+@receiver(post_save, sender=Pregunta)
+@receiver(post_delete, sender=Pregunta)
+def pregunta_cambiada(sender, instance, **kwargs):
+    """El índice por dificultad del curso queda desactualizado."""
+    banco_preguntas.invalidar(_curso_de_modulo(instance.modulo_id))
+
+
+@receiver(post_save, sender=Examen)
+@receiver(post_delete, sender=Examen)
+def examen_cambiado(sender, instance, **kwargs):
+    """Crear, activar/desactivar o borrar exámenes cambia el total y los aprobados."""
+    progreso.programar_recalculo_curso(instance.curso_id)
+
+
+@receiver(post_save, sender=Inscripcion)
+def inscripcion_creada(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        progreso.inicializar_inscripcion(instance)
+
+
+@receiver(post_save, sender=Curso)
+@receiver(post_save, sender=RecursoComunidad)
+@receiver(post_save, sender=TemaForo)
+def documento_guardado(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Mantiene el índice de búsqueda al día; ignora guardados que no tocan texto (vistas, descargas)."""
+    if not raw:
+        busqueda.indexar(instance, update_fields)
+
+
+@receiver(post_delete, sender=Curso)
+@receiver(post_delete, sender=RecursoComunidad)
+@receiver(post_delete, sender=TemaForo)
+def documento_borrado(sender, instance, **kwargs):
+    busqueda.desindexar(instance)
+
+
+@receiver(post_save, sender=RespuestaForo)
+def respuesta_foro_creada(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        TemaForo.objects.filter(pk=instance.tema_id).update(
+            total_respuestas=models.F('total_respuestas') + 1,
+            ultima_actividad=instance.fecha_creacion
+        )
+
+
+@receiver(post_delete, sender=RespuestaForo)
+def respuesta_foro_borrada(sender, instance, **kwargs):
+    """Borrar es raro (admin); se recalcula el par desde las respuestas restantes."""
+    tema = TemaForo.objects.filter(pk=instance.tema_id).annotate(
+        conteo=models.Count('respuestas'),
+        ultima_respuesta=models.Max('respuestas__fecha_creacion'),
+    ).first()
+    if tema:
+        TemaForo.objects.filter(pk=tema.pk).update(
+            total_respuestas=tema.conteo,
+            ultima_actividad=tema.ultima_respuesta or tema.fecha_creacion,
+        )
+
+
+# --- Snapshots de mi_panel (cursos/panel.py) ---
+
+@receiver(post_save, sender=Inscripcion)
+@receiver(post_delete, sender=Inscripcion)
+@receiver(post_save, sender=IntentoExamen)
+def panel_estudiante_cambiado(sender, instance, raw=False, **kwargs):
+    if not raw:
+        panel.invalidar_estudiantes([instance.estudiante_id])
+
+
+@receiver(post_save, sender=ProximaActividad)
+@receiver(post_delete, sender=ProximaActividad)
+def actividad_cambiada(sender, instance, raw=False, **kwargs):
+    if not raw:
+        panel.invalidar_estudiantes([instance.estudiante_id])
+        panel.invalidar_administradores()
+
+
+@receiver(post_save, sender=Tutoria)
+@receiver(post_delete, sender=Tutoria)
+def tutoria_cambiada(sender, instance, raw=False, **kwargs):
+    if not raw:
+        panel.invalidar_creadores([instance.tutor_id])
+
+
+@receiver(post_save, sender=RecursoComunidad)
+@receiver(post_delete, sender=RecursoComunidad)
+def recurso_comunidad_cambiado(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Solo el alta, la baja y el cambio de ``activo`` mueven los conteos del panel."""
+    if raw or (update_fields is not None and 'activo' not in update_fields):
+        return
+    panel.invalidar_usuarios([instance.autor_id])
+    panel.invalidar_administradores()
+
+
+@receiver(post_delete, sender=RecursoComunidad)
+@receiver(post_delete, sender=FormularioEstudio)
+def archivo_liberado(sender, instance, **kwargs):
+    """Quita la referencia al archivo subido (el almacén lo borra si nadie más lo usa)."""
+    if instance.archivo:
+        instance.archivo.storage.delete(instance.archivo.name)
+
+
+@receiver(post_save, sender=Curso)
+def curso_del_panel_cambiado(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    """Los estudiantes inscritos ven título e imagen del curso en su panel."""
+    if raw or created:
+        return
+    if update_fields is not None and not set(update_fields) & {'titulo', 'imagen_portada'}:
+        return
+    panel.invalidar_estudiantes(
+        Inscripcion.objects.filter(curso_id=instance.pk).values_list('estudiante_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_save, sender=Creador)
+def usuario_del_panel_cambiado(sender, instance, raw=False, **kwargs):
+    if not raw:
+        panel.invalidar_usuarios([instance.pk if sender is Usuario else instance.id_usuario_id])
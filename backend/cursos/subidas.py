@@ -0,0 +1,165 @@
+"""
+Subidas por partes y reanudables de archivos de recursos de la comunidad y
+formularios de estudio.
+
+Un archivo de 50 MB en un solo ``multipart/form-data`` ocupa un worker sync todo
+lo que dure la transferencia y, si la conexión se cae, empieza de cero. Con
+sesiones de subida el cliente:
+
+1. ``POST /api/subidas/`` con ``nombre`` y ``tamano``: crea la sesión y recibe
+   ``tamano_parte``.
+2. ``PUT /api/subidas/<id>/partes/<n>/`` con los bytes de la parte ``n`` (desde
+   0) como cuerpo y, opcionalmente, ``X-Parte-SHA256``. Cada parte se agrega al
+   archivo temporal y se guarda su SHA-256; repetir una parte ya recibida con
+   el mismo contenido no hace nada, así que reintentar es seguro.
+3. ``GET /api/subidas/<id>/`` dice cuánto se ha recibido para reanudar.
+4. Manda ``subida`` en lugar de ``archivo`` al crear o actualizar el recurso o
+   formulario: el archivo temporal se mueve a ``MEDIA_ROOT`` y la sesión se
+   borra.
+
+nginx recibe el cuerpo completo de cada parte antes de pasarlo a gunicorn, así
+que el worker solo copia unos MB desde la red local. Las sesiones que pasan
+``SUBIDAS_TTL`` segundos sin recibir partes se borran con ``limpiar_subidas``.
+"""
+import fcntl
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+from .models import SubidaArchivo
+
+
+TAMANO_BLOQUE = 64 * 1024
+
+
+class ParteInvalida(Exception):
+    """La parte no se puede agregar; ``status`` es el código HTTP a responder."""
+
+    def __init__(self, mensaje, status=400):
+        super().__init__(mensaje)
+        self.status = status
+
+
+class ArchivoSubido(File):
+    """Archivo temporal de una sesión; ``FileSystemStorage`` lo mueve en vez de copiarlo."""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def ruta(subida):
+    return os.path.join(settings.SUBIDAS_DIR, f'{subida.pk}.parcial')
+
+
+def vencimiento():
+    return timezone.now() + timedelta(seconds=settings.SUBIDAS_TTL)
+
+
+def crear(usuario, nombre, tamano):
+    """Nueva sesión de ``usuario`` para un archivo de ``tamano`` bytes."""
+    os.makedirs(settings.SUBIDAS_DIR, exist_ok=True)
+    subida = SubidaArchivo.objects.create(
+        usuario=usuario, nombre=os.path.basename(nombre), tamano=tamano, expira=vencimiento()
+    )
+    open(ruta(subida), 'wb').close()
+    return subida
+
+
+def agregar_parte(subida, numero, flujo, longitud, sha256=''):
+    """
+    Agrega la parte ``numero`` leyendo ``longitud`` bytes de ``flujo``. Regresa
+    ``False`` si esa parte ya estaba (reintento) y ``True`` si se escribió.
+
+    Todo ocurre con un ``flock`` exclusivo sobre el archivo parcial: dos PUT de
+    la misma parte (un reintento mientras el original sigue en curso) se
+    turnan, y el segundo relee la sesión y ve la parte ya recibida en lugar de
+    truncar y reescribir los bytes del primero.
+    """
+    try:
+        archivo = open(ruta(subida), 'r+b')
+    except FileNotFoundError:
+        raise ParteInvalida('El archivo parcial ya no existe; crea otra subida', status=410) from None
+
+    with archivo:
+        fcntl.flock(archivo, fcntl.LOCK_EX)
+        subida.refresh_from_db(fields=['recibido', 'partes'])
+        if numero < len(subida.partes):
+            recibida = subida.partes[numero]
+            if sha256 and sha256 != recibida:
+                raise ParteInvalida(f'La parte {numero} ya se recibió con otro contenido', status=409)
+            return False
+        if numero > len(subida.partes):
+            raise ParteInvalida(f'Se esperaba la parte {len(subida.partes)}', status=409)
+        if subida.completa:
+            raise ParteInvalida('La subida ya está completa', status=409)
+        if longitud <= 0 or longitud > settings.SUBIDAS_TAMANO_PARTE:
+            raise ParteInvalida(f'Cada parte debe tener entre 1 y {settings.SUBIDAS_TAMANO_PARTE} bytes')
+        if subida.recibido + longitud > subida.tamano:
+            raise ParteInvalida('La parte rebasa el tamaño declarado')
+        if os.fstat(archivo.fileno()).st_size < subida.recibido:
+            raise ParteInvalida('El archivo parcial ya no existe; crea otra subida', status=410)
+
+        suma = hashlib.sha256()
+        # Descarta lo que haya quedado de un intento anterior cortado
+        archivo.truncate(subida.recibido)
+        archivo.seek(subida.recibido)
+        pendiente = longitud
+        while pendiente > 0:
+            bloque = flujo.read(min(TAMANO_BLOQUE, pendiente))
+            if not bloque:
+                break
+            pendiente -= len(bloque)
+            suma.update(bloque)
+            archivo.write(bloque)
+        if pendiente:
+            archivo.truncate(subida.recibido)
+            raise ParteInvalida('La parte llegó incompleta')
+        if sha256 and sha256 != suma.hexdigest():
+            archivo.truncate(subida.recibido)
+            raise ParteInvalida(f'El SHA-256 de la parte {numero} no coincide')
+        archivo.flush()
+
+        # Respaldo si el candado no aplica (p. ej. un NFS que ignora flock)
+        actualizadas = SubidaArchivo.objects.filter(pk=subida.pk, recibido=subida.recibido).update(
+            recibido=subida.recibido + longitud, partes=subida.partes + [suma.hexdigest()], expira=vencimiento()
+        )
+        if not actualizadas:
+            raise ParteInvalida('Otra petición agregó una parte al mismo tiempo; consulta la subida', status=409)
+    subida.recibido += longitud
+    subida.partes = subida.partes + [suma.hexdigest()]
+    return True
+
+
+def archivo(subida):
+    """``File`` listo para asignarse a un ``FileField``."""
+    return ArchivoSubido(open(ruta(subida), 'rb'), name=subida.nombre)
+
+
+def borrar(subida):
+    """Borra la sesión y su archivo temporal (si no se movió ya)."""
+    try:
+        os.remove(ruta(subida))
+    except FileNotFoundError:
+        pass
+    subida.delete()
+
+
+def limpiar(ahora=None):
+    """Borra las sesiones vencidas y los temporales sin sesión. Regresa cuántas sesiones borró."""
+    ahora = ahora or timezone.now()
+    vencidas = list(SubidaArchivo.objects.filter(expira__lt=ahora))
+    for subida in vencidas:
+        borrar(subida)
+    if os.path.isdir(settings.SUBIDAS_DIR):
+        # Solo temporales viejos: uno recién creado puede no tener su fila visible todavía
+        limite = (ahora - timedelta(seconds=settings.SUBIDAS_TTL)).timestamp()
+        vigentes = {f'{pk}.parcial' for pk in SubidaArchivo.objects.values_list('pk', flat=True)}
+        for nombre in os.listdir(settings.SUBIDAS_DIR):
+            temporal = os.path.join(settings.SUBIDAS_DIR, nombre)
+            if nombre not in vigentes and os.path.getmtime(temporal) < limite:
+                os.remove(temporal)
+    return len(vencidas)
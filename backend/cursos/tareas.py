@@ -0,0 +1,78 @@
+"""
+Tareas en segundo plano de cursos (ver ``tareas/cola.py``). Reciben ids y no
+instancias: para cuando se ejecutan la fila pudo cambiar o desaparecer.
+"""
+from django.core.management import call_command
+from django.db import models
+
+from tareas.cola import tarea
+from .models import CalificacionRecurso, Curso, Notificacion, RecursoComunidad, Tutoria
+from . import progreso, subidas
+
+
+@tarea()
+def recalcular_curso(curso_id):
+    """Ver ``progreso.programar_recalculo_curso``."""
+    if Curso.objects.filter(pk=curso_id).exists():
+        progreso.recalcular_curso(curso_id)
+
+
+@tarea()
+def notificar_solicitud_tutoria(tutoria_id):
+    """Avisa al tutor de una solicitud nueva y confirma al estudiante que se registró."""
+    tutoria = (
+        Tutoria.objects.select_related('tutor', 'estudiante', 'curso')
+        .filter(pk=tutoria_id).first()
+    )
+    if tutoria is None:
+        return
+    Notificacion.objects.bulk_create([
+        Notificacion(
+            usuario_id=tutoria.tutor.id_usuario_id,
+            titulo='Nueva solicitud de tutoria',
+            mensaje=f"Tienes una solicitud sobre: {tutoria.tema or (tutoria.curso.titulo if tutoria.curso else 'Tutoria')}",
+            tipo='info',
+        ),
+        Notificacion(
+            usuario_id=tutoria.estudiante.id_usuario_id,
+            titulo='Solicitud enviada',
+            mensaje='Tu solicitud de tutoria ha sido registrada.',
+            tipo='success',
+        ),
+    ])
+
+
+def promedio_calificaciones(recurso_id):
+    promedio = CalificacionRecurso.objects.filter(
+        recurso_id=recurso_id
+    ).aggregate(promedio=models.Avg('calificacion'))['promedio'] or 0
+    return round(promedio, 2)
+
+
+@tarea()
+def actualizar_calificacion_recurso(recurso_id):
+    """Guarda en ``calificacion_promedio`` el promedio actual de las calificaciones."""
+    RecursoComunidad.objects.filter(pk=recurso_id).update(
+        calificacion_promedio=promedio_calificaciones(recurso_id)
+    )
+
+
+@tarea()
+def borrar_curso(curso_id):
+    """
+    Borra un curso ya desactivado y todo lo que cuelga de él (módulos, recursos,
+    exámenes, inscripciones, foro...).
+    """
+    curso = Curso.objects.filter(pk=curso_id, activo=False).first()
+    if curso is not None:
+        curso.delete()
+
+
+@tarea()
+def limpiar_subidas():
+    subidas.limpiar()
+
+
+@tarea()
+def reconciliar_votos():
+    call_command('reconciliar_votos')
@@ -1,3 +1,1415 @@
-from django.test import TestCase
+"""
+Presupuesto de consultas SQL de cada ruta de la API (ver ``cursos/presupuestos.py``).
 
-# Create your tests here.
+Cada lectura se mide dos veces: con ``PEQUENO`` objetos de cada tipo y después
+de agregar ``CRECIMIENTO`` más. Debe quedar dentro de su presupuesto en ambos
+casos y hacer el mismo número de consultas: una consulta por fila (N+1) hace
+crecer la cuenta y la prueba falla mostrando el SQL. Las escrituras se miden una
+vez sobre el fixture grande, cada una en una transacción que se revierte.
+
+``ProgresoTests`` cubre los contadores de ``cursos/progreso.py``,
+``CatalogoTests`` el catálogo por lotes de ``CursoViewSet.list``,
+``BusquedaTests`` los filtros y la paginación de ``cursos/busqueda.py``,
+``ForoTests`` los contadores desnormalizados de los temas del foro y los votos,
+``ExamenesTests`` la calificación, los conjuntos fijos de preguntas, el banco
+de preguntas y los simuladores,
+``PanelTests`` los snapshots de ``cursos/panel.py``,
+``VistasAsyncTests`` las vistas ASGI de ``cursos/vistas_async.py``,
+``ContadoresTests`` el buffer de ``cursos/contadores.py``,
+``EntregaArchivosTests`` la entrega de archivos de ``estudiapro/entrega.py``,
+``SubidasTests`` las subidas por partes de ``cursos/subidas.py`` y
+``AlmacenamientoPorContenidoTests`` la deduplicación de ``cursos/almacenamiento.py``.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+
+from estudiapro.instrumentacion import presupuesto
+from usuarios import urls as usuarios_urls
+from usuarios.models import Administrador, Creador, Estudiante, Usuario
+from . import banco_preguntas, busqueda, contadores, progreso, subidas, urls as cursos_urls, vistas_async
+from .models import (
+    BlobArchivo, CalificacionRecurso, Curso, DescargaRecurso, DetalleRespuesta, Examen, Formulario,
+    FormularioEstudio, Inscripcion, IntentoExamen, Logro, LogroEstudiante, Modulo, Notificacion, Pregunta,
+    PreguntaExamen, PreguntaFormulario, ProgresoRecurso, ProximaActividad, Recurso, RecursoComunidad, RespuestaForo,
+    RespuestaFormulario, SubidaArchivo, TemaForo, TutorPerfil, Tutoria, VotoRespuesta,
+)
+from .presupuestos import HOLGURA, PRESUPUESTOS
+
+
+PEQUENO = 5
+CRECIMIENTO = 45
+
+# (nombre de URL, rol, muestra para el pk, query string)
+LECTURAS = [
+    ('curso-list', 'estudiante', None, {}),
+    ('curso-detail', 'estudiante', 'curso', {}),
+    ('curso-mi-progreso', 'estudiante', 'curso', {}),
+    ('curso-modulos', 'estudiante', 'curso', {}),
+    ('recurso-list', 'estudiante', None, {}),
+    ('recurso-mis-compras', 'estudiante', None, {}),
+    ('recurso-detail', 'estudiante', 'recurso', {}),
+    ('pregunta-list', 'estudiante', None, {}),
+    ('pregunta-por-dificultad', 'estudiante', None, {'dificultad': 'MEDIA'}),
+    ('pregunta-por-modulo', 'estudiante', None, {'modulo_id': 'modulo'}),
+    ('pregunta-detail', 'estudiante', 'pregunta', {}),
+    ('examen-list', 'estudiante', None, {}),
+    ('examen-plantillas', 'estudiante', None, {'courseId': 'curso'}),
+    ('examen-detail', 'estudiante', 'examen', {}),
+    ('foro-list', 'estudiante', None, {}),
+    ('foro-buscar', 'estudiante', None, {'q': 'derivadas'}),
+    ('foro-detail', 'estudiante', 'tema', {}),
+    ('recurso-comunidad-list', 'estudiante', None, {}),
+    ('recurso-comunidad-buscar', 'estudiante', None, {}),
+    ('recurso-comunidad-mis-recursos', 'estudiante', None, {}),
+    ('recurso-comunidad-por-curso', 'estudiante', None, {'curso_id': 'curso'}),
+    ('recurso-comunidad-detail', 'estudiante', 'recurso_comunidad', {}),
+    # Sin archivo subido: responde 404 después de buscar el recurso
+    ('recurso-comunidad-archivo', 'estudiante', 'recurso_comunidad', {}),
+    ('formulario-list', 'estudiante', None, {}),
+    ('formulario-disponibles', 'estudiante', None, {}),
+    ('formulario-mis-formularios', 'creador', None, {}),
+    ('formulario-detail', 'estudiante', 'formulario', {}),
+    ('formulario-resultados', 'creador', 'formulario', {}),
+    ('formulario-estudio-list', 'estudiante', None, {}),
+    ('formulario-estudio-detail', 'estudiante', 'formulario_estudio', {}),
+    ('formulario-estudio-archivo', 'estudiante', 'formulario_estudio', {}),
+    ('subida-detail', 'estudiante', 'subida', {}),
+    ('proxima-actividad-list', 'estudiante', None, {}),
+    ('proxima-actividad-detail', 'estudiante', 'proxima_actividad', {}),
+    ('tutor-list', 'estudiante', None, {}),
+    ('tutor-me', 'creador', None, {}),
+    ('tutor-detail', 'estudiante', 'tutor', {}),
+    ('notificacion-list', 'estudiante', None, {}),
+    ('notificacion-detail', 'estudiante', 'notificacion', {}),
+    ('mi-panel', 'estudiante', None, {}),
+    ('mis-cursos', 'estudiante', None, {}),
+    ('buscar-cursos', 'estudiante', None, {'q': 'calculo'}),
+    ('recursos-mis-compras', 'estudiante', None, {}),
+    ('mi-progreso-detallado', 'estudiante', None, {}),
+    ('logros', 'estudiante', None, {}),
+    ('mis-logros', 'estudiante', None, {}),
+    ('profile', 'estudiante', None, {}),
+    ('verificar-rol', 'estudiante', None, {}),
+    ('manage-users', 'administrador', None, {}),
+]
+
+# Rutas heredadas de RecursoComunidadViewSet que hoy responden 500 sobre ProximaActividad
+SIN_MEDIR = {
+    'proxima-actividad-buscar', 'proxima-actividad-mis-recursos', 'proxima-actividad-por-curso',
+    'proxima-actividad-calificar',
+}
+
+
+def _nombres_de_rutas():
+    def recorrer(patrones):
+        for patron in patrones:
+            if isinstance(patron, URLResolver):
+                yield from recorrer(patron.url_patterns)
+            elif patron.name and patron.name != 'api-root':
+                yield patron.name
+    return set(recorrer(cursos_urls.urlpatterns)) | set(recorrer(usuarios_urls.urlpatterns))
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class PresupuestoConsultasTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temporales = tempfile.TemporaryDirectory()
+        cls.enterClassContext(override_settings(
+            MEDIA_ROOT=cls.temporales.name, SUBIDAS_DIR=os.path.join(cls.temporales.name, '.subidas'),
+        ))
+        cls.addClassCleanup(cls.temporales.cleanup)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        def usuario(nombre, rol):
+            return Usuario.objects.create_user(nombre, f'{nombre}@example.com', 'clave123', rol=rol)
+
+        cls.admin = usuario('admin', 'ADMINISTRADOR')
+        Administrador.objects.create(id_usuario=cls.admin, permiso='TOTAL')
+        cls.creador_usuario = usuario('creador', 'CREADOR')
+        cls.creador = Creador.objects.create(id_usuario=cls.creador_usuario, especialidad='Cálculo')
+        TutorPerfil.objects.create(creador=cls.creador, materias='Cálculo', activo=True)
+        cls.estudiante_usuario = usuario('estudiante', 'ESTUDIANTE')
+        cls.estudiante = Estudiante.objects.create(id_usuario=cls.estudiante_usuario, nivel_escolar='Universidad')
+        cls.tokens = {
+            'administrador': Token.objects.create(user=cls.admin).key,
+            'creador': Token.objects.create(user=cls.creador_usuario).key,
+            'estudiante': Token.objects.create(user=cls.estudiante_usuario).key,
+        }
+        cls.formulario = Formulario.objects.create(
+            titulo='Encuesta', descripcion='Fin de curso', tipo='ENCUESTA', creador=cls.creador_usuario
+        )
+        cls.preguntas_formulario = [
+            PreguntaFormulario.objects.create(formulario=cls.formulario, texto_pregunta=texto, tipo=tipo, orden=orden)
+            for orden, (texto, tipo) in enumerate([
+                ('¿Qué tan útil fue?', 'ESCALA'), ('¿Lo recomiendas?', 'SI_NO'), ('Comentarios', 'TEXTO_LARGO'),
+            ])
+        ]
+        cls.curso_libre = Curso.objects.create(titulo='Física', descripcion='Sin inscritos', creador=cls.creador)
+        cls.creados = 0
+        cls.crecer(PEQUENO)
+        cls.muestras = {
+            'curso': Curso.objects.exclude(pk=cls.curso_libre.pk).first().pk,
+            'curso_libre': cls.curso_libre.pk,
+            'modulo': Modulo.objects.first().pk,
+            'recurso': Recurso.objects.first().pk,
+            'pregunta': Pregunta.objects.first().pk,
+            'examen': Examen.objects.first().pk,
+            'tema': TemaForo.objects.first().pk,
+            'respuesta': RespuestaForo.objects.first().pk,
+            'recurso_comunidad': RecursoComunidad.objects.filter(autor=cls.estudiante_usuario).first().pk,
+            'formulario': cls.formulario.pk,
+            'formulario_estudio': FormularioEstudio.objects.first().pk,
+            'proxima_actividad': ProximaActividad.objects.first().pk,
+            'tutor': cls.creador.pk,
+            'tutoria': Tutoria.objects.first().pk,
+            'notificacion': Notificacion.objects.first().pk,
+            'usuario': Estudiante.objects.exclude(pk=cls.estudiante.pk).first().id_usuario_id,
+            'subida': subidas.crear(cls.estudiante_usuario, 'guia.pdf', 1024).pk,
+        }
+        cls.muestras['estudiante_usuario'] = cls.estudiante_usuario.pk
+        cls.muestras['admin'] = cls.admin.pk
+
+        # Caminos más caros de algunas escrituras: sin conjunto de preguntas
+        # congelado, un voto nuevo y un simulador que se regenera
+        curso = Curso.objects.get(pk=cls.muestras['curso'])
+        cls.muestras['examen_sin_conjunto'] = Examen.objects.create(
+            curso=curso, titulo='Examen sin conjunto', tipo='PRACTICA', duracion_minutos=30, numero_preguntas=2
+        ).pk
+        cls.muestras['respuesta_sin_voto'] = RespuestaForo.objects.create(
+            tema=TemaForo.objects.exclude(pk=cls.muestras['tema']).first(), autor=cls.creador_usuario,
+            contenido='Sin votos',
+        ).pk
+        simulador = Examen.objects.create(
+            curso=curso, titulo='Simulador de Examen - Intermedio', tipo='SIMULADOR', duracion_minutos=30,
+            numero_preguntas=2,
+        )
+        for orden, pregunta in enumerate(Pregunta.objects.filter(modulo__curso=curso)):
+            PreguntaExamen.objects.create(examen=simulador, pregunta=pregunta, orden=orden)
+
+    @classmethod
+    def crecer(cls, cantidad):
+        """Agrega ``cantidad`` objetos de cada tipo que listan las lecturas."""
+        hoy = timezone.localdate()
+        for _ in range(cantidad):
+            cls.creados += 1
+            i = cls.creados
+            otro = Usuario.objects.create_user(f'alumno{i}', f'alumno{i}@example.com', 'clave123', rol='ESTUDIANTE')
+            Estudiante.objects.create(id_usuario=otro, nivel_escolar='Universidad')
+            tutor = Usuario.objects.create_user(f'tutor{i}', f'tutor{i}@example.com', 'clave123', rol='CREADOR')
+            TutorPerfil.objects.create(creador=Creador.objects.create(id_usuario=tutor, especialidad='Física'), activo=True)
+
+            curso = Curso.objects.create(titulo=f'Cálculo {i}', descripcion='Límites y derivadas', creador=cls.creador)
+            modulo = Modulo.objects.create(curso=curso, titulo='Límites', orden=1)
+            Recurso.objects.create(modulo=modulo, titulo=f'Video {i}', tipo='VIDEO', contenido_url='https://example.com/v')
+            preguntas = [
+                Pregunta.objects.create(
+                    modulo=modulo, texto_pregunta=f'Pregunta {i}.{j}', opcion_a='1', opcion_b='2', opcion_c='3',
+                    opcion_d='4', respuesta_correcta='A', dificultad='MEDIA',
+                )
+                for j in range(2)
+            ]
+            examen = Examen.objects.create(
+                curso=curso, modulo=modulo, titulo=f'Examen {i}', tipo='PRACTICA', duracion_minutos=30, numero_preguntas=2
+            )
+            for orden, pregunta in enumerate(preguntas):
+                PreguntaExamen.objects.create(examen=examen, pregunta=pregunta, orden=orden)
+            Inscripcion.objects.create(estudiante=cls.estudiante, curso=curso)
+            IntentoExamen.objects.create(
+                estudiante=cls.estudiante, examen=examen, completado=True, aprobado=True, puntaje_obtenido=90
+            )
+
+            tema = TemaForo.objects.create(titulo=f'Dudas de derivadas {i}', contenido='¿Regla de la cadena?',
+                                           autor=cls.estudiante_usuario, curso=curso)
+            for autor in (otro, cls.creador_usuario):
+                respuesta = RespuestaForo.objects.create(tema=tema, autor=autor, contenido='Se deriva por partes')
+                VotoRespuesta.objects.create(respuesta=respuesta, usuario=cls.estudiante_usuario, tipo='UP')
+
+            for autor in (cls.estudiante_usuario, otro):
+                recurso = RecursoComunidad.objects.create(
+                    titulo=f'Apuntes {i}', descripcion='Resumen', tipo='DOCUMENTO', autor=autor, curso=curso,
+                    archivo_url='https://example.com/a.pdf', aprobado=True,
+                )
+                CalificacionRecurso.objects.create(recurso=recurso, usuario=cls.estudiante_usuario, calificacion=5)
+
+            Formulario.objects.create(titulo=f'Encuesta {i}', descripcion='Opinión', tipo='FEEDBACK', creador=cls.creador_usuario)
+            # resultados recorre las preguntas: también crecen
+            cls.preguntas_formulario.append(PreguntaFormulario.objects.create(
+                formulario=cls.formulario, texto_pregunta=f'Pregunta {i}', tipo='OPCION_MULTIPLE', orden=3 + i
+            ))
+            respuesta_formulario = RespuestaFormulario.objects.create(formulario=cls.formulario, usuario=otro)
+            for pregunta in cls.preguntas_formulario:
+                DetalleRespuesta.objects.create(respuesta_formulario=respuesta_formulario, pregunta=pregunta,
+                                                respuesta_texto='Muy útil', respuesta_opcion='5')
+            FormularioEstudio.objects.create(titulo=f'Formulario {i}', archivo_url='https://example.com/f.pdf',
+                                             creado_por=cls.admin)
+
+            logro = Logro.objects.create(nombre=f'Logro {i}', descripcion='Constancia', tipo='PUNTOS', condicion_valor=100)
+            if i % 2:
+                LogroEstudiante.objects.create(estudiante=cls.estudiante, logro=logro, progreso_actual=50)
+            Notificacion.objects.create(usuario=cls.estudiante_usuario, titulo=f'Aviso {i}', mensaje='Nuevo material')
+            ProximaActividad.objects.create(estudiante=cls.estudiante, curso=curso, titulo=f'Repaso {i}',
+                                            fecha=hoy + timedelta(days=i))
+            Tutoria.objects.create(estudiante=cls.estudiante, tutor=cls.creador, curso=curso, tema='Derivadas')
+
+    def setUp(self):
+        cache.clear()
+
+    def _cliente(self, rol):
+        cliente = APIClient()
+        if rol:
+            cliente.credentials(HTTP_AUTHORIZATION=f'Token {self.tokens[rol]}')
+        return cliente
+
+    def _ruta(self, nombre, muestra=None, kwargs=None):
+        kwargs = dict(kwargs or {})
+        if muestra:
+            kwargs['pk'] = self.muestras[muestra]
+        return reverse(nombre, kwargs=kwargs)
+
+    def _medir(self, metodo, nombre, rol, ruta, datos=None):
+        """Respuesta y consultas de una petición en frío (sin caché de auth ni del panel)."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as capturadas:
+            if isinstance(datos, bytes):
+                opciones = {'content_type': 'application/octet-stream'}
+            else:
+                opciones = {'format': 'json' if metodo != 'get' else None}
+            respuesta = getattr(self._cliente(rol), metodo)(ruta, datos, **opciones)
+        self.assertLess(respuesta.status_code, 500, f'{metodo.upper()} {ruta} respondió {respuesta.status_code}')
+        return capturadas.captured_queries
+
+    def _sql(self, consultas):
+        return '\n'.join(f"  {i}. {consulta['sql']}" for i, consulta in enumerate(consultas, 1))
+
+    def assertDentroDePresupuesto(self, nombre, consultas, metodo='GET', contexto=''):
+        limite, _ = presupuesto(nombre, metodo)
+        if len(consultas) > limite:
+            self.fail(
+                f'{nombre}{contexto}: {len(consultas)} consultas, presupuesto {limite}\n{self._sql(consultas)}'
+            )
+
+    def _query(self, query):
+        return {clave: self.muestras.get(valor, valor) for clave, valor in query.items()}
+
+    def test_todas_las_rutas_tienen_presupuesto(self):
+        self.assertEqual(_nombres_de_rutas() - set(PRESUPUESTOS), set())
+        self.assertEqual(set(PRESUPUESTOS) - _nombres_de_rutas(), set())
+
+    def test_todas_las_lecturas_se_miden(self):
+        medidas = {nombre for nombre, *_ in LECTURAS} | {nombre for nombre, *_ in ESCRITURAS} | SIN_MEDIR
+        self.assertEqual(_nombres_de_rutas() - medidas, set())
+
+    def test_lecturas_constantes_al_crecer_los_datos(self):
+        antes = {}
+        for nombre, rol, muestra, query in LECTURAS:
+            ruta = self._ruta(nombre, muestra)
+            # La primera petición llena cachés del proceso (ContentType, detección de FTS...)
+            self._medir('get', nombre, rol, ruta, self._query(query))
+            antes[nombre] = self._medir('get', nombre, rol, ruta, self._query(query))
+
+        self.crecer(CRECIMIENTO)
+
+        for nombre, rol, muestra, query in LECTURAS:
+            with self.subTest(ruta=nombre):
+                despues = self._medir('get', nombre, rol, self._ruta(nombre, muestra), self._query(query))
+                self.assertDentroDePresupuesto(nombre, antes[nombre], contexto=f' con {PEQUENO} objetos')
+                self.assertDentroDePresupuesto(nombre, despues, contexto=f' con {PEQUENO + CRECIMIENTO} objetos')
+                if len(despues) != len(antes[nombre]):
+                    self.fail(
+                        f'{nombre}: {len(antes[nombre])} consultas con {PEQUENO} objetos y {len(despues)} con '
+                        f'{PEQUENO + CRECIMIENTO}\n{self._sql(despues)}'
+                    )
+
+    def test_catalogo_constante_con_500_cursos(self):
+        ruta = reverse('curso-list')
+        con_pocos = self._medir('get', 'curso-list', 'estudiante', ruta)
+        Curso.objects.bulk_create([
+            Curso(titulo=f'Curso {i}', descripcion='Catálogo', creador=self.creador) for i in range(500 - Curso.objects.count())
+        ])
+        con_500 = self._medir('get', 'curso-list', 'estudiante', ruta)
+        self.assertEqual(len(con_500), len(con_pocos), self._sql(con_500))
+        self.assertDentroDePresupuesto('curso-list', con_500, contexto=' con 500 cursos')
+
+    def _medir_escrituras(self):
+        """``(nombre, MÉTODO, consultas)`` de cada escritura, cada una en una transacción que se revierte."""
+        for nombre, metodo, rol, kwargs, cuerpo in ESCRITURAS:
+            with transaction.atomic():
+                ruta = self._ruta(nombre, kwargs=kwargs(self.muestras))
+                consultas = self._medir(metodo, nombre, rol, ruta, cuerpo(self.muestras))
+                transaction.set_rollback(True)
+            yield nombre, metodo.upper(), consultas
+
+    def test_escrituras_dentro_de_presupuesto(self):
+        self.crecer(CRECIMIENTO)
+        for nombre, metodo, consultas in self._medir_escrituras():
+            with self.subTest(ruta=nombre, metodo=metodo):
+                self.assertDentroDePresupuesto(nombre, consultas, metodo, f' ({metodo})')
+
+    def test_presupuestos_son_lo_medido(self):
+        """
+        Cada número de ``PRESUPUESTOS`` es el máximo medido en frío de las
+        peticiones que cubre (``consultas`` para los métodos sin entrada propia
+        en ``por_metodo``), más la ``HOLGURA`` declarada. Un presupuesto que
+        nada mide o que quedó por encima de lo medido también falla.
+        """
+        self.crecer(CRECIMIENTO)
+        medidas = []
+        for nombre, rol, muestra, query in LECTURAS:
+            ruta = self._ruta(nombre, muestra)
+            # Como en las lecturas: la primera petición llena cachés del proceso
+            self._medir('get', nombre, rol, ruta, self._query(query))
+            medidas.append((nombre, 'GET', self._medir('get', nombre, rol, ruta, self._query(query))))
+        medidas += self._medir_escrituras()
+
+        maximos = {}
+        for nombre, metodo, consultas in medidas:
+            llave = (nombre, metodo if metodo in PRESUPUESTOS[nombre].get('por_metodo', {}) else None)
+            maximos[llave] = max(maximos.get(llave, 0), len(consultas))
+
+        diferencias = []
+        for nombre, entrada in PRESUPUESTOS.items():
+            if nombre in SIN_MEDIR:
+                continue
+            esperados = {(nombre, None): entrada['consultas']}
+            esperados.update({(nombre, metodo): limite for metodo, limite in entrada.get('por_metodo', {}).items()})
+            for llave, limite in esperados.items():
+                medido = maximos.get(llave)
+                if medido is None:
+                    diferencias.append(f'{nombre} {llave[1] or "consultas"}: presupuesto {limite} sin medir')
+                elif medido + HOLGURA.get(llave, 0) != limite:
+                    diferencias.append(
+                        f'{nombre} {llave[1] or "consultas"}: medido {medido}, presupuesto {limite}'
+                        + (f' (holgura {HOLGURA[llave]})' if llave in HOLGURA else '')
+                    )
+        self.assertEqual(diferencias, [], '\n'.join(diferencias))
+
+
+def _pk(muestra):
+    return lambda m: {'pk': m[muestra]}
+
+
+def _sin_kwargs(m):
+    return {}
+
+
+def _vacio(m):
+    return {}
+
+
+def _subida(usuario_id, nombre='guia.pdf', contenido=b''):
+    """
+    Sesión de subida nueva, con ``contenido`` como única parte si se da.
+    Terminarla o borrarla toca archivos que la transacción revertida no
+    restaura, así que cada escritura crea la suya.
+    """
+    subida = subidas.crear(Usuario.objects.get(pk=usuario_id), nombre, len(contenido) or 1024)
+    if contenido:
+        subidas.agregar_parte(subida, 0, BytesIO(contenido), len(contenido))
+    return subida.pk
+
+
+# (nombre de URL, método, rol, kwargs de la ruta, cuerpo)
+ESCRITURAS = [
+    ('register', 'post', None, _sin_kwargs, lambda m: {
+        'username': 'nuevo', 'email': 'nuevo@example.com', 'password': 'clave123', 'password_confirm': 'clave123',
+        'rol': 'ESTUDIANTE', 'nivel_escolar': 'Universidad',
+    }),
+    ('register', 'post', None, _sin_kwargs, lambda m: {
+        'username': 'nueva', 'email': 'nueva@example.com', 'password': 'clave123', 'password_confirm': 'clave123',
+        'rol': 'CREADOR', 'especialidad': 'Física',
+    }),
+    ('login', 'post', None, _sin_kwargs, lambda m: {'username': 'estudiante', 'password': 'clave123'}),
+    # Sin token previo: lo crea
+    ('login', 'post', None, _sin_kwargs, lambda m: {'username': 'alumno1', 'password': 'clave123'}),
+    ('logout', 'post', 'estudiante', _sin_kwargs, _vacio),
+    ('activate-premium', 'post', 'estudiante', _sin_kwargs, _vacio),
+    ('track-time', 'post', 'estudiante', _sin_kwargs, lambda m: {'minutes': 5}),
+    ('manage-user-detail', 'put', 'administrador', _pk('usuario'), lambda m: {'is_premium': True}),
+    ('manage-user-detail', 'delete', 'administrador', _pk('usuario'), _vacio),
+    ('curso-list', 'post', 'administrador', _sin_kwargs, lambda m: {
+        'titulo': 'Álgebra', 'descripcion': 'Matrices', 'temario': [{'titulo': 'Matrices'}],
+    }),
+    ('curso-detail', 'put', 'administrador', _pk('curso'), lambda m: {
+        'titulo': 'Cálculo I', 'descripcion': 'Límites y derivadas',
+    }),
+    ('curso-detail', 'patch', 'administrador', _pk('curso'), lambda m: {'titulo': 'Cálculo I'}),
+    ('curso-detail', 'delete', 'administrador', _pk('curso'), _vacio),
+    ('curso-inscribirse', 'post', 'estudiante', _pk('curso_libre'), _vacio),
+    ('curso-desinscribirse', 'post', 'estudiante', _pk('curso'), _vacio),
+    ('recurso-marcar-completado', 'post', 'estudiante', _pk('recurso'), lambda m: {'tiempo_dedicado': 5}),
+    # recursos/comprar/ y recursos/descargar/ quedan detrás de recursos/<pk>/ del router (405)
+    ('recursos-comprar', 'post', 'estudiante', _sin_kwargs, lambda m: {'resourceId': m['recurso']}),
+    ('recursos-descargar', 'post', 'estudiante', _sin_kwargs, lambda m: {'resourceId': m['recurso']}),
+    # Regenera el simulador "Intermedio" del curso: borra el anterior y crea 5 preguntas
+    ('examen-generar-simulador', 'post', 'administrador', _sin_kwargs, lambda m: {
+        'courseId': m['curso'], 'questionsCount': 5, 'difficulty': 'MEDIA', 'questions': [
+            {'text': f'Derivada {i}', 'options': ['1', '2', '3', '4'], 'answer': 'A', 'difficulty': 'MEDIA'}
+            for i in range(5)
+        ],
+    }),
+    ('examen-iniciar', 'post', 'estudiante', _pk('examen'), _vacio),
+    # Primera vez: congela el conjunto de preguntas
+    ('examen-iniciar', 'post', 'estudiante', _pk('examen_sin_conjunto'), _vacio),
+    ('examen-enviar-respuestas', 'post', 'estudiante', _pk('examen'), lambda m: {'answers': {}}),
+    ('foro-list', 'post', 'estudiante', _sin_kwargs, lambda m: {
+        'titulo': 'Integrales', 'contenido': '¿Por partes?', 'curso': m['curso'],
+    }),
+    ('foro-detail', 'delete', 'estudiante', _pk('tema'), _vacio),
+    ('foro-responder', 'post', 'estudiante', _pk('tema'), lambda m: {'contenido': 'Gracias'}),
+    # Cambiar, quitar y registrar un voto
+    ('votar-respuesta', 'post', 'estudiante', lambda m: {'respuesta_id': m['respuesta']}, lambda m: {'tipo': 'DOWN'}),
+    ('votar-respuesta', 'post', 'estudiante', lambda m: {'respuesta_id': m['respuesta']}, lambda m: {'tipo': 'UP'}),
+    ('votar-respuesta', 'post', 'estudiante', lambda m: {'respuesta_id': m['respuesta_sin_voto']},
+     lambda m: {'tipo': 'UP'}),
+    ('recurso-comunidad-list', 'post', 'estudiante', _sin_kwargs, lambda m: {
+        'titulo': 'Guía', 'descripcion': 'Ejercicios', 'tipo': 'ENLACE', 'archivo_url': 'https://example.com/g',
+    }),
+    ('recurso-comunidad-detail', 'patch', 'estudiante', _pk('recurso_comunidad'), lambda m: {'titulo': 'Guía 2'}),
+    ('recurso-comunidad-detail', 'patch', 'estudiante', _pk('recurso_comunidad'),
+     lambda m: {'subida': _subida(m['estudiante_usuario'], contenido=b'%PDF' * 256)}),
+    ('recurso-comunidad-detail', 'put', 'estudiante', _pk('recurso_comunidad'), lambda m: {
+        'titulo': 'Guía 2', 'descripcion': 'Ejercicios', 'tipo': 'DOCUMENTO',
+        'subida': _subida(m['estudiante_usuario'], contenido=b'%PDF-1.7' * 128),
+    }),
+    ('recurso-comunidad-calificar', 'post', 'estudiante', _pk('recurso_comunidad'), lambda m: {'calificacion': 4}),
+    ('recurso-comunidad-descargar', 'post', 'estudiante', _pk('recurso_comunidad'), _vacio),
+    ('formulario-list', 'post', 'creador', _sin_kwargs, lambda m: {
+        'titulo': 'Sondeo', 'descripcion': 'Horarios', 'tipo': 'ENCUESTA',
+    }),
+    ('formulario-detail', 'patch', 'creador', _pk('formulario'), lambda m: {'titulo': 'Encuesta final'}),
+    ('formulario-responder', 'post', 'estudiante', _pk('formulario'), lambda m: {'respuestas': []}),
+    ('formulario-estudio-list', 'post', 'administrador', _sin_kwargs, lambda m: {
+        'title': 'Formulario de integrales',
+        'subida': _subida(m['admin'], 'formulario.pdf', b'%PDF-1.4' * 128),
+    }),
+    ('formulario-estudio-detail', 'patch', 'administrador', _pk('formulario_estudio'), lambda m: {
+        'title': 'Formulario 1', 'url': 'https://example.com/f.pdf',
+    }),
+    ('subida-list', 'post', 'estudiante', _sin_kwargs, lambda m: {'nombre': 'guia.pdf', 'tamano': 1024}),
+    ('subida-parte', 'put', 'estudiante', lambda m: {'pk': _subida(m['estudiante_usuario']), 'numero': 0},
+     lambda m: b'%PDF' * 64),
+    ('subida-detail', 'delete', 'estudiante', lambda m: {'pk': _subida(m['estudiante_usuario'])}, _vacio),
+    # perform_create de ProximaActividadViewSet solo deja pasar administradores (403)
+    ('proxima-actividad-list', 'post', 'estudiante', _sin_kwargs, lambda m: {
+        'titulo': 'Examen parcial', 'tipo': 'EXAMEN', 'fecha': str(timezone.localdate() + timedelta(days=3)),
+    }),
+    ('tutor-me', 'put', 'creador', _sin_kwargs, lambda m: {'bio': 'Diez años de docencia'}),
+    ('tutor-agendar', 'post', 'estudiante', _sin_kwargs, lambda m: {'tutorId': m['tutor'], 'duration': 30}),
+    ('tutor-actualizar-solicitud', 'put', 'creador', lambda m: {'tutoria_id': m['tutoria']}, lambda m: {
+        'estado': 'ACEPTADA',
+    }),
+    ('notificacion-mark-read', 'post', 'estudiante', _sin_kwargs, lambda m: {'id': m['notificacion']}),
+    ('notificacion-delete-one', 'post', 'estudiante', _sin_kwargs, lambda m: {'id': m['notificacion']}),
+    ('notificacion-delete-all', 'post', 'estudiante', _sin_kwargs, _vacio),
+    ('actualizar-fecha-examen', 'put', 'estudiante', _sin_kwargs, lambda m: {
+        'subjectId': m['curso'], 'examDate': str(timezone.localdate() + timedelta(days=10)), 'examTime': '09:00',
+    }),
+]
+
+
+class DatosCurso:
+    """Un curso con dos recursos y un examen de dos preguntas, y un usuario por rol."""
+
+    @classmethod
+    def setUpTestData(cls):
+        def usuario(nombre, rol):
+            creado = Usuario.objects.create_user(nombre, f'{nombre}@example.com', 'clave123', rol=rol)
+            return creado, Token.objects.create(user=creado).key
+
+        cls.admin, token_admin = usuario('admin', 'ADMINISTRADOR')
+        Administrador.objects.create(id_usuario=cls.admin, permiso='TOTAL')
+        cls.creador_usuario, token_creador = usuario('creador', 'CREADOR')
+        cls.creador = Creador.objects.create(id_usuario=cls.creador_usuario, especialidad='Cálculo')
+        cls.estudiante_usuario, token_estudiante = usuario('estudiante', 'ESTUDIANTE')
+        cls.estudiante = Estudiante.objects.create(id_usuario=cls.estudiante_usuario, nivel_escolar='Universidad')
+        cls.tokens = {'administrador': token_admin, 'creador': token_creador, 'estudiante': token_estudiante}
+
+        cls.curso = Curso.objects.create(titulo='Cálculo diferencial', descripcion='Límites y derivadas',
+                                         creador=cls.creador)
+        cls.modulo = Modulo.objects.create(curso=cls.curso, titulo='Límites', orden=1)
+        cls.recursos = [
+            Recurso.objects.create(modulo=cls.modulo, titulo=f'Video {i}', tipo='VIDEO', orden=i)
+            for i in range(2)
+        ]
+        cls.preguntas = [
+            Pregunta.objects.create(
+                modulo=cls.modulo, texto_pregunta=f'¿Cuánto es {i} + 1?', opcion_a=str(i + 1), opcion_b='0',
+                opcion_c='-1', opcion_d='10', respuesta_correcta='A', dificultad='MEDIA',
+            )
+            for i in range(2)
+        ]
+        cls.examen = Examen.objects.create(
+            curso=cls.curso, modulo=cls.modulo, titulo='Parcial', tipo='PRACTICA', duracion_minutos=30,
+            numero_preguntas=2, puntaje_minimo_aprobacion=60,
+        )
+        for orden, pregunta in enumerate(cls.preguntas):
+            PreguntaExamen.objects.create(examen=cls.examen, pregunta=pregunta, orden=orden)
+
+    def _cliente(self, rol='estudiante'):
+        cliente = APIClient()
+        if rol:
+            cliente.credentials(HTTP_AUTHORIZATION=f'Token {self.tokens[rol]}')
+        return cliente
+
+    def _inscribir(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Inscripcion.objects.create(estudiante=self.estudiante, curso=self.curso)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    TAREAS_EAGER=True,
+)
+class ProgresoTests(DatosCurso, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            progreso.recalcular_curso(self.curso.pk)
+
+    def test_recurso_completado_cuenta_una_vez(self):
+        inscripcion = self._inscribir()
+        ruta = reverse('recurso-marcar-completado', kwargs={'pk': self.recursos[0].pk})
+        for _ in range(2):
+            respuesta = self._cliente().post(ruta, {'tiempo_dedicado': 5}, format='json')
+            self.assertEqual(respuesta.status_code, 200)
+            # 60% recursos (1 de 2) y 40% exámenes (0 de 1)
+            self.assertEqual(respuesta.data['progreso_curso'], 30.0)
+        inscripcion.refresh_from_db()
+        self.assertEqual(inscripcion.recursos_completados, 1)
+
+    def test_marcado_simultaneo_solo_gana_uno(self):
+        inscripcion = self._inscribir()
+        ProgresoRecurso.objects.create(inscripcion=inscripcion, recurso=self.recursos[0])
+        # Dos peticiones que leyeron la fila antes de que cualquiera la actualizara
+        primera, segunda = (ProgresoRecurso.objects.get(inscripcion=inscripcion) for _ in range(2))
+        self.assertTrue(progreso.marcar_recurso_completado(primera))
+        self.assertFalse(progreso.marcar_recurso_completado(segunda))
+
+    def test_examen_aprobado_y_curso_completo(self):
+        inscripcion = self._inscribir()
+        for recurso in self.recursos:
+            self._cliente().post(reverse('recurso-marcar-completado', kwargs={'pk': recurso.pk}))
+        for puntaje in (90, 95):
+            intento = IntentoExamen.objects.create(
+                estudiante=self.estudiante, examen=self.examen, completado=True, puntaje_obtenido=puntaje
+            )
+            progreso.registrar_intento_examen(intento)
+        inscripcion.refresh_from_db()
+        self.assertEqual(inscripcion.examenes_aprobados, 1)
+        self.assertEqual(float(inscripcion.progreso_porcentaje), 100.0)
+        self.assertTrue(inscripcion.completado)
+
+    def test_recalculo_una_vez_por_transaccion(self):
+        # Los recursos de setUpTestData dejaron su recálculo pendiente en la transacción de la clase
+        curso = Curso.objects.create(titulo='Álgebra', descripcion='Matrices', creador=self.creador)
+        modulo = Modulo.objects.create(curso=curso, titulo='Matrices', orden=1)
+        with mock.patch('cursos.tareas.recalcular_curso.encolar') as encolar:
+            with self.captureOnCommitCallbacks(execute=True):
+                for i in range(3):
+                    Recurso.objects.create(modulo=modulo, titulo=f'Lectura {i}', tipo='LECTURA')
+            encolar.assert_called_once_with(curso.pk)
+
+            # Una transacción revertida no deja el curso marcado como pendiente
+            with transaction.atomic():
+                Recurso.objects.create(modulo=modulo, titulo='Revertida', tipo='LECTURA')
+                transaction.set_rollback(True)
+            with self.captureOnCommitCallbacks(execute=True):
+                Recurso.objects.create(modulo=modulo, titulo='Lectura 3', tipo='LECTURA')
+            self.assertEqual(encolar.call_count, 2)
+
+        progreso.recalcular_curso(curso.pk)
+        curso.refresh_from_db()
+        self.assertEqual(curso.total_recursos, 4)
+
+
+class CatalogoTests(DatosCurso, TestCase):
+
+    def test_catalogo_igual_al_armado_curso_por_curso(self):
+        from .views import _course_to_catalog
+
+        otro = Curso.objects.create(titulo='Álgebra', descripcion='Matrices', creador=self.creador, profesor='')
+        for orden, titulo in ((2, 'Determinantes'), (1, 'Matrices')):
+            Modulo.objects.create(curso=otro, titulo=titulo, orden=orden)
+        inscripcion = self._inscribir()
+        Inscripcion.objects.filter(pk=inscripcion.pk).update(progreso_porcentaje=42.5)
+
+        catalogo = self._cliente().get(reverse('curso-list')).data
+        esperado = [
+            _course_to_catalog(curso, self.estudiante_usuario)
+            for curso in Curso.objects.filter(activo=True).order_by('id')
+        ]
+        self.assertEqual(sorted(catalogo, key=lambda curso: curso['id']), esperado)
+        por_id = {curso['id']: curso for curso in catalogo}
+        self.assertEqual(por_id[self.curso.pk]['progress'], 42.5)
+        self.assertEqual(por_id[otro.pk]['progress'], 0)
+        self.assertEqual([modulo['title'] for modulo in por_id[otro.pk]['temario']], ['Matrices', 'Determinantes'])
+        self.assertEqual(por_id[otro.pk]['professor'], 'creador')
+
+    def test_busqueda_usa_el_mismo_formato(self):
+        respuesta = self._cliente().get(reverse('buscar-cursos'), {'q': 'derivadas'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([curso['id'] for curso in respuesta.data], [self.curso.pk])
+        self.assertEqual(respuesta.data[0]['temario'], [{'title': 'Límites', 'description': ''}])
+
+
+class BusquedaTests(DatosCurso, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        otro_usuario = Usuario.objects.create_user('otro', 'otro@example.com', 'clave123', rol='CREADOR')
+        otro = Creador.objects.create(id_usuario=otro_usuario, especialidad='Cálculo')
+        # Coinciden en el título (pesa más que la descripción), pero no pasan el filtro
+        for i in range(3):
+            Curso.objects.create(titulo=f'Derivadas {i}', descripcion='Derivadas', creador=otro)
+
+    def tearDown(self):
+        busqueda.obtener_backend.cache_clear()
+
+    def test_filtros_antes_del_limite(self):
+        cursos = Curso.objects.filter(creador=self.creador)
+        for backend in ('cursos.busqueda.BusquedaSimple', 'cursos.busqueda.BusquedaSQLite'):
+            busqueda.obtener_backend.cache_clear()
+            with self.subTest(backend=backend), override_settings(BUSQUEDA_BACKEND=backend):
+                self.assertEqual(busqueda.buscar(cursos, 'derivadas', limite=2), [self.curso])
+
+    def test_paginar_queryset_en_la_base(self):
+        Curso.objects.create(titulo='Álgebra', descripcion='Matrices', creador=self.creador)
+        peticion = Request(RequestFactory().get('/', {'page': 2, 'page_size': 2}))
+        cursos = Curso.objects.order_by('id')
+        with CaptureQueriesContext(connection) as consultas:
+            pagina = busqueda.paginar(peticion, cursos, lambda pagina: [curso.titulo for curso in pagina])
+        self.assertEqual(pagina['count'], 5)
+        self.assertEqual(pagina['results'], ['Derivadas 1', 'Derivadas 2'])
+        self.assertEqual(pagina['next'], 3)
+        # COUNT y la página con LIMIT/OFFSET, sin cargar todos los cursos
+        self.assertEqual(len(consultas), 2)
+        self.assertIn('LIMIT', consultas[1]['sql'])
+
+    def test_fts_no_disponible_se_vuelve_a_revisar(self):
+        busqueda.BusquedaSQLite._fts_confirmado.discard(connection.alias)
+        with mock.patch('cursos.busqueda.FTS_TABLE', 'no_existe'):
+            self.assertFalse(busqueda.BusquedaSQLite._fts_disponible(connection.alias))
+        self.assertTrue(busqueda.BusquedaSQLite._fts_disponible(connection.alias))
+        with self.assertNumQueries(0):
+            self.assertTrue(busqueda.BusquedaSQLite._fts_disponible(connection.alias))
+
+
+class ForoTests(DatosCurso, TestCase):
+
+    def _tema(self, titulo):
+        return TemaForo.objects.create(titulo=titulo, contenido='...', autor=self.estudiante_usuario, curso=self.curso)
+
+    def test_listado_con_conteos_y_ultima_actividad(self):
+        con_respuestas, sin_respuestas = self._tema('Límites laterales'), self._tema('Regla de la cadena')
+        for contenido in ('Primera', 'Segunda'):
+            respuesta = self._cliente('creador').post(
+                reverse('foro-responder', kwargs={'pk': con_respuestas.pk}), {'contenido': contenido}, format='json'
+            )
+            self.assertEqual(respuesta.status_code, 201)
+        ultima = RespuestaForo.objects.get(contenido='Segunda')
+
+        temas = self._cliente().get(reverse('foro-list')).data
+        # El tema con respuestas recientes sube aunque se haya creado antes
+        self.assertEqual([tema['id'] for tema in temas], [con_respuestas.pk, sin_respuestas.pk])
+        self.assertEqual([tema['postCount'] for tema in temas], [2, 0])
+        self.assertEqual(temas[0]['lastActivity'], ultima.fecha_creacion)
+        con_respuestas.refresh_from_db()
+        self.assertEqual((con_respuestas.total_respuestas, con_respuestas.ultima_actividad),
+                         (2, ultima.fecha_creacion))
+
+    def test_ultima_actividad_es_la_que_ordena(self):
+        viejo = self._tema('Límites laterales')
+        self._tema('Regla de la cadena')
+        # Como los datos sintéticos: la actividad no sale de las respuestas
+        TemaForo.objects.filter(pk=viejo.pk).update(ultima_actividad=timezone.now() + timedelta(days=1))
+        for parametros in ({}, {'cursor': ''}):
+            respuesta = self._cliente().get(reverse('foro-list'), parametros).data
+            temas = respuesta['results'] if parametros else respuesta
+            esperado = TemaForo.objects.order_by('-ultima_actividad', '-id').values_list('id', 'ultima_actividad')
+            self.assertEqual([(tema['id'], tema['lastActivity']) for tema in temas], list(esperado))
+
+    def test_borrar_respuestas_recalcula_el_tema(self):
+        tema = self._tema('Límites laterales')
+        primera, segunda = (
+            RespuestaForo.objects.create(tema=tema, autor=self.creador_usuario, contenido=contenido)
+            for contenido in ('Primera', 'Segunda')
+        )
+        segunda.delete()
+        tema.refresh_from_db()
+        self.assertEqual((tema.total_respuestas, tema.ultima_actividad), (1, primera.fecha_creacion))
+        primera.delete()
+        tema.refresh_from_db()
+        self.assertEqual((tema.total_respuestas, tema.ultima_actividad), (0, tema.fecha_creacion))
+
+    def test_votos_registrar_cambiar_y_quitar(self):
+        respuesta = RespuestaForo.objects.create(
+            tema=self._tema('Límites laterales'), autor=self.creador_usuario, contenido='Primera'
+        )
+        ruta = reverse('votar-respuesta', kwargs={'respuesta_id': respuesta.pk})
+        pasos = (('UP', 'Voto registrado', 1), ('DOWN', 'Voto actualizado', -1), ('DOWN', 'Voto eliminado', 0))
+        for tipo, mensaje, votos in pasos:
+            resultado = self._cliente().post(ruta, {'tipo': tipo}, format='json').data
+            self.assertEqual((resultado['message'], resultado['votes']), (mensaje, votos))
+        self.assertFalse(VotoRespuesta.objects.filter(respuesta=respuesta).exists())
+        self._cliente('creador').post(ruta, {'tipo': 'UP'}, format='json')
+        self.assertEqual(self._cliente().post(ruta, {'tipo': 'UP'}, format='json').data['votes'], 2)
+        self.assertEqual(self._cliente().post(ruta, {'tipo': 'MEH'}, format='json').status_code, 400)
+
+    def test_reconciliar_votos(self):
+        respuesta = RespuestaForo.objects.create(
+            tema=self._tema('Límites laterales'), autor=self.creador_usuario, contenido='Primera'
+        )
+        VotoRespuesta.objects.create(respuesta=respuesta, usuario=self.estudiante_usuario, tipo='UP')
+        VotoRespuesta.objects.create(respuesta=respuesta, usuario=self.admin, tipo='UP')
+        RespuestaForo.objects.filter(pk=respuesta.pk).update(votos=7)
+
+        salida = StringIO()
+        call_command('reconciliar_votos', '--dry-run', stdout=salida)
+        self.assertIn(f'Respuesta {respuesta.pk}: 7 -> 2', salida.getvalue())
+        respuesta.refresh_from_db()
+        self.assertEqual(respuesta.votos, 7)
+        call_command('reconciliar_votos', stdout=StringIO())
+        respuesta.refresh_from_db()
+        self.assertEqual(respuesta.votos, 2)
+
+    def test_reconciliar_no_pisa_un_voto_concurrente(self):
+        respuesta = RespuestaForo.objects.create(
+            tema=self._tema('Límites laterales'), autor=self.creador_usuario, contenido='Primera'
+        )
+        VotoRespuesta.objects.create(respuesta=respuesta, usuario=self.estudiante_usuario, tipo='UP')
+        RespuestaForo.objects.filter(pk=respuesta.pk).update(votos=7)
+
+        class VotoEntreLecturaYEscritura(StringIO):
+            # El reporte se escribe después de leer y antes de corregir
+            def write(salida, texto):
+                if not VotoRespuesta.objects.filter(usuario=self.creador_usuario).exists():
+                    self._cliente('creador').post(
+                        reverse('votar-respuesta', kwargs={'respuesta_id': respuesta.pk}), {'tipo': 'UP'}, format='json'
+                    )
+                return super().write(texto)
+
+        salida = VotoEntreLecturaYEscritura()
+        call_command('reconciliar_votos', stdout=salida)
+        self.assertIn(f'Respuesta {respuesta.pk}: 7 -> 1', salida.getvalue())
+        respuesta.refresh_from_db()
+        self.assertEqual(respuesta.votos, 2)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    TAREAS_EAGER=True,
+)
+class ExamenesTests(DatosCurso, TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def _enviar(self, respuestas):
+        ruta = reverse('examen-enviar-respuestas', kwargs={'pk': self.examen.pk})
+        return self._cliente().post(ruta, {'answers': respuestas}, format='json')
+
+    def test_calificacion_por_letra_o_por_texto(self):
+        primera, segunda = self.preguntas
+        # La primera por el texto de la opción correcta, la segunda con la letra equivocada
+        respuesta = self._enviar({str(primera.pk): '1', str(segunda.pk): 'b'})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual((respuesta.data['calificacion'], respuesta.data['correctas'], respuesta.data['total']),
+                         (50.0, 1, 2))
+        intento = IntentoExamen.objects.get(pk=respuesta.data['intento_id'])
+        self.assertFalse(intento.aprobado)
+        self.assertEqual(
+            sorted(intento.respuestas.values_list('pregunta_id', 'respuesta_seleccionada', 'es_correcta')),
+            [(primera.pk, '1', True), (segunda.pk, 'b', False)],
+        )
+
+        respuesta = self._enviar({str(primera.pk): 'A', str(segunda.pk): 'a'})
+        self.assertEqual(respuesta.data['calificacion'], 100.0)
+        self.assertTrue(IntentoExamen.objects.get(pk=respuesta.data['intento_id']).aprobado)
+
+    def test_pregunta_sin_responder_cuenta_como_incorrecta(self):
+        respuesta = self._enviar({str(self.preguntas[0].pk): 'A'})
+        self.assertEqual((respuesta.data['correctas'], respuesta.data['total']), (1, 2))
+        guardadas = IntentoExamen.objects.get(pk=respuesta.data['intento_id']).respuestas
+        self.assertEqual(guardadas.get(pregunta=self.preguntas[1]).respuesta_seleccionada, '')
+        self.assertEqual(self._enviar(['A']).status_code, 400)
+
+    def test_conjunto_de_preguntas_congelado(self):
+        examen = Examen.objects.create(
+            curso=self.curso, modulo=self.modulo, titulo='Quiz', tipo='PRACTICA', duracion_minutos=10,
+            numero_preguntas=1,
+        )
+        # El listado muestra las primeras del curso sin escribir el conjunto
+        listado = {item['id']: item for item in self._cliente().get(reverse('examen-list')).data}
+        self.assertEqual([pregunta['id'] for pregunta in listado[examen.pk]['questions']], [self.preguntas[0].pk])
+        self.assertFalse(PreguntaExamen.objects.filter(examen=examen).exists())
+
+        iniciar = reverse('examen-iniciar', kwargs={'pk': examen.pk})
+        self.assertEqual([p['id'] for p in self._cliente().post(iniciar).data['questions']], [self.preguntas[0].pk])
+        # Cambios posteriores al curso o al examen no alteran lo que ya se presentó
+        Examen.objects.filter(pk=examen.pk).update(numero_preguntas=2)
+        Pregunta.objects.create(modulo=self.modulo, texto_pregunta='Nueva', opcion_a='1', opcion_b='2',
+                                opcion_c='3', opcion_d='4', respuesta_correcta='A')
+        self.assertEqual([p['id'] for p in self._cliente().post(iniciar).data['questions']], [self.preguntas[0].pk])
+        respuesta = self._cliente().post(
+            reverse('examen-enviar-respuestas', kwargs={'pk': examen.pk}),
+            {'answers': {str(self.preguntas[0].pk): 'A'}}, format='json',
+        )
+        self.assertEqual((respuesta.data['total'], respuesta.data['calificacion']), (1, 100.0))
+
+    def test_banco_de_preguntas_en_cache(self):
+        primera, segunda = self.preguntas
+        self.assertEqual(banco_preguntas.ids_por_dificultad(self.curso.pk), {'MEDIA': [primera.pk, segunda.pk]})
+        with self.assertNumQueries(1):
+            # Solo el in_bulk: los ids salen de la caché
+            por_dificultad = banco_preguntas.preguntas_por_dificultad(self.curso.pk, limite=1)
+        self.assertEqual(por_dificultad, {'FACIL': [], 'MEDIA': [primera], 'DIFICIL': []})
+
+        # Guardar una pregunta invalida la entrada del curso
+        segunda.dificultad = 'DIFICIL'
+        segunda.save()
+        self.assertEqual(banco_preguntas.ids_por_dificultad(self.curso.pk),
+                         {'MEDIA': [primera.pk], 'DIFICIL': [segunda.pk]})
+
+    def test_simulador_rellenado_con_preguntas_distintas(self):
+        cuerpo = {'courseId': self.curso.pk, 'questionsCount': 5, 'difficulty': 'FACIL'}
+        # El banco por defecto solo tiene 2 fáciles: los 5 lugares repiten su contenido
+        simulador = self._cliente('administrador').post(reverse('examen-generar-simulador'), cuerpo, format='json')
+        self.assertEqual(simulador.status_code, 201)
+        ids = [pregunta['id'] for pregunta in simulador.data['questions']]
+        self.assertEqual(len(set(ids)), 5)
+        examen = Examen.objects.get(pk=simulador.data['id'])
+        self.assertEqual(list(examen.preguntas_examen.values_list('pregunta_id', flat=True)), ids)
+
+        respuestas = {str(pregunta['id']): pregunta['answer'] for pregunta in simulador.data['questions']}
+        calificado = self._cliente().post(
+            reverse('examen-enviar-respuestas', kwargs={'pk': examen.pk}), {'answers': respuestas}, format='json'
+        )
+        self.assertEqual((calificado.data['correctas'], calificado.data['total']), (5, 5))
+
+        # Regenerar reutiliza las mismas filas, copia por copia
+        total = Pregunta.objects.count()
+        otra = self._cliente('administrador').post(reverse('examen-generar-simulador'), cuerpo, format='json')
+        self.assertEqual([pregunta['id'] for pregunta in otra.data['questions']], ids)
+        self.assertEqual(Pregunta.objects.count(), total)
+
+    def test_banco_por_defecto_por_titulo_normalizado(self):
+        faciles = banco_preguntas.preguntas_por_defecto('Cálculo Diferencial', 'FACIL')
+        self.assertEqual(len(faciles), 2)
+        self.assertTrue(all(pregunta['difficulty'] == 'FACIL' for pregunta in faciles))
+        self.assertEqual([indice for indice, _ in banco_preguntas.preguntas_por_defecto_enumeradas(
+            'CALCULO DIFERENCIAL', 'FACIL')], [0, 4])
+        self.assertEqual(banco_preguntas.preguntas_por_defecto('Historia'), [])
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    TAREAS_EAGER=True,
+)
+class PanelTests(DatosCurso, TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def _panel(self):
+        respuesta = self._cliente().get(reverse('mi-panel'))
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.data
+
+    def test_snapshot_se_invalida_al_confirmar(self):
+        from . import views
+
+        with mock.patch('cursos.views._construir_panel', wraps=views._construir_panel) as construir:
+            self.assertEqual(self._panel()['mis_cursos'], [])
+            self._panel()
+            self.assertEqual(construir.call_count, 1)
+
+            # Una escritura revertida no toca el snapshot
+            with transaction.atomic():
+                Inscripcion.objects.create(estudiante=self.estudiante, curso=self.curso)
+                transaction.set_rollback(True)
+            self._panel()
+            self.assertEqual(construir.call_count, 1)
+
+            self._inscribir()
+            self.assertEqual([curso['titulo'] for curso in self._panel()['mis_cursos']], ['Cálculo diferencial'])
+            self.assertEqual(construir.call_count, 2)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.curso.titulo = 'Cálculo I'
+                self.curso.save(update_fields=['titulo'])
+            self.assertEqual([curso['titulo'] for curso in self._panel()['mis_cursos']], ['Cálculo I'])
+            self.assertEqual(construir.call_count, 3)
+
+    def test_snapshot_por_usuario_y_rol(self):
+        self._panel()
+        administrador = self._cliente('administrador').get(reverse('mi-panel'))
+        self.assertEqual(administrador.status_code, 200)
+        self.assertNotIn('mis_cursos', administrador.data)
+        self.assertEqual(self._cliente('creador').get(reverse('mi-panel')).status_code, 200)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class VistasAsyncTests(DatosCurso, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Curso.objects.create(titulo='Álgebra', descripcion='Matrices', creador=cls.creador, profesor='')
+        TemaForo.objects.create(titulo='Límites', contenido='...', autor=cls.estudiante_usuario, curso=cls.curso)
+        Notificacion.objects.create(usuario=cls.estudiante_usuario, titulo='Bienvenida', mensaje='Hola')
+        Logro.objects.create(nombre='Primer curso', descripcion='...', tipo='CURSO', condicion_valor=1)
+
+    def setUp(self):
+        cache.clear()
+
+    def _async(self, vista, token=True, **parametros):
+        cabeceras = {'Authorization': f"Token {self.tokens['estudiante']}"} if token else {}
+        peticion = AsyncRequestFactory().get('/', parametros, headers=cabeceras)
+        return async_to_sync(vista)(peticion)
+
+    def test_mismo_json_que_la_vista_sincrona(self):
+        self._inscribir()
+        rutas = (
+            (vistas_async.catalogo, 'curso-list'),
+            (vistas_async.notificaciones, 'notificacion-list'),
+            (vistas_async.foro, 'foro-list'),
+            (vistas_async.lista_logros, 'logros'),
+        )
+        for vista, nombre in rutas:
+            with self.subTest(ruta=nombre):
+                asincrona = self._async(vista)
+                sincrona = self._cliente().get(reverse(nombre))
+                self.assertEqual(asincrona.status_code, 200)
+                self.assertEqual(json.loads(asincrona.content), json.loads(sincrona.content))
+
+    def test_sin_token_y_peticiones_delegadas(self):
+        self.assertEqual(self._async(vistas_async.catalogo, token=False).status_code, 401)
+        # La paginación por cursor la atiende la vista de DRF
+        pagina = self._async(vistas_async.notificaciones, cursor='', page_size=1)
+        pagina.render()
+        self.assertEqual(len(json.loads(pagina.content)['results']), 1)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    CONTADORES_INTERVALO=3600,
+)
+class ContadoresTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user('lector', 'lector@example.com', 'clave123', rol='ESTUDIANTE')
+        cls.token = Token.objects.create(user=cls.usuario).key
+        cls.recurso = RecursoComunidad.objects.create(
+            titulo='Apuntes', descripcion='Resumen', tipo='DOCUMENTO', autor=cls.usuario,
+            archivo_url='https://example.com/a.pdf', aprobado=True,
+        )
+        cls.tema = TemaForo.objects.create(titulo='Límites', contenido='¿Cómo se calculan?', autor=cls.usuario)
+
+    def setUp(self):
+        cache.clear()
+        self.cliente = APIClient()
+        self.cliente.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        self.addCleanup(contadores._buffer.tomar)
+
+    def test_descargas_se_acumulan_hasta_el_volcado(self):
+        ruta = reverse('recurso-comunidad-descargar', kwargs={'pk': self.recurso.pk})
+        for esperado in (1, 2):
+            with self.captureOnCommitCallbacks(execute=True):
+                respuesta = self.cliente.post(ruta)
+            self.assertEqual(respuesta.data['total_descargas'], esperado)
+
+        self.recurso.refresh_from_db()
+        self.assertEqual(self.recurso.descargas, 0)
+        self.assertFalse(DescargaRecurso.objects.exists())
+        listado = self.cliente.get(reverse('recurso-comunidad-list'))
+        self.assertEqual(listado.data[0]['descargas'], 2)
+
+        with self.assertNumQueries(4):
+            self.assertEqual(contadores.volcar(), 2)
+        self.recurso.refresh_from_db()
+        self.assertEqual(self.recurso.descargas, 2)
+        self.assertEqual(DescargaRecurso.objects.filter(recurso=self.recurso, usuario=self.usuario).count(), 2)
+        self.assertEqual(contadores.pendiente('descargas', self.recurso.pk), 0)
+        self.assertEqual(self.cliente.get(reverse('recurso-comunidad-list')).data[0]['descargas'], 2)
+
+    def test_proximas_actividades_no_registran_descargas(self):
+        estudiante = Estudiante.objects.create(id_usuario=self.usuario, nivel_escolar='Universidad')
+        actividad = ProximaActividad.objects.create(estudiante=estudiante, titulo='Parcial', fecha=timezone.localdate())
+        ruta = reverse('proxima-actividad-detail', kwargs={'pk': actividad.pk}) + 'descargar/'
+        self.assertEqual(self.cliente.post(ruta).status_code, 404)
+        self.assertFalse(DescargaRecurso.objects.exists())
+
+    def test_vistas_del_foro_en_un_solo_update(self):
+        ruta = reverse('foro-detail', kwargs={'pk': self.tema.pk})
+        for _ in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.cliente.get(ruta)
+        self.assertEqual(contadores.pendiente('vistas', self.tema.pk), 3)
+
+        with self.assertNumQueries(3):
+            contadores.volcar()
+        self.tema.refresh_from_db()
+        self.assertEqual(self.tema.vistas, 3)
+
+    @override_settings(CONTADORES_COMPARTIDOS=False)
+    def test_sin_cache_atomica_cada_proceso_lee_lo_suyo(self):
+        ruta = reverse('foro-detail', kwargs={'pk': self.tema.pk})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cliente.get(ruta)
+        self.assertIsNone(cache.get(contadores._llave('vistas', self.tema.pk)))
+        self.assertEqual(contadores.pendiente('vistas', self.tema.pk), 1)
+        contadores.volcar()
+        self.assertEqual(contadores.pendiente('vistas', self.tema.pk), 0)
+
+    @override_settings(CONTADORES_COMPARTIDOS=True)
+    def test_con_cache_atomica_lo_pendiente_se_comparte(self):
+        ruta = reverse('foro-detail', kwargs={'pk': self.tema.pk})
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.cliente.get(ruta)
+        # Lo que otro worker publicó también cuenta
+        cache.incr(contadores._llave('vistas', self.tema.pk))
+        self.assertEqual(contadores.pendiente('vistas', self.tema.pk), 3)
+        contadores.volcar()
+        self.assertEqual(contadores.pendiente('vistas', self.tema.pk), 1)
+
+    @override_settings(CONTADORES_INTERVALO=0)
+    def test_sin_buffer_escribe_de_inmediato(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cliente.post(reverse('recurso-comunidad-descargar', kwargs={'pk': self.recurso.pk}))
+        self.recurso.refresh_from_db()
+        self.assertEqual(self.recurso.descargas, 1)
+        self.assertEqual(DescargaRecurso.objects.count(), 1)
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    ARCHIVOS_X_ACCEL_PREFIJO='',
+)
+class EntregaArchivosTests(TestCase):
+
+    CONTENIDO = b'%PDF-1.4 ' + bytes(range(256)) * 40
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media = tempfile.TemporaryDirectory()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media.name))
+        cls.addClassCleanup(cls.media.cleanup)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user('lectora', 'lectora@example.com', 'clave123', rol='ESTUDIANTE')
+        cls.token = Token.objects.create(user=cls.usuario).key
+        cls.recurso = RecursoComunidad.objects.create(
+            titulo='Apuntes', descripcion='Resumen', tipo='DOCUMENTO', autor=cls.usuario, aprobado=True,
+            archivo=SimpleUploadedFile('apuntes.pdf', cls.CONTENIDO, content_type='application/pdf'),
+        )
+        cls.ruta = reverse('recurso-comunidad-archivo', kwargs={'pk': cls.recurso.pk})
+
+    def setUp(self):
+        self.cliente = APIClient()
+        self.cliente.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def _cuerpo(self, respuesta):
+        return b''.join(respuesta.streaming_content)
+
+    def test_archivo_completo_con_etag(self):
+        self.assertEqual(self.recurso.hash_archivo, hashlib.sha256(self.CONTENIDO).hexdigest())
+        respuesta = self.cliente.get(self.ruta)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(self._cuerpo(respuesta), self.CONTENIDO)
+        self.assertEqual(respuesta['ETag'], f'"{self.recurso.hash_archivo}"')
+        self.assertEqual(respuesta['Accept-Ranges'], 'bytes')
+        self.assertEqual(respuesta['Cache-Control'], 'private, no-cache')
+
+    def test_etag_vigente_responde_304(self):
+        respuesta = self.cliente.get(self.ruta, HTTP_IF_NONE_MATCH=f'"{self.recurso.hash_archivo}"')
+        self.assertEqual(respuesta.status_code, 304)
+
+    def test_rangos(self):
+        respuesta = self.cliente.get(self.ruta, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(respuesta.status_code, 206)
+        self.assertEqual(self._cuerpo(respuesta), self.CONTENIDO[100:200])
+        self.assertEqual(respuesta['Content-Range'], f'bytes 100-199/{len(self.CONTENIDO)}')
+
+        final = self.cliente.get(self.ruta, HTTP_RANGE='bytes=-10')
+        self.assertEqual(self._cuerpo(final), self.CONTENIDO[-10:])
+
+        fuera = self.cliente.get(self.ruta, HTTP_RANGE=f'bytes={len(self.CONTENIDO)}-')
+        self.assertEqual(fuera.status_code, 416)
+        self.assertEqual(fuera['Content-Range'], f'bytes */{len(self.CONTENIDO)}')
+
+        # If-Range con otra versión: el archivo completo
+        otra_version = self.cliente.get(self.ruta, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"otro"')
+        self.assertEqual(otra_version.status_code, 200)
+
+    def test_url_firmada_sin_token(self):
+        url = self.cliente.get(reverse('recurso-comunidad-detail', kwargs={'pk': self.recurso.pk})).data['archivo_url']
+        anonimo = APIClient()
+        respuesta = anonimo.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(self._cuerpo(respuesta), self.CONTENIDO)
+        self.assertIn('immutable', respuesta['Cache-Control'])
+
+        self.assertEqual(anonimo.get(url.replace('firma=', 'firma=x')).status_code, 403)
+        self.assertEqual(anonimo.get(self.ruta).status_code, 401)
+        with mock.patch('estudiapro.entrega.time.time', return_value=time.time() + 3 * settings.ARCHIVOS_FIRMA_TTL):
+            self.assertEqual(anonimo.get(url).status_code, 403)
+
+    @override_settings(ARCHIVOS_X_ACCEL_PREFIJO='/archivos-protegidos/')
+    def test_x_accel_redirect(self):
+        respuesta = self.cliente.get(self.ruta)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['X-Accel-Redirect'], f'/archivos-protegidos/{self.recurso.archivo.name}')
+        self.assertEqual(respuesta.content, b'')
+        self.assertEqual(respuesta['ETag'], f'"{self.recurso.hash_archivo}"')
+
+
+@override_settings(SUBIDAS_TAMANO_PARTE=1024)
+class SubidasTests(TestCase):
+
+    CONTENIDO = bytes(range(256)) * 10
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media = tempfile.TemporaryDirectory()
+        cls.enterClassContext(override_settings(
+            MEDIA_ROOT=cls.media.name, SUBIDAS_DIR=os.path.join(cls.media.name, '.subidas'),
+        ))
+        cls.addClassCleanup(cls.media.cleanup)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user('autora', 'autora@example.com', 'clave123', rol='ESTUDIANTE')
+        cls.token = Token.objects.create(user=cls.usuario).key
+        cls.recurso = RecursoComunidad.objects.create(
+            titulo='Apuntes', descripcion='Resumen', tipo='DOCUMENTO', autor=cls.usuario, aprobado=True,
+        )
+
+    def setUp(self):
+        self.cliente = APIClient()
+        self.cliente.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def _parte(self, subida_id, numero, datos, sha256=None):
+        cabeceras = {}
+        if sha256 is not None:
+            cabeceras['HTTP_X_PARTE_SHA256'] = sha256
+        return self.cliente.put(
+            reverse('subida-parte', kwargs={'pk': subida_id, 'numero': numero}), datos,
+            content_type='application/octet-stream', **cabeceras
+        )
+
+    def test_subida_reanudable_y_adjunta_al_recurso(self):
+        creada = self.cliente.post(reverse('subida-list'), {'nombre': 'apuntes.pdf', 'tamano': len(self.CONTENIDO)},
+                                   format='json')
+        self.assertEqual(creada.status_code, 201)
+        self.assertEqual(creada.data['tamano_parte'], 1024)
+        subida_id = creada.data['id']
+        partes = [self.CONTENIDO[i:i + 1024] for i in range(0, len(self.CONTENIDO), 1024)]
+
+        self.assertEqual(self._parte(subida_id, 0, partes[0], hashlib.sha256(partes[0]).hexdigest()).status_code, 201)
+        # Reintento de una parte ya recibida
+        self.assertEqual(self._parte(subida_id, 0, partes[0]).status_code, 200)
+        self.assertEqual(self._parte(subida_id, 2, partes[2]).status_code, 409)
+        self.assertEqual(self._parte(subida_id, 1, partes[1], 'f' * 64).status_code, 400)
+
+        estado = self.cliente.get(reverse('subida-detail', kwargs={'pk': subida_id}))
+        self.assertEqual(estado.data['recibido'], 1024)
+        self.assertFalse(estado.data['completa'])
+        incompleta = self.cliente.patch(reverse('recurso-comunidad-detail', kwargs={'pk': self.recurso.pk}),
+                                        {'subida': subida_id}, format='json')
+        self.assertEqual(incompleta.status_code, 400)
+
+        for numero, parte in enumerate(partes[1:], 1):
+            self.assertEqual(self._parte(subida_id, numero, parte).status_code, 201)
+        respuesta = self.cliente.patch(reverse('recurso-comunidad-detail', kwargs={'pk': self.recurso.pk}),
+                                       {'subida': subida_id}, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+
+        self.recurso.refresh_from_db()
+        self.assertEqual(self.recurso.hash_archivo, hashlib.sha256(self.CONTENIDO).hexdigest())
+        with self.recurso.archivo.open('rb') as archivo:
+            self.assertEqual(archivo.read(), self.CONTENIDO)
+        self.assertFalse(SubidaArchivo.objects.exists())
+        self.assertFalse(os.path.exists(os.path.join(settings.SUBIDAS_DIR, f'{subida_id}.parcial')))
+
+    def test_reintento_concurrente_no_pisa_la_parte(self):
+        subida = subidas.crear(self.usuario, 'apuntes.pdf', 1024)
+        # Dos peticiones que leyeron la sesión antes de que cualquiera escribiera
+        primera, segunda = (SubidaArchivo.objects.get(pk=subida.pk) for _ in range(2))
+        self.assertTrue(subidas.agregar_parte(primera, 0, BytesIO(b'a' * 1024), 1024))
+        self.assertFalse(subidas.agregar_parte(segunda, 0, BytesIO(b'b' * 1024), 1024))
+        with open(subidas.ruta(subida), 'rb') as archivo:
+            self.assertEqual(archivo.read(), b'a' * 1024)
+        self.assertEqual(segunda.recibido, 1024)
+
+    def test_subida_vencida_no_se_adjunta(self):
+        subida = subidas.crear(self.usuario, 'apuntes.pdf', 10)
+        subidas.agregar_parte(subida, 0, BytesIO(b'0123456789'), 10)
+        SubidaArchivo.objects.filter(pk=subida.pk).update(expira=timezone.now() - timedelta(seconds=1))
+        respuesta = self.cliente.patch(reverse('recurso-comunidad-detail', kwargs={'pk': self.recurso.pk}),
+                                       {'subida': str(subida.pk)}, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('expiró', str(respuesta.data['subida']))
+        self.recurso.refresh_from_db()
+        self.assertFalse(self.recurso.archivo)
+
+    def test_formulario_de_estudio_desde_una_subida(self):
+        admin = Usuario.objects.create_user('admin', 'admin@example.com', 'clave123', rol='ADMINISTRADOR')
+        subida = subidas.crear(admin, 'integrales.pdf', len(self.CONTENIDO))
+        for numero, inicio in enumerate(range(0, len(self.CONTENIDO), 1024)):
+            parte = self.CONTENIDO[inicio:inicio + 1024]
+            subidas.agregar_parte(subida, numero, BytesIO(parte), len(parte))
+        cliente = APIClient()
+        cliente.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=admin).key}')
+
+        respuesta = cliente.post(reverse('formulario-estudio-list'),
+                                 {'title': 'Integrales', 'subida': str(subida.pk)}, format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        formulario = FormularioEstudio.objects.get(pk=respuesta.data['id'])
+        sha256 = hashlib.sha256(self.CONTENIDO).hexdigest()
+        self.assertEqual((formulario.creado_por, formulario.hash_archivo), (admin, sha256))
+        self.assertEqual(formulario.archivo.name, f'blobs/{sha256[:2]}/{sha256}/integrales.pdf')
+        self.assertEqual(BlobArchivo.objects.get(sha256=sha256).referencias, 1)
+        self.assertFalse(SubidaArchivo.objects.exists())
+
+        # Solo administradores
+        respuesta = self.cliente.post(reverse('formulario-estudio-list'),
+                                      {'title': 'Integrales', 'url': 'https://example.com/f.pdf'}, format='json')
+        self.assertEqual(respuesta.status_code, 403)
+
+    def test_subida_de_otro_usuario(self):
+        otro = Usuario.objects.create_user('otro', 'otro@example.com', 'clave123', rol='ESTUDIANTE')
+        ajena = subidas.crear(otro, 'ajeno.pdf', 10)
+        self.assertEqual(self.cliente.get(reverse('subida-detail', kwargs={'pk': ajena.pk})).status_code, 404)
+        self.assertEqual(self._parte(ajena.pk, 0, b'0123456789').status_code, 404)
+
+    def test_limpiar_borra_sesiones_vencidas(self):
+        vigente = subidas.crear(self.usuario, 'vigente.pdf', 10)
+        vencida = subidas.crear(self.usuario, 'vencida.pdf', 10)
+        SubidaArchivo.objects.filter(pk=vencida.pk).update(expira=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(self.cliente.get(reverse('subida-detail', kwargs={'pk': vencida.pk})).status_code, 404)
+        self.assertEqual(subidas.limpiar(), 1)
+        self.assertEqual(list(SubidaArchivo.objects.values_list('pk', flat=True)), [vigente.pk])
+        self.assertTrue(os.path.exists(subidas.ruta(vigente)))
+        self.assertFalse(os.path.exists(subidas.ruta(vencida)))
+
+
+class AlmacenamientoPorContenidoTests(TestCase):
+
+    CONTENIDO = b'%PDF-1.4 formulario de derivadas'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media = tempfile.TemporaryDirectory()
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media.name))
+        cls.addClassCleanup(cls.media.cleanup)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user('subidor', 'subidor@example.com', 'clave123', rol='ESTUDIANTE')
+
+    def _recurso(self, nombre, contenido=None):
+        return RecursoComunidad.objects.create(
+            titulo='Formulario', descripcion='Derivadas', tipo='DOCUMENTO', autor=self.usuario,
+            archivo=SimpleUploadedFile(nombre, contenido or self.CONTENIDO),
+        )
+
+    def test_contenido_repetido_se_guarda_una_vez(self):
+        primero = self._recurso('derivadas.pdf')
+        segundo = self._recurso('copia.pdf')
+        sha256 = hashlib.sha256(self.CONTENIDO).hexdigest()
+
+        self.assertEqual(primero.archivo.name, f'blobs/{sha256[:2]}/{sha256}/derivadas.pdf')
+        self.assertEqual(segundo.archivo.name, primero.archivo.name)
+        self.assertEqual(BlobArchivo.objects.get().referencias, 2)
+        self.assertEqual(os.listdir(os.path.dirname(primero.archivo.path)), ['derivadas.pdf'])
+
+        ruta = primero.archivo.path
+        with self.captureOnCommitCallbacks(execute=True):
+            primero.delete()
+        self.assertEqual(BlobArchivo.objects.get().referencias, 1)
+        self.assertTrue(os.path.exists(ruta))
+        with self.captureOnCommitCallbacks(execute=True):
+            segundo.delete()
+        self.assertFalse(BlobArchivo.objects.exists())
+        self.assertFalse(os.path.exists(ruta))
+
+    def test_reemplazar_archivo_libera_el_anterior(self):
+        recurso = self._recurso('v1.pdf', b'version 1')
+        anterior = recurso.archivo.path
+        recurso.archivo = SimpleUploadedFile('v2.pdf', b'version 2')
+        with self.captureOnCommitCallbacks(execute=True):
+            recurso.save()
+        self.assertFalse(os.path.exists(anterior))
+        self.assertEqual(list(BlobArchivo.objects.values_list('nombre', flat=True)), [recurso.archivo.name])
+
+    def test_resubir_el_mismo_contenido_no_suma_referencias(self):
+        recurso = self._recurso('v1.pdf')
+        ruta = recurso.archivo.path
+        recurso.archivo = SimpleUploadedFile('v1-otra-vez.pdf', self.CONTENIDO)
+        with self.captureOnCommitCallbacks(execute=True):
+            recurso.save()
+        self.assertEqual(recurso.archivo.path, ruta)
+        self.assertEqual(BlobArchivo.objects.get().referencias, 1)
+        self.assertTrue(os.path.exists(ruta))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recurso.delete()
+        self.assertFalse(BlobArchivo.objects.exists())
+        self.assertFalse(os.path.exists(ruta))
+
+    def test_deduplicar_archivos_existentes(self):
+        recursos = [self._recurso(f'r{i}.pdf') for i in range(3)]
+        BlobArchivo.objects.all().delete()
+        # Como quedaban antes: una copia por fila en recursos_comunidad/
+        for i, recurso in enumerate(recursos):
+            nombre = f'recursos_comunidad/r{i}.pdf'
+            os.makedirs(os.path.join(settings.MEDIA_ROOT, 'recursos_comunidad'), exist_ok=True)
+            with open(os.path.join(settings.MEDIA_ROOT, nombre), 'wb') as archivo:
+                archivo.write(self.CONTENIDO)
+            RecursoComunidad.objects.filter(pk=recurso.pk).update(archivo=nombre)
+
+        salida = StringIO()
+        call_command('deduplicar_archivos', stdout=salida, stderr=StringIO())
+
+        nombres = set(RecursoComunidad.objects.values_list('archivo', flat=True))
+        self.assertEqual(len(nombres), 1)
+        self.assertEqual(BlobArchivo.objects.get().referencias, 3)
+        self.assertEqual(os.listdir(os.path.join(settings.MEDIA_ROOT, 'recursos_comunidad')), [])
+        self.assertIn('2 duplicado(s)', salida.getvalue())
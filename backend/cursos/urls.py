@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
@@ -11,6 +12,7 @@ router.register(r'foro', views.ForoViewSet, basename='foro')
 router.register(r'recursos-comunidad', views.RecursoComunidadViewSet, basename='recurso-comunidad') 
 router.register(r'formularios', views.FormularioViewSet, basename='formulario')  
 router.register(r'formularios-estudio', views.FormularioEstudioViewSet, basename='formulario-estudio')
+router.register(r'subidas', views.SubidaArchivoViewSet, basename='subida')
 router.register(r'proximas-actividades', views.ProximaActividadViewSet, basename='proxima-actividad')
 router.register(r'tutores', views.TutorViewSet, basename='tutor')
 router.register(r'notificaciones', views.NotificacionViewSet, basename='notificacion')
@@ -35,3 +37,14 @@ urlpatterns = [
     # Endpoints para Foro
     path('foro/respuesta/<int:respuesta_id>/votar/', views.votar_respuesta, name='votar-respuesta'),
 ]
+
+if settings.ASYNC_VIEWS:
+    from . import vistas_async
+
+    # Van antes que las rutas síncronas para atender los GET de lectura
+    urlpatterns = [
+        path('cursos/', vistas_async.catalogo),
+        path('notificaciones/', vistas_async.notificaciones),
+        path('foro/', vistas_async.foro),
+        path('logros/', vistas_async.lista_logros),
+    ] + urlpatterns
@@ -1,13 +1,15 @@
 import json
-import unicodedata
-from django.db import models
-from rest_framework import viewsets, status, permissions
+from django.conf import settings
+from django.db import models, transaction
+from rest_framework import mixins, viewsets, status, permissions
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.response import Response
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import NotAuthenticated, PermissionDenied
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from estudiapro import entrega, metricas
+from estudiapro.escrituras import escritura_con_reintentos
 from usuarios.models import Creador
 from .models import (
     Curso, Modulo, Recurso, Pregunta,
@@ -17,9 +19,9 @@ from .models import (
     ProximaActividad,
     TutorPerfil, Tutoria, Notificacion,
     TemaForo, RespuestaForo, VotoRespuesta,
-    RecursoComunidad, CalificacionRecurso, DescargaRecurso,
+    RecursoComunidad, CalificacionRecurso,
     Formulario, PreguntaFormulario, RespuestaFormulario, DetalleRespuesta,
-    FormularioEstudio
+    FormularioEstudio, SubidaArchivo, normalizar_dificultad
 )
 from .serializers import (
     CursoListSerializer, CursoDetalleSerializer,
@@ -35,10 +37,13 @@ from .serializers import (
     TemaForoSerializer, TemaForoDetalleSerializer,
     RespuestaForoSerializer,
     RecursoComunidadSerializer, RecursoComunidadDetalleSerializer,
-    FormularioEstudioSerializer,
+    FormularioEstudioSerializer, SubidaArchivoSerializer,
     FormularioSerializer, FormularioDetalleSerializer,
     RespuestaFormularioSerializer
 )
+from .progreso import marcar_recurso_completado, registrar_recurso_completado, registrar_intento_examen
+from . import banco_preguntas, busqueda, contadores, panel, subidas, tareas
+from .examenes import con_preguntas, fijar_preguntas, preguntas_de, preguntas_por_examen
 from datetime import timedelta
 
 
@@ -59,63 +64,17 @@ def _serialize_user_basic(user):
     }
 
 
-def _recalcular_progreso_inscripcion(inscripcion):
+def _course_to_catalog(curso, user=None, progress=None):
     """
-    Recalcula el progreso de una inscripción basándose en:
-    - Recursos completados
-    - Exámenes aprobados
-    Retorna el porcentaje actualizado.
+    Convierte un curso al formato esperado por el frontend.
+    ``progress`` permite pasar el progreso ya resuelto (ver ``_catalog_payload``).
     """
-    curso = inscripcion.curso
-    estudiante = inscripcion.estudiante
-    
-    total_recursos = Recurso.objects.filter(modulo__curso=curso).count()
-    recursos_completados = ProgresoRecurso.objects.filter(
-        inscripcion=inscripcion,
-        completado=True
-    ).count()
-    
-    examenes_curso = Examen.objects.filter(curso=curso, activo=True)
-    total_examenes = examenes_curso.count()
-    
-    examenes_aprobados = 0
-    for examen in examenes_curso:
-        mejor_intento = IntentoExamen.objects.filter(
-            estudiante=estudiante,
-            examen=examen,
-            completado=True
-        ).order_by('-puntaje_obtenido').first()
-        
-        if mejor_intento and mejor_intento.puntaje_obtenido >= examen.puntaje_minimo_aprobacion:
-            examenes_aprobados += 1
-    
-    # Calcular progreso ponderado
-    # 60% recursos, 40% exámenes (si hay exámenes, sino 100% recursos)
-    if total_examenes > 0 and total_recursos > 0:
-        progreso_recursos = (recursos_completados / total_recursos) * 60
-        progreso_examenes = (examenes_aprobados / total_examenes) * 40
-        porcentaje = progreso_recursos + progreso_examenes
-    elif total_recursos > 0:
-        porcentaje = (recursos_completados / total_recursos) * 100
-    elif total_examenes > 0:
-        porcentaje = (examenes_aprobados / total_examenes) * 100
-    else:
-        porcentaje = 0
-    
-    inscripcion.progreso_porcentaje = round(porcentaje, 2)
-    inscripcion.completado = porcentaje >= 100
-    inscripcion.save(update_fields=['progreso_porcentaje', 'completado'])
-    
-    return float(inscripcion.progreso_porcentaje)
-
-
-def _course_to_catalog(curso, user=None):
-    """Convierte un curso al formato esperado por el frontend."""
-    progress = 0
-    if user and hasattr(user, 'perfil_estudiante'):
-        insc = Inscripcion.objects.filter(estudiante=user.perfil_estudiante, curso=curso).first()
-        if insc:
-            progress = _recalcular_progreso_inscripcion(insc)
+    if progress is None:
+        progress = 0
+        if user and hasattr(user, 'perfil_estudiante'):
+            insc = Inscripcion.objects.filter(estudiante=user.perfil_estudiante, curso=curso).first()
+            if insc:
+                progress = float(insc.progreso_porcentaje)
 
     profesor = (curso.profesor or '').strip()
     if not profesor:
@@ -128,7 +87,8 @@ def _course_to_catalog(curso, user=None):
             profesor = 'Profesor'
     escuela = curso.escuela or 'ESCOM'
 
-    temario = [{'title': modulo.titulo, 'description': modulo.descripcion} for modulo in curso.modulos.all().order_by('orden')]
+    # Modulo.Meta.ordering ya es 'orden'; .all() reutiliza el Prefetch si existe.
+    temario = [{'title': modulo.titulo, 'description': modulo.descripcion} for modulo in curso.modulos.all()]
 
     return {
         'id': curso.id,
@@ -143,6 +103,35 @@ def _course_to_catalog(curso, user=None):
     }
 
 
+def _catalog_queryset(cursos):
+    """Agrega los joins y prefetch que necesita ``_course_to_catalog``."""
+    return cursos.select_related('creador__id_usuario').prefetch_related(
+        models.Prefetch('modulos', queryset=Modulo.objects.order_by('orden'))
+    )
+
+
+def _catalog_payload(cursos, user=None):
+    """
+    Construye el catálogo de un queryset de cursos con un número constante de
+    consultas: cursos+creador, módulos e inscripciones del usuario. También
+    acepta una lista ya cargada con ``_catalog_queryset``.
+    """
+    if isinstance(cursos, models.QuerySet):
+        cursos = _catalog_queryset(cursos)
+    progress_by_course = {}
+    if user and hasattr(user, 'perfil_estudiante'):
+        progress_by_course = {
+            curso_id: float(porcentaje)
+            for curso_id, porcentaje in Inscripcion.objects.filter(
+                estudiante=user.perfil_estudiante
+            ).values_list('curso_id', 'progreso_porcentaje')
+        }
+    return [
+        _course_to_catalog(curso, progress=progress_by_course.get(curso.id, 0))
+        for curso in cursos
+    ]
+
+
 def _parse_temario(raw_temario):
     """Convierte el payload de temario del frontend a una lista de dicts."""
     if raw_temario is None:
@@ -221,20 +210,6 @@ def _serialize_market_resource(recurso):
     }
 
 
-def _normalize_difficulty_code(value: str) -> str:
-    """Normaliza diferentes variantes de dificultad a un código único."""
-    raw = (value or '').strip().upper()
-    mapping = {
-        'INTERMEDIO': 'MEDIA',
-        'INTERMEDIA': 'MEDIA',
-        'AVANZADO': 'DIFICIL',
-        'AVANZADA': 'DIFICIL',
-        'BASICO': 'FACIL',
-        'BÁSICO': 'FACIL',
-    }
-    return mapping.get(raw, raw)
-
-
 def _difficulty_label(code: str) -> str:
     labels = {
         'FACIL': 'Fácil',
@@ -244,87 +219,6 @@ def _difficulty_label(code: str) -> str:
     return labels.get(code, code.title())
 
 
-def _default_simulator_banks():
-    """Banco de preguntas por defecto por curso y dificultad (centralizado en backend)."""
-    return {
-        'calculo diferencial': [
-            {
-                'text': 'Calcula la derivada de f(x)=3x^4-5x^2+2',
-                'options': ['12x^3-10x', '12x^3-5x', '3x^3-10x', '3x^4-10x'],
-                'answer': 'A',
-                'difficulty': 'FACIL',
-                'explanation': 'Deriva cada término y agrupa.'
-            },
-            {
-                'text': 'Evalúa el límite lim_{x→0} (sin(3x))/x',
-                'options': ['1', '2', '3', '0'],
-                'answer': 'C',
-                'difficulty': 'MEDIA',
-                'explanation': 'Usa sin(kx)/(x)=k cuando x→0.'
-            },
-            {
-                'text': 'Encuentra la pendiente de la tangente a f(x)=e^{x} en x=0',
-                'options': ['0', '1', 'e', '2'],
-                'answer': 'B',
-                'difficulty': 'MEDIA',
-                'explanation': "f'(x)=e^{x}; en x=0 es 1."
-            },
-            {
-                'text': 'Aplica la regla de L’Hôpital al límite lim_{x→0} (ln(1+x))/x',
-                'options': ['0', '1', 'e', 'No existe'],
-                'answer': 'B',
-                'difficulty': 'DIFICIL',
-                'explanation': 'Deriva numerador y denominador; queda 1.'
-            },
-            {
-                'text': 'Determina la derivada de y=ln(x^2+1)',
-                'options': ['2x/(x^2+1)', '1/(x^2+1)', '2/(x^2+1)', 'x/(x^2+1)'],
-                'answer': 'A',
-                'difficulty': 'FACIL',
-                'explanation': 'Cadena: (1/(x^2+1))*2x.'
-            }
-        ],
-        'calculo integral': [
-            {
-                'text': 'Evalúa la integral definida ∫_0^1 2x dx',
-                'options': ['1', '2', '0', '3'],
-                'answer': 'A',
-                'difficulty': 'FACIL',
-                'explanation': 'x^2 de 0 a 1 es 1.'
-            },
-            {
-                'text': 'Resuelve ∫ e^{3x} dx',
-                'options': ['(1/3)e^{3x}+C', '3e^{3x}+C', 'e^{3x}+C', '(1/9)e^{3x}+C'],
-                'answer': 'A',
-                'difficulty': 'MEDIA',
-                'explanation': 'Divide por la derivada interna (3).'
-            },
-            {
-                'text': 'Calcula el área bajo y = x^2 de 0 a 2',
-                'options': ['4/3', '8/3', '2', '16/3'],
-                'answer': 'B',
-                'difficulty': 'MEDIA',
-                'explanation': '∫_0^2 x^2 dx = [x^3/3]_0^2 = 8/3.'
-            },
-            {
-                'text': 'Usa integración por partes para ∫ x·e^{x} dx',
-                'options': ['x e^{x}-e^{x}+C', 'e^{x}-x e^{x}+C', 'x e^{x}+C', 'e^{x}+C'],
-                'answer': 'A',
-                'difficulty': 'DIFICIL',
-                'explanation': 'u=x, dv=e^{x}dx → u\'=1, v=e^{x}.'
-            },
-            {
-                'text': 'Aplica sustitución a ∫ (2x)/(x^2+1) dx',
-                'options': ['ln(x^2+1)+C', '(1/2)ln(x^2+1)+C', 'arctan(x)+C', 'x/(x^2+1)+C'],
-                'answer': 'A',
-                'difficulty': 'FACIL',
-                'explanation': 'u=x^2+1, du=2x dx.'
-            }
-        ]
-    }
-
-
-
 class CursoViewSet(viewsets.ModelViewSet):
     """
     ViewSet para gestionar cursos (Materias)
@@ -333,9 +227,7 @@ class CursoViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def list(self, request, *args, **kwargs):
-        cursos = self.get_queryset().select_related('creador__id_usuario').prefetch_related('modulos')
-        data = [_course_to_catalog(curso, request.user) for curso in cursos]
-        return Response(data)
+        return Response(_catalog_payload(self.get_queryset(), request.user))
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -396,7 +288,11 @@ class CursoViewSet(viewsets.ModelViewSet):
     def perform_destroy(self, instance):
         if self.request.user.rol != 'ADMINISTRADOR':
              raise PermissionDenied('Solo administradores pueden eliminar cursos')
-        instance.delete()
+        # Se oculta de inmediato; el borrado en cascada corre en segundo plano
+        instance.activo = False
+        instance.save(update_fields=['activo'])
+        busqueda.desindexar(instance)
+        tareas.borrar_curso.encolar(instance.id)
     
     @action(detail=True, methods=['get'])
     def modulos(self, request, pk=None):
@@ -485,13 +381,6 @@ class CursoViewSet(viewsets.ModelViewSet):
             progresos = ProgresoRecurso.objects.filter(inscripcion=inscripcion)
             progreso_map = {p.recurso_id: p for p in progresos}
 
-            total_recursos = Recurso.objects.filter(modulo__curso=curso).count()
-            recursos_completados = len([p for p in progresos if p.completado])
-            porcentaje = (recursos_completados / total_recursos * 100) if total_recursos > 0 else 0
-
-            inscripcion.progreso_porcentaje = round(porcentaje, 2)
-            inscripcion.save(update_fields=['progreso_porcentaje'])
-
             modulos_data = []
             for modulo in curso.modulos.all().order_by('orden'):
                 recursos_data = []
@@ -538,9 +427,13 @@ class RecursoViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Recurso.objects.all()
     serializer_class = RecursoSerializer
     permission_classes = [permissions.IsAuthenticated]
+    keyset_ordering = ('orden', 'id')
 
     def list(self, request, *args, **kwargs):
         recursos = self.get_queryset().select_related('modulo__curso__creador__id_usuario')
+        page = self.paginate_queryset(recursos)
+        if page is not None:
+            return self.get_paginated_response([_serialize_market_resource(r) for r in page])
         data = [_serialize_market_resource(r) for r in recursos]
         return Response(data)
     
@@ -555,6 +448,7 @@ class RecursoViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(data)
     
     @action(detail=True, methods=['post'])
+    @escritura_con_reintentos
     def marcar_completado(self, request, pk=None):
         """Marcar un recurso como completado"""
         recurso = self.get_object()
@@ -577,13 +471,11 @@ class RecursoViewSet(viewsets.ReadOnlyModelViewSet):
             inscripcion=inscripcion,
             recurso=recurso
         )
+        ya_completado = not marcar_recurso_completado(
+            progreso, tiempo_dedicado=request.data.get('tiempo_dedicado', 0)
+        )
         
-        progreso.completado = True
-        progreso.fecha_completado = timezone.now()
-        progreso.tiempo_dedicado = request.data.get('tiempo_dedicado', 0)
-        progreso.save()
-        
-        nuevo_progreso = _recalcular_progreso_inscripcion(inscripcion)
+        nuevo_progreso = registrar_recurso_completado(inscripcion, ya_completado)
         
         return Response({
             'message': 'Recurso marcado como completado',
@@ -681,7 +573,7 @@ class ExamenViewSet(viewsets.ReadOnlyModelViewSet):
             pregunta.opcion_c,
             pregunta.opcion_d
         ]
-        difficulty_code = _normalize_difficulty_code(getattr(pregunta, 'dificultad', ''))
+        difficulty_code = normalizar_dificultad(getattr(pregunta, 'dificultad', ''))
         return {
             'id': pregunta.id,
             'text': pregunta.texto_pregunta,
@@ -696,7 +588,7 @@ class ExamenViewSet(viewsets.ReadOnlyModelViewSet):
     def _serialize_default_question(self, question_dict, fallback_difficulty, index):
         options = (question_dict.get('options') or question_dict.get('opciones') or ['A', 'B', 'C', 'D'])[:4]
         padded_options = (options + ['A', 'B', 'C', 'D'])[:4]
-        difficulty_code = _normalize_difficulty_code(question_dict.get('difficulty') or fallback_difficulty)
+        difficulty_code = normalizar_dificultad(question_dict.get('difficulty') or fallback_difficulty)
         return {
             'id': question_dict.get('id') or f"template-{difficulty_code}-{index+1}",
             'text': question_dict.get('text') or question_dict.get('texto') or f'Pregunta {index + 1}',
@@ -720,29 +612,26 @@ class ExamenViewSet(viewsets.ReadOnlyModelViewSet):
         passing_score = float(request.data.get('passingScore') or 70)
         questions_payload = request.data.get('questions') or []
         questions_count = int(request.data.get('questionsCount') or len(questions_payload) or 5)
+        questions_count = min(questions_count, settings.SIMULADOR_MAX_PREGUNTAS)
         difficulty_selected = (request.data.get('difficulty') or 'FACIL').upper()
 
         if not course_id:
             return Response({'error': 'courseId requerido'}, status=status.HTTP_400_BAD_REQUEST)
 
         curso = get_object_or_404(Curso, id=course_id)
-        modulo = curso.modulos.first() or Modulo.objects.create(
-            curso=curso,
-            titulo='Simulador',
-            descripcion='Banco de preguntas generado'
-        )
 
-        banks = _default_simulator_banks()
-        normalized_title = unicodedata.normalize('NFD', curso.titulo or '').encode('ascii', 'ignore').decode('ascii').lower()
-        default_questions = banks.get(normalized_title, [])
-        base_questions = questions_payload if isinstance(questions_payload, list) and questions_payload else default_questions
+        if isinstance(questions_payload, list) and questions_payload:
+            base_questions = questions_payload
+            filtered_by_difficulty = [
+                q for q in base_questions
+                if normalizar_dificultad(q.get('difficulty')) == difficulty_selected
+            ]
+        else:
+            base_questions = banco_preguntas.preguntas_por_defecto(curso.titulo)
+            filtered_by_difficulty = banco_preguntas.preguntas_por_defecto(curso.titulo, difficulty_selected)
         if not base_questions:
             return Response({'error': 'No hay preguntas para generar'}, status=status.HTTP_400_BAD_REQUEST)
 
-        filtered_by_difficulty = [
-            q for q in base_questions
-            if _normalize_difficulty_code(q.get('difficulty')) == difficulty_selected
-        ]
         source = filtered_by_difficulty if filtered_by_difficulty else base_questions
         target_count = max(5, questions_count)
         questions_data = []
@@ -751,29 +640,13 @@ class ExamenViewSet(viewsets.ReadOnlyModelViewSet):
             questions_data.append(self._serialize_default_question(q, difficulty_selected, idx))
 
         difficulty_label = _difficulty_label(difficulty_selected)
-        Examen.objects.filter(curso=curso, tipo='SIMULADOR', titulo__icontains=difficulty_label).delete()
-
         if difficulty_label.lower() not in title.lower():
             title = f"{title} - {difficulty_label}"
 
-        examen = Examen.objects.create(
-            curso=curso,
-            modulo=modulo,
-            titulo=title,
-            descripcion='Simulador generado desde panel admin',
-            tipo='SIMULADOR',
-            duracion_minutos=duration,
-            numero_preguntas=len(questions_data),
-            puntaje_minimo_aprobacion=passing_score,
-            activo=True
-        )
-
-        created_questions = []
+        preguntas = []
         for idx, q in enumerate(questions_data):
             opcion_a, opcion_b, opcion_c, opcion_d = (q.get('options') or q.get('opciones') or ['A', 'B', 'C', 'D'])[:4]
-            diff_raw = _normalize_difficulty_code(q.get('difficulty') or 'FACIL')
-            pregunta = Pregunta.objects.create(
-                modulo=modulo,
+            preguntas.append(Pregunta(
                 texto_pregunta=q.get('text') or q.get('texto') or f'Pregunta {idx+1}',
                 opcion_a=opcion_a,
                 opcion_b=opcion_b if opcion_b is not None else 'B',
@@ -781,18 +654,46 @@ class ExamenViewSet(viewsets.ReadOnlyModelViewSet):
                 opcion_d=opcion_d if opcion_d is not None else 'D',
                 respuesta_correcta=q.get('answer', 'A'),
                 explicacion=q.get('explanation', ''),
-                dificultad=diff_raw,
+                dificultad=normalizar_dificultad(q.get('difficulty') or 'FACIL'),
                 puntos=int(q.get('points') or 1)
+            ))
+
+        # Todo o nada: sin simuladores a medio generar si algo falla
+        with transaction.atomic():
+            modulo = curso.modulos.first() or Modulo.objects.create(
+                curso=curso,
+                titulo='Simulador',
+                descripcion='Banco de preguntas generado'
+            )
+            Examen.objects.filter(curso=curso, tipo='SIMULADOR', titulo__icontains=difficulty_label).delete()
+
+            examen = Examen.objects.create(
+                curso=curso,
+                modulo=modulo,
+                titulo=title,
+                descripcion='Simulador generado desde panel admin',
+                tipo='SIMULADOR',
+                duracion_minutos=duration,
+                numero_preguntas=len(questions_data),
+                puntaje_minimo_aprobacion=passing_score,
+                activo=True
             )
-            created_questions.append({
+            # Regenerar el mismo simulador reutiliza las preguntas en lugar de duplicarlas
+            preguntas = banco_preguntas.obtener_o_crear(modulo, preguntas)
+            fijar_preguntas(examen, preguntas)
+
+        created_questions = [
+            {
                 'id': pregunta.id,
                 'text': pregunta.texto_pregunta,
-                'difficulty': diff_raw,
+                'difficulty': pregunta.dificultad_normalizada,
                 'answer': pregunta.respuesta_correcta,
                 'explanation': pregunta.explicacion,
                 'wolframQuery': pregunta.texto_pregunta,
-                'options': [opcion_a, opcion_b, opcion_c, opcion_d]
-            })
+                'options': [pregunta.opcion_a, pregunta.opcion_b, pregunta.opcion_c, pregunta.opcion_d]
+            }
+            for pregunta in preguntas
+        ]
 
         return Response({
             'id': examen.id,
@@ -812,21 +713,16 @@ class ExamenViewSet(viewsets.ReadOnlyModelViewSet):
             return Response({'error': 'courseId requerido'}, status=status.HTTP_400_BAD_REQUEST)
 
         curso = get_object_or_404(Curso, id=course_id)
-        banks = _default_simulator_banks()
-        normalized_title = unicodedata.normalize('NFD', curso.titulo or '').encode('ascii', 'ignore').decode('ascii').lower()
-        default_questions = banks.get(normalized_title, [])
-
-        preguntas_qs = list(Pregunta.objects.filter(modulo__curso=curso))
-        difficulties = ['FACIL', 'MEDIA', 'DIFICIL']
+        # Solo se usan las primeras 5 preguntas de cada dificultad
+        preguntas_por_dificultad = banco_preguntas.preguntas_por_dificultad(curso.id, limite=5)
         templates = []
 
-        for code in difficulties:
-            curso_questions = [self._serialize_question(p) for p in preguntas_qs if _normalize_difficulty_code(p.dificultad) == code]
+        for code in banco_preguntas.DIFICULTADES:
+            curso_questions = [self._serialize_question(p) for p in preguntas_por_dificultad[code]]
 
             fallback = [
                 self._serialize_default_question(q, code, idx)
-                for idx, q in enumerate(default_questions)
-                if _normalize_difficulty_code(q.get('difficulty')) == code
+                for idx, q in banco_preguntas.preguntas_por_defecto_enumeradas(curso.titulo, code)
             ]
 
             combined = curso_questions + fallback
@@ -849,11 +745,11 @@ class ExamenViewSet(viewsets.ReadOnlyModelViewSet):
         })
 
     def list(self, request, *args, **kwargs):
-        exams = self.get_queryset().select_related('curso')
+        exams = list(con_preguntas(self.get_queryset().select_related('curso')))
+        preguntas = preguntas_por_examen(exams)
         data = []
         for exam in exams:
-            preguntas_qs = Pregunta.objects.filter(modulo__curso=exam.curso)[: max(exam.numero_preguntas, 1)]
-            preguntas_data = [self._serialize_question(p) for p in preguntas_qs]
+            preguntas_data = [self._serialize_question(p) for p in preguntas[exam.id]]
             difficulty_code = preguntas_data[0].get('difficulty') if preguntas_data else None
             difficulty_label = preguntas_data[0].get('difficultyLabel') if preguntas_data else None
             data.append({
@@ -871,8 +767,7 @@ class ExamenViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=True, methods=['post'])
     def iniciar(self, request, pk=None):
         examen = self.get_object()
-        preguntas_qs = Pregunta.objects.filter(modulo__curso=examen.curso)[: max(examen.numero_preguntas, 1)]
-        preguntas_data = [self._serialize_question(p) for p in preguntas_qs]
+        preguntas_data = [self._serialize_question(p) for p in preguntas_de(examen)]
         return Response({
             'examen': {
                 'id': examen.id,
@@ -891,55 +786,55 @@ class ExamenViewSet(viewsets.ReadOnlyModelViewSet):
         if not isinstance(answers, dict):
             return Response({'error': 'answers debe ser un objeto'}, status=status.HTTP_400_BAD_REQUEST)
 
-        preguntas = list(Pregunta.objects.filter(modulo__curso=examen.curso)[: max(examen.numero_preguntas, 1)])
+        preguntas = preguntas_de(examen)
         total = len(preguntas)
-        correctas = 0
 
         def _normalize(expr: str):
             return (expr or '').replace('^', '').replace('{', '').replace('}', '').replace('\\', '').replace(' ', '').lower()
 
+        # Se califica una sola vez; las mismas respuestas se persisten después en bloque
+        calificadas = []
         for pregunta in preguntas:
             user_answer = answers.get(str(pregunta.id)) or answers.get(pregunta.id)
-            if user_answer is None:
-                continue
-            user_norm = _normalize(str(user_answer))
+            es_correcta = False
+            if user_answer is not None:
+                user_norm = _normalize(str(user_answer))
 
-            letra_correcta = str(pregunta.respuesta_correcta).strip().lower()
-            texto_correcto = getattr(pregunta, f"opcion_{pregunta.respuesta_correcta.lower()}", '')
-            texto_norm = _normalize(texto_correcto)
+                letra_correcta = str(pregunta.respuesta_correcta).strip().lower()
+                texto_correcto = getattr(pregunta, f"opcion_{pregunta.respuesta_correcta.lower()}", '')
+                texto_norm = _normalize(texto_correcto)
 
-            if user_norm == letra_correcta or (texto_norm and user_norm == texto_norm):
-                correctas += 1
+                es_correcta = user_norm == letra_correcta or bool(texto_norm and user_norm == texto_norm)
+            calificadas.append((pregunta, user_answer, es_correcta))
 
+        correctas = sum(1 for _, _, es_correcta in calificadas if es_correcta)
         calificacion = round((correctas / total * 100) if total else 0, 2)
 
         intento = None
         if hasattr(request.user, 'perfil_estudiante'):
-            intento = IntentoExamen.objects.create(
-                estudiante=request.user.perfil_estudiante,
-                examen=examen,
-                puntaje_obtenido=calificacion,
-                tiempo_usado=examen.duracion_minutos * 60,
-                completado=True,
-                aprobado=calificacion >= float(examen.puntaje_minimo_aprobacion or 0),
-                fecha_fin=timezone.now()
-            )
-            for pregunta in preguntas:
-                user_answer = answers.get(str(pregunta.id)) or answers.get(pregunta.id)
-                RespuestaEstudiante.objects.create(
-                    intento=intento,
-                    pregunta=pregunta,
-                    respuesta_seleccionada=str(user_answer or '')[:1],
-                    es_correcta=str(user_answer or '').strip().lower() == str(pregunta.respuesta_correcta).strip().lower(),
-                    tiempo_respuesta=0
+            with transaction.atomic():
+                intento = IntentoExamen.objects.create(
+                    estudiante=request.user.perfil_estudiante,
+                    examen=examen,
+                    puntaje_obtenido=calificacion,
+                    tiempo_usado=examen.duracion_minutos * 60,
+                    completado=True,
+                    aprobado=calificacion >= float(examen.puntaje_minimo_aprobacion or 0),
+                    fecha_fin=timezone.now()
                 )
-            
-            inscripcion = Inscripcion.objects.filter(
-                estudiante=request.user.perfil_estudiante,
-                curso=examen.curso
-            ).first()
-            if inscripcion:
-                _recalcular_progreso_inscripcion(inscripcion)
+                RespuestaEstudiante.objects.bulk_create([
+                    RespuestaEstudiante(
+                        intento=intento,
+                        pregunta=pregunta,
+                        respuesta_seleccionada=str(user_answer or '')[:1],
+                        es_correcta=es_correcta,
+                        tiempo_respuesta=0
+                    )
+                    for pregunta, user_answer, es_correcta in calificadas
+                ])
+
+                registrar_intento_examen(intento)
+                metricas.examen_enviado()
 
         return Response({
             'calificacion': calificacion,
@@ -949,29 +844,65 @@ class ExamenViewSet(viewsets.ReadOnlyModelViewSet):
         })
 
 
+FORUM_KEYSET_ORDERING = ('-ultima_actividad', '-id')
+
+
+def _forum_topics_queryset(temas):
+    """
+    Temas con su conteo de respuestas en una sola consulta (sin cargar
+    respuestas). La última actividad sale de ``ultima_actividad``, la misma
+    columna que ordena y pagina el listado.
+    """
+    return temas.select_related('curso').annotate(
+        post_count=models.Count('respuestas'),
+    ).order_by(*FORUM_KEYSET_ORDERING)
+
+
+def _forum_topic_summary(tema):
+    post_count = getattr(tema, 'post_count', None)
+    return {
+        'id': tema.id,
+        'title': tema.titulo,
+        'subjectName': tema.curso.titulo if tema.curso else 'General',
+        'postCount': post_count if post_count is not None else tema.total_respuestas,
+        'lastActivity': tema.ultima_actividad
+    }
+
+
 class ForoViewSet(viewsets.ModelViewSet):
     """ViewSet para foro (temas y respuestas)"""
     queryset = TemaForo.objects.all()
     permission_classes = [permissions.IsAuthenticated]
+    keyset_ordering = FORUM_KEYSET_ORDERING
+
+    def _topics_queryset(self):
+        return _forum_topics_queryset(self.get_queryset())
+
+    def _topic_summary(self, tema):
+        return _forum_topic_summary(tema)
 
     def list(self, request, *args, **kwargs):
-        temas = self.get_queryset().select_related('curso')
-        data = []
-        for tema in temas:
-            data.append({
-                'id': tema.id,
-                'title': tema.titulo,
-                'subjectName': tema.curso.titulo if tema.curso else 'General',
-                'postCount': tema.respuestas.count(),
-                'lastActivity': tema.fecha_actualizacion
-            })
+        temas = self._topics_queryset()
+        page = self.paginate_queryset(temas)
+        if page is not None:
+            return self.get_paginated_response([self._topic_summary(tema) for tema in page])
+        data = [self._topic_summary(tema) for tema in temas]
         return Response(data)
 
+    @action(detail=False, methods=['get'])
+    def buscar(self, request):
+        """Buscar temas del foro por título y contenido, ordenados por relevancia."""
+        query = request.query_params.get('q', '')
+        temas = self._topics_queryset()
+        if query:
+            temas = busqueda.buscar(temas, query)
+        return Response(busqueda.paginar(
+            request, temas, lambda pagina: [self._topic_summary(tema) for tema in pagina]
+        ))
+
     def retrieve(self, request, *args, **kwargs):
         tema = self.get_object()
-        tema.vistas = models.F('vistas') + 1
-        tema.save(update_fields=['vistas'])
-        tema.refresh_from_db()
+        contadores.incrementar('vistas', tema.pk)
 
         posts = []
         for resp in tema.respuestas.all().order_by('-fecha_creacion'):
@@ -1011,7 +942,7 @@ class ForoViewSet(viewsets.ModelViewSet):
             'title': tema.titulo,
             'subjectName': tema.curso.titulo if tema.curso else 'General',
             'postCount': 0,
-            'lastActivity': tema.fecha_actualizacion
+            'lastActivity': tema.ultima_actividad
         }
         return Response({'success': True, 'topic': topic_payload}, status=status.HTTP_201_CREATED)
 
@@ -1038,6 +969,7 @@ class ForoViewSet(viewsets.ModelViewSet):
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@escritura_con_reintentos
 def votar_respuesta(request, respuesta_id):
     """
     Votar una respuesta del foro
@@ -1050,47 +982,75 @@ def votar_respuesta(request, respuesta_id):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    try:
-        respuesta = RespuestaForo.objects.get(id=respuesta_id)
-    except RespuestaForo.DoesNotExist:
+    if not RespuestaForo.objects.filter(id=respuesta_id).exists():
         return Response(
             {'error': 'Respuesta no encontrada'},
             status=status.HTTP_404_NOT_FOUND
         )
     
-    voto_existente = VotoRespuesta.objects.filter(
-        respuesta=respuesta,
-        usuario=request.user
-    ).first()
-    
-    if voto_existente:
-        if voto_existente.tipo == tipo_voto:
+    # Todo el voto en una transacción: el voto del usuario se bloquea, el contador
+    # de la respuesta se ajusta con F() y nunca se reescribe la fila completa.
+    with transaction.atomic():
+        voto_existente = VotoRespuesta.objects.select_for_update().filter(
+            respuesta_id=respuesta_id,
+            usuario=request.user
+        ).first()
+        
+        creado = False
+        if voto_existente is None:
+            voto_existente, creado = VotoRespuesta.objects.get_or_create(
+                respuesta_id=respuesta_id,
+                usuario=request.user,
+                defaults={'tipo': tipo_voto}
+            )
+            if not creado:
+                # Otra petición del mismo usuario insertó el voto primero
+                voto_existente = VotoRespuesta.objects.select_for_update().get(pk=voto_existente.pk)
+        
+        if creado:
+            delta = 1 if tipo_voto == 'UP' else -1
+            mensaje = 'Voto registrado'
+            accion = 'registrado'
+        elif voto_existente.tipo == tipo_voto:
             voto_existente.delete()
-            respuesta.votos += 1 if tipo_voto == 'DOWN' else -1
+            delta = -1 if tipo_voto == 'UP' else 1
             mensaje = 'Voto eliminado'
+            accion = 'eliminado'
         else:
-            voto_existente.tipo = tipo_voto
-            voto_existente.save()
-            respuesta.votos += 2 if tipo_voto == 'UP' else -2
+            VotoRespuesta.objects.filter(pk=voto_existente.pk).update(tipo=tipo_voto)
+            delta = 2 if tipo_voto == 'UP' else -2
             mensaje = 'Voto actualizado'
-    else:
-        VotoRespuesta.objects.create(
-            respuesta=respuesta,
-            usuario=request.user,
-            tipo=tipo_voto
-        )
-        respuesta.votos += 1 if tipo_voto == 'UP' else -1
-        mensaje = 'Voto registrado'
-    
-    respuesta.save()
+            accion = 'actualizado'
+        metricas.voto(tipo_voto, accion)
+        
+        RespuestaForo.objects.filter(id=respuesta_id).update(votos=models.F('votos') + delta)
+        votos = RespuestaForo.objects.filter(id=respuesta_id).values_list('votos', flat=True).first()
     
     return Response({
         'success': True,
         'message': mensaje,
-        'votes': respuesta.votos
+        'votes': votos
     })
 
 
+def _entregar_archivo(request, modelo, pk):
+    """Entrega el ``archivo`` de un objeto activo si hay sesión o la URL trae una firma vigente."""
+    if not request.user.is_authenticated:
+        if 'firma' not in request.GET:
+            raise NotAuthenticated()
+        if not entrega.firma_valida(request):
+            raise PermissionDenied('El enlace del archivo no es válido o ya expiró')
+    objeto = get_object_or_404(modelo, pk=pk, activo=True)
+    if not objeto.archivo:
+        return Response({'error': 'Este elemento no tiene archivo'}, status=status.HTTP_404_NOT_FOUND)
+    return entrega.entregar(request, objeto.archivo, objeto.hash_archivo)
+
+
+def _community_resources_queryset(recursos):
+    """Recursos con autor, curso y conteo de calificaciones en una sola consulta."""
+    return recursos.select_related('autor', 'curso').annotate(num_calificaciones=models.Count('calificaciones'))
+
+
 class RecursoComunidadViewSet(viewsets.ModelViewSet):
     """
     ViewSet para recursos de comunidad
@@ -1098,6 +1058,10 @@ class RecursoComunidadViewSet(viewsets.ModelViewSet):
     queryset = RecursoComunidad.objects.filter(activo=True).order_by('-fecha_creacion')
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = (MultiPartParser, FormParser, JSONParser)
+    keyset_ordering = ('-fecha_creacion', '-id')
+
+    def get_queryset(self):
+        return _community_resources_queryset(super().get_queryset())
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -1120,26 +1084,24 @@ class RecursoComunidadViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def descargar(self, request, pk=None):
         recurso = self.get_object()
-        DescargaRecurso.objects.create(
-            recurso=recurso,
-            usuario=request.user
-        )
-        recurso.descargas = models.F('descargas') + 1
-        recurso.save(update_fields=['descargas'])
-        recurso.refresh_from_db()
+        total_descargas = contadores.valor(recurso, 'descargas') + 1
+        contadores.registrar_descarga(recurso, request.user)
+        metricas.descarga('recurso_comunidad')
         
         url = recurso.archivo_url
         if getattr(recurso, 'archivo', None):
-            try:
-                url = request.build_absolute_uri(recurso.archivo.url)
-            except Exception:
-                url = recurso.archivo_url
+            url = entrega.url_archivo(request, 'recurso-comunidad-archivo', recurso)
 
         return Response({
             'message': 'Descarga registrada',
-            'total_descargas': recurso.descargas,
+            'total_descargas': total_descargas,
             'url': url
         })
+
+    @action(detail=True, methods=['get'], permission_classes=[permissions.AllowAny])
+    def archivo(self, request, pk=None):
+        """Contenido del archivo subido (con token o con URL firmada)."""
+        return _entregar_archivo(request, RecursoComunidad, pk)
     
     @action(detail=True, methods=['post'])
     def calificar(self, request, pk=None):
@@ -1167,21 +1129,17 @@ class RecursoComunidadViewSet(viewsets.ModelViewSet):
             }
         )
         
-        promedio = CalificacionRecurso.objects.filter(
-            recurso=recurso
-        ).aggregate(promedio=models.Avg('calificacion'))['promedio'] or 0
-        
-        recurso.calificacion_promedio = round(promedio, 2)
-        recurso.save(update_fields=['calificacion_promedio'])
+        # El UPDATE del recurso (fila muy disputada en los populares) se hace en segundo plano
+        tareas.actualizar_calificacion_recurso.encolar(recurso.id)
         
         return Response({
             'message': 'Calificación registrada' if created else 'Calificación actualizada',
-            'calificacion_promedio': float(recurso.calificacion_promedio)
+            'calificacion_promedio': float(tareas.promedio_calificaciones(recurso.id))
         })
     
     @action(detail=False, methods=['get'])
     def mis_recursos(self, request):
-        recursos = RecursoComunidad.objects.filter(autor=request.user)
+        recursos = _community_resources_queryset(RecursoComunidad.objects.filter(autor=request.user))
         serializer = self.get_serializer(recursos, many=True)
         return Response(serializer.data)
     
@@ -1195,7 +1153,7 @@ class RecursoComunidadViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        recursos = self.queryset.filter(curso_id=curso_id)
+        recursos = self.get_queryset().filter(curso_id=curso_id)
         serializer = self.get_serializer(recursos, many=True)
         return Response(serializer.data)
     
@@ -1204,21 +1162,19 @@ class RecursoComunidadViewSet(viewsets.ModelViewSet):
         query = request.query_params.get('q', '')
         tipo = request.query_params.get('tipo', '')
         
-        recursos = self.queryset
-        
-        if query:
-            recursos = recursos.filter(
-                models.Q(titulo__icontains=query) |
-                models.Q(descripcion__icontains=query)
-            )
+        recursos = self.get_queryset()
         
         if tipo:
             recursos = recursos.filter(tipo=tipo)
         
-        recursos = recursos.order_by('-calificacion_promedio', '-descargas')
+        if query:
+            recursos = busqueda.buscar(recursos, query)
+        else:
+            recursos = recursos.order_by('-calificacion_promedio', '-descargas')
         
-        serializer = self.get_serializer(recursos, many=True)
-        return Response(serializer.data)
+        return Response(busqueda.paginar(
+            request, recursos, lambda pagina: self.get_serializer(pagina, many=True).data
+        ))
 
 
 class TutorViewSet(viewsets.ReadOnlyModelViewSet):
@@ -1227,6 +1183,11 @@ class TutorViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = TutorPublicSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_queryset(self):
+        return super().get_queryset().select_related('creador__id_usuario').annotate(
+            num_tutorias=models.Count('creador__tutorias')
+        )
+
     @action(detail=False, methods=['get', 'put'], url_path='me')
     def me(self, request):
         """Obtener o actualizar el perfil de tutor del creador autenticado."""
@@ -1270,21 +1231,7 @@ class TutorViewSet(viewsets.ReadOnlyModelViewSet):
             estado='SOLICITADA'
         )
 
-        try:
-            Notificacion.objects.create(
-                usuario=tutor.id_usuario,
-                titulo='Nueva solicitud de tutoria',
-                mensaje=f"Tienes una solicitud sobre: {topic or (curso.titulo if curso else 'Tutoria')}",
-                tipo='info'
-            )
-            Notificacion.objects.create(
-                usuario=request.user,
-                titulo='Solicitud enviada',
-                mensaje='Tu solicitud de tutoria ha sido registrada.',
-                tipo='success'
-            )
-        except Exception:
-            pass
+        tareas.notificar_solicitud_tutoria.encolar(tutoria.id)
 
         return Response({'id': tutoria.id, 'estado': tutoria.estado}, status=status.HTTP_201_CREATED)
 
@@ -1329,6 +1276,7 @@ class NotificacionViewSet(viewsets.ReadOnlyModelViewSet):
     """Notificaciones del usuario"""
     serializer_class = NotificacionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    keyset_ordering = ('-fecha_creacion', '-id')
 
     def get_queryset(self):
         return Notificacion.objects.filter(usuario=self.request.user)
@@ -1371,74 +1319,71 @@ from rest_framework.exceptions import PermissionDenied
 from django.db import models
 from datetime import date, time
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def mi_panel(request):
-    user = request.user
+def _panel_creador(user):
     base_user = _serialize_user_basic(user)
+    creador = user.perfil_creador
+    tutorias = Tutoria.objects.filter(tutor=creador).exclude(estado='CANCELADA').select_related(
+        'estudiante__id_usuario', 'curso'
+    ).order_by('fecha_hora')
+    tutoring_list = []
+    for t in tutorias:
+        student_user = getattr(getattr(t, 'estudiante', None), 'id_usuario', None)
+        student_full_name = ''
+        student_username = ''
+        student_email = ''
+        if student_user:
+            student_full_name = f"{student_user.first_name} {student_user.last_name}".strip() or student_user.username
+            student_username = student_user.username
+            student_email = student_user.email
+
+        tutoring_list.append({
+            'id': t.id,
+            'student': student_full_name or 'Estudiante',
+            'studentUsername': student_username,
+            'studentEmail': student_email,
+            'subject': t.curso.titulo if t.curso else (t.tema or 'Tutoria'),
+            'date': timezone.localtime(t.fecha_hora).strftime('%Y-%m-%d %H:%M') if t.fecha_hora else 'Por definir',
+            'duration': f"{t.duracion_minutos} min",
+            'status': t.estado
+        })
 
-    if user.rol == 'CREADOR':
-        if not hasattr(user, 'perfil_creador'):
-            return Response({'error': 'Perfil de creador no encontrado'}, status=status.HTTP_404_NOT_FOUND)
-
-        creador = user.perfil_creador
-        tutorias = Tutoria.objects.filter(tutor=creador).exclude(estado='CANCELADA').order_by('fecha_hora')
-        tutoring_list = []
-        for t in tutorias:
-            student_user = getattr(getattr(t, 'estudiante', None), 'id_usuario', None)
-            student_full_name = ''
-            student_username = ''
-            student_email = ''
-            if student_user:
-                student_full_name = f"{student_user.first_name} {student_user.last_name}".strip() or student_user.username
-                student_username = student_user.username
-                student_email = student_user.email
-
-            tutoring_list.append({
-                'id': t.id,
-                'student': student_full_name or 'Estudiante',
-                'studentUsername': student_username,
-                'studentEmail': student_email,
-                'subject': t.curso.titulo if t.curso else (t.tema or 'Tutoria'),
-                'date': timezone.localtime(t.fecha_hora).strftime('%Y-%m-%d %H:%M') if t.fecha_hora else 'Por definir',
-                'duration': f"{t.duracion_minutos} min",
-                'status': t.estado
-            })
+    return {
+        'usuario': base_user,
+        'published': RecursoComunidad.objects.filter(autor=user, activo=True).count(),
+        'rating': float(creador.calificacion_promedio or 0),
+        'studentsHelped': len(tutoring_list),
+        'tutoring': tutoring_list
+    }
 
-        return Response({
-            'usuario': base_user,
-            'published': RecursoComunidad.objects.filter(autor=user, activo=True).count(),
-            'rating': float(creador.calificacion_promedio or 0),
-            'studentsHelped': Tutoria.objects.filter(tutor=creador).exclude(estado='CANCELADA').count(),
-            'tutoring': tutoring_list
-        })
 
-    if user.rol == 'ADMINISTRADOR':
-        return Response({
-            'usuario': base_user,
-            'published': RecursoComunidad.objects.filter(activo=True).count(),
-            'rating': 0,
-            'studentsHelped': 0,
-            'tutoring': [],
-            'pendientes_count': ProximaActividad.objects.count(),
-            'nivel_actual': base_user.get('nivel', 1),
-            'puntos_totales': base_user.get('puntos_gamificacion', 0),
-        })
+def _panel_administrador(user):
+    base_user = _serialize_user_basic(user)
+    return {
+        'usuario': base_user,
+        'published': RecursoComunidad.objects.filter(activo=True).count(),
+        'rating': 0,
+        'studentsHelped': 0,
+        'tutoring': [],
+        'pendientes_count': ProximaActividad.objects.count(),
+        'nivel_actual': base_user.get('nivel', 1),
+        'puntos_totales': base_user.get('puntos_gamificacion', 0),
+    }
 
-    if not hasattr(request.user, 'perfil_estudiante'):
-        return Response({'error': 'Solo disponible para estudiantes'}, status=status.HTTP_403_FORBIDDEN)
 
-    estudiante = request.user.perfil_estudiante
+def _panel_estudiante(user):
+    base_user = _serialize_user_basic(user)
+    estudiante = user.perfil_estudiante
 
-    inscripciones = Inscripcion.objects.filter(estudiante=estudiante).select_related('curso').order_by('-fecha_ultimo_acceso')
+    inscripciones = list(
+        Inscripcion.objects.filter(estudiante=estudiante).select_related('curso').order_by('-fecha_ultimo_acceso')
+    )
 
     mis_cursos = []
     for inscripcion in inscripciones[:5]:
-        progreso_actualizado = _recalcular_progreso_inscripcion(inscripcion)
         mis_cursos.append({
             'id': inscripcion.curso.id,
             'titulo': inscripcion.curso.titulo,
-            'progreso': progreso_actualizado,
+            'progreso': float(inscripcion.progreso_porcentaje),
             'imagen_url': inscripcion.curso.imagen_portada
         })
 
@@ -1455,7 +1400,7 @@ def mi_panel(request):
 
     proximas_actividades = ProximaActividad.objects.filter(estudiante=estudiante, fecha__gte=today)
 
-    return Response({
+    return {
         'usuario': base_user,
         'mis_cursos': mis_cursos,
         'proximos_examenes': proximos_examenes[:5],
@@ -1464,7 +1409,34 @@ def mi_panel(request):
         'puntos_totales': base_user.get('puntos_gamificacion', 0),
         'nivel_actual': base_user.get('nivel', 1),
         'tutoring': []
-    })
+    }
+
+
+def _construir_panel(user):
+    if user.rol == 'CREADOR':
+        return _panel_creador(user)
+    if user.rol == 'ADMINISTRADOR':
+        return _panel_administrador(user)
+    return _panel_estudiante(user)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def mi_panel(request):
+    """
+    Panel inicial del usuario según su rol. Se sirve desde un snapshot en caché
+    (ver ``cursos/panel.py``) que se reconstruye cuando cambia algo relevante.
+    """
+    user = request.user
+
+    if user.rol == 'CREADOR':
+        if not hasattr(user, 'perfil_creador'):
+            return Response({'error': 'Perfil de creador no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+    elif user.rol != 'ADMINISTRADOR':
+        if not hasattr(user, 'perfil_estudiante'):
+            return Response({'error': 'Solo disponible para estudiantes'}, status=status.HTTP_403_FORBIDDEN)
+
+    return Response(panel.obtener(user, _construir_panel))
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -1482,15 +1454,16 @@ def mis_cursos_inscritos(request):
     
     inscripciones = Inscripcion.objects.filter(
         estudiante=estudiante
-    ).select_related('curso__creador')
+    ).select_related('curso__creador__id_usuario').prefetch_related(
+        models.Prefetch('curso__modulos', queryset=Modulo.objects.order_by('orden'))
+    )
     
     cursos = []
     for inscripcion in inscripciones:
-        progreso_actualizado = _recalcular_progreso_inscripcion(inscripcion)
         cursos.append({
             'inscripcion_id': inscripcion.id,
-            'curso': _course_to_catalog(inscripcion.curso, request.user),
-            'progreso_porcentaje': progreso_actualizado,
+            'curso': _course_to_catalog(inscripcion.curso, progress=float(inscripcion.progreso_porcentaje)),
+            'progreso_porcentaje': float(inscripcion.progreso_porcentaje),
             'completado': inscripcion.completado,
             'fecha_inscripcion': inscripcion.fecha_inscripcion,
             'ultimo_acceso': inscripcion.fecha_ultimo_acceso,
@@ -1514,12 +1487,6 @@ def buscar_cursos(request):
     
     cursos = Curso.objects.filter(activo=True)
     
-    if query:
-        cursos = cursos.filter(
-            models.Q(titulo__icontains=query) |
-            models.Q(descripcion__icontains=query)
-        )
-    
     if categoria:
         cursos = cursos.filter(categoria=categoria)
     
@@ -1529,8 +1496,10 @@ def buscar_cursos(request):
     if es_gratuito:
         cursos = cursos.filter(es_gratuito=True)
     
-    data = [_course_to_catalog(curso, request.user) for curso in cursos]
-    return Response(data)
+    if query:
+        cursos = busqueda.buscar(_catalog_queryset(cursos), query)
+    
+    return Response(busqueda.paginar(request, cursos, lambda pagina: _catalog_payload(pagina, request.user)))
 
 
 @api_view(['GET'])
@@ -1543,7 +1512,16 @@ def mi_progreso_detallado(request):
             status=status.HTTP_403_FORBIDDEN
         )
     estudiante = request.user.perfil_estudiante
-    inscripciones = Inscripcion.objects.filter(estudiante=estudiante).select_related('curso')
+    inscripciones = list(Inscripcion.objects.filter(estudiante=estudiante).select_related('curso'))
+
+    # Todos los intentos completados en una consulta, agrupados por curso
+    intentos_por_curso = {}
+    for intento in IntentoExamen.objects.filter(
+        estudiante=estudiante,
+        completado=True,
+        examen__curso_id__in=[inscripcion.curso_id for inscripcion in inscripciones],
+    ).select_related('examen'):
+        intentos_por_curso.setdefault(intento.examen.curso_id, []).append(intento)
 
     progreso_cursos = []
     total_minutos = 0
@@ -1551,12 +1529,14 @@ def mi_progreso_detallado(request):
 
     for inscripcion in inscripciones:
         curso = inscripcion.curso
-        progreso_actualizado = _recalcular_progreso_inscripcion(inscripcion)
+        progreso_actualizado = float(inscripcion.progreso_porcentaje)
         
-        intentos = IntentoExamen.objects.filter(examen__curso=curso, estudiante=estudiante, completado=True)
-        total_examenes = intentos.count()
-        promedio_examenes = intentos.aggregate(models.Avg('puntaje_obtenido')).get('puntaje_obtenido__avg') or 0
-        minutos_examenes = intentos.aggregate(models.Sum('tiempo_usado')).get('tiempo_usado__sum') or 0
+        intentos = intentos_por_curso.get(curso.id, [])
+        total_examenes = len(intentos)
+        promedio_examenes = (
+            sum(intento.puntaje_obtenido for intento in intentos) / total_examenes if total_examenes else 0
+        )
+        minutos_examenes = sum(intento.tiempo_usado or 0 for intento in intentos)
         total_minutos += minutos_examenes
 
         for intento in intentos:
@@ -1582,7 +1562,7 @@ def mi_progreso_detallado(request):
         'total_puntos': getattr(request.user, 'puntos_gamificacion', 0),
         'tiempo_total_minutos': total_minutos,
         'tiempo_total_horas': round(total_minutos / 60, 1),
-        'total_cursos': inscripciones.count(),
+        'total_cursos': len(inscripciones),
         'total_intentos': len(intentos_historial)
     }
 
@@ -1691,17 +1671,19 @@ def mis_logros(request):
     
     estudiante = request.user.perfil_estudiante
     logros = Logro.objects.filter(activo=True)
+    # Una sola consulta para el progreso de todos los logros del estudiante
+    progreso_por_logro = {
+        logro_estudiante.logro_id: logro_estudiante
+        for logro_estudiante in LogroEstudiante.objects.filter(estudiante=estudiante).select_related('logro')
+    }
     
     resultado = []
     for logro in logros:
-        try:
-            logro_estudiante = LogroEstudiante.objects.get(
-                estudiante=estudiante,
-                logro=logro
-            )
+        logro_estudiante = progreso_por_logro.get(logro.id)
+        if logro_estudiante is not None:
             serializer = LogroEstudianteSerializer(logro_estudiante)
             resultado.append(serializer.data)
-        except LogroEstudiante.DoesNotExist:
+        else:
             resultado.append({
                 'logro': LogroSerializer(logro).data,
                 'progreso_actual': 0,
@@ -1724,7 +1706,7 @@ class ProximaActividadViewSet(viewsets.ModelViewSet):
 
     def list(self, request, *args, **kwargs):
         today = timezone.localdate()
-        queryset = self.get_queryset().filter(fecha__gte=today).order_by('fecha', 'hora', 'id')
+        queryset = self.get_queryset().filter(fecha__gte=today).select_related('curso').order_by('fecha', 'hora', 'id')
         serializer = self.get_serializer(queryset, many=True)
         data = list(serializer.data)
         
@@ -1732,7 +1714,7 @@ class ProximaActividadViewSet(viewsets.ModelViewSet):
             tutorias = Tutoria.objects.filter(
                 estudiante=request.user.perfil_estudiante,
                 fecha_hora__gt=timezone.now()
-            ).exclude(estado='CANCELADA')
+            ).exclude(estado='CANCELADA').select_related('curso')
             
             for t in tutorias:
                  local_dt = timezone.localtime(t.fecha_hora)
@@ -1789,32 +1771,6 @@ class ProximaActividadViewSet(viewsets.ModelViewSet):
              raise PermissionDenied('No tienes permiso para eliminar este recurso')
         instance.delete()
     
-    @action(detail=True, methods=['post'])
-    def descargar(self, request, pk=None):
-        """Registrar descarga de recurso"""
-        recurso = self.get_object()
-        
-        DescargaRecurso.objects.create(
-            recurso=recurso,
-            usuario=request.user
-        )
-        
-        recurso.descargas += 1
-        recurso.save()
-        
-        url = recurso.archivo_url
-        if getattr(recurso, 'archivo', None):
-            try:
-                url = request.build_absolute_uri(recurso.archivo.url)
-            except Exception:
-                url = recurso.archivo_url
-
-        return Response({
-            'message': 'Descarga registrada',
-            'total_descargas': recurso.descargas,
-            'url': url
-        })
-    
     @action(detail=True, methods=['post'])
     def calificar(self, request, pk=None):
         """Calificar un recurso"""
@@ -1852,7 +1808,7 @@ class ProximaActividadViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def mis_recursos(self, request):
         """Ver mis recursos subidos"""
-        recursos = RecursoComunidad.objects.filter(autor=request.user)
+        recursos = _community_resources_queryset(RecursoComunidad.objects.filter(autor=request.user))
         serializer = self.get_serializer(recursos, many=True)
         return Response(serializer.data)
     
@@ -1867,7 +1823,7 @@ class ProximaActividadViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        recursos = self.queryset.filter(curso_id=curso_id)
+        recursos = self.get_queryset().filter(curso_id=curso_id)
         serializer = self.get_serializer(recursos, many=True)
         return Response(serializer.data)
     
@@ -1916,32 +1872,9 @@ class FormularioEstudioViewSet(viewsets.ModelViewSet):
         )
 
     def perform_create(self, serializer):
-        if self.request.user.rol != 'ADMINISTRADOR':
-            raise PermissionDenied('Solo administradores pueden crear cursos')
-        if hasattr(self.request.user, 'perfil_creador'):
-            curso = serializer.save(creador=self.request.user.perfil_creador)
-        else:
-            first_creator = Creador.objects.first()
-            if first_creator:
-                curso = serializer.save(creador=first_creator)
-            else:
-                raise PermissionDenied('No hay perfil de Creador disponible para asignar al curso.')
-        extra_prof = self.request.data.get('professor') or self.request.data.get('profesor')
-        extra_school = self.request.data.get('school') or self.request.data.get('escuela')
-        extra_level = self.request.data.get('level') or self.request.data.get('nivel')
-        updated_fields = []
-        if extra_prof is not None:
-            curso.profesor = str(extra_prof)
-            updated_fields.append('profesor')
-        if extra_school is not None:
-            curso.escuela = str(extra_school)
-            updated_fields.append('escuela')
-        if extra_level is not None:
-            curso.nivel = str(extra_level).upper()
-            updated_fields.append('nivel')
-        if updated_fields:
-            curso.save(update_fields=updated_fields)
-        _replace_course_modules(curso, self.request.data.get('temario') or self.request.data.get('modules'))
+        if not self._user_is_admin(self.request.user):
+            raise PermissionDenied('Solo administradores pueden crear formularios.')
+        serializer.save(creado_por=self.request.user)
 
     def perform_update(self, serializer):
         if not self._user_is_admin(self.request.user):
@@ -1953,6 +1886,56 @@ class FormularioEstudioViewSet(viewsets.ModelViewSet):
             raise PermissionDenied('Solo administradores pueden eliminar formularios.')
         return super().perform_destroy(instance)
 
+    @action(detail=True, methods=['get'], permission_classes=[permissions.AllowAny])
+    def archivo(self, request, pk=None):
+        """Contenido del PDF subido (con token o con URL firmada)."""
+        return _entregar_archivo(request, FormularioEstudio, pk)
+
+
+# ========== Subidas por partes ==========
+
+class SubidaArchivoViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Sesiones de subida por partes para archivos de recursos de comunidad y
+    formularios de estudio (ver cursos/subidas.py)
+    """
+    serializer_class = SubidaArchivoSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return SubidaArchivo.objects.filter(usuario=self.request.user, expira__gte=timezone.now())
+
+    def perform_create(self, serializer):
+        serializer.instance = subidas.crear(self.request.user, **serializer.validated_data)
+
+    def perform_destroy(self, instance):
+        subidas.borrar(instance)
+
+    @action(detail=True, methods=['put'], url_path=r'partes/(?P<numero>\d+)')
+    def parte(self, request, pk=None, numero=None):
+        """Agrega la parte ``numero``; el cuerpo son los bytes de la parte."""
+        subida = self.get_object()
+        try:
+            longitud = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            longitud = 0
+        try:
+            escrita = subidas.agregar_parte(
+                subida, int(numero), request.stream, longitud, request.headers.get('X-Parte-SHA256', '').lower()
+            )
+        except subidas.ParteInvalida as e:
+            return Response({'error': str(e), 'recibido': subida.recibido}, status=e.status)
+        return Response(
+            SubidaArchivoSerializer(subida).data,
+            status=status.HTTP_201_CREATED if escrita else status.HTTP_200_OK,
+        )
+
+
+
+def _forms_queryset(formularios):
+    """Formularios con su creador y conteo de respuestas en una sola consulta."""
+    return formularios.select_related('creador').annotate(num_respuestas=models.Count('respuestas'))
 
 
 class FormularioViewSet(viewsets.ModelViewSet):
@@ -1961,6 +1944,9 @@ class FormularioViewSet(viewsets.ModelViewSet):
     """
     queryset = Formulario.objects.filter(activo=True)
     permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return _forms_queryset(super().get_queryset())
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -2033,10 +2019,14 @@ class FormularioViewSet(viewsets.ModelViewSet):
         ).prefetch_related('detalles')
         
         preguntas = formulario.preguntas.all()
+        # Todos los detalles del formulario en una consulta, agrupados por pregunta
+        detalles_por_pregunta = {}
+        for detalle in DetalleRespuesta.objects.filter(pregunta__formulario=formulario).order_by('id'):
+            detalles_por_pregunta.setdefault(detalle.pregunta_id, []).append(detalle)
         estadisticas = []
         
         for pregunta in preguntas:
-            detalles = DetalleRespuesta.objects.filter(pregunta=pregunta)
+            detalles = detalles_por_pregunta.get(pregunta.id, [])
             
             if pregunta.tipo == 'ESCALA' or pregunta.tipo == 'OPCION_MULTIPLE':
                 from collections import Counter
@@ -2047,14 +2037,14 @@ class FormularioViewSet(viewsets.ModelViewSet):
                 estadisticas.append({
                     'pregunta': pregunta.texto_pregunta,
                     'tipo': pregunta.tipo,
-                    'total_respuestas': detalles.count(),
+                    'total_respuestas': len(detalles),
                     'distribuciÃƒÆ’Ã‚Â³n': dict(opciones_count)
                 })
             else:
                 estadisticas.append({
                     'pregunta': pregunta.texto_pregunta,
                     'tipo': pregunta.tipo,
-                    'total_respuestas': detalles.count(),
+                    'total_respuestas': len(detalles),
                     'respuestas': [d.respuesta_texto for d in detalles if d.respuesta_texto][:10]  # Primeras 10
                 })
         
@@ -2066,9 +2056,7 @@ class FormularioViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def disponibles(self, request):
         """Formularios disponibles para responder"""
-        formularios = Formulario.objects.filter(
-            activo=True
-        ).filter(
+        formularios = self.get_queryset().filter(
             models.Q(fecha_cierre__isnull=True) |
             models.Q(fecha_cierre__gt=timezone.now())
         )
@@ -2086,6 +2074,6 @@ class FormularioViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def mis_formularios(self, request):
         """Formularios que he creado"""
-        formularios = Formulario.objects.filter(creador=request.user)
+        formularios = _forms_queryset(Formulario.objects.filter(creador=request.user))
         serializer = self.get_serializer(formularios, many=True)
         return Response(serializer.data)
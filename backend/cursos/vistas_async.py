@@ -0,0 +1,102 @@
+"""
+Vistas ``async def`` para las lecturas más frecuentes cuando el backend corre
+en modo ASGI (uvicorn bajo gunicorn, ver ``deploy/gunicorn.conf.py``).
+
+Cada vista atiende solo el GET simple con el ORM asíncrono de Django y devuelve
+exactamente el mismo JSON que su equivalente de DRF. Cualquier otra cosa (POST,
+paginación por cursor, etc.) se delega a la vista síncrona original, así que
+las URLs se comportan igual en WSGI y en ASGI. ``cursos/urls.py`` solo las
+monta cuando ``settings.ASYNC_VIEWS`` está activo.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+
+from usuarios.autenticacion import CachedTokenAuthentication
+from .models import Curso, Inscripcion, Logro, Notificacion, TemaForo
+from .serializers import NotificacionSerializer
+from . import views
+
+
+def _json(data, status=200, headers=None):
+    response = HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+    for header, value in (headers or {}).items():
+        response[header] = value
+    return response
+
+
+def _pide_paginacion(request):
+    return 'cursor' in request.GET
+
+
+def lectura_async(vista_sync, paginable=False):
+    """
+    Envuelve una vista async de solo lectura: autentica el token de forma
+    asíncrona y delega a ``vista_sync`` todo lo que no sea un GET simple.
+    """
+    def decorador(vista_async):
+        @wraps(vista_async)
+        async def vista(request, *args, **kwargs):
+            if request.method != 'GET' or (paginable and _pide_paginacion(request)):
+                return await sync_to_async(vista_sync)(request, *args, **kwargs)
+
+            autenticacion = CachedTokenAuthentication()
+            cabecera = {'WWW-Authenticate': autenticacion.authenticate_header(request)}
+            try:
+                resultado = await autenticacion.aauthenticate(request)
+            except exceptions.AuthenticationFailed as exc:
+                return _json({'detail': exc.detail}, status=401, headers=cabecera)
+            if resultado is None:
+                return _json(
+                    {'detail': exceptions.NotAuthenticated.default_detail}, status=401, headers=cabecera
+                )
+            request.user = resultado[0]
+            return _json(await vista_async(request, *args, **kwargs))
+
+        # Igual que las vistas de DRF: la autenticación es por token, no por sesión
+        vista.csrf_exempt = True
+        return vista
+    return decorador
+
+
+@lectura_async(views.CursoViewSet.as_view({'get': 'list', 'post': 'create'}))
+async def catalogo(request):
+    cursos = [curso async for curso in views._catalog_queryset(Curso.objects.filter(activo=True))]
+    progress_by_course = {}
+    if hasattr(request.user, 'perfil_estudiante'):
+        progress_by_course = {
+            curso_id: float(porcentaje)
+            async for curso_id, porcentaje in Inscripcion.objects.filter(
+                estudiante=request.user.perfil_estudiante
+            ).values_list('curso_id', 'progreso_porcentaje')
+        }
+    return [
+        views._course_to_catalog(curso, progress=progress_by_course.get(curso.id, 0))
+        for curso in cursos
+    ]
+
+
+@lectura_async(views.NotificacionViewSet.as_view({'get': 'list'}), paginable=True)
+async def notificaciones(request):
+    notificaciones = [notificacion async for notificacion in Notificacion.objects.filter(usuario=request.user)]
+    return NotificacionSerializer(notificaciones, many=True).data
+
+
+@lectura_async(views.ForoViewSet.as_view({'get': 'list', 'post': 'create'}), paginable=True)
+async def foro(request):
+    temas = views._forum_topics_queryset(TemaForo.objects.all())
+    return [views._forum_topic_summary(tema) async for tema in temas]
+
+
+@lectura_async(views.lista_logros)
+async def lista_logros(request):
+    return [{
+        'id': logro.id,
+        'title': logro.nombre,
+        'description': logro.descripcion,
+        'icon': logro.icono,
+        'date': None,
+    } async for logro in Logro.objects.filter(activo=True)]
@@ -25,12 +25,14 @@ python manage.py migrate --noinput
 echo ">>> Recolectando archivos estáticos..."
 python manage.py collectstatic --noinput
 
-echo ">>> Reiniciando servicio..."
+echo ">>> Reiniciando servicios..."
 sudo systemctl restart estudiapro
+sudo systemctl restart estudiapro-worker
 
 echo ">>> Verificando estado..."
 sleep 2
 sudo systemctl status estudiapro --no-pager | head -10
+sudo systemctl status estudiapro-worker --no-pager | head -5
 
 echo ""
 echo "=========================================="
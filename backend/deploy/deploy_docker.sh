@@ -40,6 +40,7 @@ echo ""
 echo "Comandos útiles:"
 echo "  docker compose logs -f          # Ver logs en tiempo real"
 echo "  docker compose restart backend  # Reiniciar backend"
+echo "  docker compose logs -f worker   # Logs del worker de tareas"
 echo "  docker compose down             # Detener todo"
 echo "  docker compose exec backend python manage.py shell  # Django shell"
 echo ""
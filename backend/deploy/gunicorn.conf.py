@@ -1,27 +1,48 @@
 # Gunicorn configuration file para Estudia Pro Backend
 # https://docs.gunicorn.org/en/stable/settings.html
 
+import glob
 import multiprocessing
+import os
+import tempfile
 
-bind = "127.0.0.1:8000"
+# Los valores por defecto son los del servidor EC2 (deploy/estudiapro.service);
+# el Dockerfile los cambia por variables de entorno.
+bind = os.getenv("GUNICORN_BIND", "127.0.0.1:8000")
 
-workers = 2
-worker_class = "sync"
+# GUNICORN_MODE=wsgi (por defecto): workers sync con estudiapro.wsgi.
+# GUNICORN_MODE=asgi: workers de uvicorn con estudiapro.asgi, que además monta
+# las vistas async de lectura (cursos/vistas_async.py). Un request lento ya no
+# bloquea un worker completo.
+mode = os.getenv("GUNICORN_MODE", "wsgi").lower()
+if mode == "asgi":
+    wsgi_app = "estudiapro.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    wsgi_app = "estudiapro.wsgi:application"
+    worker_class = "sync"
+
+# Los mismos valores dimensionan el pool de conexiones (DB_POOL, ver settings).
+# Con GUNICORN_THREADS > 1 en modo wsgi gunicorn usa workers gthread.
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "1"))
 worker_connections = 1000
 timeout = 120
 keepalive = 5
 
-accesslog = "/home/ubuntu/estudia-pro/logs/gunicorn_access.log"
-errorlog = "/home/ubuntu/estudia-pro/logs/gunicorn_error.log"
+# "-" escribe a stdout/stderr
+accesslog = os.getenv("GUNICORN_ACCESSLOG", "/home/ubuntu/estudia-pro/logs/gunicorn_access.log")
+errorlog = os.getenv("GUNICORN_ERRORLOG", "/home/ubuntu/estudia-pro/logs/gunicorn_error.log")
 loglevel = "info"
 capture_output = True
 
 proc_name = "estudiapro"
 
 daemon = False
-pidfile = "/home/ubuntu/estudia-pro/gunicorn.pid"
-user = "ubuntu"
-group = "ubuntu"
+# Vacíos: sin pidfile y sin cambiar de usuario
+pidfile = os.getenv("GUNICORN_PIDFILE", "/home/ubuntu/estudia-pro/gunicorn.pid") or None
+user = os.getenv("GUNICORN_USER", "ubuntu") or None
+group = os.getenv("GUNICORN_GROUP", "ubuntu") or None
 
 raw_env = [
     "DJANGO_SETTINGS_MODULE=estudiapro.settings",
@@ -33,3 +54,35 @@ max_requests_jitter = 100
 
 
 preload_app = True
+
+# Métricas de Prometheus compartidas entre workers (estudiapro/metricas.py).
+# El directorio se toma de PROMETHEUS_MULTIPROC_DIR (por defecto uno en el
+# directorio temporal) y debe existir antes de que preload_app importe Django.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "estudiapro-metrics"))
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+
+def on_starting(server):
+    # Los archivos de workers de una ejecución anterior sumarían contadores viejos
+    for archivo in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+        if not archivo.endswith(f"_{os.getpid()}.db"):
+            os.remove(archivo)
+
+
+def post_worker_init(worker):
+    from estudiapro import conexiones
+
+    bases = conexiones.reporte()["bases"]
+    worker.log.info("Worker %s listo; bases de datos: %s", worker.pid, bases)
+
+
+def worker_exit(server, worker):
+    from estudiapro import conexiones
+
+    server.log.info("Worker %s termina; conexiones: %s", worker.pid, conexiones.reporte())
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -104,6 +104,14 @@ sudo systemctl enable estudiapro
 sudo systemctl start estudiapro
 print_status "Servicio Gunicorn configurado"
 
+echo ""
+echo ">>> Configurando worker de tareas..."
+sudo cp /home/ubuntu/estudia-pro/backend/deploy/estudiapro-worker.service /etc/systemd/system/
+sudo systemctl daemon-reload
+sudo systemctl enable estudiapro-worker
+sudo systemctl start estudiapro-worker
+print_status "Worker de tareas configurado"
+
 echo ""
 echo ">>> Configurando permisos..."
 sudo chown -R ubuntu:ubuntu /home/ubuntu/estudia-pro
@@ -120,6 +128,9 @@ sudo systemctl status nginx --no-pager | head -5
 echo ""
 echo "Gunicorn (Estudia Pro):"
 sudo systemctl status estudiapro --no-pager | head -5
+echo ""
+echo "Worker de tareas:"
+sudo systemctl status estudiapro-worker --no-pager | head -5
 
 echo ""
 echo "=========================================="
@@ -128,7 +139,7 @@ echo "=========================================="
 echo ""
 echo "Próximos pasos:"
 echo "1. Editar /home/ubuntu/estudia-pro/backend/.env con tus valores"
-echo "2. Si cambiaste .env, ejecutar: sudo systemctl restart estudiapro"
+echo "2. Si cambiaste .env, ejecutar: sudo systemctl restart estudiapro estudiapro-worker"
 echo "3. Verificar logs: tail -f /home/ubuntu/estudia-pro/logs/*.log"
 echo "4. Probar API: curl http://localhost/api/"
 echo ""
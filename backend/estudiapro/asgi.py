@@ -12,5 +12,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'estudiapro.settings')
+# Bajo ASGI se montan las vistas async de lectura (cursos/vistas_async.py)
+os.environ.setdefault('DJANGO_ASYNC_VIEWS', 'True')
+# Cada request async corre su código síncrono en un hilo nuevo; una conexión
+# persistente quedaría huérfana en ese hilo. Para reutilizar conexiones bajo
+# ASGI se usa el pool (DB_POOL=True).
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
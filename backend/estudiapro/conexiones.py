@@ -0,0 +1,70 @@
+"""
+Reporte de conexiones a la base de datos del proceso actual.
+
+Cada worker de gunicorn tiene sus propias conexiones, así que el reporte es por
+proceso: cuántas peticiones atendió, cuántas conexiones abrió (con conexiones
+persistentes o pool la proporción debe quedar muy por debajo de 1) y, si
+``DB_POOL`` está activo, las estadísticas del pool. Lo consumen
+``/api/admin/conexiones/`` y los hooks de ``deploy/gunicorn.conf.py``.
+"""
+import os
+import threading
+import time
+from collections import Counter
+
+from django.core.signals import request_finished
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from .postgresql_pool.base import pools
+
+
+_inicio = time.monotonic()
+_lock = threading.Lock()
+_peticiones = 0
+_abiertas = Counter()
+
+
+def _contar_conexion(sender, connection, **kwargs):
+    with _lock:
+        _abiertas[connection.alias] += 1
+
+
+def _contar_peticion(sender, **kwargs):
+    global _peticiones
+    with _lock:
+        _peticiones += 1
+
+
+def conectar_senales():
+    connection_created.connect(_contar_conexion, dispatch_uid='conexiones_creadas')
+    request_finished.connect(_contar_peticion, dispatch_uid='conexiones_peticiones')
+
+
+def reporte():
+    """Diccionario serializable con el estado de las conexiones de este proceso."""
+    with _lock:
+        peticiones = _peticiones
+        abiertas = dict(_abiertas)
+
+    bases = {}
+    for alias in connections:
+        settings_dict = connections.settings[alias]
+        total = abiertas.get(alias, 0)
+        bases[alias] = {
+            'engine': settings_dict['ENGINE'],
+            'conn_max_age': settings_dict.get('CONN_MAX_AGE'),
+            'conn_health_checks': settings_dict.get('CONN_HEALTH_CHECKS'),
+            'conexiones_abiertas': total,
+            'conexiones_por_peticion': round(total / peticiones, 4) if peticiones else None,
+        }
+
+    for alias, pool in pools().items():
+        bases[alias]['pool'] = pool.get_stats()
+
+    return {
+        'pid': os.getpid(),
+        'uptime_segundos': round(time.monotonic() - _inicio, 1),
+        'peticiones': peticiones,
+        'bases': bases,
+    }
@@ -0,0 +1,159 @@
+"""
+Entrega de archivos subidos (``FileField``) después de revisar permisos.
+
+``entregar`` arma la respuesta de un archivo:
+
+- ``ETag`` fuerte con el SHA-256 guardado en el modelo; ``If-None-Match`` y
+  ``If-Match`` se contestan con 304/412 sin tocar el disco.
+- ``Cache-Control: private``. Si la URL trae ``v`` igual al hash actual, el
+  contenido de esa URL no cambia y se permite guardarlo
+  ``ARCHIVOS_CACHE_SEGUNDOS``; sin ``v`` el navegador revalida con el ETag.
+- Con ``ARCHIVOS_X_ACCEL_PREFIJO`` (p. ej. ``/archivos-protegidos/``) la vista
+  solo responde la cabecera ``X-Accel-Redirect`` y nginx manda los bytes desde
+  una ``location internal`` (con rangos incluidos), así que un PDF grande no
+  ocupa un worker sync de gunicorn.
+- Sin nginx (desarrollo) se transmite desde Django, con soporte de un rango
+  ``Range: bytes=...`` (206/416) e ``If-Range``.
+- Si el storage no es local (sin ``path``) se redirige a ``archivo.url``.
+
+``firmar`` agrega ``expira`` y ``firma`` a una ruta para abrirla sin token (una
+pestaña nueva o un visor de PDF no mandan ``Authorization``). El vencimiento se
+redondea a ventanas de ``ARCHIVOS_FIRMA_TTL``, así que la URL firmada es estable
+dentro de la ventana y el navegador puede reutilizar su copia.
+"""
+import mimetypes
+import os
+import re
+import time
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.core import signing
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import constant_time_compare
+from django.utils.http import content_disposition_header
+
+
+RANGO = re.compile(r'^bytes=(\d*)-(\d*)$')
+TAMANO_BLOQUE = 64 * 1024
+
+_firmador = signing.Signer(salt='estudiapro.entrega')
+
+
+def firmar(ruta, version=''):
+    """``ruta`` con ``v``, ``expira`` y ``firma`` en el query string."""
+    ttl = settings.ARCHIVOS_FIRMA_TTL
+    # Al menos un TTL completo de vigencia, y el mismo valor para toda la ventana
+    expira = (int(time.time()) // ttl + 2) * ttl
+    parametros = {'expira': expira, 'firma': _firmador.signature(f'{ruta}:{expira}')}
+    if version:
+        parametros = {'v': version[:16], **parametros}
+    return f'{ruta}?{urlencode(parametros)}'
+
+
+def url_archivo(request, nombre_url, instancia):
+    """URL (absoluta si hay ``request``) y firmada de la vista de entrega de ``instancia``."""
+    ruta = firmar(reverse(nombre_url, args=[instancia.pk]), instancia.hash_archivo)
+    return request.build_absolute_uri(ruta) if request else ruta
+
+
+def firma_valida(request):
+    """``True`` si la petición trae una firma vigente para su ruta."""
+    expira = request.GET.get('expira', '')
+    firma = request.GET.get('firma', '')
+    if not expira.isdigit() or not firma or int(expira) < time.time():
+        return False
+    return constant_time_compare(firma, _firmador.signature(f'{request.path}:{expira}'))
+
+
+def _rango(request, tamano, etag):
+    """``(inicio, fin)`` del rango pedido, ``None`` para el archivo completo o ``False`` si no se puede servir."""
+    cabecera = request.headers.get('Range', '')
+    if not cabecera or tamano == 0:
+        return None
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range != etag:
+        return None
+    coincide = RANGO.match(cabecera.strip())
+    if not coincide:
+        # Varios rangos o unidades distintas: se responde el archivo completo
+        return None
+    inicio, fin = coincide.groups()
+    if not inicio and not fin:
+        return None
+    if not inicio:
+        inicio, fin = max(tamano - int(fin), 0), tamano - 1
+    else:
+        inicio, fin = int(inicio), min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or inicio > fin:
+        return False
+    return inicio, fin
+
+
+def _leer(ruta, inicio, longitud):
+    with open(ruta, 'rb') as archivo:
+        archivo.seek(inicio)
+        while longitud > 0:
+            bloque = archivo.read(min(TAMANO_BLOQUE, longitud))
+            if not bloque:
+                break
+            longitud -= len(bloque)
+            yield bloque
+
+
+def _cabeceras(response, request, nombre, etag, version):
+    response['Content-Disposition'] = content_disposition_header(False, nombre)
+    response['Accept-Ranges'] = 'bytes'
+    if etag:
+        response['ETag'] = etag
+    if version and request.GET.get('v') == version[:16]:
+        response['Cache-Control'] = f'private, max-age={settings.ARCHIVOS_CACHE_SEGUNDOS}, immutable'
+    else:
+        response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def entregar(request, archivo, version='', nombre=None):
+    """
+    Respuesta con el contenido de ``archivo`` (un ``FieldFile``). ``version`` es
+    el SHA-256 del contenido; sin él no hay ETag.
+    """
+    nombre = nombre or os.path.basename(archivo.name)
+    etag = f'"{version}"' if version else None
+    if etag:
+        condicional = get_conditional_response(request, etag=etag)
+        if condicional is not None:
+            return _cabeceras(condicional, request, nombre, etag, version)
+
+    tipo = mimetypes.guess_type(nombre)[0] or 'application/octet-stream'
+    prefijo = settings.ARCHIVOS_X_ACCEL_PREFIJO
+    if prefijo:
+        response = HttpResponse(content_type=tipo)
+        response['X-Accel-Redirect'] = quote(f"{prefijo.rstrip('/')}/{archivo.name}")
+        return _cabeceras(response, request, nombre, etag, version)
+
+    try:
+        ruta = archivo.path
+    except NotImplementedError:
+        return HttpResponseRedirect(archivo.url)
+    try:
+        tamano = os.path.getsize(ruta)
+    except FileNotFoundError:
+        raise Http404('El archivo ya no existe')
+
+    rango = _rango(request, tamano, etag)
+    if rango is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{tamano}'
+        return _cabeceras(response, request, nombre, etag, version)
+    if rango is None:
+        response = FileResponse(open(ruta, 'rb'), content_type=tipo)
+        return _cabeceras(response, request, nombre, etag, version)
+
+    inicio, fin = rango
+    response = StreamingHttpResponse(_leer(ruta, inicio, fin - inicio + 1), status=206, content_type=tipo)
+    response['Content-Length'] = str(fin - inicio + 1)
+    response['Content-Range'] = f'bytes {inicio}-{fin}/{tamano}'
+    return _cabeceras(response, request, nombre, etag, version)
@@ -0,0 +1,38 @@
+"""
+Escrituras concurrentes con reintento.
+
+``escritura_con_reintentos`` ejecuta la vista dentro de ``transaction.atomic()``
+y, si la base responde "database is locked" (SQLite con varios workers), la
+repite con espera exponencial y jitter hasta ``ESCRITURA_REINTENTOS`` veces.
+Como todo el bloque se revierte antes de reintentar, repetirlo es seguro. Con
+PostgreSQL el error no ocurre y el decorador solo agrega la transacción.
+"""
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+
+def _es_bloqueo(exc):
+    mensaje = str(exc).lower()
+    return 'database is locked' in mensaje or 'database table is locked' in mensaje
+
+
+def escritura_con_reintentos(vista):
+    @wraps(vista)
+    def envuelta(*args, **kwargs):
+        intento = 0
+        while True:
+            try:
+                with transaction.atomic():
+                    return vista(*args, **kwargs)
+            except OperationalError as exc:
+                # Dentro de otra transacción el reintento le toca al bloque externo
+                if connection.in_atomic_block or not _es_bloqueo(exc) or intento >= settings.ESCRITURA_REINTENTOS:
+                    raise
+            espera = settings.ESCRITURA_BACKOFF * (2 ** intento)
+            time.sleep(espera + random.uniform(0, espera))
+            intento += 1
+    return envuelta
@@ -0,0 +1,113 @@
+"""
+Instrumentación por request: consultas SQL, tiempo en base de datos, vista y
+tiempo total.
+
+``InstrumentacionMiddleware`` instala un ``execute_wrapper`` en cada conexión
+mientras dura la petición, así que funciona con ``DEBUG=False`` (no depende de
+``connection.queries``) y solo agrega un par de ``perf_counter()`` por consulta.
+Los datos salen en la cabecera ``Server-Timing`` (visible en las devtools del
+navegador), en los histogramas de ``estudiapro.metricas`` y, si la vista rebasa
+su presupuesto, en una línea JSON del logger ``estudiapro.instrumentacion``.
+
+Presupuestos: ``settings.PRESUPUESTOS_VISTAS`` (un dict o la ruta a uno, por
+defecto ``cursos.presupuestos.PRESUPUESTOS``) mapea el nombre de la URL
+(``curso-list``, ``votar-respuesta``...) a ``{'consultas': n, 'db_ms': ms}``,
+con ``por_metodo`` para límites distintos en escrituras; las vistas sin entrada
+usan ``PRESUPUESTO_CONSULTAS`` y ``PRESUPUESTO_DB_MS``.
+"""
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.module_loading import import_string
+
+from . import metricas
+
+
+logger = logging.getLogger(__name__)
+
+
+class MedidorConsultas:
+    """``execute_wrapper`` que acumula número de consultas y segundos en la base."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.consultas += 1
+
+
+def presupuestos_vistas():
+    """La tabla de ``PRESUPUESTOS_VISTAS``, importándola si es una ruta."""
+    tabla = settings.PRESUPUESTOS_VISTAS
+    return import_string(tabla) if isinstance(tabla, str) else tabla
+
+
+def presupuesto(vista, metodo=None):
+    """``(consultas, db_ms)`` permitidos para la vista ``vista`` (nombre de URL)."""
+    propio = presupuestos_vistas().get(vista, {})
+    consultas = propio.get('consultas', settings.PRESUPUESTO_CONSULTAS)
+    return (
+        propio.get('por_metodo', {}).get(metodo, consultas),
+        propio.get('db_ms', settings.PRESUPUESTO_DB_MS),
+    )
+
+
+def _nombre_vista(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    return match.view_name or match._func_path
+
+
+class InstrumentacionMiddleware:
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTACION_ACTIVA:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        medidor = MedidorConsultas()
+        inicio = time.perf_counter()
+        with ExitStack() as pila:
+            for alias in connections:
+                pila.enter_context(connections[alias].execute_wrapper(medidor))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - inicio) * 1000
+        db_ms = medidor.segundos * 1000
+        vista = _nombre_vista(request) or '-'
+        metricas.observar_request(
+            vista, request.method, response.status_code, total_ms / 1000, medidor.consultas, medidor.segundos
+        )
+
+        response['Server-Timing'] = (
+            f'db;dur={db_ms:.1f};desc="{medidor.consultas} consultas", '
+            f'app;dur={total_ms:.1f};desc="{vista}"'
+        )
+
+        limite_consultas, limite_db_ms = presupuesto(vista, request.method)
+        if medidor.consultas > limite_consultas or db_ms > limite_db_ms:
+            logger.warning(json.dumps({
+                'evento': 'presupuesto_excedido',
+                'vista': vista,
+                'metodo': request.method,
+                'ruta': request.path,
+                'status': response.status_code,
+                'consultas': medidor.consultas,
+                'presupuesto_consultas': limite_consultas,
+                'db_ms': round(db_ms, 2),
+                'presupuesto_db_ms': limite_db_ms,
+                'total_ms': round(total_ms, 2),
+            }))
+        return response
@@ -0,0 +1,86 @@
+"""
+Métricas en formato de texto de Prometheus, expuestas en ``/metrics``.
+
+- Latencia por vista (nombre de URL: ``curso-list``, ``examen-enviar-respuestas``...),
+  consultas SQL y tiempo en base de datos por request. Las alimenta
+  ``InstrumentacionMiddleware`` con lo que ya mide.
+- Aciertos y fallos de las cachés de la aplicación (``cache``: ``panel``,
+  ``auth``, ``banco_preguntas``); la proporción de aciertos sale de
+  ``rate(hit) / rate(hit + miss)``.
+- Exámenes enviados, votos y descargas. Se cuentan al confirmar la transacción,
+  así que un reintento o un rollback no los duplica.
+
+Con ``PROMETHEUS_MULTIPROC_DIR`` definido (lo hace ``deploy/gunicorn.conf.py``)
+cada worker escribe sus valores en archivos de ese directorio y ``/metrics``
+suma los de todos, sin importar qué worker atienda la petición. Sin la variable
+(``runserver``, pruebas) las métricas viven en memoria del proceso.
+"""
+import os
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+
+REQUEST_SEGUNDOS = Histogram(
+    'estudiapro_request_segundos', 'Duración de cada request por vista',
+    ['vista', 'metodo', 'codigo'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+CONSULTAS_POR_REQUEST = Histogram(
+    'estudiapro_consultas_por_request', 'Consultas SQL por request',
+    ['vista'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+DB_SEGUNDOS = Histogram(
+    'estudiapro_db_segundos', 'Tiempo en base de datos por request',
+    ['vista'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+CACHE_CONSULTAS = Counter(
+    'estudiapro_cache_consultas', 'Lecturas de las cachés de la aplicación',
+    ['cache', 'resultado'],
+)
+EXAMENES_ENVIADOS = Counter('estudiapro_examenes_enviados', 'Intentos de examen calificados')
+VOTOS = Counter('estudiapro_votos', 'Votos del foro registrados, cambiados o retirados', ['tipo', 'accion'])
+DESCARGAS = Counter('estudiapro_descargas', 'Descargas registradas', ['origen'])
+
+
+def observar_request(vista, metodo, codigo, segundos, consultas, db_segundos):
+    REQUEST_SEGUNDOS.labels(vista, metodo, f'{codigo // 100}xx').observe(segundos)
+    CONSULTAS_POR_REQUEST.labels(vista).observe(consultas)
+    DB_SEGUNDOS.labels(vista).observe(db_segundos)
+
+
+def consulta_cache(cache, acierto):
+    CACHE_CONSULTAS.labels(cache, 'hit' if acierto else 'miss').inc()
+
+
+def examen_enviado():
+    transaction.on_commit(EXAMENES_ENVIADOS.inc)
+
+
+def voto(tipo, accion):
+    transaction.on_commit(VOTOS.labels(tipo, accion).inc)
+
+
+def descarga(origen):
+    transaction.on_commit(DESCARGAS.labels(origen).inc)
+
+
+def _registro():
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registro = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registro)
+    return registro
+
+
+def vista_metricas(request):
+    """``GET /metrics``; si ``METRICAS_TOKEN`` está definido exige ``Authorization: Bearer <token>``."""
+    token = settings.METRICAS_TOKEN
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse(status=401)
+    return HttpResponse(generate_latest(_registro()), content_type=CONTENT_TYPE_LATEST)
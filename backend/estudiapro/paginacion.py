@@ -0,0 +1,139 @@
+"""
+Paginación keyset (por cursor) para los listados de la API.
+
+Es opcional para no romper al frontend actual: solo se activa cuando la petición
+trae ``cursor`` (vacío para la primera página); ``page_size`` solo fija el tamaño
+de la página. Sin ``cursor`` las vistas siguen devolviendo el arreglo completo,
+igual que las búsquedas sin ``page`` (ver ``cursos.busqueda.paginar``).
+
+Cada vista declara ``keyset_ordering``, una tupla de campos que termina en un
+campo único, p. ej. ``('-fecha_creacion', '-id')``. El cursor codifica los
+valores de esos campos del último elemento de la página.
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def __init__(self, ordering=None):
+        self.ordering = tuple(ordering) if ordering else None
+
+    # --- activación y tamaño de página ---
+
+    def is_requested(self, request):
+        return self.cursor_query_param in request.query_params
+
+    def get_page_size(self, request):
+        default = settings.REST_FRAMEWORK.get('PAGE_SIZE') or 50
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param) or default)
+        except (TypeError, ValueError):
+            page_size = default
+        return min(max(page_size, 1), self.max_page_size)
+
+    # --- cursor ---
+
+    def encode_cursor(self, values):
+        raw = json.dumps(values, default=str, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, token, model):
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except Exception:
+            raise NotFound('Cursor inválido')
+
+    def _after(self, values):
+        """Filtro "estrictamente después de ``values``" respetando la dirección de cada campo."""
+        condition = Q()
+        for idx, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            term = Q(**{f'{name}__{lookup}': values[idx]})
+            for prev_field, prev_value in zip(self.ordering[:idx], values[:idx]):
+                term &= Q(**{prev_field.lstrip('-'): prev_value})
+            condition |= term
+        return condition
+
+    def _values_of(self, obj):
+        values = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip('-'))
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return values
+
+    # --- API de DRF ---
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.ordering is None:
+            self.ordering = tuple(getattr(view, 'keyset_ordering', None) or ())
+        if not self.ordering or not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            queryset = queryset.filter(self._after(self.decode_cursor(token, queryset.model)))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        page = rows[:self.page_size]
+        self.next_cursor = self.encode_cursor(self._values_of(page[-1])) if self.has_next else None
+        return page
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('next_cursor', self.next_cursor),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'next_cursor': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+
+def paginar_keyset(request, queryset, ordering, serializar):
+    """
+    Atajo para vistas de función (``@api_view``): regresa la respuesta paginada
+    si el cliente la pidió o la lista completa en orden ``ordering`` si no.
+    """
+    paginator = KeysetPagination(ordering)
+    page = paginator.paginate_queryset(queryset, request)
+    if page is None:
+        return Response(serializar(queryset.order_by(*ordering)))
+    return paginator.get_paginated_response(serializar(page))
@@ -0,0 +1,208 @@
+"""
+Perfilado bajo demanda de un request, solo para administradores.
+
+Un ``ADMINISTRADOR`` agrega la cabecera ``X-Perfilar: 1`` o el parámetro
+``?perfilar=1`` y ``PerfiladoMiddleware`` ejecuta la vista con un muestreador:
+un hilo que cada ``PERFILADO_INTERVALO_MS`` toma la pila del hilo que atiende el
+request (``sys._current_frames``). Para cualquier otro usuario la marca se
+ignora. Se guardan dos archivos en ``PERFILADO_DIR``:
+
+- ``<id>.folded``: pilas colapsadas (``a;b;c 12``), listas para
+  ``flamegraph.pl`` o speedscope.
+- ``<id>.json``: vista, ruta, usuario, duración y la lista de consultas SQL con
+  su tiempo (capturadas con ``execute_wrapper``, sin depender de ``DEBUG``).
+
+La respuesta trae ``X-Perfil-Id``. El directorio se limita a
+``PERFILADO_MAX_MB``: al rebasarlo se borran los perfiles más antiguos. Los
+endpoints ``/api/admin/perfiles/`` listan y descargan los perfiles.
+
+Las vistas ``async`` (modo ASGI) corren fuera del hilo muestreado; su perfil
+solo muestra la espera.
+"""
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from rest_framework import exceptions
+
+from usuarios.autenticacion import CachedTokenAuthentication
+
+
+PERFIL_ID = re.compile(r'^\d{8}-\d{6}-[0-9a-f]{8}$')
+ARCHIVOS = {'folded': '.folded', 'consultas': '.json'}
+
+
+class Muestreador(threading.Thread):
+    """Cuenta las pilas de ``hilo_id`` cada ``intervalo`` segundos."""
+
+    def __init__(self, hilo_id, intervalo):
+        super().__init__(daemon=True)
+        self.hilo_id = hilo_id
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self._fin = threading.Event()
+
+    def run(self):
+        while not self._fin.wait(self.intervalo):
+            frame = sys._current_frames().get(self.hilo_id)
+            pila = []
+            while frame is not None:
+                codigo = frame.f_code
+                modulo = frame.f_globals.get('__name__', '?')
+                pila.append(f"{modulo}:{getattr(codigo, 'co_qualname', codigo.co_name)}")
+                frame = frame.f_back
+            if pila:
+                self.pilas[';'.join(reversed(pila))] += 1
+
+    def detener(self):
+        self._fin.set()
+        self.join()
+
+    def colapsado(self):
+        return ''.join(f'{pila} {cuenta}\n' for pila, cuenta in self.pilas.most_common())
+
+
+class RegistroConsultas:
+    """``execute_wrapper`` que guarda cada consulta con su duración."""
+
+    def __init__(self, limite):
+        self.limite = limite
+        self.consultas = []
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.total += 1
+            if len(self.consultas) < self.limite:
+                self.consultas.append({
+                    'sql': sql,
+                    'params': repr(params)[:500],
+                    'ms': round((time.perf_counter() - inicio) * 1000, 3),
+                    'alias': context['connection'].alias,
+                })
+
+
+def _directorio():
+    directorio = Path(settings.PERFILADO_DIR)
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio
+
+
+def _rotar(directorio, conservar):
+    """Borra los perfiles más antiguos (menos ``conservar``) hasta quedar dentro de ``PERFILADO_MAX_MB``."""
+    limite = settings.PERFILADO_MAX_MB * 1024 * 1024
+    perfiles = {}
+    for archivo in directorio.iterdir():
+        if PERFIL_ID.match(archivo.stem):
+            perfiles.setdefault(archivo.stem, []).append(archivo)
+    tamano = sum(archivo.stat().st_size for archivos in perfiles.values() for archivo in archivos)
+    # El id empieza con la fecha, así que el orden alfabético es el cronológico
+    for perfil_id in sorted(perfiles):
+        if tamano <= limite:
+            break
+        if perfil_id == conservar:
+            continue
+        for archivo in perfiles[perfil_id]:
+            tamano -= archivo.stat().st_size
+            archivo.unlink(missing_ok=True)
+
+
+def listar():
+    """Metadatos de los perfiles guardados, del más reciente al más antiguo."""
+    perfiles = []
+    for archivo in sorted(_directorio().glob('*.json'), reverse=True):
+        if not PERFIL_ID.match(archivo.stem):
+            continue
+        try:
+            datos = json.loads(archivo.read_text())
+        except (OSError, ValueError):
+            continue
+        datos.pop('consultas', None)
+        datos['bytes'] = sum(
+            ruta.stat().st_size for ruta in (archivo, archivo.with_suffix('.folded')) if ruta.exists()
+        )
+        perfiles.append(datos)
+    return perfiles
+
+
+def ruta_archivo(perfil_id, tipo):
+    """Ruta del archivo ``tipo`` (``folded`` o ``consultas``) del perfil, o ``None``."""
+    if not PERFIL_ID.match(perfil_id) or tipo not in ARCHIVOS:
+        return None
+    ruta = _directorio() / f'{perfil_id}{ARCHIVOS[tipo]}'
+    return ruta if ruta.exists() else None
+
+
+def _admin_solicitante(request):
+    """Usuario administrador que pide el perfil, o ``None``."""
+    if not (request.headers.get('X-Perfilar') or request.GET.get('perfilar')):
+        return None
+    usuario = getattr(request, 'user', None)
+    if not (usuario and usuario.is_authenticated):
+        try:
+            resultado = CachedTokenAuthentication().authenticate(request)
+        except exceptions.AuthenticationFailed:
+            return None
+        usuario = resultado[0] if resultado else None
+    if usuario is None or getattr(usuario, 'rol', None) != 'ADMINISTRADOR':
+        return None
+    return usuario
+
+
+class PerfiladoMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        usuario = _admin_solicitante(request)
+        if usuario is None:
+            return self.get_response(request)
+
+        registro = RegistroConsultas(settings.PERFILADO_MAX_CONSULTAS)
+        muestreador = Muestreador(threading.get_ident(), settings.PERFILADO_INTERVALO_MS / 1000)
+        inicio = time.perf_counter()
+        muestreador.start()
+        try:
+            with ExitStack() as pila:
+                for alias in connections:
+                    pila.enter_context(connections[alias].execute_wrapper(registro))
+                response = self.get_response(request)
+        finally:
+            muestreador.detener()
+        duracion_ms = (time.perf_counter() - inicio) * 1000
+
+        ahora = timezone.localtime()
+        perfil_id = f"{ahora:%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+        match = getattr(request, 'resolver_match', None)
+        directorio = _directorio()
+        (directorio / f'{perfil_id}.folded').write_text(muestreador.colapsado())
+        (directorio / f'{perfil_id}.json').write_text(json.dumps({
+            'id': perfil_id,
+            'fecha': ahora.isoformat(),
+            'vista': match.view_name if match else None,
+            'metodo': request.method,
+            'ruta': request.get_full_path(),
+            'usuario': usuario.username,
+            'status': response.status_code,
+            'duracion_ms': round(duracion_ms, 2),
+            'muestras': sum(muestreador.pilas.values()),
+            'total_consultas': registro.total,
+            'consultas': registro.consultas,
+        }, indent=1))
+        _rotar(directorio, perfil_id)
+
+        response['X-Perfil-Id'] = perfil_id
+        return response
@@ -0,0 +1,80 @@
+"""
+Backend de PostgreSQL con pool de conexiones de ``psycopg_pool`` (psycopg 3).
+
+Se activa con ``DB_POOL=True`` (ver ``settings.DATABASES``). Cada proceso
+(worker de gunicorn) crea su propio pool la primera vez que lo necesita, ya
+después del fork de ``preload_app``. Django sigue pidiendo y cerrando la
+conexión en cada request (``CONN_MAX_AGE = 0``), pero "abrir" toma una conexión
+ya autenticada del pool y "cerrar" la devuelve, así que el handshake TLS y la
+autenticación quedan fuera de la latencia de las peticiones.
+
+El tamaño se configura en ``DATABASES['default']['POOL']``.
+"""
+import os
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel, is_psycopg3
+
+
+_pools = {}
+_lock = threading.Lock()
+
+
+def pools():
+    """Pools creados en este proceso, por alias de base de datos."""
+    pid = os.getpid()
+    return {alias: pool for (alias, pool_pid), pool in _pools.items() if pool_pid == pid}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def _pool(self, conn_params):
+        llave = (self.alias, os.getpid())
+        pool = _pools.get(llave)
+        if pool is not None:
+            return pool
+
+        if not is_psycopg3:
+            raise ImproperlyConfigured('DB_POOL=True requiere psycopg 3 (pip install "psycopg[binary,pool]")')
+        try:
+            from psycopg_pool import ConnectionPool
+        except ImportError as exc:
+            raise ImproperlyConfigured('DB_POOL=True requiere psycopg_pool (pip install "psycopg[binary,pool]")') from exc
+
+        opciones = self.settings_dict.get('POOL', {})
+        with _lock:
+            pool = _pools.get(llave)
+            if pool is None:
+                pool = ConnectionPool(
+                    kwargs=conn_params,
+                    min_size=opciones.get('min_size', 1),
+                    max_size=opciones.get('max_size', 4),
+                    timeout=opciones.get('timeout', 10),
+                    max_idle=opciones.get('max_idle', 600),
+                    check=ConnectionPool.check_connection,
+                    name=f'{self.alias}-{llave[1]}',
+                    open=True,
+                )
+                _pools[llave] = pool
+        return pool
+
+    def get_new_connection(self, conn_params):
+        isolation_level = self.settings_dict['OPTIONS'].get('isolation_level')
+        try:
+            self.isolation_level = IsolationLevel(isolation_level or IsolationLevel.READ_COMMITTED)
+        except ValueError:
+            raise ImproperlyConfigured(
+                f'Invalid transaction isolation level {isolation_level} '
+                f'specified. Use one of the psycopg.IsolationLevel values.'
+            )
+        connection = self._pool(conn_params).getconn()
+        connection.isolation_level = self.isolation_level
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                # El pool revierte transacciones abiertas y descarta conexiones rotas
+                return _pools[(self.alias, os.getpid())].putconn(self.connection)
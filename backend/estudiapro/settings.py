@@ -27,9 +27,11 @@ INSTALLED_APPS = [
     # Tu app
     'usuarios',
     'cursos',
+    'tareas',
 ]
 
 MIDDLEWARE = [
+    'estudiapro.instrumentacion.InstrumentacionMiddleware',  # Primero: mide el request completo
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Servir archivos estáticos en producción
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -38,6 +40,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'estudiapro.perfilado.PerfiladoMiddleware',  # Después de la autenticación por sesión
     # 'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -63,12 +66,29 @@ WSGI_APPLICATION = 'estudiapro.wsgi.application'
 
 # Database
 DB_ENGINE = os.getenv('DB_ENGINE', 'django.db.backends.sqlite3')
+# Segundos que un worker reutiliza su conexión (0 = una conexión por request)
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '60'))
+# Verifica la conexión persistente antes de reutilizarla en un nuevo request
+DB_CONN_HEALTH_CHECKS = os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+# Hilos por worker de gunicorn (deploy/gunicorn.conf.py), para dimensionar el pool
+GUNICORN_THREADS = int(os.getenv('GUNICORN_THREADS', '1'))
 
-if DB_ENGINE == 'django.db.backends.sqlite3':
+if DB_ENGINE in ('django.db.backends.sqlite3', 'estudiapro.sqlite'):
     DATABASES = {
         'default': {
             'ENGINE': DB_ENGINE,
             'NAME': BASE_DIR / os.getenv('DB_NAME', 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+            # Solo los aplica el perfil de producción (estudiapro/sqlite)
+            'PRAGMAS': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+                'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(128 * 1024 * 1024))),
+                # Negativo = KiB por conexión
+                'cache_size': -int(os.getenv('SQLITE_CACHE_KB', '20000')),
+            },
         }
     }
 else:
@@ -81,8 +101,156 @@ else:
             'PASSWORD': os.getenv('DB_PASSWORD', ''),
             'HOST': os.getenv('DB_HOST', 'localhost'),
             'PORT': os.getenv('DB_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
         }
     }
+    # Pool de psycopg 3 por worker (estudiapro/postgresql_pool). Django devuelve
+    # la conexión al pool al terminar cada request, por eso CONN_MAX_AGE = 0.
+    # Por defecto el pool alcanza para los hilos de un worker de gunicorn (en
+    # modo ASGI conviene fijar DB_POOL_MAX_SIZE); el total hacia PostgreSQL es
+    # GUNICORN_WORKERS x DB_POOL_MAX_SIZE.
+    if os.getenv('DB_POOL', 'False') == 'True':
+        DATABASES['default'].update({
+            'ENGINE': 'estudiapro.postgresql_pool',
+            'CONN_MAX_AGE': 0,
+            'POOL': {
+                'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+                'max_size': int(os.getenv('DB_POOL_MAX_SIZE') or max(GUNICORN_THREADS, 1) + 1),
+                'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+            },
+        })
+
+# Reintentos de escrituras que encuentran la base bloqueada (estudiapro/escrituras.py)
+ESCRITURA_REINTENTOS = int(os.getenv('ESCRITURA_REINTENTOS', '5'))
+# Espera inicial en segundos; se duplica en cada reintento
+ESCRITURA_BACKOFF = float(os.getenv('ESCRITURA_BACKOFF', '0.05'))
+
+# Caché compartida entre workers (snapshots de mi_panel, banco de preguntas).
+# Por defecto en archivos para que la invalidación llegue a todos los procesos
+# de gunicorn sin servicios externos.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / 'cache')),
+    }
+}
+
+# Modo ASGI: estudiapro/asgi.py activa las vistas async de cursos/vistas_async.py
+ASYNC_VIEWS = os.getenv('DJANGO_ASYNC_VIEWS', 'False') == 'True'
+
+# Búsqueda full-text (cursos/busqueda.py)
+BUSQUEDA_BACKEND = os.getenv(
+    'BUSQUEDA_BACKEND',
+    'cursos.busqueda.BusquedaPostgres' if 'postgresql' in DB_ENGINE else 'cursos.busqueda.BusquedaSQLite'
+)
+BUSQUEDA_LIMITE = int(os.getenv('BUSQUEDA_LIMITE', '500'))
+BUSQUEDA_PAGE_SIZE = int(os.getenv('BUSQUEDA_PAGE_SIZE', '20'))
+
+# Segundos que se guarda en caché el índice de preguntas por curso y dificultad
+BANCO_PREGUNTAS_TTL = int(os.getenv('BANCO_PREGUNTAS_TTL', '300'))
+# Máximo de preguntas por simulador generado (questionsCount)
+SIMULADOR_MAX_PREGUNTAS = int(os.getenv('SIMULADOR_MAX_PREGUNTAS', '100'))
+
+# Segundos máximos que vive un snapshot de mi_panel (cursos/panel.py)
+PANEL_CACHE_TTL = int(os.getenv('PANEL_CACHE_TTL', '900'))
+
+# Segundos que se reutiliza un token ya resuelto (usuarios/autenticacion.py)
+AUTH_CACHE_TTL = int(os.getenv('AUTH_CACHE_TTL', '60'))
+
+# Contadores con buffer de descargas y vistas del foro (cursos/contadores.py):
+# segundos entre volcados a la base; 0 escribe cada incremento de inmediato
+CONTADORES_INTERVALO = float(os.getenv('CONTADORES_INTERVALO', '5'))
+# Incrementos acumulados en un proceso que adelantan el volcado
+CONTADORES_MAX_PENDIENTES = int(os.getenv('CONTADORES_MAX_PENDIENTES', '1000'))
+# Publicar lo pendiente en la caché para que todos los workers lo sumen al leer.
+# Necesita incr/decr atómicos entre procesos (Redis o Memcached); con la caché
+# de archivos cada proceso solo ve lo suyo hasta el volcado
+CONTADORES_COMPARTIDOS = os.getenv(
+    'CONTADORES_COMPARTIDOS',
+    str(any(backend in CACHES['default']['BACKEND'] for backend in ('redis', 'memcached'))),
+) == 'True'
+
+# Entrega de archivos subidos (estudiapro/entrega.py): con nginx delante,
+# prefijo de la location internal que sirve MEDIA_ROOT vía X-Accel-Redirect;
+# vacío transmite el archivo desde Django
+ARCHIVOS_X_ACCEL_PREFIJO = os.getenv('ARCHIVOS_X_ACCEL_PREFIJO', '')
+# Vigencia mínima de las URLs firmadas de archivos (segundos)
+ARCHIVOS_FIRMA_TTL = int(os.getenv('ARCHIVOS_FIRMA_TTL', '3600'))
+# max-age de un archivo pedido con su versión (?v=<hash>) en la URL
+ARCHIVOS_CACHE_SEGUNDOS = int(os.getenv('ARCHIVOS_CACHE_SEGUNDOS', '86400'))
+
+# Subidas por partes (cursos/subidas.py): directorio de los archivos a medio
+# subir (en el mismo disco que MEDIA_ROOT para que al terminar solo se muevan)
+SUBIDAS_DIR = os.getenv('SUBIDAS_DIR', str(BASE_DIR / 'media' / '.subidas'))
+# Tamaño máximo de cada parte y del archivo completo
+SUBIDAS_TAMANO_PARTE = int(os.getenv('SUBIDAS_TAMANO_PARTE_MB', '5')) * 1024 * 1024
+SUBIDAS_TAMANO_MAXIMO = int(os.getenv('SUBIDAS_TAMANO_MAXIMO_MB', '200')) * 1024 * 1024
+# Segundos sin recibir partes antes de que la sesión expire
+SUBIDAS_TTL = int(os.getenv('SUBIDAS_TTL', '86400'))
+
+# Cola de tareas en segundo plano (tareas/cola.py y tareas/worker.py):
+# con TAREAS_EAGER las tareas corren en el mismo proceso al confirmar la
+# transacción, sin runworker (desarrollo y pruebas)
+TAREAS_EAGER = os.getenv('TAREAS_EAGER', str(DEBUG)) == 'True'
+# Procesos e hilos por proceso de runworker
+TAREAS_PROCESOS = int(os.getenv('TAREAS_PROCESOS', '1'))
+TAREAS_HILOS = int(os.getenv('TAREAS_HILOS', '2'))
+# Segundos de espera de cada hilo cuando la cola está vacía
+TAREAS_INTERVALO = float(os.getenv('TAREAS_INTERVALO', '2'))
+# Intentos por tarea y espera antes de reintentar: BACKOFF * 2^(intento-1), hasta BACKOFF_MAXIMO
+TAREAS_REINTENTOS = int(os.getenv('TAREAS_REINTENTOS', '3'))
+TAREAS_BACKOFF = float(os.getenv('TAREAS_BACKOFF', '10'))
+TAREAS_BACKOFF_MAXIMO = float(os.getenv('TAREAS_BACKOFF_MAXIMO', '3600'))
+# Segundos tras los que otro worker retoma una tarea EN_CURSO (su worker murió)
+TAREAS_TIMEOUT = int(os.getenv('TAREAS_TIMEOUT', '300'))
+# Días que se conservan las tareas terminadas
+TAREAS_RETENCION_DIAS = int(os.getenv('TAREAS_RETENCION_DIAS', '7'))
+# Tareas periódicas: nombre de la tarea -> expresión cron (hora local)
+TAREAS_PERIODICAS = {
+    'limpiar_subidas': '15 * * * *',
+    'reconciliar_votos': '30 3 * * *',
+    'purgar_tareas_terminadas': '45 3 * * *',
+}
+
+# Consultas y tiempo en base de datos por request (estudiapro/instrumentacion.py)
+INSTRUMENTACION_ACTIVA = os.getenv('INSTRUMENTACION_ACTIVA', 'True') == 'True'
+# Presupuesto por defecto; al rebasarlo se registra una línea JSON
+PRESUPUESTO_CONSULTAS = int(os.getenv('PRESUPUESTO_CONSULTAS', '30'))
+PRESUPUESTO_DB_MS = float(os.getenv('PRESUPUESTO_DB_MS', '200'))
+# Presupuestos por nombre de URL (dict o ruta a uno), p. ej. {'curso-list': {'consultas': 5, 'db_ms': 50}}
+PRESUPUESTOS_VISTAS = 'cursos.presupuestos.PRESUPUESTOS'
+
+# Perfilado bajo demanda para administradores (estudiapro/perfilado.py)
+PERFILADO_DIR = os.getenv('PERFILADO_DIR', str(BASE_DIR / 'perfiles'))
+# Tamaño máximo del directorio; al rebasarlo se borran los perfiles más antiguos
+PERFILADO_MAX_MB = int(os.getenv('PERFILADO_MAX_MB', '50'))
+PERFILADO_INTERVALO_MS = float(os.getenv('PERFILADO_INTERVALO_MS', '1'))
+PERFILADO_MAX_CONSULTAS = int(os.getenv('PERFILADO_MAX_CONSULTAS', '2000'))
+
+# Si se define, /metrics exige "Authorization: Bearer <token>" (estudiapro/metricas.py)
+METRICAS_TOKEN = os.getenv('METRICAS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'instrumentacion': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'json',
+        },
+    },
+    'loggers': {
+        'estudiapro.instrumentacion': {
+            'handlers': ['instrumentacion'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -129,8 +297,12 @@ AUTH_USER_MODEL = 'usuarios.Usuario'
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        # TokenAuthentication con caché y perfiles precargados (usuarios/autenticacion.py)
+        'usuarios.autenticacion.CachedTokenAuthentication',
     ],
+    # Opcional por petición (?cursor= / ?page_size=), ver estudiapro/paginacion.py
+    'DEFAULT_PAGINATION_CLASS': 'estudiapro.paginacion.KeysetPagination',
+    'PAGE_SIZE': int(os.getenv('API_PAGE_SIZE', '50')),
 }
 
 
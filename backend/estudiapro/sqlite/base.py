@@ -0,0 +1,27 @@
+"""
+Perfil de SQLite para producción (``DB_ENGINE=estudiapro.sqlite``).
+
+Al abrir cada conexión aplica los PRAGMA de ``DATABASES['default']['PRAGMAS']``
+(WAL, ``busy_timeout``, ``synchronous=NORMAL``, ``mmap_size``, ``cache_size``).
+Con WAL las lecturas no esperan a las escrituras.
+
+Los bloques ``transaction.atomic()`` abren con ``BEGIN IMMEDIATE``: toman el
+candado de escritura al inicio, esperando hasta ``busy_timeout``, en lugar de
+fallar con "database is locked" al intentar subir de lectura a escritura a mitad
+de la transacción (caso en el que SQLite no respeta ``busy_timeout``). Así las
+escrituras de los distintos workers quedan en fila; ``estudiapro.escrituras``
+reintenta las que aun así agoten la espera.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for pragma, valor in self.settings_dict.get('PRAGMAS', {}).items():
+            conn.execute(f'PRAGMA {pragma} = {valor}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,358 @@
+"""
+Infraestructura del proyecto (``estudiapro/``).
+
+``PaginacionKeysetTests`` cubre la paginación por cursor de ``paginacion.py``,
+``ConexionesTests`` el pool de ``postgresql_pool``, ``ReporteConexionesTests``
+el reporte de ``conexiones.py``, ``PerfilSQLiteTests`` el perfil de ``sqlite``,
+``EscriturasTests`` los reintentos de ``escrituras.py``,
+``InstrumentacionTests`` el middleware de ``instrumentacion.py``,
+``MetricasTests`` el endpoint ``/metrics`` y su configuración en gunicorn,
+``PerfiladoTests`` el perfilado bajo demanda de ``perfilado.py`` y
+``BenchmarkRutasTests`` la preparación de peticiones de ``benchmarks/rutas.py``.
+"""
+import copy
+import json
+import os
+import re
+import runpy
+import sys
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from cursos.models import Notificacion
+from usuarios.models import Usuario
+from .escrituras import escritura_con_reintentos
+from .instrumentacion import presupuesto
+from .postgresql_pool import base as postgresql_pool
+from .sqlite import base as sqlite
+
+
+class PaginacionKeysetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user('estudiante', 'estudiante@example.com', 'clave123', rol='ESTUDIANTE')
+        cls.token = Token.objects.create(user=cls.usuario).key
+        Notificacion.objects.bulk_create([
+            Notificacion(usuario=cls.usuario, titulo=f'Aviso {i}', mensaje='...') for i in range(5)
+        ])
+        # Misma fecha en todas: el orden lo desempata el id
+        Notificacion.objects.update(fecha_creacion=timezone.now())
+
+    def setUp(self):
+        self.cliente = APIClient()
+        self.cliente.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def test_sin_parametros_regresa_el_arreglo_completo(self):
+        respuesta = self.cliente.get(reverse('notificacion-list'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.data), 5)
+
+    def test_page_size_sin_cursor_no_pagina(self):
+        # Como las búsquedas con page_size y sin page
+        respuesta = self.cliente.get(reverse('notificacion-list'), {'page_size': 2})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.data), 5)
+
+    def test_recorre_todas_las_paginas_sin_repetir(self):
+        esperado = list(Notificacion.objects.order_by('-fecha_creacion', '-id').values_list('id', flat=True))
+        vistos, parametros = [], {'cursor': '', 'page_size': 2}
+        while True:
+            respuesta = self.cliente.get(reverse('notificacion-list'), parametros)
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertLessEqual(len(respuesta.data['results']), 2)
+            vistos.extend(notificacion['id'] for notificacion in respuesta.data['results'])
+            if not respuesta.data['next_cursor']:
+                self.assertIsNone(respuesta.data['next'])
+                break
+            self.assertIn('cursor=', respuesta.data['next'])
+            parametros['cursor'] = respuesta.data['next_cursor']
+        self.assertEqual(vistos, esperado)
+
+    def test_cursor_invalido(self):
+        respuesta = self.cliente.get(reverse('notificacion-list'), {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(respuesta.status_code, 404)
+
+
+class ConexionesTests(SimpleTestCase):
+
+    def setUp(self):
+        self.addCleanup(postgresql_pool._pools.clear)
+
+    def _wrapper(self):
+        return postgresql_pool.DatabaseWrapper({
+            'ENGINE': 'estudiapro.postgresql_pool', 'NAME': 'estudiapro_db', 'OPTIONS': {},
+            'CONN_MAX_AGE': 0, 'POOL': {'min_size': 1, 'max_size': 3, 'timeout': 5},
+        }, alias='pruebas')
+
+    @mock.patch('psycopg_pool.ConnectionPool')
+    def test_un_pool_por_proceso_y_las_conexiones_regresan(self, ConnectionPool):
+        primera, segunda = self._wrapper(), self._wrapper()
+        for wrapper in (primera, segunda):
+            wrapper.connection = wrapper.get_new_connection({'dbname': 'estudiapro_db'})
+        ConnectionPool.assert_called_once()
+        self.assertEqual(ConnectionPool.call_args.kwargs['max_size'], 3)
+        pool = ConnectionPool.return_value
+        self.assertEqual(pool.getconn.call_count, 2)
+
+        # Cerrar no desconecta: devuelve la conexión al pool
+        conexion = primera.connection
+        primera._close()
+        pool.putconn.assert_called_once_with(conexion)
+        self.assertEqual(postgresql_pool.pools(), {'pruebas': pool})
+
+    def test_pools_de_otro_proceso_no_se_reportan(self):
+        postgresql_pool._pools[('pruebas', os.getpid() + 1)] = object()
+        self.assertEqual(postgresql_pool.pools(), {})
+
+
+class ReporteConexionesTests(TestCase):
+
+    def test_reporte_para_administradores(self):
+        admin = Usuario.objects.create_user('admin', 'admin@example.com', 'clave123', rol='ADMINISTRADOR')
+        estudiante = Usuario.objects.create_user('estudiante', 'e@example.com', 'clave123', rol='ESTUDIANTE')
+        cliente = APIClient()
+        cliente.force_authenticate(estudiante)
+        self.assertEqual(cliente.get(reverse('admin-conexiones')).status_code, 403)
+
+        cliente.force_authenticate(admin)
+        reporte = cliente.get(reverse('admin-conexiones')).data
+        self.assertEqual(reporte['pid'], os.getpid())
+        self.assertGreaterEqual(reporte['peticiones'], 1)
+        self.assertEqual(reporte['bases']['default']['engine'], settings.DATABASES['default']['ENGINE'])
+        self.assertNotIn('pool', reporte['bases']['default'])
+
+
+class PerfilSQLiteTests(SimpleTestCase):
+
+    def _wrapper(self, ruta, busy_timeout):
+        settings_dict = copy.deepcopy(connection.settings_dict)
+        settings_dict.update(ENGINE='estudiapro.sqlite', NAME=ruta, PRAGMAS={
+            'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': busy_timeout,
+        })
+        wrapper = sqlite.DatabaseWrapper(settings_dict, alias='pruebas_sqlite')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_pragmas_y_begin_immediate(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ruta = os.path.join(directorio.name, 'pruebas.sqlite3')
+        primera, segunda = self._wrapper(ruta, 5000), self._wrapper(ruta, 50)
+
+        with primera.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('CREATE TABLE t (x INTEGER)')
+
+        # El candado de escritura se pide al abrir el bloque, no en el primer INSERT
+        primera._start_transaction_under_autocommit()
+        try:
+            with self.assertRaisesMessage(OperationalError, 'database is locked'), segunda.wrap_database_errors:
+                segunda._start_transaction_under_autocommit()
+        finally:
+            primera.connection.execute('ROLLBACK')
+
+
+@override_settings(ESCRITURA_REINTENTOS=2, ESCRITURA_BACKOFF=0.01)
+@mock.patch('estudiapro.escrituras.time.sleep')
+class EscriturasTests(TransactionTestCase):
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user('estudiante', 'estudiante@example.com', 'clave123')
+
+    def _vista(self, *errores):
+        pendientes = list(errores)
+
+        @escritura_con_reintentos
+        def vista():
+            self.assertTrue(connection.in_atomic_block)
+            Notificacion.objects.create(usuario=self.usuario, titulo='Aviso', mensaje='...')
+            if pendientes:
+                raise pendientes.pop(0)
+            return 'ok'
+        return vista
+
+    def test_reintenta_los_bloqueos_y_revierte_cada_intento(self, sleep):
+        bloqueo = OperationalError('database is locked')
+        self.assertEqual(self._vista(bloqueo, bloqueo)(), 'ok')
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual(Notificacion.objects.count(), 1)
+
+    def test_se_rinde_o_no_reintenta(self, sleep):
+        bloqueo = OperationalError('database is locked')
+        with self.assertRaises(OperationalError):
+            self._vista(bloqueo, bloqueo, bloqueo)()
+        self.assertEqual(sleep.call_count, 2)
+        with self.assertRaisesMessage(OperationalError, 'no such table'):
+            self._vista(OperationalError('no such table: x'))()
+        # Dentro de otra transacción el reintento le toca al bloque externo
+        with self.assertRaises(OperationalError), transaction.atomic():
+            self._vista(bloqueo)()
+        self.assertEqual(sleep.call_count, 2)
+        self.assertFalse(Notificacion.objects.exists())
+
+
+class InstrumentacionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user('estudiante', 'estudiante@example.com', 'clave123')
+        Notificacion.objects.create(usuario=cls.usuario, titulo='Aviso', mensaje='...')
+
+    def setUp(self):
+        self.cliente = APIClient()
+        self.cliente.force_authenticate(self.usuario)
+
+    def test_server_timing_con_las_consultas_del_request(self):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.cliente.get(reverse('notificacion-list'))
+        cabecera = respuesta['Server-Timing']
+        self.assertRegex(cabecera, r'^db;dur=[\d.]+;desc="\d+ consultas", app;dur=[\d.]+;desc="notificacion-list"$')
+        self.assertEqual(int(re.search(r'"(\d+) consultas"', cabecera).group(1)), len(consultas))
+
+    @override_settings(PRESUPUESTOS_VISTAS={'notificacion-list': {'consultas': 0}})
+    def test_presupuesto_excedido_se_registra(self):
+        with self.assertLogs('estudiapro.instrumentacion', 'WARNING') as registro:
+            self.cliente.get(reverse('notificacion-list'))
+        evento = json.loads(registro.records[0].getMessage())
+        self.assertEqual((evento['evento'], evento['vista'], evento['presupuesto_consultas']),
+                         ('presupuesto_excedido', 'notificacion-list', 0))
+        self.assertGreater(evento['consultas'], 0)
+
+    @override_settings(
+        PRESUPUESTOS_VISTAS={'vista': {'consultas': 2, 'por_metodo': {'POST': 5}}},
+        PRESUPUESTO_CONSULTAS=10, PRESUPUESTO_DB_MS=100,
+    )
+    def test_presupuesto_por_vista_y_metodo(self):
+        self.assertEqual(presupuesto('vista', 'GET'), (2, 100))
+        self.assertEqual(presupuesto('vista', 'POST'), (5, 100))
+        self.assertEqual(presupuesto('otra', 'GET'), (10, 100))
+
+
+class MetricasTests(TestCase):
+
+    def test_histogramas_por_vista(self):
+        usuario = Usuario.objects.create_user('estudiante', 'estudiante@example.com', 'clave123')
+        cliente = APIClient()
+        cliente.force_authenticate(usuario)
+        cliente.get(reverse('notificacion-list'))
+        respuesta = self.client.get(reverse('metricas'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn(
+            'estudiapro_request_segundos_count{codigo="2xx",metodo="GET",vista="notificacion-list"}',
+            respuesta.content.decode(),
+        )
+
+    @override_settings(METRICAS_TOKEN='secreto')
+    def test_token(self):
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 401)
+        respuesta = self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_configuracion_de_gunicorn_para_contenedores(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        metricas = os.path.join(directorio.name, 'metricas')
+        entorno = {
+            'GUNICORN_BIND': '0.0.0.0:8000', 'GUNICORN_PIDFILE': '', 'GUNICORN_USER': '', 'GUNICORN_GROUP': '',
+            'PROMETHEUS_MULTIPROC_DIR': metricas,
+        }
+        with mock.patch.dict(os.environ, entorno):
+            configuracion = runpy.run_path(os.path.join(settings.BASE_DIR, 'deploy', 'gunicorn.conf.py'))
+        self.assertEqual(configuracion['bind'], '0.0.0.0:8000')
+        self.assertIsNone(configuracion['pidfile'])
+        self.assertIsNone(configuracion['user'])
+        self.assertTrue(os.path.isdir(metricas))
+
+
+class PerfiladoTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.perfiles = tempfile.TemporaryDirectory()
+        cls.enterClassContext(override_settings(PERFILADO_DIR=cls.perfiles.name))
+        cls.addClassCleanup(cls.perfiles.cleanup)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        admin = Usuario.objects.create_user('admin', 'admin@example.com', 'clave123', rol='ADMINISTRADOR')
+        estudiante = Usuario.objects.create_user('estudiante', 'e@example.com', 'clave123', rol='ESTUDIANTE')
+        cls.tokens = {
+            'admin': Token.objects.create(user=admin).key,
+            'estudiante': Token.objects.create(user=estudiante).key,
+        }
+
+    def _cliente(self, rol):
+        cliente = APIClient()
+        cliente.credentials(HTTP_AUTHORIZATION=f'Token {self.tokens[rol]}')
+        return cliente
+
+    def test_admin_perfila_y_descarga(self):
+        respuesta = self._cliente('admin').get(reverse('notificacion-list'), HTTP_X_PERFILAR='1')
+        perfil_id = respuesta['X-Perfil-Id']
+
+        perfiles = self._cliente('admin').get(reverse('admin-perfiles')).data
+        self.assertEqual([perfil['id'] for perfil in perfiles], [perfil_id])
+        self.assertEqual((perfiles[0]['vista'], perfiles[0]['usuario']), ('notificacion-list', 'admin'))
+        self.assertGreater(perfiles[0]['total_consultas'], 0)
+
+        ruta = reverse('admin-perfil-descarga', kwargs={'perfil_id': perfil_id})
+        consultas = self._cliente('admin').get(ruta, {'archivo': 'consultas'})
+        detalle = json.loads(b''.join(consultas.streaming_content))
+        self.assertEqual(len(detalle['consultas']), detalle['total_consultas'])
+        self.assertEqual(self._cliente('admin').get(ruta).status_code, 200)
+        self.assertEqual(self._cliente('estudiante').get(ruta).status_code, 403)
+
+    def test_la_marca_se_ignora_para_otros_usuarios(self):
+        respuesta = self._cliente('estudiante').get(reverse('notificacion-list'), HTTP_X_PERFILAR='1')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn('X-Perfil-Id', respuesta)
+        self.assertEqual(os.listdir(self.perfiles.name), [])
+
+    @override_settings(PERFILADO_MAX_MB=0)
+    def test_rotacion_conserva_el_perfil_nuevo(self):
+        viejo = os.path.join(self.perfiles.name, '20200101-000000-0000abcd')
+        for extension in ('.json', '.folded'):
+            with open(viejo + extension, 'w') as archivo:
+                archivo.write('{}')
+        perfil_id = self._cliente('admin').get(reverse('notificacion-list'), {'perfilar': 1})['X-Perfil-Id']
+        self.assertEqual(sorted(os.listdir(self.perfiles.name)), [f'{perfil_id}.folded', f'{perfil_id}.json'])
+
+    def tearDown(self):
+        for archivo in os.listdir(self.perfiles.name):
+            os.remove(os.path.join(self.perfiles.name, archivo))
+
+
+class BenchmarkRutasTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # El script importa ``carga_http`` como módulo hermano
+        with mock.patch.object(sys, 'path', [str(settings.BASE_DIR / 'benchmarks'), *sys.path]):
+            cls.rutas = runpy.run_path(str(settings.BASE_DIR / 'benchmarks' / 'rutas.py'))
+
+    def test_ruta_de_detalle_con_muestra(self):
+        m = {'curso': 7, 'tokens': {'estudiante': 'abc'}}
+        ruta, argumentos = self.rutas['preparar_peticion']('curso-detail', 'get', ['pk'], m, {})
+        self.assertEqual(ruta, reverse('curso-detail', kwargs={'pk': 7}))
+        self.assertEqual(argumentos['HTTP_AUTHORIZATION'], 'Token abc')
+
+    def test_ruta_de_detalle_sin_muestra_se_omite(self):
+        m = {'tokens': {'estudiante': 'abc'}}
+        preparar = self.rutas['preparar_peticion']
+        self.assertIsNone(preparar('ruta-sin-prefijo-detail', 'get', ['pk'], m, {}))
+        self.assertIsNone(preparar('curso-detail', 'get', ['pk'], m, {}))
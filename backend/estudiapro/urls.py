@@ -3,11 +3,14 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from .metricas import vista_metricas
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('usuarios.urls')),
     path('api/admin/', include('usuarios.admin_urls')),
     path('api/', include('cursos.urls')), 
+    path('metrics', vista_metricas, name='metricas'),
 ]
 
 if settings.DEBUG:
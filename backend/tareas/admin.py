@@ -0,0 +1,20 @@
+from django.contrib import admin
+from .models import EjecucionPeriodica, Tarea
+
+
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ['nombre', 'estado', 'intentos', 'max_intentos', 'ejecutar_en', 'trabajador', 'fecha_fin']
+    list_filter = ['estado', 'nombre']
+    search_fields = ['nombre', 'ultimo_error']
+    actions = ['reintentar']
+
+    @admin.action(description='Volver a encolar')
+    def reintentar(self, request, queryset):
+        from django.utils import timezone
+        queryset.update(estado='PENDIENTE', intentos=0, ejecutar_en=timezone.now(), bloqueada_hasta=None)
+
+
+@admin.register(EjecucionPeriodica)
+class EjecucionPeriodicaAdmin(admin.ModelAdmin):
+    list_display = ['nombre', 'cron', 'proxima', 'ultima']
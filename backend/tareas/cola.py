@@ -0,0 +1,120 @@
+"""
+Cola de tareas en segundo plano respaldada por la base de datos.
+
+Recalcular el progreso de un curso, crear notificaciones o borrar un curso con
+todo lo que cuelga de él no tiene por qué ocurrir dentro del request. Una
+función se registra con ``@tarea`` en el módulo ``tareas.py`` de su app (se
+importa solo al arrancar) y se encola con ``.encolar(...)``::
+
+    @tarea()
+    def notificar_solicitud_tutoria(tutoria_id):
+        ...
+
+    notificar_solicitud_tutoria.encolar(tutoria.id)
+
+``encolar`` inserta la fila en ``Tarea`` cuando se confirma la transacción
+actual, así el worker nunca ve una tarea cuyos datos todavía no existen y un
+rollback no deja tareas huérfanas. Los argumentos deben poder serializarse a
+JSON (ids, no instancias). ``runworker`` las ejecuta; con ``TAREAS_EAGER`` se
+ejecutan en el mismo proceso al confirmar, sin worker (desarrollo y pruebas).
+"""
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+
+# nombre -> TareaRegistrada
+_registro = {}
+
+
+class TareaNoRegistrada(KeyError):
+    pass
+
+
+class TareaRegistrada:
+    """Función registrada como tarea; se sigue pudiendo llamar directamente."""
+
+    def __init__(self, funcion, nombre, max_intentos=None):
+        self.funcion = funcion
+        self.nombre = nombre
+        self._max_intentos = max_intentos
+        self.__doc__ = funcion.__doc__
+        self.__name__ = funcion.__name__
+        self.__module__ = funcion.__module__
+
+    @property
+    def max_intentos(self):
+        return self._max_intentos or settings.TAREAS_REINTENTOS
+
+    def __call__(self, *args, **kwargs):
+        return self.funcion(*args, **kwargs)
+
+    def encolar(self, *args, **kwargs):
+        return encolar(self.nombre, *args, **kwargs)
+
+    def encolar_en(self, segundos, *args, **kwargs):
+        """Como ``encolar`` pero no antes de ``segundos`` a partir de ahora."""
+        return encolar(self.nombre, *args, _retraso=segundos, **kwargs)
+
+    def __repr__(self):
+        return f'<tarea {self.nombre}>'
+
+
+def tarea(nombre=None, max_intentos=None):
+    """
+    Registra la función decorada. ``nombre`` por omisión es el de la función;
+    ``max_intentos`` por omisión es ``TAREAS_REINTENTOS``.
+    """
+    def decorador(funcion):
+        registrada = TareaRegistrada(funcion, nombre or funcion.__name__, max_intentos)
+        anterior = _registro.get(registrada.nombre)
+        if anterior is not None and anterior.funcion is not funcion:
+            raise ValueError(f'Ya hay una tarea llamada {registrada.nombre!r} ({anterior.__module__})')
+        _registro[registrada.nombre] = registrada
+        return registrada
+    return decorador
+
+
+def obtener(nombre):
+    try:
+        return _registro[nombre]
+    except KeyError:
+        raise TareaNoRegistrada(nombre) from None
+
+
+def registradas():
+    return dict(_registro)
+
+
+def encolar(nombre, *args, _retraso=0, **kwargs):
+    """
+    Encola la tarea ``nombre`` al confirmar la transacción actual (de inmediato
+    si no hay una). Los argumentos se validan aquí para que un error de
+    serialización salga en el request y no en el worker.
+    """
+    registrada = obtener(nombre)
+    argumentos = json.loads(json.dumps(list(args)))
+    argumentos_nombrados = json.loads(json.dumps(kwargs))
+
+    def _encolar():
+        if settings.TAREAS_EAGER:
+            registrada(*argumentos, **argumentos_nombrados)
+        else:
+            insertar(registrada, argumentos, argumentos_nombrados, _retraso)
+
+    transaction.on_commit(_encolar)
+
+
+def insertar(registrada, argumentos=(), argumentos_nombrados=None, retraso=0):
+    """Crea la fila de inmediato, sin esperar al commit ni ejecutar en modo eager."""
+    from .models import Tarea
+    return Tarea.objects.create(
+        nombre=registrada.nombre,
+        argumentos=list(argumentos),
+        argumentos_nombrados=argumentos_nombrados or {},
+        max_intentos=registrada.max_intentos,
+        ejecutar_en=timezone.now() + timedelta(seconds=retraso),
+    )
@@ -0,0 +1,93 @@
+"""
+Expresiones cron de cinco campos (minuto, hora, día del mes, mes, día de la
+semana) para ``TAREAS_PERIODICAS``.
+
+Cada campo acepta ``*``, valores, rangos ``a-b``, listas ``a,b`` y pasos
+``*/n`` o ``a-b/n``. El día de la semana va de 0 (domingo) a 6; 7 también es
+domingo. Como en cron, si se restringen el día del mes y el de la semana basta
+con que se cumpla uno. Las horas son locales (``TIME_ZONE``).
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+
+# (mínimo, máximo) de cada campo
+LIMITES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+ALIAS = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+# Hasta dónde se busca: un 29 de febrero puede estar hasta 8 años adelante
+MAX_DIAS = 8 * 366
+
+
+class ExpresionInvalida(ValueError):
+    pass
+
+
+def _campo(texto, minimo, maximo):
+    valores = set()
+    for parte in texto.split(','):
+        rango, _, paso = parte.partition('/')
+        try:
+            paso = int(paso) if paso else 1
+            if rango == '*':
+                inicio, fin = minimo, maximo
+            elif '-' in rango:
+                inicio, fin = (int(valor) for valor in rango.split('-', 1))
+            else:
+                inicio = fin = int(rango)
+                if paso != 1:
+                    fin = maximo
+        except ValueError:
+            raise ExpresionInvalida(f'Campo inválido: {texto!r}') from None
+        if paso < 1 or inicio < minimo or fin > maximo or inicio > fin:
+            raise ExpresionInvalida(f'Campo fuera de rango ({minimo}-{maximo}): {texto!r}')
+        valores.update(range(inicio, fin + 1, paso))
+    return valores
+
+
+def analizar(expresion):
+    """Regresa ``(minutos, horas, dias, meses, dias_semana, restringe_dia, restringe_semana)``."""
+    campos = ALIAS.get(expresion.strip(), expresion).split()
+    if len(campos) != 5:
+        raise ExpresionInvalida(f'Se esperaban 5 campos: {expresion!r}')
+    minutos, horas, dias, meses, semana = (
+        _campo(texto, *limites) for texto, limites in zip(campos, LIMITES)
+    )
+    if 7 in semana:
+        semana = (semana - {7}) | {0}
+    return minutos, horas, dias, meses, semana, campos[2] != '*', campos[4] != '*'
+
+
+def siguiente(expresion, desde=None):
+    """Primer minuto estrictamente posterior a ``desde`` que cumple ``expresion``."""
+    minutos, horas, dias, meses, semana, restringe_dia, restringe_semana = analizar(expresion)
+    desde = timezone.localtime(desde or timezone.now())
+    momento = desde.replace(second=0, microsecond=0, tzinfo=None) + timedelta(minutes=1)
+    limite = momento + timedelta(days=MAX_DIAS)
+    while momento < limite:
+        if momento.month not in meses:
+            momento = (momento.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            continue
+        # isoweekday(): lunes 1 ... domingo 7
+        dia_ok = momento.day in dias
+        semana_ok = momento.isoweekday() % 7 in semana
+        if restringe_dia and restringe_semana:
+            coincide = dia_ok or semana_ok
+        else:
+            coincide = dia_ok and semana_ok
+        if not coincide:
+            momento = momento.replace(hour=0, minute=0) + timedelta(days=1)
+            continue
+        if momento.hour not in horas:
+            momento = momento.replace(minute=0) + timedelta(hours=1)
+            continue
+        if momento.minute not in minutos:
+            momento += timedelta(minutes=1)
+            continue
+        return timezone.make_aware(momento)
+    raise ExpresionInvalida(f'La expresión no se cumple nunca: {expresion!r}')
@@ -0,0 +1,95 @@
+"""
+Worker de la cola de tareas (``tareas/worker.py``).
+
+Arranca ``--procesos`` procesos con ``--hilos`` hilos cada uno. Los hilos
+sirven para tareas que esperan E/S (archivos, base de datos); para trabajo de
+CPU conviene subir los procesos. Con SIGTERM o Ctrl+C cada hilo termina la
+tarea que está ejecutando y sale.
+"""
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from tareas import cola, cron
+from tareas.worker import ciclo, procesar_pendientes
+
+
+def _hilos(detener, hilos, intervalo):
+    # Solo un hilo por proceso revisa las periódicas; el UPDATE condicional evita duplicados entre procesos
+    trabajadores = [
+        threading.Thread(target=ciclo, args=(detener, intervalo, numero == 0), name=f'tareas-{numero}')
+        for numero in range(hilos)
+    ]
+    for hilo in trabajadores:
+        hilo.start()
+    for hilo in trabajadores:
+        hilo.join()
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las tareas en segundo plano encoladas en la base de datos y las periódicas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=settings.TAREAS_PROCESOS)
+        parser.add_argument('--hilos', type=int, default=settings.TAREAS_HILOS)
+        parser.add_argument(
+            '--intervalo', type=float, default=settings.TAREAS_INTERVALO,
+            help='Segundos de espera cuando la cola está vacía',
+        )
+        parser.add_argument(
+            '--una-vez', action='store_true',
+            help='Ejecuta lo pendiente y termina (útil desde cron)',
+        )
+
+    def handle(self, *args, **options):
+        self._validar_periodicas()
+
+        if options['una_vez']:
+            ejecutadas = procesar_pendientes()
+            self.stdout.write(self.style.SUCCESS(f'{ejecutadas} tarea(s) ejecutada(s)'))
+            return
+
+        procesos, hilos = options['procesos'], options['hilos']
+        if procesos < 1 or hilos < 1:
+            raise CommandError('--procesos y --hilos deben ser al menos 1')
+
+        detener = multiprocessing.Event()
+
+        def _detener(signum, frame):
+            detener.set()
+
+        signal.signal(signal.SIGTERM, _detener)
+        signal.signal(signal.SIGINT, _detener)
+        self.stdout.write(
+            f'Worker de tareas: {procesos} proceso(s) x {hilos} hilo(s), '
+            f'{len(cola.registradas())} tarea(s) registradas'
+        )
+
+        if procesos == 1:
+            _hilos(detener, hilos, options['intervalo'])
+            return
+
+        # Los hijos no deben heredar conexiones abiertas
+        connections.close_all()
+        hijos = [
+            multiprocessing.Process(target=_hilos, args=(detener, hilos, options['intervalo']))
+            for _ in range(procesos)
+        ]
+        for hijo in hijos:
+            hijo.start()
+        for hijo in hijos:
+            hijo.join()
+
+    def _validar_periodicas(self):
+        for nombre, expresion in settings.TAREAS_PERIODICAS.items():
+            try:
+                cola.obtener(nombre)
+                cron.analizar(expresion)
+            except cola.TareaNoRegistrada:
+                raise CommandError(f'TAREAS_PERIODICAS: no hay una tarea registrada como {nombre!r}')
+            except cron.ExpresionInvalida as error:
+                raise CommandError(f'TAREAS_PERIODICAS[{nombre!r}]: {error}')
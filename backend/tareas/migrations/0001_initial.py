@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-17 23:25
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EjecucionPeriodica',
+            fields=[
+                ('nombre', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('cron', models.CharField(max_length=100)),
+                ('proxima', models.DateTimeField()),
+                ('ultima', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Ejecución periódica',
+                'verbose_name_plural': 'Ejecuciones periódicas',
+                'db_table': 'tarea_periodica',
+            },
+        ),
+        migrations.CreateModel(
+            name='Tarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=200)),
+                ('argumentos', models.JSONField(blank=True, default=list)),
+                ('argumentos_nombrados', models.JSONField(blank=True, default=dict)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_CURSO', 'En curso'), ('COMPLETADA', 'Completada'), ('FALLIDA', 'Fallida')], default='PENDIENTE', max_length=20)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('max_intentos', models.PositiveIntegerField(default=3)),
+                ('ejecutar_en', models.DateTimeField(default=django.utils.timezone.now)),
+                ('bloqueada_hasta', models.DateTimeField(blank=True, null=True)),
+                ('trabajador', models.CharField(blank=True, max_length=100)),
+                ('ultimo_error', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Tarea',
+                'verbose_name_plural': 'Tareas',
+                'db_table': 'tarea',
+                'indexes': [models.Index(fields=['estado', 'ejecutar_en'], name='tarea_estado_ejecutar_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Tarea(models.Model):
+    """Trabajo encolado para ``runworker`` (ver tareas/cola.py)."""
+    ESTADOS = [
+        ('PENDIENTE', 'Pendiente'),
+        ('EN_CURSO', 'En curso'),
+        ('COMPLETADA', 'Completada'),
+        ('FALLIDA', 'Fallida'),
+    ]
+
+    nombre = models.CharField(max_length=200)
+    argumentos = models.JSONField(default=list, blank=True)
+    argumentos_nombrados = models.JSONField(default=dict, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='PENDIENTE')
+    intentos = models.PositiveIntegerField(default=0)
+    max_intentos = models.PositiveIntegerField(default=3)
+    ejecutar_en = models.DateTimeField(default=timezone.now)
+    # Si el worker que la tomó muere, otro la retoma después de esta hora
+    bloqueada_hasta = models.DateTimeField(null=True, blank=True)
+    trabajador = models.CharField(max_length=100, blank=True)
+    ultimo_error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'tarea'
+        verbose_name = 'Tarea'
+        verbose_name_plural = 'Tareas'
+        indexes = [
+            models.Index(fields=['estado', 'ejecutar_en'], name='tarea_estado_ejecutar_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.nombre} ({self.estado})'
+
+
+class EjecucionPeriodica(models.Model):
+    """Próxima ejecución de cada entrada de ``TAREAS_PERIODICAS``; coordina a los workers."""
+    nombre = models.CharField(max_length=100, primary_key=True)
+    cron = models.CharField(max_length=100)
+    proxima = models.DateTimeField()
+    ultima = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'tarea_periodica'
+        verbose_name = 'Ejecución periódica'
+        verbose_name_plural = 'Ejecuciones periódicas'
+
+    def __str__(self):
+        return f'{self.nombre} ({self.cron})'
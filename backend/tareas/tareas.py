@@ -0,0 +1,14 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .cola import tarea
+from .models import Tarea
+
+
+@tarea()
+def purgar_tareas_terminadas():
+    """Borra las tareas completadas o fallidas hace más de ``TAREAS_RETENCION_DIAS``."""
+    limite = timezone.now() - timedelta(days=settings.TAREAS_RETENCION_DIAS)
+    Tarea.objects.filter(estado__in=['COMPLETADA', 'FALLIDA'], fecha_fin__lt=limite).delete()
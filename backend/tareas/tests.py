@@ -0,0 +1,202 @@
+"""
+Cola de tareas (``tareas/cola.py``), worker (``tareas/worker.py``) y
+expresiones cron (``tareas/cron.py``), más las tareas que sacaron trabajo de
+las vistas de cursos.
+"""
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from cursos.models import Curso, DocumentoBusqueda, Modulo, Notificacion, Recurso, TutorPerfil
+from usuarios.models import Creador, Estudiante, Usuario
+from . import cron
+from .cola import TareaNoRegistrada, encolar, tarea
+from .models import EjecucionPeriodica, Tarea
+from .worker import ejecutar, procesar_pendientes, programar_periodicas, tomar
+
+
+llamadas = []
+
+
+@tarea(nombre='pruebas.anotar')
+def anotar(valor, sufijo=''):
+    llamadas.append(f'{valor}{sufijo}')
+
+
+@tarea(nombre='pruebas.fallar', max_intentos=2)
+def fallar():
+    raise RuntimeError('falla a propósito')
+
+
+@override_settings(TAREAS_EAGER=False, TAREAS_BACKOFF=10, TAREAS_BACKOFF_MAXIMO=3600, TAREAS_PERIODICAS={})
+class ColaTests(TestCase):
+
+    def setUp(self):
+        llamadas.clear()
+
+    def test_encolar_espera_al_commit(self):
+        with self.captureOnCommitCallbacks() as pendientes:
+            anotar.encolar(1, sufijo='a')
+            self.assertFalse(Tarea.objects.exists())
+        self.assertEqual(len(pendientes), 1)
+        pendientes[0]()
+        guardada = Tarea.objects.get()
+        self.assertEqual((guardada.nombre, guardada.argumentos, guardada.argumentos_nombrados),
+                         ('pruebas.anotar', [1], {'sufijo': 'a'}))
+        self.assertEqual(procesar_pendientes(), 1)
+        self.assertEqual(llamadas, ['1a'])
+        guardada.refresh_from_db()
+        self.assertEqual((guardada.estado, guardada.intentos), ('COMPLETADA', 1))
+        self.assertIsNotNone(guardada.fecha_fin)
+
+    @override_settings(TAREAS_EAGER=True)
+    def test_modo_eager_ejecuta_al_confirmar_sin_fila(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            anotar.encolar('x')
+            self.assertEqual(llamadas, [])
+        self.assertEqual(llamadas, ['x'])
+        self.assertFalse(Tarea.objects.exists())
+
+    def test_argumentos_no_serializables_fallan_al_encolar(self):
+        with self.assertRaises(TypeError):
+            anotar.encolar(object())
+        with self.assertRaises(TareaNoRegistrada):
+            encolar('pruebas.no_existe')
+
+    def test_reintentos_con_backoff_y_fallida(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            fallar.encolar()
+        antes = timezone.now()
+        with mock.patch('tareas.worker.random.uniform', return_value=1), self.assertLogs('tareas.worker', 'WARNING'):
+            self.assertEqual(procesar_pendientes(), 1)
+        guardada = Tarea.objects.get()
+        self.assertEqual((guardada.estado, guardada.intentos), ('PENDIENTE', 1))
+        self.assertIn('falla a propósito', guardada.ultimo_error)
+        self.assertGreaterEqual(guardada.ejecutar_en, antes + timedelta(seconds=10))
+        # Todavía no toca
+        self.assertEqual(procesar_pendientes(), 0)
+
+        Tarea.objects.update(ejecutar_en=timezone.now())
+        with self.assertLogs('tareas.worker', 'ERROR'):
+            self.assertEqual(procesar_pendientes(), 1)
+        guardada.refresh_from_db()
+        self.assertEqual((guardada.estado, guardada.intentos), ('FALLIDA', 2))
+        self.assertIsNotNone(guardada.fecha_fin)
+
+    def test_una_tarea_solo_la_toma_un_worker(self):
+        Tarea.objects.create(nombre='pruebas.anotar', argumentos=[1])
+        primera = tomar('a')
+        self.assertEqual(primera.trabajador, 'a')
+        self.assertIsNone(tomar('b'))
+
+    def test_tarea_abandonada_se_retoma_o_falla(self):
+        ahora = timezone.now()
+        vencida = {'estado': 'EN_CURSO', 'bloqueada_hasta': ahora - timedelta(seconds=1)}
+        retomable = Tarea.objects.create(nombre='pruebas.anotar', argumentos=[2], intentos=1, **vencida)
+        agotada = Tarea.objects.create(nombre='pruebas.anotar', argumentos=[3], intentos=3, **vencida)
+
+        tomada = tomar('b')
+        self.assertEqual((tomada.pk, tomada.intentos), (retomable.pk, 2))
+        self.assertTrue(ejecutar(tomada))
+        agotada.refresh_from_db()
+        self.assertEqual(agotada.estado, 'FALLIDA')
+        self.assertEqual(llamadas, ['2'])
+
+    @override_settings(TAREAS_PERIODICAS={'pruebas.anotar': '*/15 * * * *'})
+    def test_periodicas_se_encolan_una_vez(self):
+        self.assertEqual(programar_periodicas(), [])
+        ejecucion = EjecucionPeriodica.objects.get()
+        self.assertGreater(ejecucion.proxima, timezone.now())
+
+        ejecucion.proxima = timezone.now() - timedelta(minutes=1)
+        ejecucion.save()
+        self.assertEqual(programar_periodicas(), ['pruebas.anotar'])
+        self.assertEqual(programar_periodicas(), [])
+        self.assertEqual(Tarea.objects.filter(nombre='pruebas.anotar').count(), 1)
+        ejecucion.refresh_from_db()
+        self.assertGreater(ejecucion.proxima, timezone.now())
+        self.assertEqual(ejecucion.proxima.minute % 15, 0)
+
+
+class CronTests(SimpleTestCase):
+
+    def _siguiente(self, expresion, desde):
+        local = timezone.make_aware(datetime(*desde))
+        resultado = timezone.localtime(cron.siguiente(expresion, local))
+        return resultado.replace(tzinfo=None)
+
+    def test_campos(self):
+        self.assertEqual(self._siguiente('*/15 * * * *', (2024, 1, 1, 10, 7)), datetime(2024, 1, 1, 10, 15))
+        self.assertEqual(self._siguiente('0 3 * * *', (2024, 1, 1, 3, 0)), datetime(2024, 1, 2, 3, 0))
+        self.assertEqual(self._siguiente('30 9-17/4 * * *', (2024, 1, 1, 14, 0)), datetime(2024, 1, 1, 17, 30))
+        self.assertEqual(self._siguiente('0 0 1 1,7 *', (2024, 2, 1, 0, 0)), datetime(2024, 7, 1, 0, 0))
+        self.assertEqual(self._siguiente('0 0 29 2 *', (2023, 3, 1, 0, 0)), datetime(2024, 2, 29, 0, 0))
+        self.assertEqual(self._siguiente('@weekly', (2024, 1, 1, 0, 0)), datetime(2024, 1, 7, 0, 0))
+
+    def test_dia_del_mes_o_de_la_semana(self):
+        # 1 de enero de 2024 fue lunes; el domingo 7 llega antes que el día 15
+        self.assertEqual(self._siguiente('0 0 15 * 7', (2024, 1, 1, 12, 0)), datetime(2024, 1, 7, 0, 0))
+        self.assertEqual(self._siguiente('0 0 * * 1-5', (2024, 1, 5, 12, 0)), datetime(2024, 1, 8, 0, 0))
+
+    def test_expresiones_invalidas(self):
+        for expresion in ('* * * *', '60 * * * *', '*/0 * * * *', 'a * * * *', '0 0 31 2 *'):
+            with self.subTest(expresion=expresion), self.assertRaises(cron.ExpresionInvalida):
+                cron.siguiente(expresion)
+
+
+@override_settings(TAREAS_EAGER=True)
+class TareasDeCursosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user('admin', 'admin@example.com', 'clave123', rol='ADMINISTRADOR')
+        cls.tutor_usuario = Usuario.objects.create_user('tutor', 'tutor@example.com', 'clave123', rol='CREADOR')
+        cls.tutor = Creador.objects.create(id_usuario=cls.tutor_usuario, especialidad='Cálculo')
+        TutorPerfil.objects.create(creador=cls.tutor, activo=True)
+        cls.estudiante_usuario = Usuario.objects.create_user(
+            'estudiante', 'estudiante@example.com', 'clave123', rol='ESTUDIANTE'
+        )
+        Estudiante.objects.create(id_usuario=cls.estudiante_usuario, nivel_escolar='Universidad')
+        cls.curso = Curso.objects.create(titulo='Cálculo', descripcion='Límites', creador=cls.tutor)
+        modulo = Modulo.objects.create(curso=cls.curso, titulo='Límites', orden=1)
+        Recurso.objects.create(modulo=modulo, titulo='Video', tipo='VIDEO', orden=1)
+
+    def _cliente(self, usuario):
+        cliente = APIClient()
+        cliente.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=usuario).key}')
+        return cliente
+
+    def test_agendar_notifica_al_confirmar(self):
+        cliente = self._cliente(self.estudiante_usuario)
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = cliente.post(reverse('tutor-agendar'), {'tutorId': self.tutor.pk, 'topic': 'Derivadas'}, format='json')
+            self.assertEqual(respuesta.status_code, 201)
+            self.assertFalse(Notificacion.objects.exists())
+        self.assertEqual(
+            set(Notificacion.objects.values_list('usuario_id', 'mensaje')),
+            {
+                (self.tutor_usuario.pk, 'Tienes una solicitud sobre: Derivadas'),
+                (self.estudiante_usuario.pk, 'Tu solicitud de tutoria ha sido registrada.'),
+            },
+        )
+
+    def test_borrar_curso_lo_oculta_y_borra_en_segundo_plano(self):
+        cliente = self._cliente(self.admin)
+        ruta = reverse('curso-detail', kwargs={'pk': self.curso.pk})
+        with self.captureOnCommitCallbacks() as pendientes:
+            self.assertEqual(cliente.delete(ruta).status_code, 204)
+        self.curso.refresh_from_db()
+        self.assertFalse(self.curso.activo)
+        self.assertFalse(DocumentoBusqueda.objects.filter(tipo='CURSO', objeto_id=self.curso.pk).exists())
+        self.assertEqual(cliente.get(ruta).status_code, 404)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for pendiente in pendientes:
+                pendiente()
+        self.assertFalse(Curso.objects.filter(pk=self.curso.pk).exists())
+        self.assertFalse(Recurso.objects.filter(modulo__curso_id=self.curso.pk).exists())
@@ -0,0 +1,182 @@
+"""
+Ejecución de las tareas encoladas (ver ``tareas/cola.py``) y de las periódicas.
+
+Cada hilo de ``runworker`` repite: toma la tarea pendiente más antigua con un
+``UPDATE`` condicional (el mismo patrón que ``subidas.agregar_parte``: si otro
+hilo o proceso la tomó antes, el ``UPDATE`` no afecta filas y se prueba con la
+siguiente), la ejecuta dentro de ``transaction.atomic()`` y guarda el
+resultado. No hace falta ``SELECT ... FOR UPDATE``, así que funciona igual en
+SQLite y en PostgreSQL.
+
+- Si falla y le quedan intentos vuelve a ``PENDIENTE`` para dentro de
+  ``TAREAS_BACKOFF * 2**(intento - 1)`` segundos (con hasta 10% de variación y
+  como máximo ``TAREAS_BACKOFF_MAXIMO``); si no, queda ``FALLIDA`` con el
+  traceback en ``ultimo_error``.
+- Una tarea ``EN_CURSO`` cuyo worker murió se vuelve a tomar cuando pasa
+  ``bloqueada_hasta`` (``TAREAS_TIMEOUT`` segundos después de tomarla).
+- ``programar_periodicas`` encola las entradas de ``TAREAS_PERIODICAS`` que ya
+  tocan. La fila ``EjecucionPeriodica`` de cada una se adelanta con otro
+  ``UPDATE`` condicional, así que con varios workers cada ejecución se encola
+  una sola vez. Si los workers estuvieron detenidos, las ejecuciones perdidas
+  se juntan en una.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connections, models, transaction
+from django.utils import timezone
+
+from . import cola, cron
+from .models import EjecucionPeriodica, Tarea
+
+
+logger = logging.getLogger(__name__)
+
+# Candidatas que se leen por consulta al buscar tarea
+LOTE = 10
+
+
+def nombre_trabajador():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def espera_reintento(intento):
+    """Segundos antes del siguiente intento tras fallar el intento número ``intento``."""
+    espera = min(settings.TAREAS_BACKOFF * 2 ** (intento - 1), settings.TAREAS_BACKOFF_MAXIMO)
+    return espera * random.uniform(0.9, 1.1)
+
+
+def _abandonadas(ahora):
+    return models.Q(estado='EN_CURSO', bloqueada_hasta__lt=ahora)
+
+
+def tomar(trabajador, ahora=None):
+    """Marca como ``EN_CURSO`` la siguiente tarea lista y la regresa (o ``None``)."""
+    ahora = ahora or timezone.now()
+    # Tareas que tumbaron a su worker en el último intento: no se reintentan otra vez
+    Tarea.objects.filter(_abandonadas(ahora), intentos__gte=models.F('max_intentos')).update(
+        estado='FALLIDA', fecha_fin=ahora, bloqueada_hasta=None,
+        ultimo_error='El worker no terminó la tarea antes de TAREAS_TIMEOUT',
+    )
+    listas = models.Q(estado='PENDIENTE', ejecutar_en__lte=ahora) | _abandonadas(ahora)
+    candidatas = list(
+        Tarea.objects.filter(listas).order_by('ejecutar_en', 'id').values_list('id', 'estado', 'intentos')[:LOTE]
+    )
+    for pk, estado, intentos in candidatas:
+        # ``intentos`` cambia en cada toma: si ya no coincide, otro worker la tomó
+        tomada = Tarea.objects.filter(listas, pk=pk, estado=estado, intentos=intentos).update(
+            estado='EN_CURSO',
+            intentos=intentos + 1,
+            trabajador=trabajador[:100],
+            bloqueada_hasta=ahora + timedelta(seconds=settings.TAREAS_TIMEOUT),
+        )
+        if tomada:
+            return Tarea.objects.get(pk=pk)
+    return None
+
+
+def ejecutar(tarea):
+    """Ejecuta una tarea ya tomada y guarda el resultado. Regresa ``True`` si terminó bien."""
+    try:
+        registrada = cola.obtener(tarea.nombre)
+        with transaction.atomic():
+            registrada(*tarea.argumentos, **tarea.argumentos_nombrados)
+    except Exception as error:
+        ahora = timezone.now()
+        cambios = {'ultimo_error': traceback.format_exc(), 'bloqueada_hasta': None}
+        if isinstance(error, cola.TareaNoRegistrada) or tarea.intentos >= tarea.max_intentos:
+            cambios.update(estado='FALLIDA', fecha_fin=ahora)
+            logger.error('Tarea %s (%s) falló definitivamente', tarea.pk, tarea.nombre, exc_info=True)
+        else:
+            cambios.update(
+                estado='PENDIENTE',
+                ejecutar_en=ahora + timedelta(seconds=espera_reintento(tarea.intentos)),
+            )
+            logger.warning('Tarea %s (%s) falló, intento %s', tarea.pk, tarea.nombre, tarea.intentos, exc_info=True)
+        _terminar(tarea, **cambios)
+        return False
+    _terminar(tarea, estado='COMPLETADA', fecha_fin=timezone.now(), bloqueada_hasta=None, ultimo_error='')
+    return True
+
+
+def _terminar(tarea, **cambios):
+    # Si pasó TAREAS_TIMEOUT y otro worker la retomó, el resultado es de ese intento
+    Tarea.objects.filter(pk=tarea.pk, estado='EN_CURSO', intentos=tarea.intentos).update(**cambios)
+    for campo, valor in cambios.items():
+        setattr(tarea, campo, valor)
+
+
+def programar_periodicas(ahora=None):
+    """Encola las tareas periódicas que ya tocan. Regresa sus nombres."""
+    ahora = ahora or timezone.now()
+    encoladas = []
+    for nombre, expresion in settings.TAREAS_PERIODICAS.items():
+        ejecucion, creada = EjecucionPeriodica.objects.get_or_create(
+            nombre=nombre, defaults={'cron': expresion, 'proxima': cron.siguiente(expresion, ahora)}
+        )
+        if creada:
+            continue
+        if ejecucion.cron != expresion:
+            # Cambió la configuración: cuenta a partir de ahora
+            EjecucionPeriodica.objects.filter(nombre=nombre).update(
+                cron=expresion, proxima=cron.siguiente(expresion, ahora)
+            )
+            continue
+        if ejecucion.proxima > ahora:
+            continue
+        adelantada = EjecucionPeriodica.objects.filter(nombre=nombre, proxima=ejecucion.proxima).update(
+            proxima=cron.siguiente(expresion, ahora), ultima=ahora
+        )
+        if adelantada:
+            cola.insertar(cola.obtener(nombre))
+            encoladas.append(nombre)
+    return encoladas
+
+
+def procesar_pendientes(trabajador=None, limite=None):
+    """
+    Encola las periódicas y ejecuta las tareas listas hasta vaciar la cola (o
+    hasta ``limite``). Regresa cuántas ejecutó. Para ``runworker --una-vez`` y
+    las pruebas.
+    """
+    trabajador = trabajador or nombre_trabajador()
+    programar_periodicas()
+    ejecutadas = 0
+    while limite is None or ejecutadas < limite:
+        tarea = tomar(trabajador)
+        if tarea is None:
+            break
+        ejecutar(tarea)
+        ejecutadas += 1
+    return ejecutadas
+
+
+def ciclo(detener, intervalo, periodicas=True):
+    """
+    Bucle de un hilo de ``runworker``: toma y ejecuta tareas hasta que se active
+    el evento ``detener``; cuando no hay nada espera ``intervalo`` segundos.
+    """
+    trabajador = nombre_trabajador()
+    try:
+        while not detener.is_set():
+            close_old_connections()
+            try:
+                if periodicas:
+                    programar_periodicas()
+                tarea = tomar(trabajador)
+            except DatabaseError:
+                # Base ocupada o caída: se reintenta en el siguiente ciclo
+                logger.exception('No se pudo consultar la cola de tareas')
+                tarea = None
+            if tarea is None:
+                detener.wait(intervalo)
+                continue
+            ejecutar(tarea)
+    finally:
+        connections.close_all()
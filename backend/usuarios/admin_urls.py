@@ -8,5 +8,8 @@ urlpatterns = [
     re_path(r'^users/(?P<user_id>\d+)/?$', admin_views.admin_users_manage, name='admin-users-manage'),
     path('custom/cursos/', admin_views.admin_courses_create, name='admin-courses-create'),
     path('custom/cursos/<int:course_id>', admin_views.admin_courses_manage, name='admin-courses-manage'),
+    path('conexiones/', admin_views.admin_conexiones, name='admin-conexiones'),
+    path('perfiles/', admin_views.admin_perfiles, name='admin-perfiles'),
+    path('perfiles/<str:perfil_id>/', admin_views.admin_perfil_descarga, name='admin-perfil-descarga'),
 ]
 
@@ -1,4 +1,5 @@
 import json
+from django.http import FileResponse
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
@@ -6,6 +7,9 @@ from rest_framework.response import Response
 
 from .models import Usuario, Creador
 from cursos.models import Curso, Modulo
+from cursos import busqueda, tareas
+from estudiapro import conexiones, perfilado
+from estudiapro.paginacion import paginar_keyset
 
 
 def _is_admin(user: Usuario) -> bool:
@@ -107,8 +111,10 @@ def admin_users_list(request):
     if not _is_admin(request.user):
         return Response({'error': 'Solo administradores.'}, status=status.HTTP_403_FORBIDDEN)
 
-    users = Usuario.objects.all().order_by('-id')
-    return Response([_serialize_user(user) for user in users])
+    return paginar_keyset(
+        request, Usuario.objects.all(), ('-id',),
+        lambda users: [_serialize_user(user) for user in users]
+    )
 
 
 @api_view(['PUT', 'DELETE'])
@@ -203,7 +209,11 @@ def admin_courses_manage(request, course_id: int):
         return Response({'error': 'Curso no encontrado.'}, status=status.HTTP_404_NOT_FOUND)
 
     if request.method == 'DELETE':
-        curso.delete()
+        # Igual que CursoViewSet.perform_destroy: se oculta y se borra en segundo plano
+        curso.activo = False
+        curso.save(update_fields=['activo'])
+        busqueda.desindexar(curso)
+        tareas.borrar_curso.encolar(curso.id)
         return Response({'success': True})
 
     # PUT
@@ -225,3 +235,33 @@ def admin_courses_manage(request, course_id: int):
     payload = _serialize_course(curso)
     return Response({'success': True, 'course': payload, 'subject': payload})
 
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_conexiones(request):
+    """Conexiones a la base de datos del worker que atiende la petición."""
+    if not _is_admin(request.user):
+        return Response({'error': 'Solo administradores.'}, status=status.HTTP_403_FORBIDDEN)
+    return Response(conexiones.reporte())
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_perfiles(request):
+    """Perfiles capturados con ``X-Perfilar`` (ver ``estudiapro/perfilado.py``)."""
+    if not _is_admin(request.user):
+        return Response({'error': 'Solo administradores.'}, status=status.HTTP_403_FORBIDDEN)
+    return Response(perfilado.listar())
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_perfil_descarga(request, perfil_id: str):
+    """Descarga ``?archivo=folded`` (pilas colapsadas, por defecto) o ``?archivo=consultas``."""
+    if not _is_admin(request.user):
+        return Response({'error': 'Solo administradores.'}, status=status.HTTP_403_FORBIDDEN)
+    ruta = perfilado.ruta_archivo(perfil_id, request.query_params.get('archivo', 'folded'))
+    if ruta is None:
+        return Response({'error': 'Perfil no encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+    return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=ruta.name)
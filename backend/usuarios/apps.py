@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class UsuariosConfig(AppConfig):
     name = 'usuarios'
+
+    def ready(self):
+        from estudiapro import conexiones
+        from . import signals  # noqa: F401
+
+        conexiones.conectar_senales()
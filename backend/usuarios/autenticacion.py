@@ -0,0 +1,144 @@
+"""
+Autenticación por token con caché.
+
+``CachedTokenAuthentication`` resuelve en una sola consulta (``values()``) el
+token, el ``Usuario`` y sus perfiles (``perfil_estudiante``, ``perfil_creador``,
+``perfil_administrador``), y guarda esos valores en la caché de Django por
+``AUTH_CACHE_TTL`` segundos. En cada petición se reconstruyen las instancias a
+partir de ellos; con los perfiles ya resueltos, ``hasattr(user,
+'perfil_estudiante')`` y similares no vuelven a consultar la base.
+
+Las entradas se eliminan al borrar el token (logout) y al guardar o borrar el
+usuario o cualquiera de sus perfiles (ver ``usuarios/signals.py``). Los campos
+de ``NO_CACHEADOS`` cambian con demasiada frecuencia (p. ej. el tiempo de estudio,
+en cada heartbeat) o no deben salir de la base (el hash de la contraseña, que
+terminaría en los archivos de la caché): no se guardan y quedan diferidos, así
+que quien los lea los consulta a la base y quien los actualice con ``update()``
+no necesita invalidar nada.
+
+``aauthenticate`` es la variante para vistas ``async def`` (ASGI), con la caché
+y el ORM asíncronos de Django.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+from django.db.models import DEFERRED
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+
+from estudiapro import metricas
+
+
+PERFILES = ('perfil_estudiante', 'perfil_creador', 'perfil_administrador')
+NO_CACHEADOS = ('password', 'perfil_estudiante__tiempo_estudio_minutos')
+
+
+def _llave(token_key):
+    # Prefijo distinto al de las entradas que guardaban el Token completo
+    return 'auth_datos:' + hashlib.sha256(token_key.encode()).hexdigest()
+
+
+def invalidar_token(token_key):
+    llave = _llave(token_key)
+    transaction.on_commit(lambda: cache.delete(llave))
+
+
+def invalidar_usuario(usuario_id):
+    """Elimina de la caché las credenciales de todos los tokens del usuario."""
+    for token_key in Token.objects.filter(user_id=usuario_id).values_list('key', flat=True):
+        invalidar_token(token_key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def _modelos(self):
+        """``(relación, modelo, prefijo)`` del token, el usuario y cada perfil."""
+        token = self.get_model()
+        usuario = token._meta.get_field('user').related_model
+        yield 'token', token, ''
+        yield 'user', usuario, 'user__'
+        for perfil in PERFILES:
+            yield perfil, usuario._meta.get_field(perfil).related_model, f'user__{perfil}__'
+
+    def _campos(self, modelo, prefijo):
+        return [
+            campo for campo in modelo._meta.concrete_fields
+            if f'{prefijo}{campo.name}'.removeprefix('user__') not in NO_CACHEADOS
+        ]
+
+    def _consulta(self, key):
+        columnas = [
+            prefijo + campo.name
+            for _, modelo, prefijo in self._modelos() for campo in self._campos(modelo, prefijo)
+        ]
+        return self.get_model().objects.filter(key=key).values(*columnas)
+
+    def _datos(self, fila):
+        """Valores de la fila por relación; ``None`` para los perfiles que el usuario no tiene."""
+        if fila is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        datos = {}
+        for relacion, modelo, prefijo in self._modelos():
+            valores = {campo.attname: fila[prefijo + campo.name] for campo in self._campos(modelo, prefijo)}
+            datos[relacion] = valores if valores[modelo._meta.pk.attname] is not None else None
+        return datos
+
+    def _instancia(self, modelo, valores):
+        nombres = [campo.attname for campo in modelo._meta.concrete_fields]
+        return modelo.from_db(
+            router.db_for_read(modelo), nombres, [valores.get(nombre, DEFERRED) for nombre in nombres]
+        )
+
+    def _validar(self, datos):
+        """Reconstruye token, usuario y perfiles (los campos no guardados quedan diferidos)."""
+        token = self._instancia(self.get_model(), datos['token'])
+        campo_usuario = token._meta.get_field('user')
+        usuario = self._instancia(campo_usuario.related_model, datos['user'])
+        campo_usuario.set_cached_value(token, usuario)
+        # ``user.auth_token`` (logout) tampoco consulta
+        campo_usuario.remote_field.set_cached_value(usuario, token)
+        for perfil in PERFILES:
+            relacion = usuario._meta.get_field(perfil)
+            objeto = self._instancia(relacion.related_model, datos[perfil]) if datos[perfil] else None
+            relacion.set_cached_value(usuario, objeto)
+            if objeto is not None:
+                relacion.field.set_cached_value(objeto, usuario)
+
+        if not usuario.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return (usuario, token)
+
+    def authenticate_credentials(self, key):
+        llave = _llave(key)
+        datos = cache.get(llave)
+        metricas.consulta_cache('auth', datos is not None)
+        if datos is None:
+            datos = self._datos(self._consulta(key).first())
+            cache.set(llave, datos, settings.AUTH_CACHE_TTL)
+        return self._validar(datos)
+
+    async def aauthenticate(self, request):
+        """Igual que ``authenticate`` pero sin bloquear el event loop."""
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. No credentials provided.'))
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header. Token string should not contain invalid characters.')
+            )
+
+        llave = _llave(key)
+        datos = await cache.aget(llave)
+        metricas.consulta_cache('auth', datos is not None)
+        if datos is None:
+            datos = self._datos(await self._consulta(key).afirst())
+            await cache.aset(llave, datos, settings.AUTH_CACHE_TTL)
+        return self._validar(datos)
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .autenticacion import invalidar_token, invalidar_usuario
+from .models import Administrador, Creador, Estudiante, Usuario
+
+
+@receiver(post_delete, sender=Token)
+def token_borrado(sender, instance, **kwargs):
+    """Logout: el token deja de ser válido de inmediato."""
+    invalidar_token(instance.key)
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def usuario_cambiado(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidar_usuario(instance.pk)
+
+
+@receiver(post_save, sender=Estudiante)
+@receiver(post_save, sender=Creador)
+@receiver(post_save, sender=Administrador)
+@receiver(post_delete, sender=Estudiante)
+@receiver(post_delete, sender=Creador)
+@receiver(post_delete, sender=Administrador)
+def perfil_cambiado(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidar_usuario(instance.id_usuario_id)
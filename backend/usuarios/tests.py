@@ -1,3 +1,80 @@
-from django.test import TestCase
+"""
+Autenticación por token con caché (``usuarios/autenticacion.py``).
+"""
+import pickle
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .autenticacion import CachedTokenAuthentication, _llave
+from .models import Estudiante, Usuario
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class AutenticacionEnCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user('estudiante', 'estudiante@example.com', 'clave123', rol='ESTUDIANTE')
+        Estudiante.objects.create(id_usuario=cls.usuario, nivel_escolar='Universidad')
+        cls.token = Token.objects.create(user=cls.usuario)
+
+    def setUp(self):
+        cache.clear()
+        self.autenticacion = CachedTokenAuthentication()
+
+    def test_token_usuario_y_perfiles_en_una_consulta(self):
+        with self.assertNumQueries(1):
+            usuario, _ = self.autenticacion.authenticate_credentials(self.token.key)
+            self.assertTrue(hasattr(usuario, 'perfil_estudiante'))
+            self.assertFalse(hasattr(usuario, 'perfil_creador'))
+        with self.assertNumQueries(0):
+            usuario, token = self.autenticacion.authenticate_credentials(self.token.key)
+        self.assertEqual((usuario.pk, token.key), (self.usuario.pk, self.token.key))
+
+    def test_la_cache_no_guarda_la_contrasena(self):
+        self.autenticacion.authenticate_credentials(self.token.key)
+        guardado = cache.get(_llave(self.token.key))
+        self.assertNotIn('password', guardado['user'])
+        self.assertNotIn(self.usuario.password, pickle.dumps(guardado).decode('latin-1'))
+
+        usuario, _ = self.autenticacion.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(1):
+            # Diferida: se lee de la base solo si alguien la necesita
+            self.assertTrue(usuario.check_password('clave123'))
+        usuario, _ = self.autenticacion.authenticate_credentials(self.token.key)
+        with self.captureOnCommitCallbacks(execute=True):
+            usuario.save()
+        self.assertTrue(Usuario.objects.get(pk=self.usuario.pk).check_password('clave123'))
+
+    def test_logout_y_cambios_del_usuario_invalidan(self):
+        self.autenticacion.authenticate_credentials(self.token.key)
+        with self.captureOnCommitCallbacks(execute=True):
+            Usuario.objects.get(pk=self.usuario.pk).save(update_fields=['first_name'])
+        self.assertIsNone(cache.get(_llave(self.token.key)))
+
+        clave = self.token.key
+        self.autenticacion.authenticate_credentials(clave)
+        with self.captureOnCommitCallbacks(execute=True):
+            Token.objects.filter(key=clave).delete()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.autenticacion.authenticate_credentials(clave)
+
+    def test_track_time_no_invalida_y_el_tiempo_sale_de_la_base(self):
+        cliente = APIClient()
+        cliente.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.autenticacion.authenticate_credentials(self.token.key)
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(2):
+                respuesta = cliente.post(reverse('track-time'), {'minutes': 5}, format='json')
+        self.assertEqual(respuesta.data['total_minutes'], 10)
+        self.assertIsNotNone(cache.get(_llave(self.token.key)))
+
+        with self.assertNumQueries(1):
+            usuario, _ = self.autenticacion.authenticate_credentials(self.token.key)
+            # Campo diferido: se lee de la base, no de la copia en caché
+            self.assertEqual(usuario.perfil_estudiante.tiempo_estudio_minutos, 10)
@@ -2,25 +2,30 @@ from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
+from django.db.models import F
 from .serializers import RegisterSerializer, LoginSerializer, UsuarioSerializer
-from .models import Usuario
+from .models import Estudiante, Usuario
+from estudiapro.escrituras import escritura_con_reintentos
+from estudiapro.paginacion import paginar_keyset
 
 def build_user_payload(usuario: Usuario) -> dict:
-    """Normaliza la respuesta de usuario al formato esperado por el frontend."""
-    serializer = UsuarioSerializer(usuario)
-    data = serializer.data
+    """
+    Normaliza la respuesta de usuario al formato esperado por el frontend.
+    Solo usa campos propios del usuario: no serializa los perfiles (ver
+    ``autenticacion.NO_CACHEADOS``).
+    """
     return {
-        'id': data.get('id'),
-        'username': data.get('username'),
-        'email': data.get('email'),
-        'first_name': data.get('first_name'),
-        'last_name': data.get('last_name'),
-        'rol': data.get('rol'),
-        'foto_perfil_url': data.get('foto_perfil_url'),
-        'nivel': data.get('nivel'),
-        'puntos_gamificacion': data.get('puntos_gamificacion'),
-        'streak': data.get('streak', 0),
-        'is_premium': data.get('is_premium', False),
+        'id': usuario.id,
+        'username': usuario.username,
+        'email': usuario.email,
+        'first_name': usuario.first_name,
+        'last_name': usuario.last_name,
+        'rol': usuario.rol,
+        'foto_perfil_url': usuario.foto_perfil_url,
+        'nivel': usuario.nivel,
+        'puntos_gamificacion': usuario.puntos_gamificacion,
+        'streak': getattr(usuario, 'streak', 0) or 0,
+        'is_premium': usuario.is_premium,
     }
 
 @api_view(['POST'])
@@ -156,6 +161,7 @@ def activate_premium(request):
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@escritura_con_reintentos
 def track_time(request):
     """
     Función: track_time
@@ -172,9 +178,12 @@ def track_time(request):
     total = 0
     if usuario.rol == 'ESTUDIANTE' and hasattr(usuario, 'perfil_estudiante'):
         estudiante = usuario.perfil_estudiante
-        estudiante.tiempo_estudio_minutos += max(minutes, 0)
-        estudiante.save(update_fields=['tiempo_estudio_minutos'])
-        total = estudiante.tiempo_estudio_minutos
+        # Incremento en la base: dos pestañas reportando a la vez no se pisan
+        Estudiante.objects.filter(pk=estudiante.pk).update(
+            tiempo_estudio_minutos=F('tiempo_estudio_minutos') + max(minutes, 0)
+        )
+        # El tiempo de estudio no va en la caché de autenticación: no hace falta invalidarla
+        total = Estudiante.objects.filter(pk=estudiante.pk).values_list('tiempo_estudio_minutos', flat=True).first()
     return Response({'success': True, 'total_minutes': total}, status=status.HTTP_200_OK)
     
 
@@ -188,9 +197,11 @@ def manage_users(request):
     if request.user.rol != 'ADMINISTRADOR':
         return Response({'error': 'No autorizado'}, status=status.HTTP_403_FORBIDDEN)
     
-    usuarios = Usuario.objects.all().order_by('-fecha_registro')
-    serializer = UsuarioSerializer(usuarios, many=True)
-    return Response(serializer.data)
+    usuarios = Usuario.objects.select_related('perfil_estudiante', 'perfil_creador', 'perfil_administrador')
+    return paginar_keyset(
+        request, usuarios, ('-fecha_registro', '-id'),
+        lambda usuarios: UsuarioSerializer(usuarios, many=True).data
+    )
 
 @api_view(['PUT', 'DELETE'])
 @permission_classes([permissions.IsAuthenticated])